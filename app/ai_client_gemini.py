@@ -7,6 +7,7 @@ from google.api_core import exceptions as google_exceptions
 from http import HTTPStatus
 
 from .limiter import RateLimiter, KeyPool
+from .tracing import span, traced
 
 MODEL = os.getenv("GEMINI_MODEL_ID", "gemini-2.5-flash-lite")
 
@@ -28,6 +29,7 @@ class AIClient:
         self.last_used_key = None  # Track qual chave foi usada
         logging.info(f"AI CLIENT: Inicializado com {len(keys)} chaves de API")
 
+    @traced('ai.generate')
     def generate_text(self, prompt: str, **kwargs) -> tuple:
         """Generate text and return (text, tokens_info) tuple.
         tokens_info is a dict with 'prompt_tokens' and 'completion_tokens'.
@@ -37,8 +39,11 @@ class AIClient:
         attempt = 0
         while True:
             attempt += 1
-            slot = self.pool.next_ready()
-            self.rl.wait()
+            # Espera por chave fora do cooldown vs. rate limiter, medidas separadamente
+            with span('ai.key_wait'):
+                slot = self.pool.next_ready()
+            with span('ai.rate_limit'):
+                self.rl.wait()
             
             # Armazenar qual chave está sendo usada
             self.last_used_key = slot.key
@@ -47,7 +52,8 @@ class AIClient:
                 logging.info(f"IA TENTATIVA {attempt}: Chave ****{slot.key[-4:]} | Modelo {MODEL}")
                 genai.configure(api_key=slot.key)
                 m = genai.GenerativeModel(MODEL)
-                resp = m.generate_content(prompt, **kwargs)
+                with span('ai.model', attempt=attempt, model=MODEL):
+                    resp = m.generate_content(prompt, **kwargs)
                 logging.info(f"IA OK: Tentativa {attempt} sucesso com chave ****{slot.key[-4:]}")
                 
                 # Capturar informações de tokens - OBRIGATÓRIO
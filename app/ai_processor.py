@@ -2,7 +2,6 @@
 import os
 import json
 import logging
-import re
 from urllib.parse import urlparse
 import time
 from pathlib import Path
@@ -16,6 +15,8 @@ from .exceptions import AIProcessorError
 from .ai_client_gemini import AIClient
 from .token_tracker import log_tokens
 from .token_guarantee import log_guaranteed, TokenGuarantee  # Double-layer token protection
+from . import regexes as rx
+from .background_writer import write_artifact
 
 # Get rate limit configs from environment or use defaults from the user's plan
 AI_MIN_INTERVAL_S = float(os.getenv('AI_MIN_INTERVAL_S', 6))
@@ -91,6 +92,17 @@ Somente produzir o conteúdo jornalístico reescrito do artigo principal.
 Se algum desses itens aparecer no texto de origem, exclua-os do resultado.
 """
 
+AI_UPDATE_RULES = """
+[ATUALIZAÇÃO DE POST JÁ PUBLICADO — CUMPRIR 100%]
+A matéria de origem de um post já publicado foi atualizada. Abaixo estão SOMENTE
+os trechos novos ou alterados na fonte (em qualquer idioma).
+- Escreva em português do Brasil um bloco curto de atualização com as informações
+  novas, em 1 a 3 parágrafos <p> (máx. 3–4 frases cada).
+- NÃO repita o que o post já diz, NÃO reescreva o post inteiro, NÃO use títulos.
+- SEM CTAs, hashtags, menção a concorrentes ou termos em inglês (exceto nomes próprios).
+DEVOLVA EXCLUSIVAMENTE JSON VÁLIDO: {"atualizacao_html": "<p>...</p>"}
+"""
+
 class AIProcessor:
     _prompt_template: ClassVar[Optional[str]] = None
     _ai_client: ClassVar[Optional[AIClient]] = None
@@ -209,12 +221,13 @@ class AIProcessor:
                     completion_tokens=int(completion_tokens),
                     api_type="gemini",
                     model=os.getenv("GEMINI_MODEL_ID", "gemini-2.5-flash-lite"),
-                    api_key_suffix=used_key if 'used_key' in locals() else "unknown",
+                    api_key_suffix=self._ai_client.get_last_used_key(),
                     metadata={
                         "batch_size": len(batch_data),
                         "operation": "batch_rewrite",
                         "batch_index": idx,
-                        "total_tokens": int(prompt_tokens + completion_tokens)
+                        "total_tokens": int(prompt_tokens + completion_tokens),
+                        "content_chars": len(batch_item.get('content_html') or ''),
                     },
                     source_url=source_url,
                     article_title=article_title,
@@ -306,7 +319,8 @@ class AIProcessor:
                 metadata={
                     "operation": "single_rewrite",
                     "source_url": source_url,
-                    "total_tokens": int(prompt_tokens + completion_tokens)
+                    "total_tokens": int(prompt_tokens + completion_tokens),
+                    "content_chars": len(content_html or ''),
                 },
                 source_url=source_url,
                 article_title=title,
@@ -334,11 +348,69 @@ class AIProcessor:
             logger.critical(f"An unexpected error occurred during AI processing for {source_url}: {e}", exc_info=True)
             return None, str(e)
 
+    def rewrite_update(
+        self,
+        post_title: str,
+        changed_paragraphs: List[str],
+        source_url: Optional[str] = None,
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Reescreve só os trechos novos/alterados da fonte de um post já publicado.
+        Retorna (html da atualização, motivo da falha).
+        """
+        trechos = "\n".join(f"- {p}" for p in changed_paragraphs)
+        prompt = (
+            f"{AI_UPDATE_RULES}\n\n"
+            f"TÍTULO DO POST PUBLICADO: {post_title}\n"
+            f"URL DA FONTE: {source_url or ''}\n\n"
+            f"TRECHOS NOVOS OU ALTERADOS NA FONTE:\n{trechos}\n"
+        )
+        try:
+            logger.info(f"Sending {len(changed_paragraphs)} changed paragraphs from {source_url} to AI (update).")
+            response_data = self._ai_client.generate_text(
+                prompt,
+                generation_config={"response_mime_type": "application/json", "max_output_tokens": 4000},
+            )
+            if isinstance(response_data, tuple):
+                response_text, tokens_info = response_data
+            else:
+                response_text, tokens_info = response_data, {}
+
+            prompt_tokens = int((tokens_info or {}).get('prompt_tokens', 0))
+            completion_tokens = int((tokens_info or {}).get('completion_tokens', 0))
+            log_tokens(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                api_type="gemini",
+                model=os.getenv("GEMINI_MODEL_ID", "gemini-2.5-flash-lite"),
+                api_key_suffix=self._ai_client.get_last_used_key(),
+                metadata={
+                    "operation": "incremental_update",
+                    "source_url": source_url,
+                    "changed_paragraphs": len(changed_paragraphs),
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+                source_url=source_url,
+                article_title=post_title,
+                success=True,
+            )
+
+            data = json.loads(self._extract_json_block(response_text))
+            update_html = (data.get("atualizacao_html") or "").strip() if isinstance(data, dict) else ""
+            if not update_html:
+                return None, "AI returned an empty update."
+            return update_html, None
+        except (json.JSONDecodeError, ValueError) as e:
+            return None, f"Failed to parse AI update response: {e}"
+        except RuntimeError as e:
+            logger.critical(f"AI update failed for {source_url} after all retries: {e}")
+            return None, str(e)
+
     @staticmethod
     def _extract_json_block(text: str) -> str:
         """Tenta extrair um bloco JSON válido de um texto possivelmente misto/formatado."""
         # 0) Remover cercas de código Markdown ```json ... ``` ou ``` ... ```
-        fenced = re.search(r"```(?:json)?\s*([\s\S]*?)\s*```", text, re.IGNORECASE)
+        fenced = rx.JSON_CODE_FENCE.search(text)
         if fenced:
             text = fenced.group(1)
 
@@ -516,7 +588,7 @@ class AIProcessor:
         s = escape_unescaped_newlines_in_strings(s)
         
         # PASSO 3: Limpar espaço após \\n e chaves
-        s = re.sub(r'\\n\s+("[\w_]+"\s*:)', r'\\n\1', s)
+        s = rx.JSON_ESCAPED_NEWLINE_INDENT.sub(r'\\n\1', s)
         
         # PASSO 4: Remover comentários JSON
         # NOTA: Remover isso porque pode quebrar URLs como //www.example.com dentro de strings
@@ -524,9 +596,9 @@ class AIProcessor:
         # s = re.sub(r"/\*[\s\S]*?\*/", "", s)
         
         # PASSO 5: Fixar estrutura JSON
-        s = re.sub(r'\}\s*\{', r'}, {', s)
-        s = re.sub(r',\s*([\]\}])', r'\1', s)
-        s = re.sub(r"^```(?:json)?|```$", "", s.strip(), flags=re.IGNORECASE)
+        s = rx.JSON_ADJACENT_OBJECTS.sub(r'}, {', s)
+        s = rx.JSON_TRAILING_COMMA.sub(r'\1', s)
+        s = rx.JSON_FENCE_EDGES.sub("", s.strip())
         
         return s
 
@@ -641,7 +713,7 @@ class AIProcessor:
             # More aggressive cleaning on second attempt
             s2 = cls._auto_fix_common_issues(s)
             s2 = final_control_char_cleanup(s2)
-            s2 = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', s2)
+            s2 = rx.CONTROL_CHARS.sub('', s2)
             
             try:
                 data = json.loads(s2)
@@ -654,31 +726,24 @@ class AIProcessor:
                     s3 = s2.encode('utf-8', 'ignore').decode('utf-8')
                     data = json.loads(s3)
                 except json.JSONDecodeError as final_e:
-                    debug_dir = Path("debug")
-                    debug_dir.mkdir(exist_ok=True)
                     timestamp = time.strftime("%Y%m%d-%H%M%S")
                     
-                    # Save raw response with detailed error info
-                    failed_path = debug_dir / f"failed_ai_{timestamp}.json.txt"
-                    with open(failed_path, "w", encoding="utf-8") as f:
-                        f.write(raw_text)
-                    
-                    # Save cleaned version for comparison
-                    cleaned_path = debug_dir / f"failed_ai_{timestamp}_cleaned.txt"
-                    with open(cleaned_path, "w", encoding="utf-8") as f:
-                        f.write(s3)
+                    # Error details
+                    details = [
+                        f"Error: {final_e}\n",
+                        f"Line: {final_e.lineno}, Col: {final_e.colno}\n",
+                        f"Message: {final_e.msg}\n",
+                    ]
+                    if final_e.pos is not None:
+                        start = max(0, final_e.pos - 200)
+                        end = min(len(s3), final_e.pos + 200)
+                        details.append(f"\nContext ({start}-{end}):\n")
+                        details.append(s3[start:end])
                     
-                    # Save error details
-                    error_path = debug_dir / f"failed_ai_{timestamp}_error.txt"
-                    with open(error_path, "w", encoding="utf-8") as f:
-                        f.write(f"Error: {final_e}\n")
-                        f.write(f"Line: {final_e.lineno}, Col: {final_e.colno}\n")
-                        f.write(f"Message: {final_e.msg}\n")
-                        if final_e.pos is not None:
-                            start = max(0, final_e.pos - 200)
-                            end = min(len(s3), final_e.pos + 200)
-                            f.write(f"\nContext ({start}-{end}):\n")
-                            f.write(s3[start:end])
+                    # Raw response, cleaned version and error details, saved (gzip) by the I/O thread
+                    failed_path = write_artifact(f"failed_ai_{timestamp}.json.txt", raw_text)
+                    cleaned_path = write_artifact(f"failed_ai_{timestamp}_cleaned.txt", s3)
+                    error_path = write_artifact(f"failed_ai_{timestamp}_error.txt", "".join(details))
                     
                     logger.critical(f"JSON decoding failed permanently. Saved to {failed_path}")
                     logger.critical(f"Cleaned version saved to {cleaned_path}")
@@ -0,0 +1,280 @@
+"""
+Escrita em disco fora do caminho crítico.
+
+As chamadas de IA e as publicações faziam I/O síncrono na thread do
+pipeline: o log de debug do TokenTracker (FileHandler), o `logs/app.log`, o
+JSON indentado de cada publicação em `debug/ai_response_batch_*.json` e os
+`debug/failed_ai_*` quando a resposta da IA não decodifica. O diretório
+`debug/` crescia sem limite.
+
+Este módulo mantém uma thread de I/O por processo com fila limitada
+(`BACKGROUND_QUEUE_SIZE`):
+
+- `submit(func, *args)` enfileira um trabalho sem bloquear; com a fila cheia
+  retorna False e quem chamou decide (o ledger de tokens grava na hora,
+  artefatos de debug são descartados);
+- `write_artifact(nome, conteúdo)` grava `debug/<nome>.gz` (gzip, com
+  `DEBUG_COMPRESS=true`) e, a cada `DEBUG_PRUNE_EVERY` artefatos, apaga os
+  mais velhos que `DEBUG_MAX_AGE_DAYS` e os que passam de `DEBUG_MAX_FILES`
+  (`prune_artifacts`, só arquivos com os prefixos conhecidos; subpastas como
+  `debug/pages` não são tocadas);
+- `async_handler(handler)` devolve um `QueueHandler` cujo `QueueListener`
+  escreve no handler original e faz `fsync` dos arquivos a cada
+  `BACKGROUND_FSYNC_SECONDS`.
+
+Tudo que estiver na fila é gravado na saída do processo (`atexit`).
+"""
+
+import atexit
+import gzip
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+BACKGROUND_QUEUE_SIZE = int(os.getenv('BACKGROUND_QUEUE_SIZE', 1000))
+BACKGROUND_FSYNC_SECONDS = float(os.getenv('BACKGROUND_FSYNC_SECONDS', 5))
+DEBUG_DIR = os.getenv('DEBUG_DIR', 'debug')
+DEBUG_COMPRESS = os.getenv('DEBUG_COMPRESS', 'true').lower() == 'true'
+DEBUG_MAX_FILES = int(os.getenv('DEBUG_MAX_FILES', 500))
+DEBUG_MAX_AGE_DAYS = float(os.getenv('DEBUG_MAX_AGE_DAYS', 14))
+DEBUG_PRUNE_EVERY = 50
+ARTIFACT_PREFIXES = ('ai_response_batch_', 'failed_ai_', 'wordpress_error_')
+
+_STOP = object()
+
+
+class BackgroundWriter:
+    """Thread única que executa os trabalhos de I/O na ordem em que chegam."""
+
+    def __init__(self, maxsize: int = BACKGROUND_QUEUE_SIZE):
+        self._queue: queue.Queue = queue.Queue(maxsize)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stopped = False
+        self.dropped = 0
+
+    def _ensure_started(self) -> bool:
+        if self._thread is not None:
+            return True
+        with self._lock:
+            if self._stopped:
+                return False
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='background-writer', daemon=True)
+                self._thread.start()
+        return True
+
+    def submit(self, func: Callable, *args) -> bool:
+        """Enfileira `func(*args)`; False se a fila estiver cheia ou o writer parado."""
+        if not self._ensure_started():
+            return False
+        try:
+            self._queue.put_nowait((func, args))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 100 == 0:
+                logger.warning(f"BACKGROUND WRITER: fila cheia ({self._queue.maxsize}), {self.dropped} trabalhos recusados")
+            return False
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                func, args = item
+                func(*args)
+            except Exception as e:
+                logger.error(f"BACKGROUND WRITER: falha em {getattr(item[0], '__name__', item[0])}: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    def drain(self):
+        """Bloqueia até a fila esvaziar (testes, fim de lote)."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def stop(self, timeout: float = 10):
+        with self._lock:
+            self._stopped = True
+            thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+
+_writer: Optional[BackgroundWriter] = None
+_writer_pid: Optional[int] = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> BackgroundWriter:
+    """Writer do processo (um novo em processos filhos: a thread não sobrevive ao fork)."""
+    global _writer, _writer_pid
+    if _writer_pid != os.getpid():
+        with _writer_lock:
+            if _writer_pid != os.getpid():
+                _writer = BackgroundWriter()
+                _writer_pid = os.getpid()
+    return _writer
+
+
+def submit(func: Callable, *args) -> bool:
+    return get_writer().submit(func, *args)
+
+
+def drain():
+    if _writer_pid == os.getpid():
+        _writer.drain()
+
+
+# --- artefatos de debug ---------------------------------------------------
+
+_artifact_count = 0
+
+
+def write_artifact(name: str, content: Union[str, bytes], directory: Optional[str] = None) -> Path:
+    """
+    Grava `<directory>/<name>` na thread de I/O (com `.gz` se DEBUG_COMPRESS)
+    e retorna o caminho final, para o log. Com a fila cheia o artefato é descartado.
+    """
+    path = Path(directory or DEBUG_DIR) / (f"{name}.gz" if DEBUG_COMPRESS else name)
+    data = content.encode('utf-8') if isinstance(content, str) else content
+    submit(_write_artifact, path, data)
+    return path
+
+
+def _write_artifact(path: Path, data: bytes):
+    global _artifact_count
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix == '.gz':
+        data = gzip.compress(data, compresslevel=6)
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+    _artifact_count += 1
+    if _artifact_count % DEBUG_PRUNE_EVERY == 1:
+        prune_artifacts(path.parent)
+
+
+def prune_artifacts(
+    directory: Optional[str] = None,
+    max_files: int = DEBUG_MAX_FILES,
+    max_age_days: float = DEBUG_MAX_AGE_DAYS,
+) -> int:
+    """Apaga artefatos velhos ou excedentes em `directory`; retorna quantos saíram."""
+    directory = Path(directory or DEBUG_DIR)
+    try:
+        entries = [
+            (entry.stat().st_mtime, entry)
+            for entry in directory.iterdir()
+            if entry.name.startswith(ARTIFACT_PREFIXES) and entry.is_file()
+        ]
+    except OSError:
+        return 0
+    entries.sort(key=lambda item: item[0], reverse=True)
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for index, (mtime, entry) in enumerate(entries):
+        if index < max_files and mtime >= cutoff:
+            continue
+        try:
+            entry.unlink()
+            removed += 1
+        except OSError:
+            pass
+    if removed:
+        logger.info(f"BACKGROUND WRITER: {removed} artefatos removidos de {directory}")
+    return removed
+
+
+# --- logging --------------------------------------------------------------
+
+class _BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler que descarta (e conta) registros quando a fila enche, em vez
+    de bloquear. Em processos filhos (sem a thread do listener) escreve direto
+    no handler original.
+    """
+
+    def __init__(self, q: queue.Queue, target: logging.Handler):
+        super().__init__(q)
+        self.target = target
+        self.dropped = 0
+        self._pid = os.getpid()
+
+    def emit(self, record):
+        if os.getpid() != self._pid:
+            self.target.handle(record)
+            return
+        super().emit(record)
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _FsyncQueueListener(logging.handlers.QueueListener):
+    """Escreve nos handlers e faz fsync dos arquivos periodicamente."""
+
+    def __init__(self, q, *handlers):
+        super().__init__(q, *handlers, respect_handler_level=True)
+        self._last_sync = time.monotonic()
+
+    def handle(self, record):
+        super().handle(record)
+        now = time.monotonic()
+        if now - self._last_sync >= BACKGROUND_FSYNC_SECONDS:
+            self._last_sync = now
+            self.sync()
+
+    def sync(self):
+        for handler in self.handlers:
+            stream = getattr(handler, 'stream', None)
+            if isinstance(handler, logging.FileHandler) and stream is not None:
+                try:
+                    handler.flush()
+                    os.fsync(stream.fileno())
+                except (OSError, ValueError):
+                    pass
+
+
+_listeners: List[_FsyncQueueListener] = []
+
+
+def async_handler(handler: logging.Handler, maxsize: int = BACKGROUND_QUEUE_SIZE) -> logging.Handler:
+    """Envolve `handler` num QueueHandler; a escrita real acontece na thread do listener."""
+    q: queue.Queue = queue.Queue(maxsize)
+    listener = _FsyncQueueListener(q, handler)
+    listener.start()
+    _listeners.append(listener)
+    queue_handler = _BoundedQueueHandler(q, handler)
+    queue_handler.setLevel(handler.level)
+    return queue_handler
+
+
+def shutdown():
+    """Grava o que estiver pendente (fila de trabalhos e listeners de log)."""
+    if _writer_pid == os.getpid():
+        _writer.stop()
+    while _listeners:
+        listener = _listeners.pop()
+        try:
+            listener.stop()
+            listener.sync()
+        except Exception:
+            pass
+
+
+atexit.register(shutdown)
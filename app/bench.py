@@ -0,0 +1,364 @@
+"""
+Benchmarks de extração.
+
+    python -m app.bench cleaners debug/pages/*.html
+    python -m app.bench cleaners --synthetic screenrant --repeat 20
+    python -m app.bench extract                      # replay do cache de páginas
+    python -m app.bench extract --update-baseline    # grava a saída atual como referência
+    python -m app.bench cta --repeat 20              # CTAs: camadas antigas vs. motor único
+
+`cleaners` mede o tempo por artigo de `ContentExtractor.extract` (parse +
+limpeza + montagem do resultado) com os limpadores BeautifulSoup originais e
+com o motor compilado (`clean_engine`), e confere se o conteúdo extraído é
+idêntico nos dois caminhos. A URL de cada página salva vem do `og:url` /
+`<link rel="canonical">`, ou de `--url`.
+
+`extract` roda o extrator sobre as páginas guardadas em `data/page_cache.db`
+(ver `page_cache`), mede a vazão por domínio e compara uma impressão digital
+da saída de cada página com a referência em `data/extract_baseline.json`:
+páginas cuja extração mudou são listadas e o comando sai com código 1 — use
+depois de mexer nos limpadores ou em `extraction_rules.json`. Páginas que o
+download em streaming cortou (`stream_until`/limite de bytes) aparecem na coluna
+`cortadas`; `--full-only` roda só sobre as páginas inteiras.
+
+`cta` mede a limpeza de CTAs de um conteúdo no formato da saída da IA (ou
+de arquivos HTML passados na linha de comando): as camadas antigas
+(detecção + verificação nó a nó + regexes do pipeline) contra uma passada do
+`cta_engine`, e confere se a camada de blocos remove exatamente os mesmos nós.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import statistics
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+from .extractor import ContentExtractor
+from .extraction_pool import extract_html
+from .page_cache import PageCache, PAGE_CACHE_DB_PATH
+from .cta_engine import legacy_pipeline_layers
+from .document import Document
+from . import html_utils
+
+EXTRACT_BASELINE_PATH = os.getenv('EXTRACT_BASELINE_PATH', 'data/extract_baseline.json')
+_FINGERPRINT_FIELDS = ('title', 'content', 'excerpt', 'featured_image_url', 'images', 'videos')
+
+_OG_URL_RE = re.compile(r'<meta[^>]+property=["\']og:url["\'][^>]+content=["\']([^"\']+)', re.I)
+_CANONICAL_RE = re.compile(r'<link[^>]+rel=["\']canonical["\'][^>]+href=["\']([^"\']+)', re.I)
+
+SYNTHETIC_URLS = {
+    'screenrant': 'https://screenrant.com/synthetic-article/',
+    'gamerant': 'https://gamerant.com/synthetic-article/',
+    'comicbook': 'https://comicbook.com/synthetic-article/',
+    'collider': 'https://collider.com/synthetic-article/',
+}
+
+
+def synthetic_page(paragraphs: int = 40, widgets: int = 30) -> str:
+    """
+    Página no formato das páginas Valnet (ScreenRant/GameRant/Collider):
+    <article> com `.article-body`, display cards, widgets de tag-interaction,
+    galerias, thumbnails ?w=300, CTAs, além de header/nav/sidebar/footer.
+    """
+    body = []
+    for i in range(paragraphs):
+        body.append(f'<p>Parágrafo {i} do artigo com <a href="https://x.com/{i}">um link</a> e <em>ênfase</em>.</p>')
+        if i % 4 == 0:
+            body.append(
+                f'<figure><img src="https://static.x.com/img{i}.jpg?w=1200" alt="Cena {i}">'
+                f'<figcaption>Cena do filme</figcaption></figure>'
+            )
+        if i % 3 == 0 and widgets:
+            widgets -= 1
+            body.append(
+                f'<div class="w-display-card-list display-card type-article"><div class="display-card-content">'
+                f'<figure><img src="https://static.x.com/thumb{i}.jpg?w=300"></figure>'
+                f'<h5 class="display-card-title"><a href="/r{i}">Relacionado {i}</a></h5></div></div>'
+                f'<div data-is-tag-interaction="true" class="tag-interaction-widget"><span>Follow</span></div>'
+                f'<div class="ad-zone-container"><div id="ad-slot-{i}"></div></div>'
+            )
+        if i % 10 == 9:
+            body.append('<div class="gallery-wrap"><ul><li><img src="https://static.x.com/g.jpg"></li></ul></div>')
+            body.append('<p>Thank you for reading, <b>subscribe now</b>!</p>')
+            body.append('<aside><p>Leia mais</p></aside><script>var x = 1;</script>')
+    return (
+        '<html><head><title>Synthetic</title>'
+        '<meta property="og:title" content="Artigo sintético">'
+        '<meta property="og:image" content="https://static.x.com/hero.jpg"></head><body>'
+        '<header><nav><ul>' + ''.join(f'<li><a href="/c{i}">Cat {i}</a></li>' for i in range(30)) + '</ul></nav></header>'
+        '<main><article><h1>Artigo sintético</h1><div class="sidebar-trending">'
+        + ''.join(f'<div class="trending-item"><a href="/t{i}">Trend {i}</a></div>' for i in range(20)) +
+        '</div><section id="article-body" class="article-body" itemprop="articleBody">'
+        + ''.join(body) +
+        '</section></article></main><footer>' + ''.join(f'<a href="/f{i}">F{i}</a>' for i in range(40)) +
+        '</footer></body></html>'
+    )
+
+
+def page_url(html: str, fallback: Optional[str] = None) -> Optional[str]:
+    m = _OG_URL_RE.search(html) or _CANONICAL_RE.search(html)
+    return m.group(1) if m else fallback
+
+
+def _time_per_call(fn: Callable[[], object], repeat: int) -> Tuple[float, object]:
+    timings, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), result
+
+
+def bench_cleaners(pages: List[Tuple[str, str, str]], repeat: int = 10) -> List[dict]:
+    """
+    Mede (mediana de `repeat` execuções) o `extract` de cada página com os
+    dois motores. `pages` = [(nome, url, html)].
+    """
+    legacy = ContentExtractor(compiled_cleaners=False)
+    compiled = ContentExtractor(compiled_cleaners=True)
+    rows = []
+    for name, url, html in pages:
+        def run(extractor):
+            return lambda: extractor.extract(html, url, soup=BeautifulSoup(html, 'lxml'))
+        parse_s, _ = _time_per_call(lambda: BeautifulSoup(html, 'lxml'), repeat)
+        legacy_s, legacy_out = _time_per_call(run(legacy), repeat)
+        compiled_s, compiled_out = _time_per_call(run(compiled), repeat)
+        rows.append({
+            'page': name,
+            'parse_ms': parse_s * 1000,
+            'legacy_ms': legacy_s * 1000,
+            'compiled_ms': compiled_s * 1000,
+            'same_output': (legacy_out or {}).get('content') == (compiled_out or {}).get('content'),
+        })
+    return rows
+
+
+def _cmd_cleaners(args):
+    pages = []
+    if args.synthetic:
+        html = synthetic_page(paragraphs=args.paragraphs)
+        pages.append((f'synthetic:{args.synthetic}', SYNTHETIC_URLS[args.synthetic], html))
+    for path in args.pages:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            html = f.read()
+        url = page_url(html, args.url)
+        if not url:
+            print(f"{path}: sem og:url/canonical, use --url")
+            continue
+        pages.append((path, url, html))
+
+    rows = bench_cleaners(pages, repeat=args.repeat)
+    print(f"{'página':<48} {'parse':>9} {'bs4':>9} {'compilado':>10} {'ganho':>7}  saída")
+    for r in rows:
+        gain = r['legacy_ms'] / r['compiled_ms'] if r['compiled_ms'] else 0
+        print(
+            f"{r['page'][-48:]:<48} {r['parse_ms']:>7.1f}ms {r['legacy_ms']:>7.1f}ms "
+            f"{r['compiled_ms']:>8.1f}ms {gain:>6.2f}x  {'igual' if r['same_output'] else 'DIFERENTE'}"
+        )
+
+
+def fingerprint(result: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Resumo estável da saída do `extract` para detectar mudanças entre versões."""
+    if not result:
+        return {'fingerprint': None, 'content_len': 0, 'images': 0}
+    payload = json.dumps({k: result.get(k) for k in _FINGERPRINT_FIELDS}, sort_keys=True, ensure_ascii=False)
+    return {
+        'fingerprint': hashlib.sha256(payload.encode('utf-8')).hexdigest(),
+        'content_len': len(result.get('content') or ''),
+        'images': len(result.get('images') or []),
+    }
+
+
+def replay_extract(
+    cache: PageCache,
+    domain: Optional[str] = None,
+    extractor: Optional[ContentExtractor] = None,
+    full_only: bool = False,
+):
+    """
+    Roda o `extract` sobre o corpus do cache.
+    Retorna ({url: fingerprint + stopped}, {domínio: {'pages', 'seconds', 'failed', 'truncated'}}).
+    Com `full_only`, pula as páginas que o streaming cortou antes do fim.
+    """
+    extractor = extractor or ContentExtractor(page_cache=cache)
+    outputs: Dict[str, Dict[str, Any]] = {}
+    per_domain: Dict[str, Dict[str, float]] = defaultdict(
+        lambda: {'pages': 0, 'seconds': 0.0, 'failed': 0, 'truncated': 0}
+    )
+    for url, page_domain, html, stopped in cache.iter_pages(domain):
+        if full_only and stopped:
+            continue
+        started = time.perf_counter()
+        try:
+            result = extract_html(extractor, html, url)
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"extract falhou para {url}: {e}")
+            result = None
+        stats = per_domain[page_domain]
+        stats['seconds'] += time.perf_counter() - started
+        stats['pages'] += 1
+        if stopped:
+            stats['truncated'] += 1
+        if not result or not result.get('content'):
+            stats['failed'] += 1
+        outputs[url] = dict(fingerprint(result), stopped=stopped)
+    return outputs, dict(per_domain)
+
+
+def compare_with_baseline(outputs: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]]) -> Dict[str, List[str]]:
+    changed = [u for u, fp in outputs.items() if u in baseline and baseline[u]['fingerprint'] != fp['fingerprint']]
+    return {
+        'changed': sorted(changed),
+        'new': sorted(u for u in outputs if u not in baseline),
+        'missing': sorted(u for u in baseline if u not in outputs),
+    }
+
+
+def _cmd_extract(args):
+    cache = PageCache(args.db)
+    outputs, per_domain = replay_extract(cache, args.domain, full_only=args.full_only)
+    if not outputs:
+        print(f"Nenhuma página em {args.db}.")
+        return 0
+
+    print(f"{'domínio':<32} {'páginas':>8} {'cortadas':>9} {'ms/pág':>9} {'pág/s':>8} {'falhas':>7}")
+    for domain, st in sorted(per_domain.items()):
+        ms = st['seconds'] * 1000 / st['pages']
+        print(
+            f"{domain[:32]:<32} {st['pages']:>8} {st['truncated']:>9} {ms:>9.1f} "
+            f"{1000 / ms if ms else 0:>8.1f} {st['failed']:>7}"
+        )
+
+    if args.update_baseline:
+        baseline = {}
+        if args.domain and os.path.exists(args.baseline):
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        baseline.update(outputs)
+        tmp = args.baseline + '.tmp'
+        os.makedirs(os.path.dirname(args.baseline) or '.', exist_ok=True)
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=1, sort_keys=True)
+        os.replace(tmp, args.baseline)
+        print(f"Referência gravada: {len(outputs)} páginas em {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"Sem referência em {args.baseline}; rode com --update-baseline.")
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if args.domain:
+        baseline = {u: fp for u, fp in baseline.items() if u in outputs or args.domain in u}
+    diff = compare_with_baseline(outputs, baseline)
+    for url in diff['changed']:
+        old, new = baseline[url], outputs[url]
+        # Página cortada de um lado e inteira do outro: mudou o download, não o extrator
+        download = ''
+        if old.get('stopped') != new.get('stopped'):
+            download = f", download {old.get('stopped') or 'inteiro'} -> {new.get('stopped') or 'inteiro'}"
+        print(
+            f"MUDOU  {url}  conteúdo {old['content_len']} -> {new['content_len']} chars, "
+            f"imagens {old['images']} -> {new['images']}{download}"
+        )
+    print(f"{len(diff['changed'])} mudaram, {len(diff['new'])} novas, {len(diff['missing'])} fora do cache.")
+    return 1 if diff['changed'] else 0
+
+
+def synthetic_ai_content(paragraphs: int = 40) -> str:
+    """Conteúdo no formato da saída da IA, com listas aninhadas e um CTA no fim."""
+    body = []
+    for i in range(paragraphs):
+        body.append(
+            f'<p>Parágrafo {i} sobre o filme, com <strong>destaque</strong>, <em>ênfase</em> e '
+            f'<a href="https://x.com/{i}">um link</a>. A produção confirmou detalhes do elenco.</p>'
+        )
+        if i % 5 == 0:
+            body.append(f'<div><ul><li>Item {i}</li><li>Outro <span>item</span></li></ul></div>')
+    body.append("<p>Thank you for reading this post, don't forget to subscribe!</p>")
+    return f"<div><section>{''.join(body)}</section></div>"
+
+
+def _legacy_cta(html: str) -> str:
+    doc = Document(html)
+    html_utils.detect_forbidden_cta(doc)
+    html_utils._strip_forbidden_cta_soup_per_node(doc.soup)
+    cleaned, _ = html_utils._strip_fallback_regexes(doc.html())
+    cleaned, _ = legacy_pipeline_layers(cleaned)
+    return cleaned
+
+
+def bench_cta(docs: List[Tuple[str, str]], repeat: int = 10) -> List[dict]:
+    """Mediana de `repeat` execuções das camadas antigas e do motor. `docs` = [(nome, html)]."""
+    rows = []
+    for name, html in docs:
+        legacy_s, _ = _time_per_call(lambda: _legacy_cta(html), repeat)
+        engine_s, _ = _time_per_call(lambda: html_utils.scan_forbidden_cta(Document(html), paragraphs=True), repeat)
+        per_node, engine = BeautifulSoup(html, 'lxml'), BeautifulSoup(html, 'lxml')
+        html_utils._strip_forbidden_cta_soup_per_node(per_node)
+        html_utils._CTA_ENGINE.strip_soup(engine, tiers=1)
+        rows.append({
+            'doc': name,
+            'legacy_ms': legacy_s * 1000,
+            'engine_ms': engine_s * 1000,
+            'same_blocks': str(per_node) == str(engine),
+        })
+    return rows
+
+
+def _cmd_cta(args):
+    docs = [(f'sintético ({args.paragraphs} parágrafos)', synthetic_ai_content(args.paragraphs))]
+    for path in args.docs:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            docs.append((path, f.read()))
+
+    print(f"{'documento':<48} {'camadas':>10} {'motor':>9} {'ganho':>7}  blocos")
+    for r in bench_cta(docs, repeat=args.repeat):
+        gain = r['legacy_ms'] / r['engine_ms'] if r['engine_ms'] else 0
+        print(
+            f"{r['doc'][-48:]:<48} {r['legacy_ms']:>8.1f}ms {r['engine_ms']:>7.1f}ms {gain:>6.2f}x  "
+            f"{'iguais' if r['same_blocks'] else 'DIFERENTES'}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de extração.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    cleaners = sub.add_parser('cleaners', help="Limpadores por site: BeautifulSoup vs. motor compilado.")
+    cleaners.add_argument('pages', nargs='*', help="Páginas HTML salvas (ScreenRant, GameRant, ...).")
+    cleaners.add_argument('--url', help="URL usada quando a página não tem og:url/canonical.")
+    cleaners.add_argument('--synthetic', choices=sorted(SYNTHETIC_URLS), help="Inclui uma página sintética do site.")
+    cleaners.add_argument('--paragraphs', type=int, default=40)
+    cleaners.add_argument('--repeat', type=int, default=10)
+    cleaners.set_defaults(func=_cmd_cleaners)
+
+    extract = sub.add_parser('extract', help="Replay do cache de páginas: vazão por domínio e regressão.")
+    extract.add_argument('--db', default=PAGE_CACHE_DB_PATH, help="Banco do cache de páginas.")
+    extract.add_argument('--domain', help="Só as páginas deste domínio (ex.: screenrant.com).")
+    extract.add_argument('--baseline', default=EXTRACT_BASELINE_PATH)
+    extract.add_argument('--update-baseline', action='store_true', help="Grava a saída atual como referência.")
+    extract.add_argument('--full-only', action='store_true', help="Ignora páginas cortadas pelo download em streaming.")
+    extract.set_defaults(func=_cmd_extract)
+
+    cta = sub.add_parser('cta', help="Limpeza de CTAs: camadas antigas vs. motor único.")
+    cta.add_argument('docs', nargs='*', help="Conteúdos HTML (saída da IA ou posts publicados).")
+    cta.add_argument('--paragraphs', type=int, default=40)
+    cta.add_argument('--repeat', type=int, default=10)
+    cta.set_defaults(func=_cmd_cta)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(args.func(args) or 0)
+
+
+if __name__ == '__main__':
+    main()
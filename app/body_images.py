@@ -0,0 +1,229 @@
+"""
+Upload concorrente das imagens do corpo do artigo para o WordPress.
+
+O pipeline só enviava a imagem destacada; as imagens que a IA manteve no corpo
+ficavam hotlinkadas no CDN da fonte. Este módulo envia essas imagens em
+paralelo (com limite de workers, deduplicação e timeout por imagem) e devolve
+o mapa {url_original -> url_no_wp} para `rewrite_img_srcs_with_wp`.
+
+A publicação não espera a imagem mais lenta: o que não terminar dentro do
+prazo é publicado com a URL original e corrigido depois por um job em
+background (`schedule_body_image_patch`).
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+from .document import Document
+from .html_utils import _norm_key, rewrite_img_srcs_with_wp
+
+logger = logging.getLogger(__name__)
+
+BODY_IMAGES_UPLOAD = os.getenv('BODY_IMAGES_UPLOAD', 'true').lower() == 'true'
+BODY_IMAGES_MAX_WORKERS = int(os.getenv('BODY_IMAGES_MAX_WORKERS', 4))
+BODY_IMAGES_MAX_PER_POST = int(os.getenv('BODY_IMAGES_MAX_PER_POST', 8))
+BODY_IMAGES_DEADLINE_S = float(os.getenv('BODY_IMAGES_DEADLINE_S', 30))
+BODY_IMAGES_TIMEOUT_S = float(os.getenv('BODY_IMAGES_TIMEOUT_S', 20))
+BODY_IMAGES_PATCH_TIMEOUT_S = float(os.getenv('BODY_IMAGES_PATCH_TIMEOUT_S', 180))
+
+# Pool compartilhado: limita o paralelismo total de uploads do processo,
+# inclusive os que continuam rodando depois do prazo de publicação.
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_local = threading.local()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, BODY_IMAGES_MAX_WORKERS),
+                thread_name_prefix='body-img',
+            )
+        return _executor
+
+
+def threadlocal_uploader(
+    client_factory: Callable[[], object],
+    alt_text: str = "",
+    timeout_s: float = BODY_IMAGES_TIMEOUT_S,
+) -> Callable[[str], Optional[Dict]]:
+    """
+    Cria a função de upload usada pelos workers: cada thread do pool mantém
+    seu próprio WordPressClient (requests.Session não é compartilhada entre
+    threads) e cada imagem tem uma única tentativa com timeout curto.
+    """
+    def _upload(url: str) -> Optional[Dict]:
+        client = getattr(_local, 'client', None)
+        if client is None:
+            client = _local.client = client_factory()
+        return client.upload_media_from_url(
+            url, alt_text, max_attempts=1,
+            download_timeout=timeout_s, upload_timeout=timeout_s,
+        )
+    return _upload
+
+
+def collect_body_image_urls(content_html, limit: int = BODY_IMAGES_MAX_PER_POST) -> List[str]:
+    """
+    Retorna as URLs de <img src> presentes no HTML ou Document (ordem do
+    documento, sem duplicatas). São exatamente as imagens que sobreviveram ao
+    passo da IA e ao merge.
+    """
+    if isinstance(content_html, Document):
+        soup = content_html.soup
+    elif not content_html or '<img' not in content_html:
+        return []
+    else:
+        soup = BeautifulSoup(content_html, 'lxml')
+    urls: List[str] = []
+    seen = set()
+    for img in soup.find_all('img'):
+        src = (img.get('src') or '').strip()
+        key = _norm_key(src)
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        urls.append(src)
+        if len(urls) >= limit:
+            break
+    return urls
+
+
+class BodyImageUploads:
+    """Resultado de um lote de uploads: mapa pronto + uploads ainda pendentes."""
+
+    def __init__(self, uploaded: Dict[str, str], pending: Dict[str, Future]):
+        self.uploaded = uploaded
+        self.pending = pending
+
+    def collect_pending(self, timeout: Optional[float] = None) -> Dict[str, str]:
+        """Espera os uploads pendentes (até `timeout`) e retorna os que deram certo."""
+        result: Dict[str, str] = {}
+        if not self.pending:
+            return result
+        wait(list(self.pending.values()), timeout=timeout)
+        for url, fut in self.pending.items():
+            if fut.done() and not fut.cancelled() and fut.exception() is None:
+                new_url = fut.result()
+                if new_url:
+                    result[url] = new_url
+        return result
+
+
+def upload_body_images(
+    upload_fn: Callable[[str], Optional[Dict]],
+    image_urls: List[str],
+    deadline_s: float = BODY_IMAGES_DEADLINE_S,
+    known: Optional[Dict[str, str]] = None,
+) -> BodyImageUploads:
+    """
+    Envia as imagens em paralelo e espera no máximo `deadline_s` segundos.
+
+    Args:
+        upload_fn: Função que recebe a URL e retorna o JSON da mídia no WP
+            (normalmente `wp_client.upload_media_from_url` com alt/attempts fixados).
+        image_urls: URLs das imagens do corpo.
+        deadline_s: Prazo total do lote; o que não terminar fica pendente.
+        known: Mapa de uploads já feitos (ex.: a imagem destacada), reutilizado
+            sem novo envio.
+
+    Returns:
+        BodyImageUploads com o mapa {url_original -> source_url_no_wp} dos uploads
+        concluídos no prazo e os futures dos que ainda estão em andamento.
+    """
+    uploaded: Dict[str, str] = {}
+    known_norm = {_norm_key(k): v for k, v in (known or {}).items() if k and v}
+    futures: Dict[str, Future] = {}
+    submitted = set()
+
+    for url in image_urls:
+        key = _norm_key(url)
+        if not key or key in submitted:
+            continue
+        submitted.add(key)
+        if key in known_norm:
+            uploaded[url] = known_norm[key]
+            continue
+        futures[url] = _get_executor().submit(_upload_one, upload_fn, url)
+
+    if not futures:
+        return BodyImageUploads(uploaded, {})
+
+    started = time.monotonic()
+    done, not_done = wait(list(futures.values()), timeout=deadline_s)
+    pending: Dict[str, Future] = {}
+    for url, fut in futures.items():
+        if fut in done:
+            if fut.exception() is None and fut.result():
+                uploaded[url] = fut.result()
+        else:
+            pending[url] = fut
+
+    logger.info(
+        f"BODY IMAGES: {len(uploaded)} prontas, {len(pending)} pendentes "
+        f"em {time.monotonic() - started:.1f}s (prazo: {deadline_s:.0f}s)"
+    )
+    return BodyImageUploads(uploaded, pending)
+
+
+def _upload_one(upload_fn: Callable[[str], Optional[Dict]], url: str) -> Optional[str]:
+    """Executa um upload e devolve a `source_url` da mídia criada no WP."""
+    try:
+        media = upload_fn(url)
+    except Exception as e:
+        logger.warning(f"BODY IMAGE ERRO: {url} | {type(e).__name__}: {str(e)[:150]}")
+        return None
+    if media and media.get('source_url'):
+        return media['source_url']
+    return None
+
+
+def schedule_body_image_patch(
+    uploads: BodyImageUploads,
+    post_id: int,
+    client_factory: Callable[[], object],
+    timeout_s: float = BODY_IMAGES_PATCH_TIMEOUT_S,
+) -> Optional[threading.Thread]:
+    """
+    Agenda a correção em background das imagens que perderam o prazo.
+
+    Quando os uploads pendentes terminam, busca o conteúdo publicado, reaponta
+    os `src`/`srcset` para as URLs do WP e atualiza o post. Usa um cliente
+    próprio (criado por `client_factory`) porque o do lote já terá sido fechado.
+    """
+    if not uploads.pending:
+        return None
+
+    def _patch():
+        src_map = uploads.collect_pending(timeout=timeout_s)
+        if not src_map:
+            logger.warning(f"BODY IMAGES PATCH: nenhum upload pendente concluiu para o post {post_id}")
+            return
+        client = client_factory()
+        try:
+            content = client.get_post_content(post_id)
+            if not content:
+                return
+            new_content = rewrite_img_srcs_with_wp(content, src_map)
+            if new_content != content:
+                client.update_post_content(post_id, new_content)
+                logger.info(f"BODY IMAGES PATCH: post {post_id} atualizado com {len(src_map)} imagens")
+        except Exception as e:
+            logger.error(f"BODY IMAGES PATCH: falha ao atualizar post {post_id}: {e}")
+        finally:
+            try:
+                client.close()
+            except Exception:
+                pass
+
+    thread = threading.Thread(target=_patch, name=f'body-img-patch-{post_id}', daemon=True)
+    thread.start()
+    return thread
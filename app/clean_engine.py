@@ -0,0 +1,370 @@
+"""
+Motor de limpeza compilado para o ContentExtractor.
+
+Os limpadores por site (`_clean_html_for_screenrant`, `_gamerant`, ...)
+percorriam o corpo do artigo várias vezes — `list(find_all(True))` com um
+`re.search` por padrão de classe, outra volta para os atributos `data-*`,
+outra para <aside> — e o `_pre_clean_html` rodava ~70 `soup.select`, cada um
+varrendo a página inteira.
+
+Aqui as regras são compiladas uma vez e avaliadas num único percurso:
+
+- `SelectorUnion` junta seletores CSS simples (`tag`, `.classe`, `#id`,
+  `[attr]`, `[attr*=valor]` e combinações deles sem espaço) em conjuntos e em
+  uma regex por atributo. Seletores fora desse subconjunto continuam indo
+  para `soup.select`.
+- `SiteCleanRule` junta os padrões de classe/id de um site em uma regex só,
+  junto com as tags e atributos `data-*` removidos.
+
+Essas remoções dependem apenas do próprio elemento, então removê-las num só
+passo produz a mesma árvore que os passes sequenciais antigos. As etapas que
+dependem de contexto (figuras órfãs, CTAs por texto) rodam depois, na mesma
+ordem de antes.
+
+O caminho BeautifulSoup original continua disponível com
+`COMPILED_CLEANERS=false`.
+"""
+
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from bs4 import Tag
+
+from . import regexes as rx
+
+logger = logging.getLogger(__name__)
+
+COMPILED_CLEANERS = os.getenv('COMPILED_CLEANERS', 'true').lower() == 'true'
+
+# Frases de CTA removidas pelos limpadores por site
+CTA_PHRASES = (
+    'thank you for reading',
+    "don't forget to subscribe",
+    'subscribe now',
+    'click here',
+    'read more',
+    'sign up',
+    'thanks for reading',
+    'thanks for visiting',
+    'please subscribe',
+    'subscribe to our',
+    'stay tuned',
+    'keep up to date',
+    'follow us',
+)
+CTA_CONTAINER_TAGS = frozenset(['p', 'div', 'span', 'article', 'blockquote', 'section'])
+_CTA_RE = rx.compile('clean_engine.cta_phrase', '|'.join(re.escape(p) for p in CTA_PHRASES))
+
+_CONTEXT_TAGS = ['p', 'h2', 'h3', 'blockquote']
+
+
+def prune(root: Tag, should_remove: Callable[[Tag], bool]) -> int:
+    """
+    Remove os descendentes de `root` para os quais `should_remove(tag)` é
+    verdadeiro. Percorre a árvore uma vez, em pré-ordem, sem descer em
+    subárvores já marcadas. `root` em si nunca é removido.
+    """
+    doomed = []
+    stack = [c for c in reversed(root.contents) if isinstance(c, Tag)]
+    while stack:
+        node = stack.pop()
+        if should_remove(node):
+            doomed.append(node)
+            continue
+        stack.extend(c for c in reversed(node.contents) if isinstance(c, Tag))
+    for node in doomed:
+        node.decompose()
+    return len(doomed)
+
+
+# --- União de seletores -----------------------------------------------------
+
+# (atributo, operador, valor); operador None = só presença
+_Condition = Tuple[str, Optional[str], Optional[str]]
+
+
+def _parse_simple_selector(selector: str) -> Optional[Tuple[Optional[str], List[_Condition]]]:
+    """Converte `tag.classe[attr*=v]` em (tag, condições). None se não for suportado."""
+    m = rx.SIMPLE_SELECTOR.match(selector.strip())
+    if not m or not (m.group('tag') or m.group('rest')):
+        return None
+    conditions: List[_Condition] = []
+    rest = m.group('rest')
+    pos = 0
+    while pos < len(rest):
+        part = rx.SELECTOR_PART.match(rest, pos)
+        if not part:
+            return None
+        if part.group('cls'):
+            conditions.append(('class', '~=', part.group('cls')))
+        elif part.group('id'):
+            conditions.append(('id', '=', part.group('id')))
+        else:
+            conditions.append((part.group('attr').lower(), part.group('op'), part.group('val')))
+        pos = part.end()
+    tag = m.group('tag')
+    return (tag.lower() if tag else None), conditions
+
+
+def _condition_matches(attrs: dict, condition: _Condition) -> bool:
+    name, op, expected = condition
+    value = attrs.get(name)
+    if value is None:
+        return False
+    if op is None:
+        return True
+    if op == '~=':
+        tokens = value if isinstance(value, list) else value.split()
+        return expected in tokens
+    if isinstance(value, list):
+        value = ' '.join(value)
+    if op == '=':
+        return value == expected
+    if not expected:
+        # Como no CSS: *=, ^= e $= com valor vazio não casam nada
+        return False
+    if op == '*=':
+        return expected in value
+    if op == '^=':
+        return value.startswith(expected)
+    return value.endswith(expected)
+
+
+def _substring_re(values: Iterable[str]) -> Optional['re.Pattern']:
+    values = sorted(set(v for v in values if v))
+    return re.compile('|'.join(re.escape(v) for v in values)) if values else None
+
+
+class SelectorUnion:
+    """
+    Um conjunto de seletores de remoção avaliado em um único percurso da árvore.
+
+    Os casos comuns (tag, `.classe`, `#id`, `[attr]`, `[class*=..]`,
+    `[id*=..]`) viram conjuntos/regex; os demais seletores simples são
+    testados condição a condição, só para a tag correspondente.
+    """
+
+    def __init__(self, selectors: Iterable[str]):
+        self.selectors = tuple(selectors)
+        self.tags = set()
+        self.class_tokens = set()
+        self.ids = set()
+        self.attrs_present = set()
+        class_contains, id_contains = [], []
+        self.compound = {}
+        self.fallback: List[str] = []
+
+        for selector in self.selectors:
+            parsed = _parse_simple_selector(selector)
+            if parsed is None:
+                self.fallback.append(selector)
+                continue
+            tag, conditions = parsed
+            if tag and not conditions:
+                self.tags.add(tag)
+            elif tag is None and len(conditions) == 1:
+                name, op, value = conditions[0]
+                if name == 'class' and op == '~=':
+                    self.class_tokens.add(value)
+                elif name == 'class' and op == '*=' and value:
+                    class_contains.append(value)
+                elif name == 'id' and op == '=':
+                    self.ids.add(value)
+                elif name == 'id' and op == '*=' and value:
+                    id_contains.append(value)
+                elif op is None:
+                    self.attrs_present.add(name)
+                else:
+                    self.compound.setdefault(None, []).append(conditions)
+            else:
+                self.compound.setdefault(tag, []).append(conditions)
+
+        self.class_re = _substring_re(class_contains)
+        self.id_re = _substring_re(id_contains)
+        self._any_tag = self.compound.get(None, [])
+
+    def matches(self, tag: Tag) -> bool:
+        if tag.name in self.tags:
+            return True
+        attrs = tag.attrs
+        if attrs:
+            if self.attrs_present and not self.attrs_present.isdisjoint(attrs):
+                return True
+            classes = attrs.get('class')
+            if classes:
+                if isinstance(classes, str):
+                    classes = classes.split()
+                if not self.class_tokens.isdisjoint(classes):
+                    return True
+                if self.class_re is not None and self.class_re.search(' '.join(classes)):
+                    return True
+            ident = attrs.get('id')
+            if ident:
+                if ident in self.ids:
+                    return True
+                if self.id_re is not None and self.id_re.search(ident):
+                    return True
+        for conditions in self.compound.get(tag.name, ()):
+            if all(_condition_matches(attrs, c) for c in conditions):
+                return True
+        for conditions in self._any_tag:
+            if all(_condition_matches(attrs, c) for c in conditions):
+                return True
+        return False
+
+    def select(self, root: Tag) -> List[Tag]:
+        """Equivalente a `root.select(', '.join(selectors))`, em ordem de documento."""
+        if self.fallback:
+            return root.select(', '.join(self.selectors))
+        return [tag for tag in root.find_all(True) if self.matches(tag)]
+
+    def remove_from(self, root: Tag) -> int:
+        """Remove de `root` todos os elementos que casam com algum seletor."""
+        removed = prune(root, self.matches)
+        for selector in self.fallback:
+            for el in root.select(selector):
+                try:
+                    el.decompose()
+                    removed += 1
+                except Exception:
+                    pass
+        return removed
+
+
+@lru_cache(maxsize=32)
+def compile_selectors(selectors: Tuple[str, ...]) -> SelectorUnion:
+    """`SelectorUnion` em cache, chaveado pela tupla de seletores."""
+    return SelectorUnion(selectors)
+
+
+# --- Regras dos limpadores por site -----------------------------------------
+
+class SiteCleanRule:
+    """
+    Regras de limpeza do corpo do artigo de um site: padrões de classe/id,
+    tags, atributos `data-*` e seletores removidos, mais as etapas de figuras
+    e CTAs. Montada a partir de `extraction_rules.json` (ver `site_rules`).
+    """
+
+    def __init__(
+        self,
+        label: str,
+        class_patterns: Iterable[str] = (),
+        remove_tags: Iterable[str] = ('script', 'style'),
+        flag_attrs: Iterable[str] = (),
+        attr_prefixes: Iterable[str] = (),
+        remove_selectors: Iterable[str] = (),
+        figures: bool = False,
+        ctas: bool = False,
+    ):
+        self.label = label
+        self.class_patterns = tuple(class_patterns)
+        self.class_re = (
+            re.compile('|'.join(f'(?:{p})' for p in self.class_patterns), re.I)
+            if self.class_patterns else None
+        )
+        self.remove_tags = frozenset(remove_tags)
+        self.flag_attrs = tuple(flag_attrs)
+        self.attr_prefixes = tuple(attr_prefixes)
+        self.selectors = SelectorUnion(remove_selectors) if remove_selectors else None
+        self.figures = figures
+        self.ctas = ctas
+
+    def matches(self, tag: Tag) -> bool:
+        if tag.name in self.remove_tags:
+            return True
+        attrs = tag.attrs
+        if not attrs:
+            return False
+        if self.class_re is not None:
+            classes = attrs.get('class')
+            if classes:
+                if not isinstance(classes, str):
+                    classes = ' '.join(classes)
+                if self.class_re.search(classes):
+                    return True
+            ident = attrs.get('id')
+            if ident and self.class_re.search(ident):
+                return True
+        for name in self.flag_attrs:
+            if attrs.get(name):
+                return True
+        if self.attr_prefixes:
+            for name in attrs:
+                if name.startswith(self.attr_prefixes):
+                    return True
+        return self.selectors is not None and self.selectors.matches(tag)
+
+
+def remove_unwanted_figures(root: Tag, label: str) -> int:
+    """Remove figuras vazias, decorativas, thumbnails (?w=300/400) e órfãs."""
+    removed = 0
+    for fig in root.find_all('figure'):
+        if not fig.parent:
+            continue
+        img = fig.find('img')
+        reason = None
+        if not img:
+            reason = "vazia (sem <img>)"
+        else:
+            src = img.get('src', '').lower()
+            alt = img.get('alt', '').lower()
+            if '.svg' in src or 'logo' in src or 'icon' in src or 'sr-db' in src or 'sr-db' in alt:
+                reason = f"decorativa/logo: {src}"
+            elif '?w=300' in src or '?w=400' in src or '&w=300' in src or '&w=400' in src:
+                reason = f"thumbnail (?w=300/400): {src}"
+            elif not fig.find_previous(_CONTEXT_TAGS) and not fig.find_next(_CONTEXT_TAGS):
+                reason = "órfã (sem contexto textual)"
+        if reason:
+            logger.debug(f"INFO ({label}): Removendo figura {reason}")
+            fig.decompose()
+            removed += 1
+    return removed
+
+
+def remove_cta_blocks(root: Tag, label: str) -> int:
+    """
+    Remove os blocos (p, div, span, ...) cujo texto contém uma frase de CTA.
+
+    O texto de um elemento contém o de todos os seus descendentes, então uma
+    subárvore cujo texto não tem CTA é pulada inteira; só os caminhos que levam
+    a um CTA são percorridos. Remove o bloco candidato mais externo, como o
+    passe antigo sobre `find_all([...])`.
+    """
+    if not _CTA_RE.search(root.get_text(strip=True).lower()):
+        return 0
+    doomed = []
+    stack = [c for c in reversed(root.contents) if isinstance(c, Tag)]
+    while stack:
+        node = stack.pop()
+        text = node.get_text(strip=True).lower()
+        if not _CTA_RE.search(text):
+            continue
+        if node.name in CTA_CONTAINER_TAGS:
+            logger.debug(f"INFO ({label}): Removendo CTA: {text[:60]}")
+            doomed.append(node)
+            continue
+        stack.extend(c for c in reversed(node.contents) if isinstance(c, Tag))
+    for node in doomed:
+        node.decompose()
+    return len(doomed)
+
+
+def clean_article_body(article_body: Tag, rule: SiteCleanRule) -> Tag:
+    """Limpeza completa do corpo do artigo com as regras compiladas de um site."""
+    blocks = prune(article_body, rule.matches)
+    if rule.selectors is not None:
+        for selector in rule.selectors.fallback:
+            for el in article_body.select(selector):
+                el.decompose()
+                blocks += 1
+    figures = remove_unwanted_figures(article_body, rule.label) if rule.figures else 0
+    ctas = remove_cta_blocks(article_body, rule.label) if rule.ctas else 0
+    logger.info(
+        f"INFO ({rule.label}): Limpeza compilada removeu {blocks} blocos, "
+        f"{figures} figuras e {ctas} CTAs."
+    )
+    return article_body
@@ -1,5 +1,10 @@
+import logging
+from urllib.parse import urlparse
+
 from bs4 import BeautifulSoup
 
+logger = logging.getLogger(__name__)
+
 def clean_html_for_globo_esporte(soup: BeautifulSoup) -> BeautifulSoup:
     """
     Limpa o HTML de uma página do Globo Esporte, removendo elementos indesejados
@@ -27,4 +32,20 @@ def clean_html_for_lance(soup: BeautifulSoup) -> BeautifulSoup:
         if 'youtube.com' not in iframe.get('src', ''):
             iframe.decompose()
             
-    return soup
\ No newline at end of file
+    return soup
+
+
+# Limpezas aplicadas à página inteira antes do ContentExtractor, por trecho do domínio
+CLEANER_FUNCTIONS = {
+    'globo.com': clean_html_for_globo_esporte,
+}
+
+
+def apply_page_cleaners(soup: BeautifulSoup, url: str) -> BeautifulSoup:
+    """Aplica o primeiro limpador de CLEANER_FUNCTIONS cujo domínio casa com a URL."""
+    domain = urlparse(url).netloc.lower()
+    for cleaner_domain, cleaner_func in CLEANER_FUNCTIONS.items():
+        if cleaner_domain in domain:
+            logger.info(f"Applied cleaner for {cleaner_domain}")
+            return cleaner_func(soup)
+    return soup
@@ -0,0 +1,399 @@
+"""
+Motor único de CTAs: detecção e remoção numa passada por documento.
+
+A remoção de CTAs ("Thank you for reading... subscribe", "se inscreva"...)
+estava espalhada em camadas que reparseavam e renormalizavam o mesmo texto:
+`strip_forbidden_cta_sentences` chamava `get_text` + normalização em cada
+p/div/span/... (nós aninhados eram normalizados várias vezes), o pipeline
+repetia tudo com frases literais e ~30 regexes `<p>.*?frase.*?</p>`, e o
+`sanitize_published_post` detectava e depois limpava, parseando duas vezes.
+
+Aqui:
+
+- todos os fragmentos das regras (partes das sequências e frases) são
+  normalizados e compilados num trie, transformado em uma única regex de
+  literais com prefixos fatorados — o "autômato" roda em C e devolve, em cada
+  posição do texto, o fragmento mais longo que começa ali; os fragmentos
+  contidos nele (e suas posições) vêm de uma tabela pré-calculada, então
+  nenhuma ocorrência se perde, nem as sobrepostas;
+- `TextIndex` normaliza cada nó de texto do documento uma vez só (tabela de
+  `str.translate` por caractere + `lru_cache`, em vez de NFKD e filtro de
+  categoria caractere a caractere) e guarda o intervalo de cada tag alvo
+  nesse texto (o mapa de offsets de volta para o DOM): o texto de qualquer
+  tag é uma fatia do texto do documento, e o resumo de um pai é a união dos
+  filhos sem renormalizar nada;
+- uma varredura do matcher no texto inteiro dá todas as ocorrências; decidir
+  se uma tag tem CTA vira uma busca binária nas ocorrências dentro do seu
+  intervalo. As tags são visitadas de baixo para cima e a menor que casa é
+  removida; as ocorrências do intervalo morrem, e o ancestral só sai se ainda
+  casar sem ela. Antes, <div>/<section> eram verificados antes de <li>, e um
+  "follow us" numa lista derrubava o contêiner com o artigo inteiro. Tags
+  inline (span/strong/em) só contam fora de um bloco candidato.
+
+As regras ficam em camadas (`tiers`): a de blocos (regras do `html_utils`,
+em todas as tags alvo) e a de parágrafos (frases que só derrubam `<p>`, a
+antiga camada de regex do pipeline). A única diferença conhecida para a
+reavaliação nó a nó é uma frase que só passaria a existir depois de uma
+remoção, juntando texto de antes e depois do bloco removido.
+
+`CTA_ENGINE_ENABLED=false` volta para a verificação nó a nó, com a mesma
+ordem de baixo para cima (`python -m app.bench cta` compara os dois caminhos).
+"""
+
+import html
+import logging
+import os
+import re
+import unicodedata
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
+
+logger = logging.getLogger(__name__)
+
+CTA_ENGINE_ENABLED = os.getenv('CTA_ENGINE_ENABLED', 'true').lower() == 'true'
+
+# Tipos que `get_text` considera (comentários, <script>/<style> ficam de fora)
+_TEXT_TYPES = (NavigableString, CData)
+
+
+class _CtaCharTable(dict):
+    """
+    Tabela de `str.translate`: cada caractere vira sua forma final (NFKD sem
+    marcas combinantes, minúscula, e espaço para o que não for [a-z0-9]).
+    Preenchida sob demanda — o primeiro uso de um caractere paga o
+    `unicodedata`, os seguintes são uma consulta no dicionário em C.
+    """
+
+    def __missing__(self, code: int) -> str:
+        decomposed = unicodedata.normalize("NFKD", chr(code))
+        out = []
+        for ch in decomposed:
+            if unicodedata.category(ch).startswith("M"):
+                continue
+            for low in ch.lower():
+                out.append(low if ('a' <= low <= 'z' or '0' <= low <= '9') else ' ')
+        value = ''.join(out)
+        self[code] = value
+        return value
+
+
+_CTA_CHAR_TABLE = _CtaCharTable()
+
+
+@lru_cache(maxsize=4096)
+def normalize_cta_text(text: str) -> str:
+    """Normaliza texto para comparação de CTA (minúsculas, sem acentos/pontuação)."""
+    if not text:
+        return ""
+    # Desescapar entidades HTML; o resto (aspas, acentos, pontuação) fica na tabela
+    text = html.unescape(text)
+    return ' '.join(text.translate(_CTA_CHAR_TABLE).split())
+
+
+class CtaRule(NamedTuple):
+    label: str
+    # Fragmentos normalizados; a regra casa quando todos aparecem no texto
+    parts: Tuple[str, ...]
+
+
+class CtaScan(NamedTuple):
+    html: str
+    # Regra detectada no documento antes da limpeza
+    label: Optional[str]
+    # Um item por bloco removido: "camada: regra: trecho"
+    removed: List[str]
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Regex de um trie de literais; em cada posição casa o literal mais longo."""
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # Quantificador guloso: tenta continuar antes de aceitar o literal mais curto
+        return f'(?:{body})?' if '' in node else body
+
+    return build(trie)
+
+
+class CtaMatcher:
+    """Ocorrências de todos os fragmentos num texto normalizado, numa varredura."""
+
+    def __init__(self, fragments: Iterable[str]):
+        self.fragments = sorted({f for f in fragments if f})
+        self._ids = {f: i for i, f in enumerate(self.fragments)}
+        self._lengths = [len(f) for f in self.fragments]
+        self.max_len = max(self._lengths, default=0)
+        # A regex devolve só o fragmento mais longo de cada posição; os contidos nele vêm daqui
+        self._contained: List[List[Tuple[int, int]]] = []
+        for f in self.fragments:
+            inner = []
+            for g in self.fragments:
+                if g == f or len(g) > len(f):
+                    continue
+                k = f.find(g)
+                while k != -1:
+                    inner.append((self._ids[g], k))
+                    k = f.find(g, k + 1)
+            self._contained.append(inner)
+        pattern = _trie_pattern(self.fragments) if self.fragments else '(?!)'
+        self._regex = re.compile(f'(?=({pattern}))')
+
+    def fragment_id(self, fragment: str) -> int:
+        return self._ids[fragment]
+
+    def occurrences(self, text: str) -> List[Tuple[int, int, int]]:
+        """[(início, fim, id do fragmento)] ordenadas pelo início."""
+        found = []
+        contained = False
+        for m in self._regex.finditer(text):
+            start = m.start()
+            fid = self._ids[m.group(1)]
+            found.append((start, start + self._lengths[fid], fid))
+            for gid, k in self._contained[fid]:
+                found.append((start + k, start + k + self._lengths[gid], gid))
+                contained = True
+        if contained:
+            found.sort()
+        return found
+
+
+class TextIndex:
+    """
+    Texto normalizado do documento (nós de texto normalizados uma vez, unidos
+    por espaço) e o intervalo, nesse texto, de cada tag de `tag_names`.
+
+    `entries` fica em ordem de documento: (tag, nome, início, fim,
+    dentro_de_bloco),
+    onde `dentro_de_bloco` diz se a tag tem um ancestral em `block_names`.
+    Percorrida de trás para frente, é uma ordem de baixo para cima (toda tag
+    vem depois dos seus descendentes).
+    """
+
+    def __init__(self, soup: BeautifulSoup, tag_names: Iterable[str], block_names: Iterable[str] = ()):
+        targets = frozenset(tag_names)
+        blocks = frozenset(block_names)
+        pieces: List[str] = []
+        starts: List[int] = []
+        pos = 0
+        # [tag, primeiro pedaço, fim do pedaço, dentro de bloco]
+        entries: List[list] = []
+        stack: List[Tuple[Tag, Optional[list]]] = []
+        open_blocks = 0
+
+        for node in soup.descendants:
+            parent = node.parent
+            while stack and stack[-1][0] is not parent:
+                closed, entry = stack.pop()
+                if entry is not None:
+                    entry[2] = len(pieces)
+                if closed.name in blocks:
+                    open_blocks -= 1
+            if isinstance(node, Tag):
+                entry = None
+                if node.name in targets:
+                    entry = [node, len(pieces), None, open_blocks > 0]
+                    entries.append(entry)
+                if node.name in blocks:
+                    open_blocks += 1
+                stack.append((node, entry))
+            elif type(node) in _TEXT_TYPES:
+                norm = normalize_cta_text(node.strip())
+                if norm:
+                    if pieces:
+                        pos += 1
+                    starts.append(pos)
+                    pieces.append(norm)
+                    pos += len(norm)
+        while stack:
+            _, entry = stack.pop()
+            if entry is not None:
+                entry[2] = len(pieces)
+
+        self.text = ' '.join(pieces)
+        self.entries: List[Tuple[Tag, str, int, int, bool]] = [
+            (tag, tag.name, starts[first], starts[end - 1] + len(pieces[end - 1]), inside)
+            for tag, first, end, inside in entries
+            if end > first
+        ]
+
+
+class CtaEngine:
+    """Regras de CTA em camadas, avaliadas sobre um único `TextIndex` por documento."""
+
+    def __init__(
+        self,
+        tiers: Sequence[Tuple[str, Sequence[str], Sequence[CtaRule]]],
+        inline_tags: Iterable[str] = (),
+    ):
+        """
+        Args:
+            tiers: [(nome, tags, regras)] na ordem de aplicação. A primeira
+                camada também define o rótulo de detecção do documento.
+            inline_tags: Tags (span, strong...) que só são candidatas fora de
+                um bloco candidato — dentro de um <p>, quem sai é o <p>.
+        """
+        rules = [rule for _, _, tier_rules in tiers for rule in tier_rules]
+        self.matcher = CtaMatcher(part for rule in rules for part in rule.parts)
+        self.tiers = []
+        for name, tags, tier_rules in tiers:
+            compiled = [
+                (rule.label, frozenset(self.matcher.fragment_id(p) for p in rule.parts if p))
+                for rule in tier_rules
+                if any(rule.parts)
+            ]
+            self.tiers.append((name, frozenset(tags), compiled))
+        self.tag_names = frozenset(tag for _, tags, _ in self.tiers for tag in tags)
+        self.inline_tags = frozenset(inline_tags)
+        self.block_tags = self.tag_names - self.inline_tags
+
+    @staticmethod
+    def _label(rules, present: Set[int]) -> Optional[str]:
+        for label, ids in rules:
+            if ids <= present:
+                return label
+        return None
+
+    def detect_text(self, text: str, tier: int = 0) -> Optional[str]:
+        """Regra da camada `tier` presente no texto (não normalizado)."""
+        norm = normalize_cta_text(text)
+        if not norm:
+            return None
+        present = {fid for _, _, fid in self.matcher.occurrences(norm)}
+        return self._label(self.tiers[tier][2], present)
+
+    def strip_soup(self, soup: BeautifulSoup, tiers: Optional[int] = None) -> Tuple[Optional[str], List[str]]:
+        """
+        Remove da árvore as tags com CTA, camada por camada (as `tiers`
+        primeiras; None = todas), de baixo para cima: a menor tag que casa sai
+        primeiro e o ancestral só sai se ainda casar sem ela. Retorna o rótulo
+        detectado no documento antes da limpeza e a lista do que foi removido.
+        """
+        index = TextIndex(soup, self.tag_names, self.block_tags)
+        occ = self.matcher.occurrences(index.text)
+        if not occ:
+            return None, []
+        starts = [o[0] for o in occ]
+        alive = [True] * len(occ)
+        max_len = self.matcher.max_len
+        detected = self._label(self.tiers[0][2], {fid for _, _, fid in occ})
+        removed: List[str] = []
+
+        for name, tags, rules in self.tiers[:tiers]:
+            for node, tag_name, a, b, inside_block in reversed(index.entries):
+                if tag_name not in tags or (inside_block and tag_name in self.inline_tags):
+                    continue
+                present = set()
+                i = bisect_left(starts, a)
+                while i < len(occ) and starts[i] < b:
+                    if alive[i] and occ[i][1] <= b:
+                        present.add(occ[i][2])
+                    i += 1
+                # Sem ocorrências vivas: inclui as tags de dentro de um bloco já removido
+                if not present:
+                    continue
+                label = self._label(rules, present)
+                if not label:
+                    continue
+                removed.append(f"{name}: {label}: {index.text[a:b][:80]}")
+                node.decompose()
+                # Ocorrências que tocam o bloco removido somem do texto dos ancestrais
+                i = bisect_left(starts, a - max_len)
+                while i < len(occ) and starts[i] < b:
+                    if occ[i][1] > a:
+                        alive[i] = False
+                    i += 1
+        return detected, removed
+
+
+# =========================
+# Caminho antigo (CTA_ENGINE_ENABLED=false, benchmark e testes de equivalência)
+# =========================
+
+def legacy_pipeline_layers(content_html: str) -> Tuple[str, List[str]]:
+    """Camadas 1, 1.5 e 2 do pipeline antes do motor: frases literais e regexes no HTML bruto."""
+    cta_removal_log: List[str] = []
+
+    # CAMADA 1: Remover a frase EXATA (literal search)
+    nuclear_phrases = [
+        "Thank you for reading this post, don't forget to subscribe!",
+        "thank you for reading this post, don't forget to subscribe!",
+        "Thank you for reading this post, don't forget to subscribe",
+        "thank you for reading this post, don't forget to subscribe",
+    ]
+
+    for phrase in nuclear_phrases:
+        if phrase in content_html:
+            logger.error(f"🔥 LAYER 1 (LITERAL): CTA encontrado: '{phrase[:50]}...'")
+            cta_removal_log.append(f"LITERAL: {phrase[:60]}")
+            content_html = content_html.replace(phrase, "")
+            logger.info("✅ Removido com sucesso")
+
+    # CAMADA 1.5: Remover variações com formatação inline ou apóstrofos diferentes
+    cta_sentence_patterns = [
+        r"(?is)(?:<p[^>]*>\s*)?(?:<[^>]+>\s*)*thank\s+you\s+for\s+reading(?:\s|&nbsp;|<[^>]+>)*?(?:this\s+post)?(?:\s|&nbsp;|<[^>]+>)*?don['’]t\s+forget\s+to\s+subscribe(?:\s|&nbsp;|<[^>]+>)*?(?:</p>)?",
+        r"(?is)(?:<p[^>]*>\s*)?(?:<[^>]+>\s*)*thanks\s+for\s+reading(?:\s|&nbsp;|<[^>]+>)*?(?:this\s+post)?(?:\s|&nbsp;|<[^>]+>)*?don['’]t\s+forget\s+to\s+subscribe(?:\s|&nbsp;|<[^>]+>)*?(?:</p>)?",
+        r"(?is)thank\s+you\s+for\s+reading[^<\n\r]*don['’]t\s+forget\s+to\s+subscribe[^<\n\r]*",
+    ]
+
+    for pattern in cta_sentence_patterns:
+        content_html, removed_count = re.subn(pattern, '', content_html)
+        if removed_count:
+            logger.error("🔥 LAYER 1.5 (SENTENCE REGEX): CTA removido via regex flexível")
+            cta_removal_log.append(f"SENTENCE_PATTERN: {pattern[:40]}...")
+
+    # CAMADA 2: Remover parágrafos INTEIROS que contêm padrões de CTA
+    cta_patterns = [
+        r'<p[^>]*>.*?thank you for reading this post.*?don\'t forget to subscribe.*?</p>',
+        r'<p[^>]*>.*?thank you for reading.*?don\'t forget.*?</p>',
+        r'<p[^>]*>.*?thank you for reading.*?</p>',
+        r'<p[^>]*>.*?thanks for reading.*?</p>',
+        r'<p[^>]*>.*?thanks for visiting.*?</p>',
+        r'<p[^>]*>.*?don\'t forget to subscribe.*?</p>',
+        r'<p[^>]*>.*?subscribe now.*?</p>',
+        r'<p[^>]*>.*?please subscribe.*?</p>',
+        r'<p[^>]*>.*?subscribe to our.*?</p>',
+        r'<p[^>]*>.*?stay tuned.*?</p>',
+        r'<p[^>]*>.*?follow us.*?</p>',
+        r'<p[^>]*>.*?if you enjoyed.*?</p>',
+        r'<p[^>]*>.*?found this helpful.*?</p>',
+        r'<p[^>]*>.*?click here.*?</p>',
+        r'<p[^>]*>.*?read more.*?</p>',
+        r'<p[^>]*>.*?sign up.*?</p>',
+        r'<p[^>]*>.*?obrigado por ler.*?</p>',
+        r'<p[^>]*>.*?obrigada por ler.*?</p>',
+        r'<p[^>]*>.*?não esqueça de se inscrever.*?</p>',
+        r'<p[^>]*>.*?se inscreva.*?</p>',
+        r'<p[^>]*>.*?clique aqui.*?</p>',
+        r'<p[^>]*>.*?leia mais.*?</p>',
+        r'<p[^>]*>.*?cadastre-se.*?</p>',
+        r'<p[^>]*>.*?fique atento.*?</p>',
+        r'<p[^>]*>.*?nos siga.*?</p>',
+        r'<p[^>]*>.*?mantenha-se atualizado.*?</p>',
+        r'<p[^>]*>.*?este artigo foi.*?</p>',
+        r'<p[^>]*>.*?se você gostou.*?</p>',
+    ]
+
+    for pattern in cta_patterns:
+        original_length = len(content_html)
+        matches = re.findall(pattern, content_html, flags=re.IGNORECASE | re.DOTALL)
+        if matches:
+            logger.debug(f"REGEX: Encontrado {len(matches)} paragrafos com CTA")
+            for match in matches[:2]:  # Log dos 2 primeiros matches
+                cta_removal_log.append(f"REGEX: {match[:80]}")
+        content_html = re.sub(pattern, '', content_html, flags=re.IGNORECASE | re.DOTALL)
+        if len(content_html) < original_length:
+            logger.debug(f"REMOVIDO: Paragrafo com CTA via regex")
+
+    return content_html, cta_removal_log
@@ -0,0 +1,210 @@
+"""
+Detecção de histórias quase duplicadas antes da chamada de IA (MinHash + LSH).
+
+`filter_new_articles` só deduplica por (source_id, external_id): quando
+movie-news e movie-lists do ScreenRant, ou fontes diferentes, cobrem o mesmo
+anúncio, pagávamos várias reescritas no Gemini e publicávamos posts quase
+iguais. Aqui cada artigo extraído vira uma assinatura MinHash:
+
+- o texto (sem HTML/acentos/stopwords, via `related_index.tokenize`) é
+  quebrado em shingles de `DEDUP_SHINGLE_WORDS` palavras, cada um com hash
+  crc32;
+- `DEDUP_NUM_PERM` permutações multiply-shift (NumPy, vetorizado) dão a
+  assinatura — a fração de posições iguais entre duas assinaturas estima a
+  similaridade de Jaccard dos textos;
+- a assinatura é dividida em `DEDUP_BANDS` faixas; cada faixa vira um bucket
+  na tabela `story_lsh` do `data/app.db`. Só artigos que dividem algum bucket
+  são comparados, e a similaridade estimada precisa passar de
+  `DEDUP_THRESHOLD`.
+
+O pipeline consulta o índice logo após a extração: artigos parecidos demais
+com outro já PUBLICADO nas últimas `DEDUP_WINDOW_HOURS` horas são marcados como
+DUPLICATE e não vão para a IA. Os que passam entram no índice na hora, mas só
+contam como original depois de publicados — se o parecido ainda estiver na
+fila ou falhar na IA/publicação, a história não se perde.
+"""
+
+import logging
+import os
+import sqlite3
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .related_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+DEDUP_ENABLED = os.getenv('DEDUP_ENABLED', 'true').lower() == 'true'
+DEDUP_THRESHOLD = float(os.getenv('DEDUP_THRESHOLD', 0.6))
+DEDUP_WINDOW_HOURS = float(os.getenv('DEDUP_WINDOW_HOURS', 72))
+DEDUP_SHINGLE_WORDS = int(os.getenv('DEDUP_SHINGLE_WORDS', 4))
+DEDUP_NUM_PERM = 128
+DEDUP_BANDS = 32
+# Abaixo disso a assinatura é ruído (notas curtas, galerias)
+DEDUP_MIN_SHINGLES = int(os.getenv('DEDUP_MIN_SHINGLES', 20))
+
+_rng = np.random.default_rng(0x5EED)
+# Multiply-shift: h(x) = (a * x + b) mod 2^64 >> 32, com `a` ímpar
+_PERM_A = _rng.integers(1, 2**63, size=DEDUP_NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_PERM_B = _rng.integers(0, 2**63, size=DEDUP_NUM_PERM, dtype=np.uint64)
+_ROWS = DEDUP_NUM_PERM // DEDUP_BANDS
+
+STORY_TABLES_SQL = """
+    CREATE TABLE IF NOT EXISTS story_signatures (
+        seen_article_id INTEGER PRIMARY KEY,
+        source_id TEXT,
+        url TEXT,
+        title TEXT,
+        signature BLOB NOT NULL,
+        created_at DATETIME NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS story_lsh (
+        bucket INTEGER NOT NULL,
+        seen_article_id INTEGER NOT NULL,
+        PRIMARY KEY (bucket, seen_article_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_story_signatures_created ON story_signatures(created_at);
+"""
+
+
+def shingle_hashes(text: str, k: int = DEDUP_SHINGLE_WORDS) -> np.ndarray:
+    """crc32 dos shingles de `k` palavras do texto (HTML é ignorado)."""
+    tokens = tokenize(text)
+    if len(tokens) < k:
+        return np.zeros(0, dtype=np.uint64)
+    shingles = {' '.join(tokens[i:i + k]) for i in range(len(tokens) - k + 1)}
+    return np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+
+def minhash(hashes: np.ndarray) -> np.ndarray:
+    """Assinatura MinHash (uint32[DEDUP_NUM_PERM]) de um conjunto de hashes."""
+    if not len(hashes):
+        return np.full(DEDUP_NUM_PERM, np.iinfo(np.uint32).max, dtype=np.uint32)
+    # (num_perm, n): o overflow de uint64 é o "mod 2^64" do multiply-shift
+    with np.errstate(over='ignore'):
+        permuted = (_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) >> np.uint64(32)
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    """Jaccard estimado: fração de posições iguais das assinaturas."""
+    return float(np.count_nonzero(sig_a == sig_b)) / len(sig_a)
+
+
+def band_buckets(signature: np.ndarray) -> List[int]:
+    """Um bucket por faixa da assinatura: crc32 das linhas da faixa, com o número da faixa nos 8 bits baixos."""
+    rows = signature.astype(np.uint32).reshape(DEDUP_BANDS, _ROWS)
+    return [zlib.crc32(band.tobytes()) << 8 | i for i, band in enumerate(rows)]
+
+
+class StoryDeduplicator:
+    """Índice LSH das assinaturas no `app.db` (conexão do `Database`)."""
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        threshold: float = DEDUP_THRESHOLD,
+        window_hours: float = DEDUP_WINDOW_HOURS,
+    ):
+        self.conn = conn
+        self.threshold = threshold
+        self.window = timedelta(hours=window_hours)
+        self.conn.executescript(STORY_TABLES_SQL)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """Assinatura do texto, ou None se ele for curto demais para comparar."""
+        hashes = shingle_hashes(text)
+        if len(hashes) < DEDUP_MIN_SHINGLES:
+            return None
+        return minhash(hashes)
+
+    def find_duplicate(self, signature: np.ndarray, exclude_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Artigo recente (na janela, já PUBLISHED) mais parecido com a
+        assinatura, se a similaridade passar do limiar.
+        """
+        buckets = band_buckets(signature)
+        cutoff = datetime.utcnow() - self.window
+        placeholders = ','.join('?' for _ in buckets)
+        rows = self.conn.execute(
+            f"""
+            SELECT s.seen_article_id, s.source_id, s.url, s.title, s.signature, a.status
+            FROM story_signatures s
+            JOIN seen_articles a ON a.id = s.seen_article_id
+            WHERE s.seen_article_id IN (SELECT seen_article_id FROM story_lsh WHERE bucket IN ({placeholders}))
+              AND s.created_at >= ?
+              AND s.seen_article_id != ?
+              AND a.status = 'PUBLISHED'
+            """,
+            (*buckets, cutoff, exclude_id if exclude_id is not None else -1),
+        ).fetchall()
+
+        best = None
+        for row in rows:
+            score = similarity(signature, np.frombuffer(row[4], dtype=np.uint32))
+            if score >= self.threshold and (best is None or score > best['similarity']):
+                best = {
+                    'seen_article_id': row[0],
+                    'source_id': row[1],
+                    'url': row[2],
+                    'title': row[3],
+                    'status': row[5],
+                    'similarity': score,
+                }
+        return best
+
+    def add(self, seen_article_id: int, signature: np.ndarray, source_id: str = '', url: str = '', title: str = ''):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO story_signatures (seen_article_id, source_id, url, title, signature, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (seen_article_id, source_id, url, title, signature.astype(np.uint32).tobytes(), datetime.utcnow()),
+            )
+            self.conn.execute("DELETE FROM story_lsh WHERE seen_article_id = ?", (seen_article_id,))
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO story_lsh (bucket, seen_article_id) VALUES (?, ?)",
+                [(bucket, seen_article_id) for bucket in band_buckets(signature)],
+            )
+
+    def check_and_add(self, art: Dict[str, Any], text: str) -> Optional[Dict[str, Any]]:
+        """
+        Passo do pipeline: devolve o artigo parecido (e não indexa `art`) ou
+        indexa `art` e devolve None. `art` usa as chaves db_id/source_id/url/title.
+        """
+        signature = self.signature(text)
+        if signature is None:
+            return None
+        match = self.find_duplicate(signature, exclude_id=art['db_id'])
+        if match:
+            return match
+        self.add(art['db_id'], signature, art.get('source_id', ''), art.get('url', ''), art.get('title', ''))
+        return None
+
+    def purge(self) -> int:
+        """Remove assinaturas fora da janela."""
+        cutoff = datetime.utcnow() - self.window
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM story_lsh WHERE seen_article_id IN "
+                "(SELECT seen_article_id FROM story_signatures WHERE created_at < ?)",
+                (cutoff,),
+            )
+            removed = self.conn.execute("DELETE FROM story_signatures WHERE created_at < ?", (cutoff,)).rowcount
+        return removed
+
+
+def purge_story_signatures() -> int:
+    """Job do agendador: remove do índice as assinaturas fora da janela."""
+    from .store import Database
+
+    db = Database()
+    try:
+        removed = StoryDeduplicator(db.conn).purge()
+    finally:
+        db.close()
+    if removed:
+        logger.info(f"DEDUP: {removed} assinaturas antigas removidas")
+    return removed
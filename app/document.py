@@ -0,0 +1,100 @@
+"""
+Documento HTML compartilhado entre as etapas de pós-processamento.
+
+Cada função de `html_utils` recebia uma string, fazia `BeautifulSoup(...)`,
+alterava a árvore e devolvia `decode_contents()` — cerca de uma dúzia de
+ciclos parse/serialize por artigo. `Document` faz o parse uma única vez; as
+transformações recebem a árvore (`soup`) e a alteram no lugar, e a
+serialização acontece só no final.
+
+Transformações podem declarar, com `@transform(touches=...)`, os tipos de nó
+que manipulam. Se o documento não tem nenhum desses nós, `Document.apply`
+pula a etapa sem percorrer o resto da função.
+
+    doc = Document(content_html)
+    doc.apply(validate_and_fix_figures_soup)
+    doc.apply(rewrite_img_srcs_soup, uploaded_src_map)
+    html = doc.html()
+"""
+
+import logging
+from typing import Any, Callable, Iterable, Optional
+
+from bs4 import BeautifulSoup, Tag
+
+logger = logging.getLogger(__name__)
+
+
+def transform(touches: Optional[Iterable[str]] = None):
+    """
+    Marca uma função `fn(soup, *args)` como transformação de Document.
+
+    Args:
+        touches: Tags que a transformação lê/altera. None = sempre executa
+            (ex.: etapas que inserem nós novos).
+    """
+    def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+        fn.touches = frozenset(touches) if touches else None
+        return fn
+    return decorator
+
+
+class Document:
+    """Árvore HTML (lxml) de um fragmento de conteúdo, parseada uma vez."""
+
+    def __init__(self, html: str = "", soup: Optional[BeautifulSoup] = None):
+        self.soup = soup if soup is not None else BeautifulSoup(html or "", "lxml")
+        self._text: Optional[str] = None
+        self.skipped = []
+
+    @classmethod
+    def from_soup(cls, soup: BeautifulSoup) -> 'Document':
+        return cls(soup=soup)
+
+    @property
+    def root(self) -> Tag:
+        """Raiz do conteúdo: o <body> criado pelo lxml (ou o próprio soup)."""
+        if self.soup.body is None and self.soup.find() is None:
+            # Documento vazio: cria o body para que append_html tenha onde inserir
+            html_tag = self.soup.new_tag("html")
+            html_tag.append(self.soup.new_tag("body"))
+            self.soup.append(html_tag)
+        return self.soup.body or self.soup
+
+    def html(self) -> str:
+        """Serializa o conteúdo (equivalente ao antigo `soup.body.decode_contents()`)."""
+        return self.soup.body.decode_contents() if self.soup.body else str(self.soup)
+
+    def text(self) -> str:
+        """Texto visível (`get_text(" ", strip=True)`), em cache até a próxima alteração."""
+        if self._text is None:
+            self._text = self.soup.get_text(" ", strip=True)
+        return self._text
+
+    def changed(self):
+        """Invalida caches derivados depois de uma alteração feita fora de `apply`."""
+        self._text = None
+
+    def has_any(self, tag_names: Iterable[str]) -> bool:
+        return self.soup.find(list(tag_names)) is not None
+
+    def apply(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Executa uma transformação na árvore, pulando-a se não houver nós relevantes."""
+        touches = getattr(fn, 'touches', None)
+        if touches and not self.has_any(touches):
+            self.skipped.append(fn.__name__)
+            return None
+        result = fn(self.soup, *args, **kwargs)
+        self._text = None
+        return result
+
+    def append_html(self, fragment: str):
+        """Acrescenta um fragmento HTML ao final do conteúdo (parse só do fragmento)."""
+        if not fragment:
+            return
+        frag = BeautifulSoup(fragment, "lxml")
+        source = frag.body or frag
+        root = self.root
+        for node in list(source.contents):
+            root.append(node.extract())
+        self._text = None
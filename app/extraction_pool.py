@@ -0,0 +1,192 @@
+"""
+Extração de conteúdo em processos separados.
+
+A extração (lxml + BeautifulSoup + limpadores + trafilatura) é o passo de CPU
+mais pesado antes da chamada de IA e rodava na thread do worker, um artigo
+por vez. `ExtractionPool` envia o HTML baixado para um `ProcessPoolExecutor`
+e recebe de volta só o dict do resultado do `extract`:
+
+- páginas pequenas vão direto como bytes no pickle da chamada;
+- páginas a partir de `EXTRACTION_HANDOFF_MIN_KB` são gravadas uma vez num
+  arquivo temporário (em /dev/shm quando existe, ou seja, em memória) e o
+  processo filho lê com mmap — o HTML não passa pelo pipe do executor;
+- o `process_batch` submete todos os artigos do lote logo após o download,
+  então a extração dos próximos roda em paralelo (em todos os núcleos)
+  enquanto o atual espera a IA.
+
+`EXTRACTION_WORKERS=0` mantém a extração no próprio processo. Se o pool
+quebrar (processo filho morto), o artigo é extraído localmente e o pool é
+recriado na próxima submissão.
+"""
+
+import atexit
+import logging
+import mmap
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+from .cleaners import apply_page_cleaners
+from .extractor import ContentExtractor
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_WORKERS = int(os.getenv('EXTRACTION_WORKERS', min(4, os.cpu_count() or 1)))
+EXTRACTION_HANDOFF_MIN_KB = int(os.getenv('EXTRACTION_HANDOFF_MIN_KB', 256))
+EXTRACTION_TIMEOUT_S = float(os.getenv('EXTRACTION_TIMEOUT_S', 120))
+# spawn: o processo principal tem threads (workers, scheduler); fork herdaria locks
+EXTRACTION_START_METHOD = os.getenv('EXTRACTION_START_METHOD', 'spawn')
+
+_HANDOFF_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+# (tipo, dado): ('bytes', b'...') ou ('file', caminho)
+_Payload = Tuple[str, Any]
+
+_worker_extractor: Optional[ContentExtractor] = None
+
+
+def extract_html(extractor: ContentExtractor, html: str, url: str) -> Optional[Dict[str, Any]]:
+    """Parse único + limpezas de página (cleaners.py) + `extract`."""
+    soup = apply_page_cleaners(BeautifulSoup(html, 'lxml'), url)
+    return extractor.extract(html, url=url, soup=soup)
+
+
+def _read_payload(payload: _Payload) -> str:
+    kind, data = payload
+    if kind == 'bytes':
+        return data.decode('utf-8')
+    try:
+        with open(data, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return str(mm, 'utf-8')
+    finally:
+        _unlink_quietly(data)
+
+
+def _unlink_quietly(path: str):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def _init_worker():
+    global _worker_extractor
+    _worker_extractor = ContentExtractor()
+
+
+def _extract_in_worker(payload: _Payload, url: str) -> Optional[Dict[str, Any]]:
+    """Roda no processo filho: lê o HTML do payload e devolve só o resultado."""
+    if _worker_extractor is None:
+        _init_worker()
+    return extract_html(_worker_extractor, _read_payload(payload), url)
+
+
+class ExtractionPool:
+    """Executor de extração; `submit` devolve um Future com o dict do `extract`."""
+
+    def __init__(self, workers: int = EXTRACTION_WORKERS, handoff_min_bytes: int = EXTRACTION_HANDOFF_MIN_KB * 1024):
+        self.workers = workers
+        self.handoff_min_bytes = handoff_min_bytes
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._local_extractor: Optional[ContentExtractor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(EXTRACTION_START_METHOD),
+                    initializer=_init_worker,
+                )
+                logger.info(f"EXTRACTION POOL: {self.workers} processos iniciados")
+            return self._executor
+
+    def _reset_executor(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def extract_local(self, html: str, url: str) -> Optional[Dict[str, Any]]:
+        if self._local_extractor is None:
+            self._local_extractor = ContentExtractor()
+        return extract_html(self._local_extractor, html, url)
+
+    def _make_payload(self, html: str) -> _Payload:
+        raw = html.encode('utf-8')
+        if len(raw) < self.handoff_min_bytes:
+            return ('bytes', raw)
+        fd, path = tempfile.mkstemp(prefix='extract-', suffix='.html', dir=_HANDOFF_DIR)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(raw)
+        return ('file', path)
+
+    def submit(self, html: str, url: str) -> Future:
+        if self.workers <= 0:
+            return self._submit_local(html, url)
+
+        payload = self._make_payload(html)
+        try:
+            inner = self._get_executor().submit(_extract_in_worker, payload, url)
+        except (BrokenProcessPool, RuntimeError) as e:
+            logger.warning(f"EXTRACTION POOL indisponível ({e}); extraindo {url} localmente.")
+            if payload[0] == 'file':
+                _unlink_quietly(payload[1])
+            self._reset_executor()
+            return self._submit_local(html, url)
+
+        # Se o filho morrer, extrai localmente em vez de perder o artigo
+        outer: Future = Future()
+
+        def _done(f: Future):
+            if payload[0] == 'file':
+                _unlink_quietly(payload[1])
+            try:
+                outer.set_result(f.result())
+            except BrokenProcessPool:
+                logger.warning(f"EXTRACTION POOL quebrou durante {url}; extraindo localmente.")
+                self._reset_executor()
+                try:
+                    outer.set_result(self.extract_local(html, url))
+                except Exception as e:
+                    outer.set_exception(e)
+            except Exception as e:
+                outer.set_exception(e)
+
+        inner.add_done_callback(_done)
+        return outer
+
+    def _submit_local(self, html: str, url: str) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(self.extract_local(html, url))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+
+_pool: Optional[ExtractionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_extraction_pool() -> ExtractionPool:
+    """Pool único do processo (os processos filhos sobrevivem entre lotes)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ExtractionPool()
+            atexit.register(_pool.shutdown)
+        return _pool
@@ -8,13 +8,38 @@ import json
 import re
 import os
 import time
+import unicodedata
 from urllib.parse import urljoin, urlparse, parse_qs
 
 from .config import USER_AGENT
+from .clean_engine import COMPILED_CLEANERS, clean_article_body, compile_selectors
+from .site_rules import SiteRule, get_site_rules
+from .page_cache import PageCache, get_page_cache
+from .streaming_fetch import FETCH_MAX_BYTES, FETCH_STREAMING, fetch_streaming
+from .tracing import traced
+from . import regexes as rx
+from .image_candidates import (
+    BAD_IMAGE_DOMAINS,
+    BAD_IMAGE_KEYWORDS,
+    JUNK_IMAGE_PATTERNS,
+    BAD_DOMAIN,
+    BAD_KEYWORD,
+    JUNK_FILENAME,
+    best_srcset_url,
+    image_candidate,
+)
 from trafilatura.metadata import extract_metadata as trafilatura_extract_metadata # New import
+from trafilatura.htmlprocessing import convert_to_html as trafilatura_convert_to_html
+import lxml.html
+from lxml.etree import ParserError
 
 logger = logging.getLogger(__name__)
 
+# Extrator genérico: trafilatura só sobre o candidato de _find_article_body
+TRAFILATURA_SUBTREE = os.getenv('TRAFILATURA_SUBTREE', 'true').lower() == 'true'
+TRAFILATURA_SUBTREE_MIN_CHARS = int(os.getenv('TRAFILATURA_SUBTREE_MIN_CHARS', 500))
+_TRAFILATURA_OPTIONS = dict(include_images=False, include_links=True, include_comments=False, include_tables=False)
+
 def _coerce_url(candidate: Any) -> Optional[str]:
     """
     Aceita str, dict (ex.: {'url': ...} / {'src': ...} / {'href': ...} / {'content': ...})
@@ -66,44 +91,12 @@ def _dedupe_preserve(urls: List[str]) -> List[str]:
             out.append(u)
     return out
 
-BAD_IMAGE_KEYWORDS = {
-    'author', 'autor', 'avatar', 'byline', 'perfil', 'profile',
-    'placeholder', 'logo', 'logomarca', 'brand', 'marca',
-    'icon', 'favicon', 'sprite', 'comment', 'user', 'usuario', 'usuário'
-}
-
-BAD_IMAGE_DOMAINS = {
-    'gravatar.com', 'twimg.com', 'facebook.com', 'fbcdn.net',
-    'gstatic.com', 'googleusercontent.com',
-    # Adicionados conforme sugestão para bloquear trackers e placeholders
-    "schema.org", "scorecardresearch.com", "doubleclick.net",
-    "quantserve.com", "chartbeat.com", "google-analytics.com"
-}
-
-# aceita query ?width=1200&height=630 e sufixos -1200x630.jpg
-DIM_SUFFIX_RE = re.compile(r'-(\d{2,5})x(\d{2,5})(?=\.[a-z]{3,4})(?:\?.*)?$', re.IGNORECASE)
-
 def _guess_dimensions_from_url(url: str) -> Tuple[Optional[int], Optional[int]]:
-    try:
-        p = urlparse(url)
-        q = parse_qs(p.query or '')
-        w = q.get('width') or q.get('w')
-        h = q.get('height') or q.get('h')
-        if w and h:
-            return int(w[0]), int(h[0])
-        m = DIM_SUFFIX_RE.search(p.path)
-        if m:
-            return int(m.group(1)), int(m.group(2))
-    except Exception:
-        pass
-    return None, None
+    candidate = image_candidate(url)
+    return candidate.width, candidate.height
 
 def _is_bad_domain(url: str) -> bool:
-    try:
-        host = urlparse(url).hostname or ''
-        return any(host.endswith(d) for d in BAD_IMAGE_DOMAINS)
-    except Exception:
-        return False
+    return bool(image_candidate(url).flags & BAD_DOMAIN)
 
 
 YOUTUBE_DOMAINS = (
@@ -134,81 +127,21 @@ FORBIDDEN_LABELS: Set[str] = {
     "Producer", "Producers", "Cast"
 }
 
-JUNK_IMAGE_PATTERNS = (
-    "placeholder", "sprite", "icon", "emoji", ".svg",
-    # From user suggestion to filter out non-content images
-    "cta", "read-more", "share", "logo", "banner"
-)
-
-# Blocos a ignorar (relacionados/sidebars/galerias etc.)
-_BAD_SECTION_RX = re.compile(
-    r"(related|trending|more|sidebar|aside|recommend|recommended|"
-    r"gallery|carousel|slideshow|video|playlist|social|share|"
-    r"footer|header|nav|subscribe|newsletter|ad|advert|sponsor|"
-    # From user suggestion
-    r"cta|banner|paid|outbrain|taboola|"
-    r"screen-hub|screenhub|hub|most-popular|popular)",
-    re.I
-)
-
-
-def _parse_srcset(srcset: str):
-    """Retorna a URL com maior largura declarada em um srcset."""
-    best = None
-    best_w = -1
-    for part in (srcset or "").split(","): 
-        part = part.strip()
-        if not part:
-            continue
-        tokens = part.split()
-        url = tokens[0]
-        w = 0
-        if len(tokens) > 1 and tokens[1].endswith("w"):
-            try:
-                w = int(tokens[1][:-1])
-            except Exception:
-                w = 0
-        if w >= best_w:
-            best_w = w
-            best = url
-    return best
-
 
 def _has_bad_keyword(url: str) -> bool:
-    u = url.lower()
-    return any(k in u for k in BAD_IMAGE_KEYWORDS)
+    return bool(image_candidate(url).flags & BAD_KEYWORD)
 
 def _is_junk_filename(url: str) -> bool:
     """Checks if the image filename suggests it's a non-content image."""
-    try:
-        name = urlparse(url).path.rsplit("/", 1)[-1].lower()
-        return any(snippet in name for snippet in JUNK_IMAGE_PATTERNS)
-    except Exception:
-        return False # Fail safe
+    return bool(image_candidate(url).flags & JUNK_FILENAME)
 
 def _passes_min_size(url: str, min_w: int = 600, min_h: int = 315) -> bool:
-    w, h = _guess_dimensions_from_url(url)
-    if w is None or h is None:
-        # Sem dimensão explícita: aceita provisoriamente (muitos sites não expõem)
-        return True
-    if w < min_w or h < min_h:
-        return False
-    # evita quase-quadradas/estranhas como avatar 150x150
-    ar = w / h if h else 0
-    return 0.6 <= ar <= 2.2
+    return image_candidate(url).passes_min_size(min_w, min_h)
 
 def is_valid_article_image(url: str) -> bool:
-    if not url or url.startswith('data:') :
-        return False
-    if _is_bad_domain(url):
-        return False
-    if _has_bad_keyword(url):
-        return False
-    if _is_junk_filename(url):
-        return False
-    if not _passes_min_size(url):
-        return False
-    return True
+    # Registro memoizado (image_candidates): a mesma URL vista na destacada,
+    # no corpo e no upload é parseada uma vez só
+    return bool(url) and image_candidate(url).valid_for_article
 
 def pick_featured_image(candidates: list[str]) -> Optional[str]:
     """Retorna a primeira imagem que passa no filtro."""
@@ -244,7 +177,7 @@ def _find_article_body(soup: BeautifulSoup) -> BeautifulSoup:
     Tenta localizar o nó raiz do corpo do artigo.
     - Prefere a tag <article>
     - Fallback para seletores comuns (article body/content)
-    - Evita nós com classes/ids que casem _BAD_SECTION_RX
+    - Evita nós com classes/ids que casem rx.BAD_SECTION
     - Fallback final: nó com mais <p> + <figure>
     """
     # 1. Encontre o contêiner principal do artigo
@@ -258,7 +191,7 @@ def _find_article_body(soup: BeautifulSoup) -> BeautifulSoup:
     candidates = soup.select(
         "article .entry-content, article .content, article [itemprop='articleBody'], "
         ".post-content, .single-content, .post-body, "
-        "[itemprop='articleBody'], .article-body, .article-content, " # Original selectors
+        "[itemprop='articleBody'], .article-body, .article-content" # Original selectors
     )
     if not candidates:
         candidates = soup.find_all(True)
@@ -266,7 +199,7 @@ def _find_article_body(soup: BeautifulSoup) -> BeautifulSoup:
     best, best_score = None, -1
     for c in candidates:
         classes = " ".join(c.get("class", [])) + " " + (c.get("id") or "")
-        if _BAD_SECTION_RX.search(classes):
+        if rx.BAD_SECTION.search(classes):
             continue
         # Evita wrappers muito genéricos do site
         if c.name in ("header", "footer", "nav", "aside"):
@@ -285,10 +218,11 @@ def collect_images_from_article(soup: BeautifulSoup, base_url: str) -> list[str]
       - nós com atributos data-*
       - estilos inline: background-image
       - <figure> contendo <img>
-    Aplica filtros de junk/thumb e prioriza CDNs conhecidas.
+    Aplica filtros de junk/thumb e prioriza CDNs conhecidas. Do srcset fica o
+    maior candidato que passa nos filtros.
     """
     root = _find_article_body(soup)
-    urls: list[str] = []
+    urls: list[Tuple[str, str]] = []
 
     def _push(candidate: Optional[str]) -> None:
         if not candidate:
@@ -296,9 +230,10 @@ def collect_images_from_article(soup: BeautifulSoup, base_url: str) -> list[str]
         abs_u = _abs(candidate, base_url)
         if not abs_u:
             return
-        if not is_valid_article_image(abs_u):
+        record = image_candidate(abs_u)
+        if not record.valid_for_article:
             return
-        urls.append(abs_u.rstrip("/"))
+        urls.append((abs_u.rstrip("/"), record.netloc))
 
     # 1) <img> tags
     for img in root.select("img:not([aria-hidden='true'])"):
@@ -308,12 +243,12 @@ def collect_images_from_article(soup: BeautifulSoup, base_url: str) -> list[str]
                 cand = img.get(attr)
                 break
         if not cand and img.get("srcset"):
-            cand = _parse_srcset(img.get("srcset"))
+            cand = best_srcset_url(img.get("srcset"), base_url)
         _push(cand)
 
     # 2) <picture><source>
     for source in root.select("picture source[srcset]"):
-        _push(_parse_srcset(source.get("srcset", "")))
+        _push(best_srcset_url(source.get("srcset", ""), base_url))
 
     # 2.5) <noscript> com <img> (fallback de lazy-load)
     for ns in root.find_all("noscript"):
@@ -340,12 +275,11 @@ def collect_images_from_article(soup: BeautifulSoup, base_url: str) -> list[str]
             if img.get("src"):
                 _push(img.get("src"))
             elif img.get("srcset"):
-                _push(_parse_srcset(img.get("srcset", "")))
+                _push(best_srcset_url(img.get("srcset", ""), base_url))
 
     # de-dup preservando preferência das CDNs
     dedup: dict[str, int] = {}
-    for u in urls:
-        host = urlparse(u).netloc
+    for u, host in urls:
         pref = 0 if host in PRIORITY_CDN_DOMAINS else 1
         dedup[u] = min(dedup.get(u, pref), pref)
     ordered = sorted(dedup.items(), key=lambda kv: (kv[1], kv[0]))
@@ -429,61 +363,6 @@ def _choose_best(a, b):
         out[k] = a.get(k) or b.get(k)
     return out
 
-def _extract_site_specific(soup: BeautifulSoup, url: str, selectors: Dict[str, Union[str, List[str]]]) -> Optional[Dict[str, Any]]:
-    """
-    Helper for site-specific extraction using a dictionary of CSS selectors.
-    Falls back gracefully by returning None if key elements are not found.
-    """
-    try:
-        # Find title
-        title_tag = soup.select_one(str(selectors['title']))
-        title = title_tag.get_text(strip=True) if title_tag else None
-
-        # Find content body
-        content_tag = soup.select_one(str(selectors['content']))
-
-        if not title or not content_tag:
-            logger.warning(f"Specific extractor failed to find title/content for {url}. Will fall back to generic.")
-            return None
-
-        # Basic cleanup inside content
-        for junk_selector in selectors.get('junk', []):
-            for junk_tag in content_tag.select(str(junk_selector)):
-                junk_tag.decompose()
-        
-        content_html = str(content_tag)
-
-        # Use existing helpers for media and metadata
-        # Note: These helpers operate on the *original* soup object to find meta tags, etc.
-        extractor = ContentExtractor() # Temporary instance to access helpers
-        featured_image_url = extractor._pick_featured_image(soup, url)
-        images = collect_images_from_article(soup, url) # This also uses its own logic to find the body
-        videos = extractor._extract_youtube_videos(soup)
-        
-        excerpt_tag = soup.select_one('meta[name="description"], meta[property="og:description"]')
-        excerpt = excerpt_tag['content'].strip() if excerpt_tag and excerpt_tag.get('content') else ''
-
-        # Ensure the featured image isn't duplicated in the body images list
-        other_images = [img for img in images if img != featured_image_url]
-
-        result = {
-            "title": title,
-            "content": content_html,
-            "excerpt": excerpt,
-            "featured_image_url": featured_image_url,
-            "images": other_images,
-            "videos": videos,
-            "source_url": url,
-        }
-        
-        logger.info(f"Successfully extracted content using specific extractor for {url}. Title: {result['title'][:50]}...")
-        return result
-
-    except Exception as e:
-        # Log with exc_info=False to avoid a huge traceback for a common fallback case
-        logger.error(f"Error in site-specific extractor for {url}: {e}. Falling back to generic.", exc_info=False)
-        return None
-
 def _extract_json_ld(soup: BeautifulSoup) -> List[Dict[str, Any]]:
     """
     Encontra e parseia todos os scripts do tipo ld+json da página.
@@ -515,20 +394,54 @@ def _find_news_article_in_json_ld(json_ld_data: List[Dict[str, Any]]) -> Optiona
                 return item
     return None
 
-# --- New constants for related content removal ---
-LEIA_HEADING_RE = re.compile(r"(leia também|veja também|relacionad[oa]s|recomendad[oa]s|tópicos relacionados)", re.I)
-
-# Site-specific rules for related content
-SITE_SPECIFIC_RELATED_SELECTORS = {
-    "infomoney.com.br": [
-        ".single__related", ".article__related", ".post-related", ".related-posts",
-        ".rm-related", ".block-related", ".single__sidebar", ".article__sidebar",
-        "section.single__see-also", ".wp-block-infomoney-blocks-infomoney-read-more",
-    ],
-    "estadao.com.br": [
-        ".links-relacionados", ".mat-relacionadas", ".es-relacionadas",
-        ".stories-related", ".see-also", ".link-relacionado", ".box-relacionadas",
-    ],
+# Lista de nomes em vez de regex: o bs4 só aceita re.Pattern puro, não o ProfiledPattern
+_HEADING_TAGS = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+
+# Seletores removidos pelo _pre_clean_html (avaliados juntos por clean_engine.SelectorUnion)
+# Merged list from original and user suggestions for more robust cleaning
+PRE_CLEAN_SELECTORS = (
+    # User-suggested selectors for CTAs, ads, and social sharing
+    ".cta-middle", ".infomoney-read-more", ".read-more", ".post__related",
+    ".sharing", ".share", ".social", ".banner", ".ads", ".advertisement",
+    "[data-ad]", "[data-ad-slot]",
+    ".sponsored", ".paid-content", ".partner", ".outbrain", ".taboola",
+    
+    # Original selectors
+    '[class*="srdb"]', '[class*="rating"]', '.review', '.score', '.meter',
+    'header', 'footer', 'nav', 'aside',
+    '[class*="related"]', '[id*="related"]',
+    # From user's patch (GENERIC_REL_SELECTORS)
+    "[class*='relacionad']", "[class*='relaciona']", "[class*='recommend']",
+    "[class*='veja-tambem']", "[class*='leia-tambem']", "[id*='relacionad']",
+    "[id*='leia']", "section[aria-label*='Leia']", "section[aria-label*='Relacionad']",
+    '[class*="trending"]', '[id*="trending"]', 'div.widget',
+    '[class*="sidebar"]',  '[id*="sidebar"]',
+    '[class*="recommend"]','[class*="recommended"]',
+    '[class*="screen-hub"]','[class*="screenhub"]',
+    '[class*="most-popular"]','[id*="most-popular"]',
+    '[class*="popular"]','[id*="popular"]',
+    '[class*="newsletter"]','[id*="newsletter"]',
+    '[class*="ad-"]','[id*="ad-"]','[class*="advert"]','[id*="advert"]',
+    '.comments', '#comments',
+    '.author', '.author-box', '.post-author', '.byline', '.entry-author',
+    '.avatar', '.author__image', '.author-profile',
+    '.subscribe',
+)
+
+YOUTUBE_DIV_SELECTORS = ('.w-youtube[id]', '.youtube[id]', '[data-youtube-id]')
+
+# Limpadores em código referenciados por `handler` em extraction_rules.json
+SITE_HANDLERS = {
+    'lance': '_clean_html_for_lance_definitivo',
+}
+
+# Limpadores BeautifulSoup originais, usados com COMPILED_CLEANERS=false
+LEGACY_CLEANERS = {
+    'screenrant.com': '_clean_html_for_screenrant',
+    'gamerant.com': '_clean_html_for_gamerant',
+    'collider.com': '_clean_html_for_collider',
+    'comicbook.com': '_clean_html_for_comicbook',
+    'ge.globo.com': '_clean_html_for_ge',
 }
 
 # English common words for simple caption language detection
@@ -607,18 +520,67 @@ def _clean_english_captions(soup: BeautifulSoup, domain: str) -> None:
 
 class ContentExtractor:
     """Extrai e limpa conteúdo para o pipeline."""
-    def __init__(self):
+    def __init__(
+        self,
+        compiled_cleaners: bool = COMPILED_CLEANERS,
+        page_cache: Optional[PageCache] = None,
+        streaming: bool = FETCH_STREAMING,
+        trafilatura_subtree: bool = TRAFILATURA_SUBTREE,
+    ):
         self.session = requests.Session()
         self.session.headers.update({'User-Agent': USER_AGENT})
-
-    def _fetch_html(self, url: str) -> Optional[str]:
+        # False = limpadores BeautifulSoup originais (vários passes por artigo)
+        self.compiled_cleaners = compiled_cleaners
+        self.page_cache = page_cache if page_cache is not None else get_page_cache()
+        # False = baixa a página inteira com resp.text (sem parada antecipada)
+        self.streaming = streaming
+        # False = trafilatura recebe a página inteira serializada
+        self.trafilatura_subtree = trafilatura_subtree
+
+    @traced('fetch')
+    def _fetch_html(self, url: str, use_cache: bool = True) -> Optional[str]:
+        """Baixa a página de origem, consultando antes o cache local (page_cache)."""
+        if use_cache and self.page_cache is not None:
+            # Sem streaming o chamador espera a página inteira, não um prefixo cortado
+            cached = self.page_cache.get(url, complete_only=not self.streaming)
+            if cached is not None:
+                logger.info(f"PAGE CACHE: usando HTML em cache para {url}")
+                return cached
+        stopped = None
         try:
-            resp = self.session.get(url, timeout=20.0, allow_redirects=True)
-            resp.raise_for_status()
-            return resp.text
+            if self.streaming:
+                html_text, stopped = self._fetch_streaming(url)
+            else:
+                resp = self.session.get(url, timeout=20.0, allow_redirects=True)
+                resp.raise_for_status()
+                html_text = resp.text
         except requests.RequestException as e:
             logger.error(f"Failed to fetch HTML from {url}: {e}")
             return None
+        if self.page_cache is not None and html_text:
+            try:
+                self.page_cache.put(url, html_text, stopped=stopped)
+            except Exception as e:
+                logger.warning(f"PAGE CACHE: falha ao gravar {url}: {e}")
+        return html_text
+
+    def _fetch_streaming(self, url: str) -> Tuple[str, Optional[str]]:
+        """
+        Download em pedaços que para no fim do corpo do artigo (regra `stream_until`).
+        Retorna (html, stopped) — stopped como em `fetch_streaming` (None = página inteira).
+        """
+        rule = get_site_rules().for_host(urlparse(url).hostname or "")
+        stop = rule.stream_stop if rule else None
+        html_text, stats = fetch_streaming(self.session, url, stop=stop, max_bytes=FETCH_MAX_BYTES)
+        if stats['stopped']:
+            total = stats['content_length']
+            total_info = f" de {total / 1024:.0f} KB" if total else ""
+            reason = "fim do corpo" if stats['stopped'] == 'body' else "limite de bytes"
+            logger.info(
+                f"FETCH: {url} — {stats['bytes'] / 1024:.0f} KB lidos{total_info}, "
+                f"parou em {reason} ({stats['elapsed_s']:.2f}s)"
+            )
+        return html_text, stats['stopped']
 
     def _pre_clean_html(self, soup: BeautifulSoup, url: str):
         """Remove widgets/ads/blocos óbvios ANTES da extração."""
@@ -626,11 +588,11 @@ class ContentExtractor:
         try:
             # 1. Remove sections by heading text (e.g., "Leia também")
             # Iterate backwards to avoid issues with modifying the list while iterating
-            for h in reversed(soup.find_all(re.compile("^h[1-6]$"))):
+            for h in reversed(soup.find_all(_HEADING_TAGS)):
                 heading_text = h.get_text(" ", strip=True)
-                if heading_text and LEIA_HEADING_RE.search(heading_text):
+                if heading_text and rx.RELATED_HEADING.search(heading_text):
                     parent_container = h.find_parent(('section', 'aside', 'div'))
-                    if parent_container and len(parent_container.find_all(re.compile("^h[1-6]$"))) <= 2:
+                    if parent_container and len(parent_container.find_all(_HEADING_TAGS)) <= 2:
                         logger.debug(f"Decomposing parent container '{parent_container.name}' of related heading: {heading_text}")
                         parent_container.decompose()
                     else:
@@ -640,12 +602,15 @@ class ContentExtractor:
                             next_sibling.decompose()
                         h.decompose()
             
-            # 2. Remove by site-specific selectors
-            source_host = (urlparse(url).hostname or "").replace("www.", "")
-            if source_host in SITE_SPECIFIC_RELATED_SELECTORS:
-                for sel in SITE_SPECIFIC_RELATED_SELECTORS[source_host]:
-                    for el in soup.select(sel):
-                        el.decompose()
+            # 2. Remove by site-specific selectors (related_selectors em extraction_rules.json)
+            rule = get_site_rules().for_host(urlparse(url).hostname or "")
+            if rule and rule.related:
+                if self.compiled_cleaners:
+                    rule.related.remove_from(soup)
+                else:
+                    for sel in rule.related.selectors:
+                        for el in soup.select(sel):
+                            el.decompose()
             
             # 3. Remove links that are likely related content wrappers
             for a in soup.select("a"):
@@ -657,41 +622,15 @@ class ContentExtractor:
             logger.warning(f"Error during advanced related content removal for {url}: {e}", exc_info=False)
         # --- End of new logic ---
 
-        # Merged list from original and user suggestions for more robust cleaning
-        selectors_to_remove = {
-            # User-suggested selectors for CTAs, ads, and social sharing
-            ".cta-middle", ".infomoney-read-more", ".read-more", ".post__related",
-            ".sharing", ".share", ".social", ".banner", ".ads", ".advertisement",
-            "[data-ad]", "[data-ad-slot]",
-            ".sponsored", ".paid-content", ".partner", ".outbrain", ".taboola",
-            
-            # Original selectors
-            '[class*="srdb"]', '[class*="rating"]', '.review', '.score', '.meter',
-            'header', 'footer', 'nav', 'aside',
-            '[class*="related"]', '[id*="related"]',
-            # From user's patch (GENERIC_REL_SELECTORS)
-            "[class*='relacionad']", "[class*='relaciona']", "[class*='recommend']",
-            "[class*='veja-tambem']", "[class*='leia-tambem']", "[id*='relacionad']",
-            "[id*='leia']", "section[aria-label*='Leia']", "section[aria-label*='Relacionad']",
-            '[class*="trending"]', '[id*="trending"]', 'div.widget',
-            '[class*="sidebar"]',  '[id*="sidebar"]',
-            '[class*="recommend"]','[class*="recommended"]',
-            '[class*="screen-hub"]','[class*="screenhub"]',
-            '[class*="most-popular"]','[id*="most-popular"]',
-            '[class*="popular"]','[id*="popular"]',
-            '[class*="newsletter"]','[id*="newsletter"]',
-            '[class*="ad-"]','[id*="ad-"]','[class*="advert"]','[id*="advert"]',
-            '.comments', '#comments',
-            '.author', '.author-box', '.post-author', '.byline', '.entry-author',
-            '.avatar', '.author__image', '.author-profile',
-            '.subscribe',
-        }
-        for sel in selectors_to_remove:
-            for el in soup.select(sel):
-                try:
-                    el.decompose()
-                except Exception:
-                    pass
+        if self.compiled_cleaners:
+            compile_selectors(PRE_CLEAN_SELECTORS).remove_from(soup)
+        else:
+            for sel in PRE_CLEAN_SELECTORS:
+                for el in soup.select(sel):
+                    try:
+                        el.decompose()
+                    except Exception:
+                        pass
 
         # remover texto "powered by srdb"
         for text_node in soup.find_all(string=lambda t: isinstance(t, str) and "powered by srdb" in t.lower()):
@@ -883,7 +822,11 @@ class ContentExtractor:
             vid = self._extract_youtube_id(iframe.get("src", ""), soup=soup)
             if vid:
                 ids.append(vid)
-        for div in soup.select('.w-youtube[id], .youtube[id], [data-youtube-id]') :
+        if self.compiled_cleaners:
+            youtube_divs = compile_selectors(YOUTUBE_DIV_SELECTORS).select(soup)
+        else:
+            youtube_divs = soup.select(', '.join(YOUTUBE_DIV_SELECTORS))
+        for div in youtube_divs:
             vid = div.get("id") or div.get("data-youtube-id")
             if vid:
                 ids.append(vid)
@@ -897,134 +840,57 @@ class ContentExtractor:
         return [{"id": v, "embed_url": f"https://www.youtube.com/embed/{v}",
                  "watch_url": f"https://www.youtube.com/watch?v={v}"} for v in ordered]
 
-    def _extract_with_trafilatura(self, html: str, url: str) -> Optional[Dict[str, Any]]:
+    def _extract_with_trafilatura(self, soup: BeautifulSoup, url: str) -> Optional[BeautifulSoup]:
         """
-        Generic extraction method using Trafilatura as the core engine.
-        This was the original `extract` method.
+        Corpo do artigo via trafilatura, devolvido como árvore (BeautifulSoup).
+
+        Em vez de serializar a página inteira para o trafilatura parsear de novo,
+        entrega a ele uma árvore lxml só do candidato de `_find_article_body`:
+        menu, comentários, barra lateral e rodapé nem chegam à extração. Se o
+        candidato for pequeno demais ou a extração vier vazia, usa a página
+        inteira, como antes.
         """
-        logger.debug(f"Using generic (trafilatura) extractor for {url}")
+        if self.trafilatura_subtree:
+            root = _find_article_body(soup)
+            if root is not soup and root.name not in ('html', 'body') \
+                    and len(root.get_text(strip=True)) >= TRAFILATURA_SUBTREE_MIN_CHARS:
+                article_soup = self._run_trafilatura(f'<html><body>{root}</body></html>', url)
+                if article_soup is not None:
+                    return article_soup
+                logger.info(f"Trafilatura vazio no candidato <{root.name}> de {url}; usando a página inteira.")
+        return self._run_trafilatura(str(soup), url)
+
+    def _run_trafilatura(self, markup: str, url: str) -> Optional[BeautifulSoup]:
         try:
-            soup = BeautifulSoup(html, 'lxml')
-
-            # Preserve twitter embeds
-            twitter_embeds = soup.find_all('blockquote', class_='twitter-tweet')
-
-            # 1) Tenta extrair metadados de JSON-LD primeiro, pois é a fonte mais confiável
-            all_json_ld = _extract_json_ld(soup)
-            news_article_schema = _find_news_article_in_json_ld(all_json_ld)
-
-            # 2) limpeza prévia pesada
-            self._pre_clean_html(soup, url)
-
-            # 5) Extrai imagens do corpo do artigo
-            body_images = collect_images_from_article(soup, base_url=url)
-
-            # 6) vídeos
-            videos = self._extract_youtube_videos(soup)
-
-            # 7) metadados: Prioriza JSON-LD, com fallback para tags meta
-            title = 'No Title Found'
-            excerpt = ''
-            if news_article_schema:
-                logger.info(f"Usando metadados do JSON-LD para {url}")
-                title = news_article_schema.get('headline') or news_article_schema.get('name') or title
-                excerpt = news_article_schema.get('description') or excerpt
-                if not featured_image_url:
-                    featured_image_url = _coerce_url(news_article_schema.get('image'))
-            else: # Fallback
-                title = (og_title.get('content') if (og_title := soup.find('meta', property='og:title')) else None) or (soup.title.string if soup.title else title)
-                excerpt = (meta_desc.get('content') if (meta_desc := soup.find('meta', attrs={'name': 'description'})) else None) or \
-                          (og_desc.get('content') if (og_desc := soup.find('meta', property='og:description')) else '')
-
-            # 8) extrair corpo com trafilatura
-            cleaned_html_str = str(soup)
-            content_html = trafilatura.extract(
-                cleaned_html_str,
-                include_images=False, # Images are handled separately
-                include_links=True,
-                include_comments=False,
-                include_tables=False,
-                output_format='html'
-            )
-            if not content_html:
-                logger.warning(f"Trafilatura returned empty content for {url}")
-                return None
-
-            # Append twitter embeds back
-            if twitter_embeds:
-                for embed in twitter_embeds:
-                    content_html += str(embed)
-
-            # 9) pós-processar corpo
-            article_soup = BeautifulSoup(content_html, 'lxml')
-            self._remove_forbidden_blocks(article_soup)
-            
-            # 9.5) REMOVER CTAs AGRESSIVAMENTE (NOVO)
-            # Remove qualquer parágrafo/div que contenha frases de CTA
-            cta_phrases = [
-                'thank you for reading',
-                "don't forget to subscribe",
-                'subscribe now',
-                'click here',
-                'read more',
-                'sign up',
-                'thanks for reading',
-                'thanks for visiting',
-                'please subscribe',
-                'subscribe to our',
-                'stay tuned',
-                'keep up to date',
-                'follow us',
-                'obrigado por ler',
-                'obrigada por ler',
-                'não esqueça de se inscrever',
-                'se inscreva',
-                'clique aqui',
-                'leia mais',
-                'cadastre-se',
-            ]
-            
-            for elem in list(article_soup.find_all(['p', 'div', 'span', 'article', 'blockquote', 'section'])):
-                if not elem.parent:
-                    continue
-                text = (elem.get_text(strip=True) or "").lower()
-                if any(cta in text for cta in cta_phrases):
-                    logger.warning(f"CTA REMOVIDO: {text[:60]}")
-                    elem.decompose()
-
-            # 10) Seleciona imagens do corpo (excluindo a destacada)
-            # A `collect_images_from_article` já aplica `is_valid_article_image`
-            other_valid_images = [
-                u for u in body_images if u != featured_image_url
-            ]
-
-            # Create figure tags for body images
-            body_images_html_list = [f'<figure><img src="{url}" alt=""><figcaption></figcaption></figure>' for url in other_valid_images]
-
-
-            logger.info(f"Selected featured image: {featured_image_url}. Found {len(other_valid_images)} other valid images.")
+            tree = lxml.html.document_fromstring(markup)
+        except ParserError:
+            return None
+        document = trafilatura.bare_extraction(tree, url=url, output_format='python', **_TRAFILATURA_OPTIONS)
+        if document is None or document.body is None or not len(document.body):
+            return None
+        # Mesma conversão XML -> HTML do output_format='html', sem serializar com pretty_print
+        html_tree = trafilatura_convert_to_html(document.body)
+        return BeautifulSoup(unicodedata.normalize('NFC', lxml.html.tostring(html_tree, encoding='unicode')), 'lxml')
 
-            # Conteúdo final: só o conteúdo interno do <body>, se existir
-            if article_soup.body:
-                final_content_html = article_soup.body.decode_contents()
-            else:
-                final_content_html = str(article_soup)
-            result = {
-                "title": title.strip(),
-                "content": final_content_html,
-                "excerpt": (excerpt or "").strip(),
-                "featured_image_url": featured_image_url,
-                "images": body_images_html_list,
-                "videos": videos,
-                "source_url": url,
-                "schema_original": news_article_schema # Passa o schema extraído adiante
-            }
-            logger.info(f"Successfully extracted and cleaned content from {url}. Title: {result['title'][:50]}...")
-            return result
+    def _clean_with_rule(self, soup: BeautifulSoup, rule: SiteRule) -> Optional[BeautifulSoup]:
+        """
+        Limpa o artigo com as regras declarativas do domínio (extraction_rules.json).
+        Com `compiled_cleaners=False` usa os limpadores BeautifulSoup originais.
+        """
+        if rule.handler:
+            return getattr(self, SITE_HANDLERS[rule.handler])(soup)
+        if not self.compiled_cleaners and rule.host in LEGACY_CLEANERS:
+            return getattr(self, LEGACY_CLEANERS[rule.host])(soup)
 
-        except Exception as e:
-            logger.error(f"An unexpected error occurred during extraction for {url}: {e}", exc_info=True)
+        article_body = rule.find_body(soup)
+        if not article_body:
             return None
+        logger.info(f"INFO ({rule.label}): Iniciando limpeza de widgets e blocos indesejados...")
+        clean_article_body(article_body, rule.clean)
+        if rule.english_captions:
+            _clean_english_captions(article_body, rule.label)
+        logger.info(f"INFO ({rule.label}): Limpeza concluída. Retornando HTML final.")
+        return article_body
 
     def _clean_html_for_collider(self, soup: BeautifulSoup) -> Optional[BeautifulSoup]:
         """
@@ -1032,6 +898,9 @@ class ContentExtractor:
         Remove widgets, CTAs, figuras indesejadas, SVGs decorativos, e outros blocos.
         Mantém APENAS paragrafos, headings, blockquotes e figuras legítimas com contexto.
         """
+        if self.compiled_cleaners:
+            return self._clean_with_rule(soup, get_site_rules().for_host('collider.com'))
+
         # 1. Isolar o article-body específico do Collider
         article_body = soup.select_one('#article-body, .article-body, [itemprop="articleBody"]')
         if not article_body:
@@ -1168,6 +1037,9 @@ class ContentExtractor:
         Remove tag-interaction widgets, display-card widgets, e outros blocos indesejados.
         Mantém APENAS o conteúdo textual do artigo.
         """
+        if self.compiled_cleaners:
+            return self._clean_with_rule(soup, get_site_rules().for_host('gamerant.com'))
+
         # 1. Isolar o <article> ou article-body
         article_container = soup.find('article')
         if not article_container:
@@ -1308,6 +1180,9 @@ class ContentExtractor:
         Remove display-card widgets, tag-interaction widgets, CTAs, sidebars, e blocos de relacionados.
         Muito mais agressivo que ScreenRant por ter mais poluição de imagens.
         """
+        if self.compiled_cleaners:
+            return self._clean_with_rule(soup, get_site_rules().for_host('comicbook.com'))
+
         # 1. Isolar o <article>
         article_container = soup.find('article')
         if not article_container:
@@ -1456,6 +1331,9 @@ class ContentExtractor:
         Remove display-card widgets, tag-interaction widgets, CTAs, e outros blocos indesejados.
         Mantém APENAS o conteúdo textual do artigo.
         """
+        if self.compiled_cleaners:
+            return self._clean_with_rule(soup, get_site_rules().for_host('screenrant.com'))
+
         # 1. Isolar o <article>
         article_container = soup.find('article')
         if not article_container:
@@ -1658,6 +1536,9 @@ class ContentExtractor:
         VERSÃO RESILIENTE E FINALÍSSIMA v2 para o GE.
         Tenta múltiplos seletores e remove blocos indesejados, incluindo o do Cartola FC.
         """
+        if self.compiled_cleaners:
+            return self._clean_with_rule(soup, get_site_rules().for_host('ge.globo.com'))
+
         # 1. Encontrar o contêiner principal do artigo (lógica resiliente).
         possible_selectors = [
             {'tag': 'div', 'class_': 'materia-conteudo'},
@@ -1710,12 +1591,16 @@ class ContentExtractor:
         logger.info("INFO (GE): Limpeza concluída. Retornando HTML final.")
         return main_container
 
-    def extract(self, html: str, url: str) -> Optional[Dict[str, Any]]:
+    def extract(self, html: str, url: str, soup: Optional[BeautifulSoup] = None) -> Optional[Dict[str, Any]]:
         """
         Main extraction flow. Uses a modular, site-specific cleaning method.
         If no specific rule is found, it falls back to a generic extractor.
+
+        `soup` lets the caller hand over a tree it already parsed (and cleaned),
+        avoiding a str(soup) + re-parse round trip. It is modified in place.
         """
-        soup = BeautifulSoup(html, 'lxml')
+        if soup is None:
+            soup = BeautifulSoup(html, 'lxml')
         domain = urlparse(url).netloc.lower().replace('www.', '')
 
         # --- Step 1: Get metadata from the full page ---
@@ -1725,35 +1610,19 @@ class ContentExtractor:
                   (og_desc.get('content') if (og_desc := soup.find('meta', property='og:description')) else '')
         videos_full_page = self._extract_youtube_videos(soup)
 
-        # --- Step 2: Route to the correct site-specific cleaner ---
+        # --- Step 2: Route to the site rules (extraction_rules.json) ---
         cleaned_container = None
-        if 'lance.com.br' in domain:
-            cleaned_container = self._clean_html_for_lance_definitivo(soup)
-        elif 'ge.globo.com' in domain:
-            cleaned_container = self._clean_html_for_ge(soup)
-        elif 'comicbook.com' in domain:
-            # Usa o limpador específico para ComicBook (mais agressivo)
-            cleaned_container = self._clean_html_for_comicbook(soup)
-            logger.info(f"INFO ({domain}): Usando limpador específico para ComicBook")
-        elif 'screenrant.com' in domain:
-            # Usa o limpador específico para ScreenRant
-            cleaned_container = self._clean_html_for_screenrant(soup)
-            logger.info(f"INFO ({domain}): Usando limpador específico para ScreenRant")
-        elif 'gamerant.com' in domain:
-            # Usa o limpador específico para GameRant
-            cleaned_container = self._clean_html_for_gamerant(soup)
-            logger.info(f"INFO ({domain}): Usando limpador específico para GameRant")
-        elif 'collider.com' in domain:
-            # Usa o limpador específico para Collider
-            cleaned_container = self._clean_html_for_collider(soup)
-            logger.info(f"INFO ({domain}): Usando limpador específico para Collider")
-        
+        rule = get_site_rules().for_host(domain)
+        if rule and rule.cleans_body:
+            logger.info(f"INFO ({domain}): Usando regras de extração de {rule.label}")
+            cleaned_container = self._clean_with_rule(soup, rule)
+
         # --- Step 3: Process content if a cleaned container was returned ---
         if cleaned_container:
             logger.info(f"Successfully cleaned content for {domain} using specific extractor.")
             
             # Extract images and videos from WITHIN the cleaned container
-            body_images = [urljoin(url, img.get('src') or img.get('data-src')) for img in cleaned_container.find_all('img') if img.get('src') or img.get('data-src')]
+            body_images = [urljoin(url, src) for src in rule.image_urls(cleaned_container)]
             videos_in_container = self._extract_youtube_videos(cleaned_container)
             
             final_content_html = str(cleaned_container)
@@ -1779,27 +1648,18 @@ class ContentExtractor:
             # --- Step 4: Fallback for unhandled sites ---
             logger.warning(f"No specific extractor rule found for {domain}. Falling back to generic (trafilatura) extractor.")
             # A lógica de extração genérica foi movida para cá para evitar chamadas duplicadas.
-            # A função _extract_with_trafilatura agora só lida com o corpo do texto.
+            # _extract_with_trafilatura só lida com o corpo do texto.
             self._pre_clean_html(soup, url)
             self._convert_data_img_to_figure(soup)
             body_images = collect_images_from_article(soup, base_url=url)
             
             # Extrai o corpo com trafilatura
-            cleaned_html_str = str(soup)
-            content_html = trafilatura.extract(
-                cleaned_html_str,
-                include_images=False,
-                include_links=True,
-                include_comments=False,
-                include_tables=False,
-                output_format='html'
-            )
-            if not content_html:
+            article_soup = self._extract_with_trafilatura(soup, url)
+            if article_soup is None:
                 logger.warning(f"Trafilatura returned empty content for {url}")
                 return None
 
             # Pós-processamento e montagem do resultado
-            article_soup = BeautifulSoup(content_html, 'lxml')
             self._remove_forbidden_blocks(article_soup)
             final_content_html = article_soup.body.decode_contents() if article_soup.body else str(article_soup)
             
@@ -0,0 +1,316 @@
+"""
+Serialização de conteúdo HTML em blocos Gutenberg, numa passada.
+
+O `html_to_gutenberg_blocks` antigo reparseava a string com `html.parser`,
+montava cada bloco com f-strings e achatava listas e citações com
+`get_text` — links, negrito e sublistas sumiam (justamente nas listas do
+ScreenRant/Collider), `div`/`section` só preservavam o texto solto do topo e
+tabelas, figuras sem imagem e texto inline fora de <p> eram descartados.
+
+Aqui um percorredor em ordem de documento (estilo SAX: cada nó visto uma
+vez, sem reparse) escreve os blocos direto num `write` — uma lista, um
+`io.StringIO` ou o buffer do payload que vai para a API:
+
+- `p`, títulos, citações e itens de lista preservam a marcação inline;
+- listas viram `core/list` com `core/list-item` aninhados (sublistas
+  inclusive); citações têm os parágrafos como blocos internos;
+- contêineres (`div`, `section`, `article`...) são percorridos, e texto ou
+  tags inline soltos são agrupados num parágrafo;
+- parágrafos que são só a URL de um vídeo do YouTube (saída de
+  `strip_credits_and_normalize_youtube`) viram `core/embed`;
+- tabelas viram `core/table`, `hr` vira `core/separator`, o resto com texto
+  vai num `core/html`;
+- atributos dos comentários são JSON com o mesmo escape do
+  `serializeAttributes` do editor (`--`, `<`, `>`, `&` e `\\"` viram `\\uXXXX`).
+"""
+
+import html
+import json
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from bs4 import Comment, NavigableString, Tag
+from bs4.element import CData
+
+from . import regexes as rx
+
+_TEXT_TYPES = (NavigableString, CData)
+
+CONTAINER_TAGS = frozenset(('div', 'section', 'article', 'main', 'header', 'footer', 'aside', 'body', 'html', 'center'))
+HEADING_TAGS = frozenset(('h1', 'h2', 'h3', 'h4', 'h5', 'h6'))
+# Tags que podem ficar dentro de um parágrafo
+INLINE_TAGS = frozenset((
+    'a', 'abbr', 'b', 'bdi', 'bdo', 'br', 'cite', 'code', 'data', 'del', 'dfn', 'em', 'i', 'ins', 'kbd',
+    'mark', 'q', 's', 'samp', 'small', 'span', 'strong', 'sub', 'sup', 'time', 'u', 'var', 'wbr',
+))
+SKIP_TAGS = frozenset(('script', 'style', 'noscript', 'template', 'head', 'title', 'meta', 'link'))
+SOCIAL_EMBED_CLASSES = ('twitter-tweet', 'instagram-media', 'tiktok-embed')
+
+
+
+def block_attrs(attrs: Optional[Dict[str, Any]]) -> str:
+    """Atributos do comentário de bloco (com o espaço inicial), ou '' se não houver."""
+    if not attrs:
+        return ''
+    encoded = json.dumps(attrs, ensure_ascii=False, separators=(',', ':'))
+    encoded = (
+        encoded.replace('--', '\\u002d\\u002d')
+        .replace('<', '\\u003c')
+        .replace('>', '\\u003e')
+        .replace('&', '\\u0026')
+        .replace('\\"', '\\u0022')
+    )
+    return ' ' + encoded
+
+
+def block(name: str, inner: str, attrs: Optional[Dict[str, Any]] = None) -> str:
+    return f"<!-- wp:{name}{block_attrs(attrs)} -->\n{inner}\n<!-- /wp:{name} -->"
+
+
+def _attr(value: Any) -> str:
+    if isinstance(value, list):
+        value = ' '.join(value)
+    return html.escape(str(value or ''), quote=True)
+
+
+def _node_html(node) -> str:
+    if isinstance(node, Tag):
+        return node.decode()
+    return node.output_ready(formatter='minimal')
+
+
+def _is_text(node) -> bool:
+    return type(node) in _TEXT_TYPES
+
+
+def _is_inline(node) -> bool:
+    return _is_text(node) or (isinstance(node, Tag) and node.name in INLINE_TAGS)
+
+
+class GutenbergSerializer:
+    """Percorre a árvore (BeautifulSoup/lxml) uma vez e escreve os blocos em `write`."""
+
+    def __init__(self, write: Callable[[str], Any], separator: str = '\n\n'):
+        self._write = write
+        self._separator = separator
+        self._first = True
+        self.blocks = 0
+
+    def _emit(self, markup: str):
+        if not self._first:
+            self._write(self._separator)
+        self._write(markup)
+        self._first = False
+        self.blocks += 1
+
+    def serialize(self, root: Tag):
+        for markup in self.iter_blocks(root.children):
+            self._emit(markup)
+
+    # --- blocos ---------------------------------------------------------
+
+    def iter_blocks(self, nodes) -> Iterator[str]:
+        """Blocos de uma sequência de nós irmãos (texto/inline consecutivo vira um parágrafo)."""
+        run: List[Any] = []
+        for node in nodes:
+            if _is_inline(node):
+                run.append(node)
+                continue
+            if run:
+                yield from self._inline_run(run)
+                run = []
+            if isinstance(node, Tag):
+                yield from self._element(node)
+        if run:
+            yield from self._inline_run(run)
+
+    def _inline_run(self, nodes: List[Any]) -> Iterator[str]:
+        inner = ''.join(_node_html(n) for n in nodes).strip()
+        if not inner:
+            return
+        if not any(n.get_text().strip() if isinstance(n, Tag) else n.strip() for n in nodes):
+            return
+        yield self._paragraph(f"<p>{inner}</p>", inner)
+
+    def _paragraph(self, markup: str, inner_text: str) -> str:
+        url = inner_text.strip()
+        if rx.YOUTUBE_URL.match(url):
+            return self._youtube_embed(html.unescape(url))
+        return block('paragraph', markup)
+
+    def _youtube_embed(self, url: str) -> str:
+        figure = (
+            '<figure class="wp-block-embed is-type-video is-provider-youtube wp-block-embed-youtube">'
+            f'<div class="wp-block-embed__wrapper">\n{html.escape(url, quote=False)}\n</div></figure>'
+        )
+        return block('embed', figure, {'url': url, 'type': 'video', 'providerNameSlug': 'youtube', 'responsive': True})
+
+    def _element(self, el: Tag) -> Iterator[str]:
+        name = el.name
+        if name in SKIP_TAGS:
+            return
+        if name == 'p':
+            if el.get_text().strip():
+                yield self._paragraph(el.decode(), el.decode_contents())
+            else:
+                # <p> só com imagem: a imagem vira bloco próprio
+                for img in el.find_all('img'):
+                    image = self._image(img)
+                    if image:
+                        yield image
+        elif name in HEADING_TAGS:
+            inner = el.decode_contents().strip()
+            if el.get_text(strip=True):
+                yield block('heading', f"<{name}>{inner}</{name}>", {'level': int(name[1])})
+        elif name == 'img':
+            image = self._image(el)
+            if image:
+                yield image
+        elif name == 'figure':
+            yield from self._figure(el)
+        elif name in ('ul', 'ol'):
+            markup = self._list(el)
+            if markup:
+                yield markup
+        elif name == 'blockquote':
+            yield from self._quote(el)
+        elif name == 'iframe':
+            src = el.get('src', '')
+            if 'youtube' in src or 'vimeo' in src:
+                yield block('embed', f'<figure class="wp-block-embed">{el.decode()}</figure>')
+        elif name == 'table':
+            markup = self._table(el)
+            if markup:
+                yield markup
+        elif name == 'hr':
+            yield block('separator', '<hr class="wp-block-separator has-alpha-channel-opacity"/>')
+        elif name in CONTAINER_TAGS:
+            yield from self.iter_blocks(el.children)
+        elif el.get_text(strip=True):
+            yield block('html', el.decode())
+
+    def _image(self, img: Tag, caption: str = '', caption_text: str = '') -> Optional[str]:
+        src = img.get('src', '')
+        if not src:
+            return None
+        attrs: Dict[str, Any] = {}
+        img_class = ''
+        match = rx.WP_IMAGE_ID_CLASS.search(_attr(img.get('class')))
+        if match:
+            attrs['id'] = int(match.group(1))
+            img_class = f' class="wp-image-{match.group(1)}"'
+        if caption_text:
+            attrs['caption'] = caption_text
+        markup = f'<img src="{_attr(src)}" alt="{_attr(img.get("alt"))}"{img_class}/>'
+        link = img.parent if isinstance(img.parent, Tag) and img.parent.name == 'a' else None
+        if link is not None and link.get('href'):
+            markup = f'<a href="{_attr(link["href"])}">{markup}</a>'
+        if caption:
+            markup += f'<figcaption class="wp-element-caption">{caption}</figcaption>'
+        return block('image', f'<figure class="wp-block-image">{markup}</figure>', attrs)
+
+    def _figure(self, fig: Tag) -> Iterator[str]:
+        img = fig.find('img')
+        if img is not None:
+            figcaption = fig.find('figcaption')
+            caption = figcaption.decode_contents().strip() if figcaption else ''
+            caption_text = ' '.join(figcaption.get_text().split()) if figcaption else ''
+            image = self._image(img, caption, caption_text)
+            if image:
+                yield image
+            return
+        if fig.find('iframe') is not None or fig.find('p') is not None:
+            # Embed/vídeo normalizado ou figura "de texto": os filhos viram blocos
+            yield from self.iter_blocks(fig.children)
+        elif fig.get_text(strip=True):
+            yield block('html', fig.decode())
+
+    def _list(self, el: Tag) -> Optional[str]:
+        items = []
+        for li in el.find_all('li', recursive=False):
+            parts = []
+            for child in li.children:
+                if isinstance(child, Tag) and child.name in ('ul', 'ol'):
+                    nested = self._list(child)
+                    if nested:
+                        parts.append(nested)
+                elif not isinstance(child, Comment):
+                    parts.append(_node_html(child))
+            inner = ''.join(parts).strip()
+            if inner:
+                items.append(block('list-item', f'<li>{inner}</li>'))
+        if not items:
+            return None
+        attrs: Dict[str, Any] = {}
+        tag = open_tag = el.name
+        if tag == 'ol':
+            attrs['ordered'] = True
+            start = el.get('start')
+            if start and str(start).lstrip('-').isdigit():
+                attrs['start'] = int(start)
+                # O save() do core/list repete o start no markup; sem ele o bloco fica inválido
+                open_tag = f'ol start="{attrs["start"]}"'
+        return block('list', f"<{open_tag}>{self._separator.join(items)}</{tag}>", attrs)
+
+    def _table(self, el: Tag) -> Optional[str]:
+        # O save() do core/table sempre separa as linhas em <thead>/<tbody>/<tfoot>;
+        # <tr> soltos direto no <table> deixam o bloco inválido no editor
+        head: List[Tag] = []
+        body: List[Tag] = []
+        foot: List[Tag] = []
+        for child in el.children:
+            if not isinstance(child, Tag):
+                continue
+            if child.name == 'tr':
+                body.append(child)
+            elif child.name in ('thead', 'tbody', 'tfoot'):
+                rows = child.find_all('tr', recursive=False)
+                {'thead': head, 'tbody': body, 'tfoot': foot}[child.name].extend(rows)
+        if not head:
+            # Linhas iniciais só com <th> são o cabeçalho
+            while body and all(c.name == 'th' for c in body[0].find_all(['td', 'th'], recursive=False)):
+                head.append(body.pop(0))
+        if not (head or body or foot):
+            return None
+
+        def section(tag: str, rows: List[Tag]) -> str:
+            if not rows:
+                return ''
+            return f"<{tag}>{''.join(self._table_row(r) for r in rows)}</{tag}>"
+
+        markup = f"<table>{section('thead', head)}{section('tbody', body)}{section('tfoot', foot)}</table>"
+        caption = el.find('caption', recursive=False)
+        if caption is not None and caption.get_text(strip=True):
+            markup += f'<figcaption class="wp-element-caption">{caption.decode_contents().strip()}</figcaption>'
+        return block('table', f'<figure class="wp-block-table">{markup}</figure>')
+
+    @staticmethod
+    def _table_row(row: Tag) -> str:
+        cells = []
+        for cell in row.find_all(['td', 'th'], recursive=False):
+            # Só colspan/rowspan sobrevivem ao parse do core/table
+            spans = ''.join(
+                f' {attr}="{_attr(cell[attr])}"' for attr in ('colspan', 'rowspan') if cell.get(attr)
+            )
+            cells.append(f"<{cell.name}{spans}>{cell.decode_contents().strip()}</{cell.name}>")
+        return f"<tr>{''.join(cells)}</tr>"
+
+    def _quote(self, el: Tag) -> Iterator[str]:
+        classes = _attr(el.get('class'))
+        if any(c in classes for c in SOCIAL_EMBED_CLASSES):
+            yield block('html', el.decode())
+            return
+        cite = el.find('cite', recursive=False)
+        inner_blocks = list(self.iter_blocks(c for c in el.children if c is not cite))
+        if not inner_blocks:
+            return
+        inner = self._separator.join(inner_blocks)
+        if cite is not None:
+            inner += f"<cite>{cite.decode_contents().strip()}</cite>"
+        yield block('quote', f'<blockquote class="wp-block-quote">{inner}</blockquote>')
+
+
+def write_gutenberg_blocks(root: Tag, write: Callable[[str], Any]) -> int:
+    """Escreve os blocos de `root` em `write`; retorna quantos blocos foram escritos."""
+    serializer = GutenbergSerializer(write)
+    serializer.serialize(root)
+    return serializer.blocks
@@ -1,32 +1,23 @@
 # app/html_utils.py
-import re
 import logging
 import html
-import unicodedata
 from typing import List, Dict, Optional, Tuple
 from bs4 import BeautifulSoup
 from urllib.parse import urlparse, parse_qs
 
+from . import regexes as rx
+from .cta_engine import CTA_ENGINE_ENABLED, CtaEngine, CtaRule, CtaScan, normalize_cta_text
+from .document import Document, transform
+from .gutenberg import write_gutenberg_blocks
+
 logger = logging.getLogger(__name__)
 
 # =========================
 # CTA sanitization helpers
 # =========================
 
-def _normalize_text_for_cta(text: str) -> str:
-    """Normaliza texto para comparação de CTA (minúsculas, sem acentos/pontuação)."""
-    if not text:
-        return ""
-    # Desescapar entidades HTML e normalizar aspas/apóstrofos
-    text = html.unescape(text)
-    text = text.replace("’", "'").replace("`", "'")
-    # Normalizar para remover acentos mantendo caracteres base
-    text = unicodedata.normalize("NFKD", text)
-    text = "".join(ch for ch in text if not unicodedata.category(ch).startswith("M"))
-    text = text.lower()
-    # Remover qualquer caractere que não seja alfanumérico (substituir por espaço)
-    text = re.sub(r"[^a-z0-9]+", " ", text)
-    return re.sub(r"\s+", " ", text).strip()
+# Normalização compartilhada com o motor de CTAs (texto de nó e fragmentos das regras)
+_normalize_text_for_cta = normalize_cta_text
 
 
 def _normalize_fragment(fragment: str) -> str:
@@ -77,6 +68,17 @@ _CTA_PHRASE_RULES_NORMALIZED = [
     (label, _normalize_fragment(phrase)) for label, phrase in _CTA_PHRASE_RULES
 ]
 
+# Frases que derrubam o <p> inteiro (antiga camada 2 de regex do pipeline)
+_CTA_PARAGRAPH_PHRASES = [
+    "thank you for reading", "thanks for reading", "thanks for visiting",
+    "don't forget to subscribe", "subscribe now", "please subscribe", "subscribe to our",
+    "stay tuned", "follow us", "if you enjoyed", "found this helpful",
+    "click here", "read more", "sign up",
+    "obrigado por ler", "obrigada por ler", "não esqueça de se inscrever", "se inscreva",
+    "clique aqui", "leia mais", "cadastre-se", "fique atento", "nos siga",
+    "mantenha-se atualizado", "este artigo foi", "se você gostou",
+]
+
 _CTA_FALLBACK_REGEXES = [
     r"(?is)thank\s+you\s+for\s+reading[^<]{0,200}?subscribe[^<]{0,200}?",
     r"(?is)thanks\s+for\s+reading[^<]{0,200}?subscribe[^<]{0,200}?",
@@ -84,6 +86,11 @@ _CTA_FALLBACK_REGEXES = [
     r"(?is)obrigad[ao]\s+por\s+ler[^<]{0,200}?(?:inscreva|inscricao|inscreve)[^<]{0,200}?",
     r"(?is)nao\s+esquec[aã]\s+de\s+se\s+inscrever[^<]{0,200}?",
 ]
+_CTA_FALLBACK_COMPILED = [
+    rx.compile(f'html_utils.cta_fallback_{i}', pattern) for i, pattern in enumerate(_CTA_FALLBACK_REGEXES)
+]
+# Todas as regexes de fallback começam por uma destas palavras: sem elas, nada a fazer
+_CTA_FALLBACK_PREFILTER = rx.compile('html_utils.cta_fallback_prefilter', r"(?i)thank|obrigad|nao\s+esquec")
 
 
 def detect_forbidden_cta_from_text(text: str) -> Optional[str]:
@@ -100,42 +107,106 @@ def detect_forbidden_cta_from_text(text: str) -> Optional[str]:
     return None
 
 
-def strip_forbidden_cta_sentences(html_content: str) -> Tuple[str, bool]:
-    """Remove blocos que contenham CTAs proibidos. Retorna HTML limpo e flag se removeu algo."""
-    if not html_content:
-        return html_content, False
+_CTA_TARGET_TAGS = ("p", "div", "span", "section", "article", "blockquote", "li", "strong", "em", "footer")
+# Só candidatas fora de um bloco candidato: dentro de um <p>, remove-se o <p> inteiro
+_CTA_INLINE_TAGS = ("span", "strong", "em")
 
-    soup = BeautifulSoup(html_content, "lxml")
+_CTA_ENGINE = CtaEngine([
+    ("BLOCK", _CTA_TARGET_TAGS, [
+        *(CtaRule(label, parts) for label, parts in _CTA_SEQUENCE_RULES_NORMALIZED),
+        *(CtaRule(label, (phrase,)) for label, phrase in _CTA_PHRASE_RULES_NORMALIZED),
+    ]),
+    ("PARAGRAPH", ("p",), [
+        CtaRule(phrase, (_normalize_fragment(phrase),)) for phrase in _CTA_PARAGRAPH_PHRASES
+    ]),
+], inline_tags=_CTA_INLINE_TAGS)
+
+
+def _strip_forbidden_cta_soup_per_node(soup: BeautifulSoup) -> bool:
+    """
+    Caminho antigo: normaliza e verifica o `get_text` de cada nó alvo, de
+    baixo para cima (ordem de documento invertida), removendo a menor tag que
+    casa — a mesma decisão do motor, com custo quadrático na profundidade.
+    """
+    block_tags = set(_CTA_TARGET_TAGS) - set(_CTA_INLINE_TAGS)
     removed = False
-    target_tags = ("p", "div", "span", "section", "article", "blockquote", "li", "strong", "em", "footer")
-
-    for tag_name in target_tags:
-        for node in list(soup.find_all(tag_name)):
-            if not node.parent:
-                continue
-            text = node.get_text(" ", strip=True)
-            if not text:
-                continue
-            if detect_forbidden_cta_from_text(text):
-                logger.debug("Removendo nó com CTA proibido: %s", text[:100])
-                node.decompose()
-                removed = True
-
-    cleaned_html = soup.body.decode_contents() if soup.body else str(soup)
-
-    # Passo adicional: remover frases residuais diretamente no HTML bruto
-    for pattern in _CTA_FALLBACK_REGEXES:
-        cleaned_html, substitutions = re.subn(pattern, "", cleaned_html)
-        if substitutions:
+    for node in reversed(soup.find_all(_CTA_TARGET_TAGS)):
+        if not node.parent:
+            continue
+        if node.name in _CTA_INLINE_TAGS and node.find_parent(block_tags):
+            continue
+        text = node.get_text(" ", strip=True)
+        if not text:
+            continue
+        if detect_forbidden_cta_from_text(text):
+            logger.debug("Removendo nó com CTA proibido: %s", text[:100])
+            node.decompose()
             removed = True
+    return removed
+
+
+@transform(touches=_CTA_TARGET_TAGS)
+def strip_forbidden_cta_soup(soup: BeautifulSoup) -> bool:
+    """Remove da árvore os blocos que contenham CTAs proibidos. Retorna True se removeu algo."""
+    if not CTA_ENGINE_ENABLED:
+        return _strip_forbidden_cta_soup_per_node(soup)
+    _, removed = _CTA_ENGINE.strip_soup(soup, tiers=1)
+    for item in removed:
+        logger.debug("Removendo nó com CTA proibido: %s", item)
+    return bool(removed)
+
+
+def _strip_fallback_regexes(html_content: str) -> Tuple[str, List[str]]:
+    """Remove frases residuais diretamente no HTML serializado."""
+    removed = []
+    if not _CTA_FALLBACK_PREFILTER.search(html_content):
+        return html_content, removed
+    for pattern in _CTA_FALLBACK_COMPILED:
+        html_content, substitutions = pattern.subn("", html_content)
+        if substitutions:
+            removed.append(f"FALLBACK: {pattern.pattern[:40]}")
+    return html_content, removed
 
-    return cleaned_html, removed
 
+def strip_forbidden_cta_sentences(html_content) -> Tuple[str, bool]:
+    """
+    Remove blocos que contenham CTAs proibidos. Retorna HTML limpo e flag se removeu algo.
+    Aceita string ou um Document já parseado (que é alterado no lugar).
+    """
+    if not html_content:
+        return html_content, False
 
-def detect_forbidden_cta(html_content: str) -> Optional[str]:
-    """Detecta CTAs proibidos em HTML, retornando a descrição da regra se encontrada."""
+    doc = html_content if isinstance(html_content, Document) else Document(html_content)
+    removed = bool(doc.apply(strip_forbidden_cta_soup))
+    cleaned_html, fallback_removed = _strip_fallback_regexes(doc.html())
+    return cleaned_html, removed or bool(fallback_removed)
+
+
+def scan_forbidden_cta(html_content, paragraphs: bool = False) -> CtaScan:
+    """
+    Detecção e remoção juntas, numa passada do motor de CTAs: rótulo da regra
+    encontrada no documento (o mesmo de `detect_forbidden_cta`), HTML limpo e o
+    que foi removido. `paragraphs=True` aplica também as frases que derrubam
+    parágrafos inteiros. Aceita string ou Document (alterado no lugar).
+    """
+    if not html_content:
+        return CtaScan(html_content, None, [])
+    doc = html_content if isinstance(html_content, Document) else Document(html_content)
+    label, removed = _CTA_ENGINE.strip_soup(doc.soup, tiers=None if paragraphs else 1)
+    doc.changed()
+    cleaned_html, fallback_removed = _strip_fallback_regexes(doc.html())
+    return CtaScan(cleaned_html, label, removed + fallback_removed)
+
+
+def detect_forbidden_cta(html_content) -> Optional[str]:
+    """
+    Detecta CTAs proibidos em HTML (string ou Document), retornando a
+    descrição da regra se encontrada.
+    """
     if not html_content:
         return None
+    if isinstance(html_content, Document):
+        return detect_forbidden_cta_from_text(html_content.text())
     soup = BeautifulSoup(html_content, "lxml")
     text = soup.get_text(" ", strip=True)
     return detect_forbidden_cta_from_text(text)
@@ -197,8 +268,14 @@ def strip_credits_and_normalize_youtube(html: str) -> str:
     if not html:
         return html
 
-    soup = BeautifulSoup(html, "lxml")
+    doc = Document(html)
+    doc.apply(strip_credits_and_normalize_youtube_soup)
+    return doc.html()
+
 
+@transform(touches=("figcaption", "p", "span", "iframe", "figure"))
+def strip_credits_and_normalize_youtube_soup(soup: BeautifulSoup) -> None:
+    """Versão in-place de `strip_credits_and_normalize_youtube`."""
     # 1) Remover “Crédito:”, “Credito:”, “Fonte:”
     for node in soup.find_all(["figcaption", "p", "span"]):
         t = (node.get_text() or "").strip().lower()
@@ -240,8 +317,6 @@ def strip_credits_and_normalize_youtube(html: str) -> str:
         if not p.get_text(strip=True) and not p.find(True):
             p.decompose()
 
-    return soup.body.decode_contents() if soup.body else str(soup)
-
 
 def hard_filter_forbidden_html(html: str) -> str:
     """
@@ -340,10 +415,14 @@ def merge_images_into_content(content_html: str, image_urls: List[str], max_imag
     IMPORTANTE: Garante que cada imagem tem pelo menos um alt text e está dentro
     de uma figura com figcaption corretamente estruturada.
     """
-    if not content_html:
-        content_html = ""
-    soup = BeautifulSoup(content_html, "lxml")
+    doc = Document(content_html or "")
+    doc.apply(merge_images_into_content_soup, image_urls, max_images)
+    return doc.html()
+
 
+@transform()
+def merge_images_into_content_soup(soup: BeautifulSoup, image_urls: List[str], max_images: int = 6) -> None:
+    """Versão in-place de `merge_images_into_content`."""
     # conjunto de URLs já presentes
     present: set[str] = set()
     for img in soup.find_all("img"):
@@ -379,8 +458,8 @@ def merge_images_into_content(content_html: str, image_urls: List[str], max_imag
             try:
                 filename = u.split('/')[-1].split('?')[0]
                 # Limpar extensão e caracteres especiais
-                clean_name = re.sub(r'\.(jpg|jpeg|png|gif|webp)$', '', filename, flags=re.IGNORECASE)
-                clean_name = re.sub(r'[-_]', ' ', clean_name)
+                clean_name = rx.IMG_EXTENSION_SUFFIX.sub('', filename)
+                clean_name = rx.FILENAME_SEPARATORS.sub(' ', clean_name)
                 if clean_name:
                     img['alt'] = clean_name.strip()
             except Exception:
@@ -399,8 +478,6 @@ def merge_images_into_content(content_html: str, image_urls: List[str], max_imag
             else:
                 parent.append(fig)
 
-    return soup.body.decode_contents() if soup.body else str(soup)
-
 
 def rewrite_img_srcs_with_wp(content_html: str, uploaded_src_map: Dict[str, str]) -> str:
     """
@@ -410,10 +487,19 @@ def rewrite_img_srcs_with_wp(content_html: str, uploaded_src_map: Dict[str, str]
     if not content_html or not uploaded_src_map:
         return content_html
 
+    doc = Document(content_html)
+    doc.apply(rewrite_img_srcs_soup, uploaded_src_map)
+    return doc.html()
+
+
+@transform(touches=("img",))
+def rewrite_img_srcs_soup(soup: BeautifulSoup, uploaded_src_map: Dict[str, str]) -> None:
+    """Versão in-place de `rewrite_img_srcs_with_wp`."""
     # normalizar chaves do mapping
     norm_map: Dict[str, str] = {_norm_key(k): v for k, v in uploaded_src_map.items() if k and v}
+    if not norm_map:
+        return
 
-    soup = BeautifulSoup(content_html, "lxml")
     for img in soup.find_all("img"):
         # src
         src = (img.get("src") or "").strip()
@@ -432,7 +518,23 @@ def rewrite_img_srcs_with_wp(content_html: str, uploaded_src_map: Dict[str, str]
                 if k2 in norm_map:
                     img[a] = norm_map[k2]
 
-    return soup.body.decode_contents() if soup.body else str(soup)
+
+def fix_malformed_img_src(text: str) -> str:
+    """
+    Fixa srcs que contêm HTML (ex: src="<figure><img src="https://..."...>").
+    Precisa rodar na string, ANTES do parsing: as aspas internas quebram o atributo.
+    """
+    def extract_and_fix(match):
+        src_with_html = match.group(0)  # ex: src="<figure><img src="https://..."...>"
+        # Extrair apenas a URL
+        url_match = rx.EMBEDDED_URL.search(src_with_html)
+        if url_match:
+            url = url_match.group(0)
+            return f'src="{url}"'
+        return ''
+
+    # Procurar por src="...conteúdo com < e >" e extrair a URL https://... dentro
+    return rx.MALFORMED_IMG_SRC.sub(extract_and_fix, text)
 
 
 def validate_and_fix_figures(html: str) -> str:
@@ -452,27 +554,17 @@ def validate_and_fix_figures(html: str) -> str:
         return html
     
     # PASSO 0: Detectar e corrigir src malformados ANTES do parsing
-    # Se temos src="<figure>... ou src="<img... extrair a URL real
-    def fix_malformed_src(text):
-        """Fixa srcs que contêm HTML."""
-        # Procurar por src="...conteúdo com < e >"
-        # E extrair a URL https://... dentro
-        pattern = r'src="[^"]*<[^"]*https?://[^\s"\'<>]*[^"]*"'
-        
-        def extract_and_fix(match):
-            src_with_html = match.group(0)  # ex: src="<figure><img src="https://..."...>"
-            # Extrair apenas a URL
-            url_match = re.search(r'https?://[^\s"\'<>]+', src_with_html)
-            if url_match:
-                url = url_match.group(0)
-                return f'src="{url}"'
-            return ''
-        
-        return re.sub(pattern, extract_and_fix, text)
-    
-    html = fix_malformed_src(html)
-    
-    soup = BeautifulSoup(html, "lxml")
+    doc = Document(fix_malformed_img_src(html))
+    doc.apply(validate_and_fix_figures_soup)
+    return doc.html()
+
+
+@transform(touches=("img", "figure"))
+def validate_and_fix_figures_soup(soup: BeautifulSoup) -> None:
+    """
+    Versão in-place de `validate_and_fix_figures` (passos 1-3). O passo 0
+    (`fix_malformed_img_src`) é textual e deve ser aplicado antes do parse.
+    """
     
     # 1. Corrigir figuras com img que tem src contendo HTML estrutural
     # (BeautifulSoup desescapa automaticamente, então procuramos por '<' literal)
@@ -484,7 +576,7 @@ def validate_and_fix_figures(html: str) -> str:
             logger.warning(f"Encontrada imagem com src contendo HTML estrutural: {src[:100]}...")
             
             # Tentar encontrar uma URL https://... ou http://... dentro do src
-            url_match = re.search(r'https?://[^\s"\'<>]+', src)
+            url_match = rx.EMBEDDED_URL.search(src)
             if url_match:
                 real_url = url_match.group(0)
                 logger.info(f"Extraída URL real do HTML no src: {real_url}")
@@ -529,8 +621,6 @@ def validate_and_fix_figures(html: str) -> str:
         if not src or not src.startswith(("http://", "https://")):
             logger.warning(f"Removendo figura com URL inválida: {src}")
             fig.decompose()
-    
-    return soup.body.decode_contents() if soup.body else str(soup)
 
 # --- Stub para compatibilidade com pipeline: não adiciona crédito nenhum ---
 from typing import Optional
@@ -557,12 +647,7 @@ def remove_broken_image_placeholders(html: str) -> str:
     # This regex targets lines that ONLY contain the placeholder.
     # `^` and `$` anchor to the start and end of a line due to MULTILINE flag.
     # It avoids touching legitimate text that happens to contain the word "Imagem".
-    return re.sub(
-        r'^\s*(\[?Imagem[^\n<]*\]?)\s*$',
-        '',
-        html,
-        flags=re.IGNORECASE | re.MULTILINE
-    )
+    return rx.IMAGE_PLACEHOLDER_LINE.sub('', html)
 
 
 def strip_naked_internal_links(html: str) -> str:
@@ -573,12 +658,7 @@ def strip_naked_internal_links(html: str) -> str:
     if not html or ("/tag/" not in html and "/categoria/" not in html):
         return html
     # This regex looks for a <p> tag containing only a URL to /tag/ or /categoria/.
-    return re.sub(
-        r'<p>\s*https?://[^<>\s]+/(?:tag|categoria)/[a-z0-9\-_/]+/?\s*</p>',
-        '',
-        html,
-        flags=re.IGNORECASE
-    )
+    return rx.NAKED_INTERNAL_LINK_PARAGRAPH.sub('', html)
 
 
 def remove_source_domain_schemas(html: str) -> str:
@@ -597,22 +677,8 @@ def remove_source_domain_schemas(html: str) -> str:
     if not html:
         return html
     
-    # Remove qualquer bloco de script JSON-LD
-    # Usa re.DOTALL para capturar conteúdo multi-linha
-    cleaned = re.sub(
-        r'<script[^>]*type="application/ld\+json"[^>]*>.*?</script>',
-        '',
-        html,
-        flags=re.DOTALL | re.IGNORECASE
-    )
-    
-    # Remove também a variação inversa do atributo type
-    cleaned = re.sub(
-        r'<script[^>]*type\s*=\s*["\']application/ld\+json["\'][^>]*>.*?</script>',
-        '',
-        cleaned,
-        flags=re.DOTALL | re.IGNORECASE
-    )
+    # Remove qualquer bloco de script JSON-LD (type="..." ou type = '...', multi-linha)
+    cleaned = rx.JSON_LD_SCRIPT.sub('', html)
     
     logger.debug("Removed source domain JSON-LD schemas from content")
     return cleaned
@@ -622,133 +688,30 @@ def remove_source_domain_schemas(html: str) -> str:
 # Gutenberg Blocks Converter
 # ===========================
 
-def html_to_gutenberg_blocks(html_content: str) -> str:
+def html_to_gutenberg_blocks(html_content, out=None) -> Optional[str]:
     """
-    Converte HTML puro para formato de blocos Gutenberg.
+    Converte HTML puro (string ou Document já parseado) para formato de blocos Gutenberg.
     Gutenberg usa comentários especiais como <!-- wp:paragraph --> para marcar blocos.
+
+    Com `out` (qualquer objeto com `.write`, ex.: o buffer do payload), os
+    blocos são escritos direto nele e a função retorna None.
+    Ver `gutenberg.GutenbergSerializer`.
     """
     if not html_content:
-        return ""
-    
-    # Limpar espaços em branco excessivos
-    html_content = html_content.strip()
-    
-    blocks = []
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
-    for element in soup.children:
-        if isinstance(element, str):
-            # Texto puro
-            text = element.strip()
-            if text:
-                blocks.append(f"<!-- wp:paragraph -->\n<p>{text}</p>\n<!-- /wp:paragraph -->")
-            continue
-        
-        if not hasattr(element, 'name'):
-            continue
-        
-        tag = element.name
-        
-        # Parágrafos
-        if tag == 'p':
-            text = element.get_text(strip=False)
-            if text.strip():
-                blocks.append(f"<!-- wp:paragraph -->\n{str(element)}\n<!-- /wp:paragraph -->")
-        
-        # Headings
-        elif tag in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
-            level = int(tag[1])
-            text = element.get_text(strip=True)
-            if text:
-                blocks.append(f"<!-- wp:heading {{\"level\":{level}}} -->\n<{tag}>{text}</{tag}>\n<!-- /wp:heading -->")
-        
-        # Imagens
-        elif tag == 'img':
-            img_src = element.get('src', '')
-            img_alt = element.get('alt', '')
-            if img_src:
-                # Imagem com figura (mais comum no Gutenberg)
-                blocks.append(f"<!-- wp:image -->\n<figure class=\"wp-block-image\"><img src=\"{img_src}\" alt=\"{img_alt}\"/></figure>\n<!-- /wp:image -->")
-        
-        # Figura com legenda (para imagens com caption)
-        elif tag == 'figure':
-            img = element.find('img')
-            figcaption = element.find('figcaption')
-            if img:
-                img_src = img.get('src', '')
-                img_alt = img.get('alt', '')
-                caption = figcaption.get_text(strip=True) if figcaption else ''
-                
-                # Construir HTML correto para Gutenberg
-                # Formato: <!-- wp:image {"caption":"..."} -->
-                #          <figure class="wp-block-image">
-                #            <img src="..." alt="..."/>
-                #            <figcaption class="wp-element-caption">...</figcaption>
-                #          </figure>
-                #          <!-- /wp:image -->
-                
-                attrs = {}
-                if caption:
-                    # Escapar aspas na legenda
-                    safe_caption = caption.replace('"', '\\"')
-                    attrs['caption'] = safe_caption
-                
-                attrs_json = ', '.join(f'"{k}":"{v}"' for k, v in attrs.items())
-                attrs_str = f" {{{attrs_json}}}" if attrs_json else ""
-                
-                # Reconstruir figura com estrutura correta
-                fig_html = f'<figure class="wp-block-image"><img src="{img_src}" alt="{img_alt}"/>'
-                if caption:
-                    fig_html += f'<figcaption class="wp-element-caption">{caption}</figcaption>'
-                fig_html += '</figure>'
-                
-                blocks.append(f"<!-- wp:image{attrs_str} -->\n{fig_html}\n<!-- /wp:image -->")
-        
-        # Listas
-        elif tag == 'ul':
-            items = []
-            for li in element.find_all('li', recursive=False):
-                items.append(f"<li>{li.get_text(strip=True)}</li>")
-            if items:
-                list_html = '<ul>' + ''.join(items) + '</ul>'
-                blocks.append(f"<!-- wp:list -->\n{list_html}\n<!-- /wp:list -->")
-        
-        elif tag == 'ol':
-            items = []
-            for li in element.find_all('li', recursive=False):
-                items.append(f"<li>{li.get_text(strip=True)}</li>")
-            if items:
-                list_html = '<ol>' + ''.join(items) + '</ol>'
-                blocks.append(f"<!-- wp:list {{\"ordered\":true}} -->\n{list_html}\n<!-- /wp:list -->")
-        
-        # Blockquotes
-        elif tag == 'blockquote':
-            text = element.get_text(strip=True)
-            if text:
-                blocks.append(f"<!-- wp:quote -->\n<blockquote class=\"wp-block-quote\"><p>{text}</p></blockquote>\n<!-- /wp:quote -->")
-        
-        # Videos (iframe)
-        elif tag == 'iframe':
-            src = element.get('src', '')
-            if 'youtube' in src or 'vimeo' in src:
-                blocks.append(f"<!-- wp:embed -->\n<figure class=\"wp-block-embed\">{str(element)}</figure>\n<!-- /wp:embed -->")
-        
-        # Divs e outros containers - processar filhos
-        elif tag in ['div', 'article', 'section']:
-            for child in element.children:
-                if isinstance(child, str):
-                    text = child.strip()
-                    if text:
-                        blocks.append(f"<!-- wp:paragraph -->\n<p>{text}</p>\n<!-- /wp:paragraph -->")
-        
-        # Outros elementos
-        else:
-            html_str = str(element)
-            if html_str.strip() and not html_str.startswith('<'):
-                blocks.append(f"<!-- wp:paragraph -->\n<p>{html_str}</p>\n<!-- /wp:paragraph -->")
-    
-    # Juntar blocos com quebras de linha
-    gutenberg_content = '\n\n'.join(blocks)
-    
-    logger.debug(f"Converted HTML ({len(html_content)} chars) to Gutenberg blocks ({len(gutenberg_content)} chars)")
+        return "" if out is None else None
+
+    if isinstance(html_content, Document):
+        root = html_content.root
+    else:
+        root = Document(html_content.strip()).root
+
+    if out is not None:
+        write_gutenberg_blocks(root, out.write)
+        return None
+
+    parts: List[str] = []
+    write_gutenberg_blocks(root, parts.append)
+    gutenberg_content = ''.join(parts)
+
+    logger.debug(f"Converted HTML to Gutenberg blocks ({len(gutenberg_content)} chars)")
     return gutenberg_content
@@ -0,0 +1,196 @@
+"""
+Modelo único de candidato a imagem.
+
+As mesmas URLs passavam várias vezes pelos filtros de imagem — na escolha da
+destacada, na coleta do corpo (`collect_images_from_article`) e de novo no
+`is_valid_upload_candidate` do pipeline — e cada filtro refazia `urlparse`,
+`lower()`, o palpite de dimensões e a varredura das listas de palavras.
+
+`image_candidate(url)` faz o parse uma vez e devolve um registro compacto
+(host, extensão, dimensões deduzidas da URL e um bitmask de motivos de
+rejeição), memoizado por URL. As listas de palavras/domínios/padrões viram
+uma regex cada (alternação), compilada no import. Os dois conjuntos de regras
+continuam com a semântica de antes:
+
+- artigo (`valid_for_article`): domínio ruim, palavra ruim na URL, nome de
+  arquivo de "lixo" (ícone, sprite, logo...), dimensões pequenas/proporção
+  estranha;
+- upload (`valid_for_upload`): esquema http(s), host bloqueado, extensão de
+  imagem, "author"/"avatar" na URL, w/h <= 100 na query.
+"""
+
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs, urljoin, urlparse
+
+from . import regexes as rx
+
+BAD_IMAGE_KEYWORDS = {
+    'author', 'autor', 'avatar', 'byline', 'perfil', 'profile',
+    'placeholder', 'logo', 'logomarca', 'brand', 'marca',
+    'icon', 'favicon', 'sprite', 'comment', 'user', 'usuario', 'usuário'
+}
+
+BAD_IMAGE_DOMAINS = {
+    'gravatar.com', 'twimg.com', 'facebook.com', 'fbcdn.net',
+    'gstatic.com', 'googleusercontent.com',
+    # Adicionados conforme sugestão para bloquear trackers e placeholders
+    "schema.org", "scorecardresearch.com", "doubleclick.net",
+    "quantserve.com", "chartbeat.com", "google-analytics.com"
+}
+
+JUNK_IMAGE_PATTERNS = (
+    "placeholder", "sprite", "icon", "emoji", ".svg",
+    # From user suggestion to filter out non-content images
+    "cta", "read-more", "share", "logo", "banner"
+)
+
+UPLOAD_BAD_HOSTS = {"sb.scorecardresearch.com", "securepubads.g.doubleclick.net"}
+UPLOAD_IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".webp", ".gif")
+
+MIN_ARTICLE_WIDTH = 600
+MIN_ARTICLE_HEIGHT = 315
+
+
+def _alternation(words) -> str:
+    return '|'.join(re.escape(w) for w in sorted(set(words), key=len, reverse=True))
+
+
+# Geradas das listas acima; registradas aqui para não importar as listas em regexes.py
+_BAD_KEYWORD_RE = rx.compile('image_candidates.bad_keyword', _alternation(BAD_IMAGE_KEYWORDS))
+_JUNK_NAME_RE = rx.compile('image_candidates.junk_name', _alternation(JUNK_IMAGE_PATTERNS))
+_BAD_DOMAIN_RE = rx.compile('image_candidates.bad_domain', f'(?:{_alternation(BAD_IMAGE_DOMAINS)})$')
+
+# Motivos de rejeição (bitmask em ImageCandidate.flags)
+DATA_URI = 1 << 0
+BAD_DOMAIN = 1 << 1
+BAD_KEYWORD = 1 << 2
+JUNK_FILENAME = 1 << 3
+TOO_SMALL = 1 << 4
+UNPARSEABLE = 1 << 5
+NOT_HTTP = 1 << 6
+BLOCKED_HOST = 1 << 7
+NOT_IMAGE_EXT = 1 << 8
+AUTHOR_IMAGE = 1 << 9
+TINY_DIMENSION = 1 << 10
+
+ARTICLE_REJECT = DATA_URI | BAD_DOMAIN | BAD_KEYWORD | JUNK_FILENAME | TOO_SMALL
+UPLOAD_REJECT = UNPARSEABLE | NOT_HTTP | BLOCKED_HOST | NOT_IMAGE_EXT | AUTHOR_IMAGE | TINY_DIMENSION
+
+
+def _fits(width: int, height: int, min_w: int, min_h: int) -> bool:
+    if width < min_w or height < min_h:
+        return False
+    # evita quase-quadradas/estranhas como avatar 150x150
+    ar = width / height if height else 0
+    return 0.6 <= ar <= 2.2
+
+
+class ImageCandidate(NamedTuple):
+    url: str
+    netloc: str
+    host: str
+    ext: str
+    width: Optional[int]
+    height: Optional[int]
+    flags: int
+
+    @property
+    def valid_for_article(self) -> bool:
+        return not self.flags & ARTICLE_REJECT
+
+    @property
+    def valid_for_upload(self) -> bool:
+        return not self.flags & UPLOAD_REJECT
+
+    def passes_min_size(self, min_w: int = MIN_ARTICLE_WIDTH, min_h: int = MIN_ARTICLE_HEIGHT) -> bool:
+        if self.width is None or self.height is None:
+            # Sem dimensão explícita: aceita provisoriamente (muitos sites não expõem)
+            return True
+        return _fits(self.width, self.height, min_w, min_h)
+
+
+def _dimensions(parsed) -> Tuple[Optional[int], Optional[int]]:
+    try:
+        q = parse_qs(parsed.query or '')
+        w = q.get('width') or q.get('w')
+        h = q.get('height') or q.get('h')
+        if w and h:
+            return int(w[0]), int(h[0])
+        m = rx.IMAGE_DIM_SUFFIX.search(parsed.path)
+        if m:
+            return int(m.group(1)), int(m.group(2))
+    except ValueError:
+        pass
+    return None, None
+
+
+@lru_cache(maxsize=8192)
+def image_candidate(url: str) -> ImageCandidate:
+    """Registro da URL: um parse só, reaproveitado entre destacada, corpo e upload."""
+    lower = url.lower()
+    flags = 0
+    if lower.startswith('data:'):
+        flags |= DATA_URI
+    if _BAD_KEYWORD_RE.search(lower):
+        flags |= BAD_KEYWORD
+    if rx.UPLOAD_BAD_KEYWORD.search(lower):
+        flags |= AUTHOR_IMAGE
+    if any(int(d) <= 100 for d in rx.UPLOAD_QUERY_DIMENSION.findall(lower)):
+        flags |= TINY_DIMENSION
+
+    try:
+        parsed = urlparse(url)
+        host = parsed.hostname or ''
+    except ValueError:
+        return ImageCandidate(url, '', '', '', None, None, flags | UNPARSEABLE | NOT_HTTP)
+
+    netloc = parsed.netloc
+    path = parsed.path.lower()
+    name = path.rsplit('/', 1)[-1]
+    ext = name.rsplit('.', 1)[-1] if '.' in name else ''
+
+    if _BAD_DOMAIN_RE.search(host):
+        flags |= BAD_DOMAIN
+    if _JUNK_NAME_RE.search(name):
+        flags |= JUNK_FILENAME
+    if not parsed.scheme.startswith('http'):
+        flags |= NOT_HTTP
+    if netloc.lower() in UPLOAD_BAD_HOSTS:
+        flags |= BLOCKED_HOST
+    if not path.endswith(UPLOAD_IMAGE_EXTS):
+        flags |= NOT_IMAGE_EXT
+
+    width, height = _dimensions(parsed)
+    if width is not None and height is not None and not _fits(width, height, MIN_ARTICLE_WIDTH, MIN_ARTICLE_HEIGHT):
+        flags |= TOO_SMALL
+    return ImageCandidate(url, netloc, host, ext, width, height, flags)
+
+
+def best_srcset_url(srcset: str, base_url: Optional[str] = None) -> Optional[str]:
+    """
+    Maior candidato do srcset (pela largura declarada) que passa nas regras de
+    imagem de artigo. URLs relativas são resolvidas contra `base_url`.
+    """
+    best = None
+    best_w = -1
+    for part in (srcset or '').split(','):
+        tokens = part.split()
+        if not tokens:
+            continue
+        w = 0
+        if len(tokens) > 1 and tokens[1].endswith('w'):
+            try:
+                w = int(tokens[1][:-1])
+            except ValueError:
+                w = 0
+        if w < best_w:
+            continue
+        url = tokens[0]
+        if base_url:
+            url = urljoin(base_url, url)
+        if image_candidate(url).valid_for_article:
+            best_w = w
+            best = url
+    return best
@@ -1,98 +1,254 @@
 import logging
 import re
-from typing import Dict, List, Set, Any
-from bs4 import BeautifulSoup
+from typing import Dict, List, Set, Any, Optional, Tuple
+from bs4 import BeautifulSoup, NavigableString, Tag
 from app.config import PILAR_POSTS
+from app.document import transform
 
 logger = logging.getLogger(__name__)
 
 EXCLUDED_TAGS = ['a', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote', 'code', 'pre', 'figure', 'figcaption']
+_EXCLUDED_TAG_SET = frozenset(EXCLUDED_TAGS)
+
+_PRIORITY_NAMES = ("PILAR", "RELATED", "CATEGORY", "OTHER")
+
+# Sentinela para "fim de keyword" dentro dos nós do trie
+_END = ''
+
+
+def _is_word_char(c: str) -> bool:
+    """Mesma noção de caractere de palavra usada por \\w/\\b no módulo re."""
+    return c.isalnum() or c == '_'
+
+
+def _fold(c: str) -> str:
+    """Normaliza um caractere para o trie (case-insensitive, como re.IGNORECASE)."""
+    return c.lower()
+
+
+def _trie_to_regex(node: Dict[str, Any]) -> str:
+    """Converte o trie em uma regex cujas alternativas se ramificam por caractere."""
+    branches = [re.escape(ch) + _trie_to_regex(child) for ch, child in node.items() if ch != _END]
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if _END in node:
+        body = '(?:' + body + ')?'
+    return body
+
+
+class CompiledLinkMap:
+    """
+    Matcher pré-compilado sobre todas as keywords do link map.
+
+    Construído uma vez quando o mapa é carregado: um trie com todas as keywords
+    (minúsculas) e uma única regex gerada a partir dele, usada só para achar as
+    posições onde alguma keyword começa. Em cada posição candidata o trie lista
+    todas as keywords que terminam em fronteira de palavra, então o custo por
+    nó de texto não depende do tamanho do acervo.
+    """
+
+    def __init__(self, link_map_data: Dict[str, List[Dict[str, Any]]]):
+        self.posts: List[Dict[str, Any]] = []
+        self.is_pilar: List[bool] = []
+        self.categories: List[frozenset] = []
+        self.posts_by_link: Dict[str, List[int]] = {}
+        self._trie: Dict[str, Any] = {}
+
+        for post_data in (link_map_data or {}).get('posts', []):
+            keywords = list(dict.fromkeys(k for k in post_data.get('keywords') or [] if k))
+            if not keywords:
+                continue
+            post_idx = len(self.posts)
+            # Rank: keyword mais longa primeiro ("Real Madrid Club de Fútbol" antes de "Real Madrid")
+            for rank, keyword in enumerate(sorted(keywords, key=len, reverse=True)):
+                self._insert(keyword, post_idx, rank)
+            self.posts.append(post_data)
+            self.is_pilar.append(post_data['link'] in PILAR_POSTS)
+            self.categories.append(frozenset(post_data.get('categories') or []))
+            self.posts_by_link.setdefault(post_data['link'], []).append(post_idx)
+
+        self._candidate_re: Optional[re.Pattern] = None
+        if self._trie:
+            self._candidate_re = re.compile(
+                r'(?=\b(?:' + _trie_to_regex(self._trie) + r')\b)', re.IGNORECASE
+            )
+
+    def __len__(self) -> int:
+        return len(self.posts)
+
+    def _insert(self, keyword: str, post_idx: int, rank: int):
+        node = self._trie
+        for c in keyword:
+            for k in _fold(c):
+                node = node.setdefault(k, {})
+        node.setdefault(_END, []).append((post_idx, rank, keyword))
+
+    def _keywords_at(self, text: str, start: int):
+        """Keywords que começam em `start` e terminam em fronteira de palavra: (post_idx, rank, keyword, end)."""
+        node = self._trie
+        i = start
+        n = len(text)
+        while i < n:
+            for k in _fold(text[i]):
+                node = node.get(k)
+                if node is None:
+                    return
+            i += 1
+            if _END in node:
+                # \b no fim: caractere final da keyword e o seguinte diferem em "ser palavra"
+                next_is_word = i < n and _is_word_char(text[i])
+                for post_idx, rank, keyword in node[_END]:
+                    if _is_word_char(keyword[-1]) != next_is_word:
+                        yield post_idx, rank, keyword, i
+
+    def find_best_match(
+        self,
+        text: str,
+        priority_of,
+        used_posts: Set[int],
+    ) -> Optional[Tuple[int, str, int, int]]:
+        """
+        Escolhe a melhor keyword para o nó: o post de maior prioridade que tenha
+        alguma keyword no texto, a keyword mais longa desse post, e a primeira
+        ocorrência dela.
+
+        Returns:
+            (post_idx, keyword, start, end) ou None.
+        """
+        if self._candidate_re is None:
+            return None
+        best_key = None
+        best = None
+        for m in self._candidate_re.finditer(text):
+            start = m.start()
+            for post_idx, rank, keyword, end in self._keywords_at(text, start):
+                if post_idx in used_posts:
+                    continue
+                key = (priority_of(post_idx), post_idx, rank, start)
+                if best_key is None or key < best_key:
+                    best_key = key
+                    best = (post_idx, keyword, start, end)
+        return best
+
+
+# Cache de uma entrada: o link map é carregado uma vez pelo worker e reutilizado
+_compiled_cache: Tuple[Optional[dict], Optional[CompiledLinkMap]] = (None, None)
+
+
+def get_compiled_link_map(link_map_data: Dict[str, List[Dict[str, Any]]]) -> CompiledLinkMap:
+    """Compila o link map (ou reutiliza a compilação do mesmo objeto)."""
+    global _compiled_cache
+    cached_data, compiled = _compiled_cache
+    if cached_data is link_map_data and compiled is not None:
+        return compiled
+    compiled = CompiledLinkMap(link_map_data)
+    _compiled_cache = (link_map_data, compiled)
+    logger.info(f"Link map compilado: {len(compiled)} posts com keywords")
+    return compiled
+
+
+def _eligible_text_nodes(root: Tag) -> List[NavigableString]:
+    """Nós de texto em ordem do documento, pulando subárvores de EXCLUDED_TAGS."""
+    nodes: List[NavigableString] = []
+    stack = [iter(root.contents)]
+    while stack:
+        child = next(stack[-1], None)
+        if child is None:
+            stack.pop()
+            continue
+        if isinstance(child, Tag):
+            if child.name not in _EXCLUDED_TAG_SET:
+                stack.append(iter(child.contents))
+        elif type(child) is NavigableString:
+            nodes.append(child)
+    return nodes
+
+
+def _resolve_compiled(link_map_data) -> Optional[CompiledLinkMap]:
+    if not link_map_data:
+        return None
+    if isinstance(link_map_data, CompiledLinkMap):
+        compiled = link_map_data
+    else:
+        if not link_map_data.get('posts'):
+            return None
+        compiled = get_compiled_link_map(link_map_data)
+    return compiled if len(compiled) else None
+
 
 def add_internal_links(
-    html_content: str, 
+    html_content: str,
     link_map_data: Dict[str, List[Dict[str, Any]]],
     current_post_categories: List[int] = None,
-    max_links: int = 6
+    max_links: int = 6,
+    related_links: Optional[Set[str]] = None,
 ) -> str:
     """
     Analyzes HTML and inserts internal links based on a prioritized strategy,
     using a list of keywords (title + tags) for each link.
+
+    Priority: PILAR_POSTS, then posts the related-content index found similar to
+    this article (`related_links`), then posts sharing a category with the
+    current post, then the rest; within a post the longest keyword wins.
+    `link_map_data` may be the raw map or a CompiledLinkMap.
     """
-    if not html_content or not link_map_data or not link_map_data.get('posts'):
+    if not html_content or _resolve_compiled(link_map_data) is None:
         return html_content
 
     soup = BeautifulSoup(html_content, 'html.parser')
-    links_inserted = 0
-    used_urls: Set[str] = set()
-    
-    all_link_options = link_map_data['posts']
-
-    # --- Prioritization Logic ---
-    pilar_options = []
-    category_options = []
-    other_options = []
-
-    current_cat_set = set(current_post_categories or [])
+    add_internal_links_soup(soup, link_map_data, current_post_categories, max_links, related_links)
+    return str(soup)
 
-    for post_data in all_link_options:
-        # Skip if the post has no keywords to match
-        if not post_data.get('keywords'):
-            continue
 
-        is_pilar = post_data['link'] in PILAR_POSTS
-        shares_category = current_cat_set and not current_cat_set.isdisjoint(post_data.get('categories', []))
+@transform()
+def add_internal_links_soup(
+    soup: BeautifulSoup,
+    link_map_data,
+    current_post_categories: List[int] = None,
+    max_links: int = 6,
+    related_links: Optional[Set[str]] = None,
+) -> int:
+    """In-place variant of `add_internal_links` for a parsed Document. Returns the number of links inserted."""
+    compiled = _resolve_compiled(link_map_data)
+    if compiled is None:
+        return 0
 
-        if is_pilar:
-            pilar_options.append(post_data)
-        elif shares_category:
-            category_options.append(post_data)
-        else:
-            other_options.append(post_data)
+    links_inserted = 0
+    used_posts: Set[int] = set()
 
-    # Within each priority group, sort keywords by length, descending.
-    # This ensures we try to match "Real Madrid Club de Fútbol" before "Real Madrid".
-    for group in [pilar_options, category_options, other_options]:
-        for post_data in group:
-            post_data['keywords'].sort(key=len, reverse=True)
+    current_cat_set = frozenset(current_post_categories or [])
 
-    prioritized_link_options = pilar_options + category_options + other_options
+    related_set = frozenset(related_links or ())
 
-    text_nodes = soup.find_all(string=True)
+    def priority_of(post_idx: int) -> int:
+        if compiled.is_pilar[post_idx]:
+            return 0
+        if related_set and compiled.posts[post_idx]['link'] in related_set:
+            return 1
+        if current_cat_set and not current_cat_set.isdisjoint(compiled.categories[post_idx]):
+            return 2
+        return 3
 
-    for node in text_nodes:
+    for node in _eligible_text_nodes(soup):
         if links_inserted >= max_links:
             break
 
-        if any(node.find_parent(tag) for tag in EXCLUDED_TAGS):
+        text = str(node)
+        match = compiled.find_best_match(text, priority_of, used_posts)
+        if not match:
             continue
 
-        original_text = str(node)
-        modified_in_node = False
+        post_idx, keyword, start, end = match
+        url = compiled.posts[post_idx]['link']
 
-        for link_option in prioritized_link_options:
-            if modified_in_node or links_inserted >= max_links:
-                break
+        link_tag = soup.new_tag('a', href=url)
+        link_tag.string = text[start:end]
+        node.replace_with(*[part for part in (text[:start], link_tag, text[end:]) if part != ''])
 
-            url = link_option['link']
-            if url in used_urls:
-                continue
-
-            # Iterate through all keywords for this link option (title, tags)
-            for keyword in link_option['keywords']:
-                pattern = re.compile(r'\b(' + re.escape(keyword) + r')\b', re.IGNORECASE)
-                
-                if pattern.search(original_text):
-                    link_tag_str = f'<a href="{url}">{keyword}</a>'
-                    new_html = pattern.sub(link_tag_str, original_text, count=1)
-                    
-                    node.replace_with(BeautifulSoup(new_html, 'html.parser'))
-                    
-                    links_inserted += 1
-                    used_urls.add(url)
-                    modified_in_node = True # Mark that we modified this node
-                    
-                    priority = "PILAR" if link_option in pilar_options else "CATEGORY" if link_option in category_options else "OTHER"
-                    logger.info(f"Inserted link for keyword: '{keyword}' (Priority: {priority})")
-                    break # Stop searching keywords for this link_option
+        links_inserted += 1
+        # O mesmo link pode aparecer em mais de um post do mapa
+        used_posts.update(compiled.posts_by_link[url])
+        logger.info(f"Inserted link for keyword: '{keyword}' (Priority: {_PRIORITY_NAMES[priority_of(post_idx)]})")
 
-    return str(soup)
+    return links_inserted
@@ -3,6 +3,8 @@ import time, random, logging
 from collections import deque
 from time import monotonic
 
+from .metrics import track_key_pool
+
 logger = logging.getLogger(__name__)
 
 class RateLimiter:
@@ -29,6 +31,7 @@ class KeyPool:
     def __init__(self, keys):
         self.slots = deque(KeySlot(k) for k in keys)
         self.rotation_index = 0  # Contador para rodízio
+        track_key_pool(self)
         logger.info(f"KEYPOOL: Inicializado com {len(self.slots)} chaves")
         
     def next_ready(self):
@@ -0,0 +1,163 @@
+"""
+Serviço de link map com recarga a quente.
+
+O `worker_loop` lia `data/internal_links.json` uma única vez; posts publicados
+durante a execução só viravam links depois de reiniciar o processo. Este
+serviço mantém um snapshot imutável (link map já compilado em
+`CompiledLinkMap` + índice de relacionados) compartilhado por todos os
+workers do processo:
+
+- a cada `LINK_MAP_CHECK_INTERVAL_S` compara (mtime, tamanho) dos arquivos;
+- se mudaram, carrega e compila em uma thread de fundo, sem bloquear quem
+  está processando;
+- troca o snapshot com uma única atribuição — quem já pegou o snapshot
+  anterior termina o artigo com ele.
+
+Os arquivos são gravados atomicamente (tmp + os.replace) pelo `post_index`,
+então o leitor nunca vê um JSON pela metade.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from .internal_linking import CompiledLinkMap
+from .related_index import RelatedIndex, RELATED_INDEX_PATH, RELATED_LINKS_ENABLED
+
+logger = logging.getLogger(__name__)
+
+LINK_MAP_PATH = os.getenv('LINK_MAP_PATH', 'data/internal_links.json')
+LINK_MAP_CHECK_INTERVAL_S = float(os.getenv('LINK_MAP_CHECK_INTERVAL_S', 30))
+
+_Version = Optional[Tuple[int, int]]
+
+
+def _file_version(path: str) -> _Version:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class LinkMapSnapshot:
+    """Versão imutável do link map compilado e do índice de relacionados."""
+
+    def __init__(
+        self,
+        link_map: Optional[CompiledLinkMap] = None,
+        related_index: Optional[RelatedIndex] = None,
+        link_map_version: _Version = None,
+        related_version: _Version = None,
+    ):
+        self.link_map = link_map
+        self.related_index = related_index
+        self.link_map_version = link_map_version
+        self.related_version = related_version
+        self.loaded_at = time.time()
+
+
+class LinkMapService:
+    """Mantém o snapshot atual e o recarrega em background quando os arquivos mudam."""
+
+    def __init__(
+        self,
+        link_map_path: str = LINK_MAP_PATH,
+        related_path: Optional[str] = RELATED_INDEX_PATH if RELATED_LINKS_ENABLED else None,
+        check_interval_s: float = LINK_MAP_CHECK_INTERVAL_S,
+    ):
+        self.link_map_path = link_map_path
+        self.related_path = related_path
+        self.check_interval_s = check_interval_s
+        self._snapshot = LinkMapSnapshot()
+        self._last_check = 0.0
+        self._reload_lock = threading.Lock()
+        self._reload_thread: Optional[threading.Thread] = None
+
+    def load(self) -> LinkMapSnapshot:
+        """Carga síncrona (usada na inicialização do worker)."""
+        self._last_check = time.monotonic()
+        self._reload(self._snapshot)
+        return self._snapshot
+
+    def current(self) -> LinkMapSnapshot:
+        """
+        Retorna o snapshot atual. No máximo uma vez por intervalo verifica se os
+        arquivos mudaram e, se sim, dispara a recarga sem esperar por ela.
+        """
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval_s:
+            self._last_check = now
+            if self._has_changed(self._snapshot):
+                self._start_background_reload()
+        return self._snapshot
+
+    def _has_changed(self, snapshot: LinkMapSnapshot) -> bool:
+        if _file_version(self.link_map_path) != snapshot.link_map_version:
+            return True
+        return bool(self.related_path) and _file_version(self.related_path) != snapshot.related_version
+
+    def _start_background_reload(self):
+        with self._reload_lock:
+            if self._reload_thread and self._reload_thread.is_alive():
+                return
+            self._reload_thread = threading.Thread(
+                target=self._reload, args=(self._snapshot,), name='link-map-reload', daemon=True
+            )
+            self._reload_thread.start()
+
+    def wait_for_reload(self, timeout: Optional[float] = None):
+        """Espera uma recarga em andamento (útil em testes e no desligamento)."""
+        thread = self._reload_thread
+        if thread:
+            thread.join(timeout)
+
+    def _reload(self, previous: LinkMapSnapshot):
+        """Recarrega só o que mudou; em caso de erro mantém a versão anterior."""
+        link_map, link_version = previous.link_map, previous.link_map_version
+        new_version = _file_version(self.link_map_path)
+        if new_version != link_version:
+            try:
+                started = time.monotonic()
+                with open(self.link_map_path, 'r', encoding='utf-8') as f:
+                    raw: Dict[str, Any] = json.load(f)
+                link_map, link_version = CompiledLinkMap(raw), new_version
+                logger.info(
+                    f"LINK MAP: {len(link_map)} posts carregados e compilados "
+                    f"em {time.monotonic() - started:.2f}s"
+                )
+            except FileNotFoundError:
+                logger.warning(f"LINK MAP: {self.link_map_path} não encontrado.")
+                link_map, link_version = None, None
+            except (json.JSONDecodeError, OSError) as e:
+                logger.error(f"LINK MAP: falha ao recarregar {self.link_map_path}, mantendo versão anterior: {e}")
+
+        related, related_version = previous.related_index, previous.related_version
+        if self.related_path:
+            new_version = _file_version(self.related_path)
+            if new_version is not None and new_version != related_version:
+                try:
+                    related, related_version = RelatedIndex.load(self.related_path), new_version
+                    logger.info(f"RELATED INDEX: {len(related)} posts carregados")
+                except Exception as e:
+                    logger.error(f"RELATED INDEX: falha ao recarregar, mantendo versão anterior: {e}")
+
+        # Troca atômica: uma única atribuição de referência
+        self._snapshot = LinkMapSnapshot(link_map, related, link_version, related_version)
+
+
+_service: Optional[LinkMapService] = None
+_service_lock = threading.Lock()
+
+
+def get_link_map_service() -> LinkMapService:
+    """Instância única do processo, compartilhada por todos os workers."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = LinkMapService()
+            _service.load()
+        return _service
@@ -3,12 +3,20 @@ import logging
 import sys
 import os
 import atexit
+import time
 from datetime import datetime, timezone
 from apscheduler.schedulers.blocking import BlockingScheduler
 
-from app.pipeline import run_pipeline_cycle
+from app.pipeline import run_pipeline_cycle, wait_until_idle
 from app.store import Database
 from app.config import SCHEDULE_CONFIG
+from app.post_index import refresh_post_index, POST_INDEX_REFRESH_MINUTES
+from app.page_cache import purge_page_cache, PAGE_CACHE_ENABLED
+from app.dedup import purge_story_signatures, DEDUP_ENABLED
+from app.revalidation import revalidate_published_sources, REVALIDATION_ENABLED, REVALIDATION_INTERVAL_MINUTES
+from app import tracing
+from app.metrics import start_metrics_server
+from app.background_writer import async_handler
 
 # Criar diretório de logs se não existir
 os.makedirs("logs", exist_ok=True)
@@ -34,14 +42,17 @@ formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(module)s - %(mess
 file_handler.setFormatter(formatter)
 console_handler.setFormatter(formatter)
 
+# app.log é escrito pela thread do QueueListener (fsync periódico)
+app_log_handler = async_handler(file_handler)
+
 # Add handlers to logger
-logger.addHandler(file_handler)
+logger.addHandler(app_log_handler)
 logger.addHandler(console_handler)
 
 # Also set root logger
 root_logger = logging.getLogger()
 root_logger.setLevel(logging.INFO)
-root_logger.addHandler(file_handler)
+root_logger.addHandler(app_log_handler)
 root_logger.addHandler(console_handler)
 
 # Garantir que os logs sejam gravados ao sair
@@ -78,6 +89,15 @@ def initialize_database():
         file_handler.flush()
         sys.exit(1)
 
+def print_profile(since: float):
+    """Latência por etapa (spans gravados em TRACE_DB_PATH a partir de `since`)."""
+    tracer = tracing.get_tracer()
+    if tracer is None:
+        print("Tracing desativado (TRACING_ENABLED=false) ou banco de spans indisponível.")
+        return
+    print(tracing.format_report(tracer.stage_stats(since=since)))
+
+
 def main():
     """Função principal para executar o pipeline de conteúdo."""
     parser = argparse.ArgumentParser(description="Executa o pipeline de conteúdo VocMoney.")
@@ -86,13 +106,32 @@ def main():
         action='store_true',
         help="Executa o ciclo do pipeline uma vez e sai."
     )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help="Imprime p50/p95 por etapa (spans do tracing). Com --once, só do ciclo executado; "
+             "sem --once, das últimas --profile-hours horas, e sai."
+    )
+    parser.add_argument('--profile-hours', type=float, default=24)
+    parser.add_argument(
+        '--profile-timeout',
+        type=float,
+        default=1800,
+        help="Com --once --profile, quantos segundos esperar o worker processar a fila antes do relatório."
+    )
     args = parser.parse_args()
 
+    if args.profile and not args.once:
+        print_profile(time.time() - args.profile_hours * 3600)
+        return
+
     initialize_database()
+    start_metrics_server()
 
     if args.once:
         logger.info("Executando um único ciclo do pipeline (--once).")
         flush_logs()
+        cycle_started = time.time()
         try:
             run_pipeline_cycle()
         except Exception as e:
@@ -101,6 +140,11 @@ def main():
         finally:
             logger.info("Ciclo único finalizado.")
             flush_logs()
+            if args.profile:
+                # O ciclo só enfileira: as etapas rodam na thread do worker
+                if not wait_until_idle(args.profile_timeout):
+                    logger.warning("Worker não esvaziou a fila a tempo; o relatório cobre só o que já terminou.")
+                print_profile(cycle_started)
     else:
         # Agenda as execuções futuras
         interval = SCHEDULE_CONFIG.get('check_interval_minutes', 15)
@@ -125,6 +169,27 @@ def main():
             timezone='America/Sao_Paulo'
         )
 
+        # Índice local de posts publicados (alimenta data/internal_links.json)
+        if POST_INDEX_REFRESH_MINUTES > 0:
+            scheduler.add_job(
+                refresh_post_index,
+                'interval',
+                minutes=POST_INDEX_REFRESH_MINUTES,
+                next_run_time=datetime.now(timezone.utc),
+            )
+
+        # Retenção do cache de páginas de origem (corpus do app.bench extract)
+        if PAGE_CACHE_ENABLED:
+            scheduler.add_job(purge_page_cache, 'interval', hours=24)
+
+        # Janela do índice de histórias quase duplicadas
+        if DEDUP_ENABLED:
+            scheduler.add_job(purge_story_signatures, 'interval', hours=6)
+
+        # Fontes publicadas que mudaram: atualização incremental do post
+        if REVALIDATION_ENABLED:
+            scheduler.add_job(revalidate_published_sources, 'interval', minutes=REVALIDATION_INTERVAL_MINUTES)
+
         logger.info("Pressione Ctrl+C para sair.")
         try:
             scheduler.start()
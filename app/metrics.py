@@ -0,0 +1,385 @@
+"""
+Métricas do processo do pipeline, no formato texto do Prometheus.
+
+`dashboard_server.py`/`dashboard.py` reconstroem o estado relendo os JSONL de
+tokens e consultando `data/app.db` a cada requisição; o processo do pipeline
+em si não expunha nada. Aqui um registro em memória com contadores, gauges e
+histogramas é atualizado no ponto onde cada evento acontece e servido em
+`http://METRICS_HOST:METRICS_PORT/metrics` (thread daemon, `http.server`):
+
+- `pipeline_queue_depth`: tamanho da fila de artigos;
+- `pipeline_article_status_total{status}`: transições de status gravadas;
+- `ai_key_cooldown_seconds{key}`: cooldown restante de cada chave;
+- `ai_tokens_total{kind}` e `ai_tokens_last_minute`;
+- `pipeline_stage_seconds{stage}`: histograma das etapas (spans do tracing);
+- `wordpress_responses_total{endpoint,code}`: respostas da API REST
+  (taxa de erro = 5xx / total).
+
+Gauges de estado vivo (fila, cooldowns) são lidos na hora da coleta
+(`Gauge.set_function`): cada scrape é O(1) sobre o estado em memória, sem
+arquivo nem banco. `METRICS_PORT=0` desliga o servidor (o registro continua
+sendo atualizado, é barato).
+"""
+
+import abc
+import bisect
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRICS_PORT = int(os.getenv('METRICS_PORT', 9108))
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List['Metric'] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: 'Metric'):
+        with self._lock:
+            if any(m.name == metric.name for m in self._metrics):
+                raise ValueError(f"Métrica '{metric.name}' já registrada")
+            self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            metrics = list(self._metrics)
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                logger.warning(f"METRICS: falha ao coletar {metric.name}: {e}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class Metric(abc.ABC):
+    type_name = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: Registry = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[LabelValues, object] = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    @abc.abstractmethod
+    def _new_child(self):
+        """Valor de uma combinação de labels (criado no primeiro `labels(...)`)."""
+
+    def labels(self, *values, **kwargs):
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(v) for v in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name}: esperava labels {self.labelnames}")
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} tem labels; use .labels(...)")
+        return self.labels()
+
+    @abc.abstractmethod
+    def _samples(self) -> Iterable[Tuple[str, LabelValues, str, float]]:
+        """(sufixo, valores dos labels, label extra, valor)."""
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type_name}']
+        for suffix, values, extra, value in self._samples():
+            lines.append(f'{self.name}{suffix}{_format_labels(self.labelnames, values, extra)} {_format_value(value)}')
+        return lines
+
+
+class _Value:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.inc(-amount)
+
+    def set(self, value: float):
+        self.value = float(value)
+
+
+class Counter(Metric):
+    type_name = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1):
+        if amount < 0:
+            raise ValueError("Contadores só aumentam")
+        self._default().inc(amount)
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            yield '', values, '', child.value
+
+
+class Gauge(Metric):
+    type_name = 'gauge'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._function: Optional[Callable[[], object]] = None
+
+    def _new_child(self):
+        return _Value()
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def inc(self, amount: float = 1):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1):
+        self._default().dec(amount)
+
+    def set_function(self, function: Callable[[], object]):
+        """
+        Valor lido na coleta. Sem labels, `function` retorna um número; com
+        labels, um iterável de (valores dos labels, número).
+        """
+        self._function = function
+
+    def _samples(self):
+        if self._function is not None:
+            result = self._function()
+            if self.labelnames:
+                for values, value in result:
+                    yield '', tuple(str(v) for v in values), '', value
+            else:
+                yield '', (), '', result
+            return
+        for values, child in list(self._children.items()):
+            yield '', values, '', child.value
+
+
+class _HistogramValue:
+    __slots__ = ('buckets', 'counts', 'sum', '_lock')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Histogram(Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Registry = REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                yield '_bucket', values, f'le="{_format_value(bound)}"', cumulative
+            yield '_sum', values, '', total
+            yield '_count', values, '', cumulative
+
+
+class RollingSum:
+    """Soma dos valores adicionados nos últimos `window` segundos."""
+
+    def __init__(self, window: float = 60.0):
+        self.window = window
+        self._events: deque = deque()
+        self._total = 0.0
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float):
+        while self._events and self._events[0][0] <= now - self.window:
+            self._total -= self._events.popleft()[1]
+
+    def add(self, value: float, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._events.append((now, value))
+            self._total += value
+            self._trim(now)
+
+    def value(self, now: Optional[float] = None) -> float:
+        with self._lock:
+            self._trim(time.monotonic() if now is None else now)
+            return self._total
+
+
+# --- métricas do pipeline ---------------------------------------------------
+
+QUEUE_DEPTH = Gauge('pipeline_queue_depth', 'Artigos aguardando na fila do pipeline.')
+ARTICLE_STATUS = Counter(
+    'pipeline_article_status_total', 'Transições de status de artigos gravadas no banco.', ['status']
+)
+STAGE_SECONDS = Histogram('pipeline_stage_seconds', 'Duração das etapas por artigo (spans do tracing).', ['stage'])
+AI_KEY_COOLDOWN = Gauge('ai_key_cooldown_seconds', 'Segundos até a chave sair do cooldown (0 = pronta).', ['key'])
+AI_TOKENS = Counter('ai_tokens_total', 'Tokens consumidos na API de IA.', ['kind'])
+AI_TOKENS_LAST_MINUTE = Gauge('ai_tokens_last_minute', 'Tokens consumidos nos últimos 60 segundos.')
+WORDPRESS_RESPONSES = Counter(
+    'wordpress_responses_total', 'Respostas da API REST do WordPress por endpoint e código.', ['endpoint', 'code']
+)
+
+_tokens_window = RollingSum(60.0)
+AI_TOKENS_LAST_MINUTE.set_function(_tokens_window.value)
+
+
+_key_pools: 'weakref.WeakSet' = weakref.WeakSet()
+
+
+def track_key_pool(pool):
+    """Registra um `KeyPool` para o gauge de cooldown (lido na coleta)."""
+    _key_pools.add(pool)
+
+
+def _key_cooldowns():
+    now = time.monotonic()
+    remaining: Dict[str, float] = {}
+    for pool in list(_key_pools):
+        for slot in list(pool.slots):
+            label = f"****{slot.key[-4:]}"
+            remaining[label] = max(remaining.get(label, 0.0), slot.cooldown_until - now, 0.0)
+    return [((label,), value) for label, value in sorted(remaining.items())]
+
+
+AI_KEY_COOLDOWN.set_function(_key_cooldowns)
+
+
+def observe_tokens(prompt_tokens: int, completion_tokens: int):
+    AI_TOKENS.labels(kind='prompt').inc(prompt_tokens)
+    AI_TOKENS.labels(kind='completion').inc(completion_tokens)
+    _tokens_window.add(prompt_tokens + completion_tokens)
+
+
+def wordpress_endpoint(url: str) -> str:
+    """'posts', 'media', 'tags'... a partir da URL da API (ids numéricos viram ':id')."""
+    path = url.split('?', 1)[0]
+    if '/wp/v2/' in path:
+        path = path.split('/wp/v2/', 1)[1]
+    elif '/wp-json/' in path:
+        path = path.split('/wp-json/', 1)[1]
+    segments = [':id' if s.isdigit() else s for s in path.strip('/').split('/') if s]
+    return '/'.join(segments[:2]) or 'root'
+
+
+def count_wordpress_response(response, *args, **kwargs):
+    """Hook de resposta do `requests.Session` do WordPressClient."""
+    try:
+        WORDPRESS_RESPONSES.labels(endpoint=wordpress_endpoint(response.url), code=str(response.status_code)).inc()
+    except Exception as e:
+        logger.debug(f"METRICS: resposta do WordPress não contabilizada: {e}")
+    return response
+
+
+# --- servidor HTTP ----------------------------------------------------------
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: Registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"METRICS HTTP: {format % args}")
+
+
+_server: Optional[ThreadingHTTPServer] = None
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = METRICS_HOST) -> Optional[ThreadingHTTPServer]:
+    """Sobe o endpoint /metrics numa thread daemon (uma vez por processo)."""
+    global _server
+    if _server is not None or port <= 0:
+        return _server
+    try:
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logger.warning(f"METRICS: não foi possível abrir {host}:{port}: {e}")
+        return None
+    _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, name='metrics-http', daemon=True).start()
+    logger.info(f"METRICS: servindo http://{host}:{_server.server_address[1]}/metrics")
+    return _server
+
+
+def stop_metrics_server():
+    global _server
+    if _server is not None:
+        _server.shutdown()
+        _server.server_close()
+        _server = None
@@ -0,0 +1,219 @@
+"""
+Cache local das páginas de origem baixadas pelo ContentExtractor (SQLite).
+
+Cada nova tentativa de um artigo que falhou chamava `_fetch_html` de novo, e
+não havia como rodar o extrator outra vez sobre o HTML exato que falhou. Este
+cache guarda o HTML bruto comprimido em `data/page_cache.db`:
+
+- `blobs` é endereçado por conteúdo (sha256 do HTML): a mesma página
+  servida em URLs diferentes (AMP, ?utm=...) ocupa espaço uma vez só;
+- `pages` liga cada URL ao blob e à hora do download, e guarda em `stopped`
+  onde o download em streaming parou ('body' | 'max_bytes'; NULL = página
+  inteira) — um prefixo não serve para quem precisa da página completa
+  (`get(..., complete_only=True)`), e o bench separa as duas coisas;
+- `_fetch_html` consulta o cache antes da rede; entradas mais velhas que
+  `PAGE_CACHE_TTL_HOURS` são baixadas de novo;
+- as páginas ficam guardadas por `PAGE_CACHE_RETENTION_DAYS` e servem de
+  corpus para `python -m app.bench extract` (benchmark e regressão dos
+  limpadores).
+
+Compressão com zstandard quando instalado; caso contrário, zlib. O codec fica
+registrado por blob, então os dois convivem no mesmo banco.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+from urllib.parse import urlparse
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+PAGE_CACHE_ENABLED = os.getenv('PAGE_CACHE_ENABLED', 'true').lower() == 'true'
+PAGE_CACHE_DB_PATH = os.getenv('PAGE_CACHE_DB_PATH', 'data/page_cache.db')
+PAGE_CACHE_TTL_HOURS = float(os.getenv('PAGE_CACHE_TTL_HOURS', 6))
+PAGE_CACHE_RETENTION_DAYS = float(os.getenv('PAGE_CACHE_RETENTION_DAYS', 14))
+
+_ZSTD_LEVEL = 10
+_ZLIB_LEVEL = 6
+
+
+def _compress(data: bytes) -> Tuple[str, bytes]:
+    if zstandard is not None:
+        return 'zstd', zstandard.ZstdCompressor(level=_ZSTD_LEVEL).compress(data)
+    return 'zlib', zlib.compress(data, _ZLIB_LEVEL)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Blob comprimido com zstd, mas zstandard não está instalado")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    raise ValueError(f"Codec desconhecido no cache de páginas: {codec}")
+
+
+def _domain(url: str) -> str:
+    return (urlparse(url).hostname or '').lower().replace('www.', '')
+
+
+class PageCache:
+    """HTML bruto das páginas de origem, comprimido e endereçado por conteúdo."""
+
+    def __init__(
+        self,
+        db_path: str = PAGE_CACHE_DB_PATH,
+        ttl_s: float = PAGE_CACHE_TTL_HOURS * 3600,
+        retention_s: float = PAGE_CACHE_RETENTION_DAYS * 86400,
+    ):
+        self.db_path = db_path
+        self.ttl_s = ttl_s
+        self.retention_s = retention_s
+        self.conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Abre o banco só no primeiro uso: instanciar o extrator não cria arquivos
+        if self.conn is None:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+            self.conn.row_factory = sqlite3.Row
+            with self.conn:
+                self.conn.executescript("""
+                    CREATE TABLE IF NOT EXISTS blobs (
+                        sha256 TEXT PRIMARY KEY,
+                        codec TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        data BLOB NOT NULL
+                    );
+                    CREATE TABLE IF NOT EXISTS pages (
+                        url TEXT PRIMARY KEY,
+                        domain TEXT NOT NULL,
+                        sha256 TEXT NOT NULL REFERENCES blobs(sha256),
+                        fetched_at REAL NOT NULL,
+                        stopped TEXT
+                    );
+                    CREATE INDEX IF NOT EXISTS idx_pages_domain ON pages(domain);
+                    CREATE INDEX IF NOT EXISTS idx_pages_fetched ON pages(fetched_at);
+                """)
+                columns = {row['name'] for row in self.conn.execute("PRAGMA table_info(pages)")}
+                if 'stopped' not in columns:
+                    # Bancos anteriores à coluna: as entradas antigas ficam como página inteira
+                    self.conn.execute("ALTER TABLE pages ADD COLUMN stopped TEXT")
+        return self.conn
+
+    def close(self):
+        with self._lock:
+            if self.conn:
+                self.conn.close()
+                self.conn = None
+
+    def get(self, url: str, max_age_s: Optional[float] = None, complete_only: bool = False) -> Optional[str]:
+        """
+        HTML da URL se foi baixado há menos de `max_age_s` (padrão: o TTL).
+        Com `complete_only`, ignora entradas cujo download parou antes do fim.
+        """
+        max_age_s = self.ttl_s if max_age_s is None else max_age_s
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT b.codec, b.data, p.fetched_at, p.stopped FROM pages p JOIN blobs b ON b.sha256 = p.sha256 "
+                "WHERE p.url = ?",
+                (url,),
+            ).fetchone()
+        if not row or time.time() - row['fetched_at'] > max_age_s:
+            return None
+        if complete_only and row['stopped']:
+            return None
+        try:
+            return _decompress(row['codec'], row['data']).decode('utf-8')
+        except Exception as e:
+            logger.warning(f"PAGE CACHE: entrada ilegível para {url}: {e}")
+            return None
+
+    def put(self, url: str, html: str, fetched_at: Optional[float] = None, stopped: Optional[str] = None):
+        """Guarda o HTML da URL; `stopped` é o motivo da parada do streaming (None = página inteira)."""
+        raw = html.encode('utf-8')
+        digest = hashlib.sha256(raw).hexdigest()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                exists = conn.execute("SELECT 1 FROM blobs WHERE sha256 = ?", (digest,)).fetchone()
+                if not exists:
+                    codec, data = _compress(raw)
+                    conn.execute(
+                        "INSERT INTO blobs (sha256, codec, size, data) VALUES (?, ?, ?, ?)",
+                        (digest, codec, len(raw), data),
+                    )
+                conn.execute(
+                    "INSERT INTO pages (url, domain, sha256, fetched_at, stopped) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(url) DO UPDATE SET sha256 = excluded.sha256, fetched_at = excluded.fetched_at, "
+                    "stopped = excluded.stopped",
+                    (url, _domain(url), digest, fetched_at if fetched_at is not None else time.time(), stopped),
+                )
+
+    def iter_pages(self, domain: Optional[str] = None) -> Iterator[Tuple[str, str, str, Optional[str]]]:
+        """(url, domínio, html, stopped) de todas as páginas guardadas, para replay."""
+        query = "SELECT p.url, p.domain, p.stopped, b.codec, b.data FROM pages p JOIN blobs b ON b.sha256 = p.sha256"
+        params: tuple = ()
+        if domain:
+            query += " WHERE p.domain = ?"
+            params = (domain,)
+        with self._lock:
+            rows = self._connect().execute(query + " ORDER BY p.domain, p.url", params).fetchall()
+        for row in rows:
+            try:
+                yield row['url'], row['domain'], _decompress(row['codec'], row['data']).decode('utf-8'), row['stopped']
+            except Exception as e:
+                logger.warning(f"PAGE CACHE: ignorando entrada ilegível {row['url']}: {e}")
+
+    def purge(self, older_than_s: Optional[float] = None) -> int:
+        """Remove páginas além da retenção e os blobs que ficaram sem referência."""
+        cutoff = time.time() - (self.retention_s if older_than_s is None else older_than_s)
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                removed = conn.execute("DELETE FROM pages WHERE fetched_at < ?", (cutoff,)).rowcount
+                conn.execute("DELETE FROM blobs WHERE sha256 NOT IN (SELECT sha256 FROM pages)")
+        if removed:
+            logger.info(f"PAGE CACHE: {removed} páginas antigas removidas")
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT (SELECT COUNT(*) FROM pages) AS pages, COUNT(*) AS blobs, "
+                "COALESCE(SUM(size), 0) AS raw_bytes, COALESCE(SUM(LENGTH(data)), 0) AS stored_bytes FROM blobs"
+            ).fetchone()
+        return dict(row)
+
+
+_cache: Optional[PageCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_page_cache() -> Optional[PageCache]:
+    """Instância única do processo (None se PAGE_CACHE_ENABLED=false)."""
+    global _cache
+    if not PAGE_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = PageCache()
+        return _cache
+
+
+def purge_page_cache() -> int:
+    """Job do agendador: aplica a retenção ao cache de páginas."""
+    cache = get_page_cache()
+    return cache.purge() if cache else 0
@@ -2,10 +2,8 @@
 import logging
 import time
 import json
-import re
 import os
 import threading
-from pathlib import Path
 from urllib.parse import urlparse
 from typing import Dict, Any, Optional, List
 
@@ -27,26 +25,51 @@ from .seo_title_optimizer import optimize_title
 from .title_validator import TitleValidator
 from .html_utils import (
     unescape_html_content,
-    validate_and_fix_figures,
-    merge_images_into_content,
-    rewrite_img_srcs_with_wp,
-    strip_credits_and_normalize_youtube,
+    fix_malformed_img_src,
+    validate_and_fix_figures_soup,
+    merge_images_into_content_soup,
+    rewrite_img_srcs_soup,
+    strip_credits_and_normalize_youtube_soup,
     remove_broken_image_placeholders,
     strip_naked_internal_links,
     remove_source_domain_schemas,
     strip_forbidden_cta_sentences,
+    scan_forbidden_cta,
     detect_forbidden_cta,
     html_to_gutenberg_blocks,
 )
-from .internal_linking import add_internal_links
+from .internal_linking import add_internal_links_soup, CompiledLinkMap
+from .document import Document
+from .cta_engine import CTA_ENGINE_ENABLED, legacy_pipeline_layers
+from .link_map_service import get_link_map_service
+from .body_images import (
+    BODY_IMAGES_UPLOAD,
+    collect_body_image_urls,
+    upload_body_images,
+    threadlocal_uploader,
+    schedule_body_image_patch,
+)
+from .related_index import (
+    RelatedIndex,
+    RELATED_LINKS_ENABLED,
+    READ_ALSO_ENABLED,
+    build_read_also_block,
+)
 from .task_queue import ArticleQueue
-from bs4 import BeautifulSoup
-from .cleaners import clean_html_for_globo_esporte
+from .extraction_pool import get_extraction_pool, EXTRACTION_TIMEOUT_S
+from .image_candidates import image_candidate
+from .dedup import DEDUP_ENABLED, StoryDeduplicator
+from .revalidation import REVALIDATION_ENABLED, record_published_source
+from . import regexes as rx
+from . import metrics, token_ledger, tracing
+from .background_writer import write_artifact
+from .token_budget import TOKEN_BUDGET_ENABLED, get_budget
 
 logger = logging.getLogger(__name__)
 
 # --- Global instances ---
 article_queue = ArticleQueue()
+metrics.QUEUE_DEPTH.set_function(lambda: len(article_queue))
 ai_processor = AIProcessor()
 
 # --- Environment variables for pipeline control ---
@@ -56,10 +79,6 @@ ARTICLE_SLEEP_S = int(os.getenv('ARTICLE_SLEEP_S', 120))  # 2 minutos entre cicl
 BETWEEN_BATCH_DELAY_S = int(os.getenv('BETWEEN_BATCH_DELAY_S', 30))  # 30s entre batches (rápido)
 BETWEEN_PUBLISH_DELAY_S = int(os.getenv('BETWEEN_PUBLISH_DELAY_S', 30))  # 30s entre publicações
 
-CLEANER_FUNCTIONS = {
-    'globo.com': clean_html_for_globo_esporte,
-}
-
 def _get_article_url(article_data: Dict[str, Any]) -> Optional[str]:
     """Get article URL from various possible fields."""
     url = article_data.get("url") or article_data.get("link") or article_data.get("id")
@@ -73,36 +92,46 @@ def _get_article_url(article_data: Dict[str, Any]) -> Optional[str]:
         return None
     return None
 
-BAD_HOSTS = {"sb.scorecardresearch.com", "securepubads.g.doubleclick.net"}
-IMG_EXTS = (".jpg", ".jpeg", ".png", ".webp", ".gif")
+def _new_wp_client() -> WordPressClient:
+    """Cria um WordPressClient independente (uploads em threads e patches em background)."""
+    return WordPressClient(config=WORDPRESS_CONFIG, categories_map=WORDPRESS_CATEGORIES)
+
 
 def is_valid_upload_candidate(url: str) -> bool:
     """Check if a URL points to a valid image for upload."""
-    if not url:
-        return False
+    # Mesmo registro memoizado usado pelo extrator (image_candidates)
+    return bool(url) and image_candidate(url).valid_for_upload
+
+def _is_near_duplicate(
+    deduplicator: StoryDeduplicator,
+    db: Database,
+    art: Dict[str, Any],
+    extracted: Dict[str, Any],
+) -> bool:
+    """Marca como DUPLICATE (sem gastar IA) se a história já foi publicada."""
     try:
-        lower_url = url.lower()
-        p = urlparse(lower_url)
-        
-        if not p.scheme.startswith("http"):
-            return False
-        if p.netloc in BAD_HOSTS:
-            return False
-        if not p.path.endswith(IMG_EXTS):
-            return False
-        
-        if "author" in lower_url or "avatar" in lower_url:
-            return False
-            
-        dims = re.findall(r'[?&](?:w|width|h|height)=(\d+)', lower_url)
-        if any(int(d) <= 100 for d in dims):
-            return False
-            
-        return True
-    except Exception:
+        match = deduplicator.check_and_add(art, f"{extracted.get('title', '')} {extracted.get('content', '')}")
+    except Exception as e:
+        logger.warning(f"DEDUP: falha ao verificar {art['url']}: {e}")
         return False
-
-def process_batch(articles: List[Dict[str, Any]], link_map: Dict[str, Any]):
+    if not match:
+        return False
+    logger.info(
+        f"DEDUP: '{art['title']}' é {match['similarity']:.0%} parecido com '{match['title']}' "
+        f"({match['source_id']}, publicado); pulando a IA."
+    )
+    db.update_article_status(
+        art['db_id'], 'DUPLICATE',
+        reason=f"Near-duplicate of article {match['seen_article_id']} ({match['similarity']:.2f})",
+    )
+    return True
+
+
+def process_batch(
+    articles: List[Dict[str, Any]],
+    link_map: Optional[CompiledLinkMap],
+    related_index: Optional[RelatedIndex] = None,
+):
     """Process a batch of articles."""
     if not articles:
         return
@@ -112,8 +141,13 @@ def process_batch(articles: List[Dict[str, Any]], link_map: Dict[str, Any]):
     wp_client = WordPressClient(config=WORDPRESS_CONFIG, categories_map=WORDPRESS_CATEGORIES)
 
     try:
-        # Extract content for all articles first
-        extracted_articles = []
+        # Baixa todos os artigos e submete a extração ao pool de processos logo em
+        # seguida: enquanto um artigo espera a IA, os próximos já estão sendo extraídos.
+        extraction_pool = get_extraction_pool()
+        deduplicator = StoryDeduplicator(db.conn) if DEDUP_ENABLED else None
+        pending_extractions = []
+        # db_id -> perf_counter() do fim da extração (para o span 'extract')
+        extraction_done_at: Dict[int, float] = {}
         for article_data in articles:
             article_db_id = article_data['db_id']
             source_id = article_data['source_id']
@@ -130,6 +164,7 @@ def process_batch(articles: List[Dict[str, Any]], link_map: Dict[str, Any]):
                 logger.info(f"Processing article: {article_data.get('title', 'N/A')} (DB ID: {article_db_id}) from {source_id}")
                 logger.info(f"  Original URL: {article_url}")
                 db.update_article_status(article_db_id, 'PROCESSING')
+                tracing.set_article(article_db_id)
 
                 # Extract content
                 html_content = extractor._fetch_html(article_url)
@@ -137,40 +172,53 @@ def process_batch(articles: List[Dict[str, Any]], link_map: Dict[str, Any]):
                     db.update_article_status(article_db_id, 'FAILED', reason="Failed to fetch HTML")
                     continue
 
-                # Apply cleaners if needed
-                soup = BeautifulSoup(html_content, 'lxml')
-                domain = urlparse(article_url).netloc.lower()
-                for cleaner_domain, cleaner_func in CLEANER_FUNCTIONS.items():
-                    if cleaner_domain in domain:
-                        soup = cleaner_func(soup)
-                        logger.info(f"Applied cleaner for {cleaner_domain}")
-                        break
-
-                # Extract data
-                extracted_data = extractor.extract(str(soup), url=article_url)
-                if not extracted_data or not extracted_data.get('content'):
-                    logger.warning(f"Failed to extract content from {article_url}")
-                    db.update_article_status(article_db_id, 'FAILED', reason="Extraction failed")
-                    continue
-
-                # Add to batch
-                extracted_articles.append({
-                    'db_id': article_db_id,
-                    'url': article_url,
-                    'source_id': source_id,
-                    'category': category,
-                    'extracted': extracted_data,
-                    'feed_config': feed_config,
-                    'title': article_data.get('title', '')
-                })
+                submitted_at = time.perf_counter()
+                future = extraction_pool.submit(html_content, article_url)
+                future.add_done_callback(
+                    lambda _f, key=article_db_id: extraction_done_at.__setitem__(key, time.perf_counter())
+                )
+                pending_extractions.append((
+                    {
+                        'db_id': article_db_id,
+                        'url': article_url,
+                        'source_id': source_id,
+                        'category': category,
+                        'feed_config': feed_config,
+                        'title': article_data.get('title', ''),
+                        'submitted_at': submitted_at,
+                    },
+                    future,
+                ))
 
             except Exception as e:
                 logger.error(f"Error extracting article {article_data.get('title', 'N/A')}: {e}", exc_info=True)
                 db.update_article_status(article_db_id, 'FAILED', reason=str(e))
 
+        def _iter_extracted_articles():
+            """Entrega os artigos na ordem do lote, à medida que a extração termina."""
+            for art, future in pending_extractions:
+                tracing.set_article(art['db_id'])
+                try:
+                    # 'extract.wait': quanto o pipeline ficou parado esperando; 'extract': fila + extração no pool
+                    with tracing.span('extract.wait'):
+                        extracted_data = future.result(timeout=EXTRACTION_TIMEOUT_S)
+                    tracing.record('extract', extraction_done_at.get(art['db_id'], time.perf_counter()) - art['submitted_at'])
+                except Exception as e:
+                    logger.error(f"Error extracting article {art['title'] or 'N/A'}: {e}", exc_info=True)
+                    db.update_article_status(art['db_id'], 'FAILED', reason=str(e) or type(e).__name__)
+                    continue
+                if not extracted_data or not extracted_data.get('content'):
+                    logger.warning(f"Failed to extract content from {art['url']}")
+                    db.update_article_status(art['db_id'], 'FAILED', reason="Extraction failed")
+                    continue
+                if deduplicator is not None and _is_near_duplicate(deduplicator, db, art, extracted_data):
+                    continue
+                art['extracted'] = extracted_data
+                yield art
+
         # Process all extracted articles individually via AI (batch size 1)
         batch_count = 0
-        for batch in [extracted_articles[i:i+1] for i in range(0, len(extracted_articles), 1)]:
+        for batch in ([art] for art in _iter_extracted_articles()):
             # Aguardar entre batches para garantir qualidade SEO
             if batch_count > 0:
                 logger.info(f"Aguardando {BETWEEN_BATCH_DELAY_S}s entre batches (garantindo processamento de qualidade)...")
@@ -196,12 +244,16 @@ def process_batch(articles: List[Dict[str, Any]], link_map: Dict[str, Any]):
                 })
 
             try:
-                # Process all articles in batch with one API call
-                batch_results = ai_processor.rewrite_batch(batch_data)
+                # Process all articles in batch with one API call (span no primeiro artigo do lote)
+                tracing.set_article(batch[0]['db_id'])
+                with tracing.span('ai'):
+                    batch_results = ai_processor.rewrite_batch(batch_data)
                 batch_count += 1
 
                 # Process results in same order
                 for art_data, (rewritten_data, failure_reason) in zip(batch, batch_results):
+                    tracing.set_article(art_data['db_id'])
+                    postprocess_span = None
                     try:
                         if not rewritten_data:
                             reason = failure_reason or "AI processing failed"
@@ -211,6 +263,7 @@ def process_batch(articles: List[Dict[str, Any]], link_map: Dict[str, Any]):
                             continue
 
                         # Process content
+                        postprocess_span = tracing.start_span('postprocess')
                         raw_content_html = rewritten_data.get("conteudo_final", "").strip()
                         title = rewritten_data.get("titulo_final", "").strip()
 
@@ -220,95 +273,40 @@ def process_batch(articles: List[Dict[str, Any]], link_map: Dict[str, Any]):
 
                         cta_removal_log = []
 
-                        raw_cta_match = detect_forbidden_cta(raw_content_html)
-                        if raw_cta_match:
-                            logger.error(f"🚨 CTA detectado na resposta bruta da IA: {raw_cta_match}")
-                            cta_removal_log.append(f"RAW: {raw_cta_match}")
-
-                        content_html, preclean_removed = strip_forbidden_cta_sentences(raw_content_html)
-                        if preclean_removed:
-                            logger.info("✅ CTA removido no pré-processamento (strip_forbidden_cta_sentences)")
-                            cta_removal_log.append("PRE: strip_forbidden_cta_sentences")
+                        original_html = raw_content_html
+                        if CTA_ENGINE_ENABLED:
+                            # Detecção + remoção (blocos e parágrafos) numa passada sobre a árvore
+                            cta_scan = scan_forbidden_cta(Document(raw_content_html), paragraphs=True)
+                            if cta_scan.label:
+                                logger.error(f"🚨 CTA detectado na resposta bruta da IA: {cta_scan.label}")
+                                cta_removal_log.append(f"RAW: {cta_scan.label}")
+                            if cta_scan.removed:
+                                logger.info(f"✅ CTA removido: {len(cta_scan.removed)} blocos")
+                                cta_removal_log.extend(cta_scan.removed)
+                                content_html = cta_scan.html
+                            else:
+                                content_html = raw_content_html
                         else:
-                            content_html = raw_content_html
+                            raw_doc = Document(raw_content_html)
+                            raw_cta_match = detect_forbidden_cta(raw_doc)
+                            if raw_cta_match:
+                                logger.error(f"🚨 CTA detectado na resposta bruta da IA: {raw_cta_match}")
+                                cta_removal_log.append(f"RAW: {raw_cta_match}")
+
+                            content_html, preclean_removed = strip_forbidden_cta_sentences(raw_doc)
+                            if preclean_removed:
+                                logger.info("✅ CTA removido no pré-processamento (strip_forbidden_cta_sentences)")
+                                cta_removal_log.append("PRE: strip_forbidden_cta_sentences")
+                            else:
+                                content_html = raw_content_html
+
+                            # Camadas literais/regex no HTML bruto
+                            content_html, layers_log = legacy_pipeline_layers(content_html)
+                            cta_removal_log.extend(layers_log)
 
-                        # 🚨 NUCLEAR LIMPEZA: Remover "Thank you for reading..." DEFINITIVAMENTE
-                        original_html = raw_content_html
-                        
-                        # CAMADA 1: Remover a frase EXATA (literal search)
-                        nuclear_phrases = [
-                            "Thank you for reading this post, don't forget to subscribe!",
-                            "thank you for reading this post, don't forget to subscribe!",
-                            "Thank you for reading this post, don't forget to subscribe",
-                            "thank you for reading this post, don't forget to subscribe",
-                        ]
-                        
-                        for phrase in nuclear_phrases:
-                            if phrase in content_html:
-                                logger.error(f"🔥 LAYER 1 (LITERAL): CTA encontrado: '{phrase[:50]}...'")
-                                cta_removal_log.append(f"LITERAL: {phrase[:60]}")
-                                content_html = content_html.replace(phrase, "")
-                                logger.info("✅ Removido com sucesso")
-
-                        # CAMADA 1.5: Remover variações com formatação inline ou apóstrofos diferentes
-                        cta_sentence_patterns = [
-                            r"(?is)(?:<p[^>]*>\s*)?(?:<[^>]+>\s*)*thank\s+you\s+for\s+reading(?:\s|&nbsp;|<[^>]+>)*?(?:this\s+post)?(?:\s|&nbsp;|<[^>]+>)*?don['’]t\s+forget\s+to\s+subscribe(?:\s|&nbsp;|<[^>]+>)*?(?:</p>)?",
-                            r"(?is)(?:<p[^>]*>\s*)?(?:<[^>]+>\s*)*thanks\s+for\s+reading(?:\s|&nbsp;|<[^>]+>)*?(?:this\s+post)?(?:\s|&nbsp;|<[^>]+>)*?don['’]t\s+forget\s+to\s+subscribe(?:\s|&nbsp;|<[^>]+>)*?(?:</p>)?",
-                            r"(?is)thank\s+you\s+for\s+reading[^<\n\r]*don['’]t\s+forget\s+to\s+subscribe[^<\n\r]*",
-                        ]
-
-                        for pattern in cta_sentence_patterns:
-                            content_html, removed_count = re.subn(pattern, '', content_html)
-                            if removed_count:
-                                logger.error("🔥 LAYER 1.5 (SENTENCE REGEX): CTA removido via regex flexível")
-                                cta_removal_log.append(f"SENTENCE_PATTERN: {pattern[:40]}...")
-
-                        # CAMADA 2: Remover parágrafos INTEIROS que contêm padrões de CTA
-                        cta_patterns = [
-                            r'<p[^>]*>.*?thank you for reading this post.*?don\'t forget to subscribe.*?</p>',
-                            r'<p[^>]*>.*?thank you for reading.*?don\'t forget.*?</p>',
-                            r'<p[^>]*>.*?thank you for reading.*?</p>',
-                            r'<p[^>]*>.*?thanks for reading.*?</p>',
-                            r'<p[^>]*>.*?thanks for visiting.*?</p>',
-                            r'<p[^>]*>.*?don\'t forget to subscribe.*?</p>',
-                            r'<p[^>]*>.*?subscribe now.*?</p>',
-                            r'<p[^>]*>.*?please subscribe.*?</p>',
-                            r'<p[^>]*>.*?subscribe to our.*?</p>',
-                            r'<p[^>]*>.*?stay tuned.*?</p>',
-                            r'<p[^>]*>.*?follow us.*?</p>',
-                            r'<p[^>]*>.*?if you enjoyed.*?</p>',
-                            r'<p[^>]*>.*?found this helpful.*?</p>',
-                            r'<p[^>]*>.*?click here.*?</p>',
-                            r'<p[^>]*>.*?read more.*?</p>',
-                            r'<p[^>]*>.*?sign up.*?</p>',
-                            r'<p[^>]*>.*?obrigado por ler.*?</p>',
-                            r'<p[^>]*>.*?obrigada por ler.*?</p>',
-                            r'<p[^>]*>.*?não esqueça de se inscrever.*?</p>',
-                            r'<p[^>]*>.*?se inscreva.*?</p>',
-                            r'<p[^>]*>.*?clique aqui.*?</p>',
-                            r'<p[^>]*>.*?leia mais.*?</p>',
-                            r'<p[^>]*>.*?cadastre-se.*?</p>',
-                            r'<p[^>]*>.*?fique atento.*?</p>',
-                            r'<p[^>]*>.*?nos siga.*?</p>',
-                            r'<p[^>]*>.*?mantenha-se atualizado.*?</p>',
-                            r'<p[^>]*>.*?este artigo foi.*?</p>',
-                            r'<p[^>]*>.*?se você gostou.*?</p>',
-                        ]
-                        
-                        for pattern in cta_patterns:
-                            original_length = len(content_html)
-                            matches = re.findall(pattern, content_html, flags=re.IGNORECASE | re.DOTALL)
-                            if matches:
-                                logger.debug(f"REGEX: Encontrado {len(matches)} paragrafos com CTA")
-                                for match in matches[:2]:  # Log dos 2 primeiros matches
-                                    cta_removal_log.append(f"REGEX: {match[:80]}")
-                            content_html = re.sub(pattern, '', content_html, flags=re.IGNORECASE | re.DOTALL)
-                            if len(content_html) < original_length:
-                                logger.debug(f"REMOVIDO: Paragrafo com CTA via regex")
-                        
                         # CAMADA 3: Remover tags vazias deixadas para trás
-                        content_html = re.sub(r'<(p|div|span|article)[^>]*>\s*</\1>', '', content_html, flags=re.IGNORECASE)
-                        content_html = re.sub(r'<p[^>]*>\s*<br[^>]*>\s*</p>', '', content_html, flags=re.IGNORECASE)
+                        content_html = rx.EMPTY_BLOCK_TAG.sub('', content_html)
+                        content_html = rx.EMPTY_BR_PARAGRAPH.sub('', content_html)
                         
                         # CAMADA 4: Verificação FINAL - se ainda houver "thank you", REJEITA
                         if 'thank you for reading' in content_html.lower():
@@ -334,10 +332,9 @@ def process_batch(articles: List[Dict[str, Any]], link_map: Dict[str, Any]):
                                 1) Tenta cortar em separadores (":", "-", "–", "—")
                                 2) Se ainda estiver longo, corta sem quebrar palavras e adiciona reticências
                                 """
-                                import re
                                 if len(t) <= max_len:
                                     return t
-                                parts = re.split(r'[:\-–—]\s*', t)
+                                parts = rx.TITLE_SEPARATORS.split(t)
                                 for p in parts:
                                     if len(p) <= max_len:
                                         return p.strip()
@@ -388,18 +385,26 @@ def process_batch(articles: List[Dict[str, Any]], link_map: Dict[str, Any]):
                         
                         # IMPORTANTE: Desescapar HTML que pode ter vindo escapado da IA
                         content_html = unescape_html_content(content_html)
-                        
+
+                        # Limpezas textuais (regex) antes do parse único
+                        content_html = fix_malformed_img_src(content_html)
+                        content_html = remove_broken_image_placeholders(content_html)
+                        content_html = strip_naked_internal_links(content_html)
+                        # Remove schemas JSON-LD originais do domínio fonte (evita conflito de SEO)
+                        content_html = remove_source_domain_schemas(content_html)
+
+                        # A partir daqui o conteúdo é parseado uma vez e serializado só no final
+                        doc = Document(content_html)
+
                         # Validar e corrigir estruturas de figura
-                        content_html = validate_and_fix_figures(content_html)
-                        
+                        doc.apply(validate_and_fix_figures_soup)
+
                         # Process images
                         extracted = art_data['extracted']
-                        content_html = remove_broken_image_placeholders(content_html)
-                        content_html = strip_naked_internal_links(content_html)
-                        content_html = merge_images_into_content(content_html, extracted.get('images', []))
+                        doc.apply(merge_images_into_content_soup, extracted.get('images', []))
 
                         # Upload images
-                        urls_to_upload = []
+                        uploaded_src_map: Dict[str, str] = {}
                         featured_image_url = extracted.get('featured_image_url')
                         featured_media_id = None
                         
@@ -409,15 +414,38 @@ def process_batch(articles: List[Dict[str, Any]], link_map: Dict[str, Any]):
                             if media and media.get("id"):
                                 featured_media_id = media["id"]
                                 logger.info(f"FEATURED OK: ID {featured_media_id}")
-
-                        content_html = strip_credits_and_normalize_youtube(content_html)
-                        # Remove schemas JSON-LD originais do domínio fonte (evita conflito de SEO)
-                        content_html = remove_source_domain_schemas(content_html)
+                                if media.get("source_url"):
+                                    uploaded_src_map[featured_image_url] = media["source_url"]
+
+                        # Upload concorrente das imagens do corpo (só as que sobreviveram à IA)
+                        body_uploads = None
+                        if BODY_IMAGES_UPLOAD:
+                            body_urls = [u for u in collect_body_image_urls(doc) if is_valid_upload_candidate(u)]
+                            if body_urls:
+                                body_uploads = upload_body_images(
+                                    threadlocal_uploader(_new_wp_client, title),
+                                    body_urls,
+                                    known=uploaded_src_map,
+                                )
+                                uploaded_src_map.update(body_uploads.uploaded)
+                        if uploaded_src_map:
+                            doc.apply(rewrite_img_srcs_soup, uploaded_src_map)
+
+                        doc.apply(strip_credits_and_normalize_youtube_soup)
+
+                        # Posts relacionados (TF-IDF local): reforçam o linker e o bloco "Leia também"
+                        related_posts = []
+                        if related_index is not None and RELATED_LINKS_ENABLED:
+                            related_posts = related_index.related(f"{title} {doc.text()}")
+                            if related_posts:
+                                logger.info(f"RELATED: {len(related_posts)} posts relacionados (top: {related_posts[0]['score']})")
+                            if READ_ALSO_ENABLED:
+                                doc.append_html(build_read_also_block(related_posts))
 
                         # Add credit line
                         source_name = art_data['feed_config'].get('source_name', urlparse(art_data['url']).netloc)
                         credit_line = f'<p><strong>Fonte:</strong> <a href="{art_data["url"]}" target="_blank" rel="noopener noreferrer">{source_name}</a></p>'
-                        content_html += f"\n{credit_line}"
+                        doc.append_html(credit_line)
 
                         # Process categories
                         final_category_ids = {WORDPRESS_CATEGORIES['Notícias']}  # Default
@@ -434,10 +462,11 @@ def process_batch(articles: List[Dict[str, Any]], link_map: Dict[str, Any]):
 
                         # Add internal links
                         if link_map:
-                            content_html = add_internal_links(
-                                html_content=content_html,
-                                link_map_data=link_map,
-                                current_post_categories=list(final_category_ids)
+                            doc.apply(
+                                add_internal_links_soup,
+                                link_map,
+                                current_post_categories=list(final_category_ids),
+                                related_links={r['link'] for r in related_posts},
                             )
 
 
@@ -448,7 +477,7 @@ def process_batch(articles: List[Dict[str, Any]], link_map: Dict[str, Any]):
                             yoast_meta['_yoast_wpseo_keyphrases'] = json.dumps([{"keyword": kw} for kw in related_kws])
 
                         # VERIFICAÇÃO FINAL: CTA CHECK ANTES DE PUBLICAR
-                        final_cta_match = detect_forbidden_cta(content_html)
+                        final_cta_match = detect_forbidden_cta(doc)
                         if final_cta_match:
                             logger.error(f"CTA FINAL: Detectado '{final_cta_match}' - bloqueando publicação")
                             db.update_article_status(art_data['db_id'], 'FAILED', reason="FINAL CHECK: CTA detected before WordPress publishing - Article blocked")
@@ -457,7 +486,7 @@ def process_batch(articles: List[Dict[str, Any]], link_map: Dict[str, Any]):
                         logger.debug("CTA OK: Nenhum CTA detectado. Pronto para publicar.")
                         
                         # Converter conteúdo para formato de blocos Gutenberg (WordPress padrão)
-                        gutenberg_content = html_to_gutenberg_blocks(content_html)
+                        gutenberg_content = html_to_gutenberg_blocks(doc)
                         
                         # Log qual chave de API foi usada para processar este artigo
                         api_key_used = ai_processor._ai_client.get_last_used_key() if ai_processor and ai_processor._ai_client else "UNKNOWN"
@@ -474,6 +503,7 @@ def process_batch(articles: List[Dict[str, Any]], link_map: Dict[str, Any]):
                             'meta': yoast_meta,
                         }
 
+                        postprocess_span.end()
                         wp_post_id = wp_client.create_post(post_payload)
                         if wp_post_id and wp_post_id > 0:  # Verificar que é ID válido
                             try:
@@ -512,13 +542,12 @@ def process_batch(articles: List[Dict[str, Any]], link_map: Dict[str, Any]):
                                     # ✅ SALVAR JSON COM SLUG (para fácil localização)
                                     slug = rewritten_data.get('slug', 'sem-slug')
                                     timestamp = time.strftime("%Y%m%d-%H%M%S")
-                                    json_filename = f"debug/ai_response_batch_{slug}_{timestamp}.json"
-                                    json_path = Path(json_filename)
-                                    
-                                    # Salvar o rewritten_data como JSON
-                                    with open(json_path, 'w', encoding='utf-8') as f:
-                                        json.dump(rewritten_data, f, indent=2, ensure_ascii=False)
-                                    logger.info(f"  JSON salvo em: {json_filename}")
+                                    # Gravado (gzip) pela thread de I/O, fora do caminho crítico
+                                    json_path = write_artifact(
+                                        f"ai_response_batch_{slug}_{timestamp}.json",
+                                        json.dumps(rewritten_data, ensure_ascii=False),
+                                    )
+                                    logger.info(f"  JSON salvo em: {json_path}")
                                     
                                     # ✅ REGISTRAR wp_post_id NOS TOKENS
                                     from .token_tracker import log_tokens
@@ -538,6 +567,17 @@ def process_batch(articles: List[Dict[str, Any]], link_map: Dict[str, Any]):
                                 logger.error(f"Erro sanitizando post {wp_post_id}: {e}")
 
                             db.save_processed_post(art_data['db_id'], wp_post_id)
+
+                            # Fingerprint da fonte para a revalidação incremental
+                            if REVALIDATION_ENABLED:
+                                record_published_source(
+                                    db.conn, art_data['db_id'], wp_post_id, art_data.get('url', ''),
+                                    title, (art_data.get('extracted') or {}).get('content', ''),
+                                )
+
+                            # Imagens do corpo que perderam o prazo: corrige o post em background
+                            if body_uploads and body_uploads.pending:
+                                schedule_body_image_patch(body_uploads, wp_post_id, _new_wp_client)
                             
                             # Small delay between posts
                             logger.info(f"Aguardando {BETWEEN_PUBLISH_DELAY_S}s para proximo...")
@@ -549,6 +589,11 @@ def process_batch(articles: List[Dict[str, Any]], link_map: Dict[str, Any]):
                     except Exception as e:
                         logger.error(f"Error processing article result {art_data['title']}: {e}", exc_info=True)
                         db.update_article_status(art_data['db_id'], 'FAILED', reason=str(e))
+                    finally:
+                        # Saídas antecipadas (continue/exceção) antes da publicação: o artigo foi rejeitado
+                        if postprocess_span is not None and not postprocess_span.ended:
+                            postprocess_span.status = 'error'
+                            postprocess_span.end()
 
             except Exception as e:
                 logger.error(f"Error processing batch: {e}", exc_info=True)
@@ -576,6 +621,65 @@ def process_batch(articles: List[Dict[str, Any]], link_map: Dict[str, Any]):
     finally:
         db.close()
         wp_client.close()
+        tracing.set_article(None)
+        tracing.flush()
+        token_ledger.flush_all()
+        if rx.REGEX_PROFILE:
+            rx.log_profile()
+
+# Artigos retirados da fila que o worker ainda está processando (wait_until_idle)
+_in_flight = 0
+_in_flight_cond = threading.Condition()
+
+
+def _release_in_flight(count: int):
+    global _in_flight
+    with _in_flight_cond:
+        _in_flight -= count
+        _in_flight_cond.notify_all()
+
+
+def wait_until_idle(timeout: float) -> bool:
+    """
+    Espera a fila esvaziar e o worker terminar o que retirou dela (o ciclo só
+    enfileira; extração, IA e WordPress rodam na thread do worker). False se
+    `timeout` segundos passarem antes disso — p.ex. artigos retidos pelo
+    orçamento de tokens.
+    """
+    deadline = time.monotonic() + timeout
+    with _in_flight_cond:
+        while len(article_queue) or _in_flight:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            _in_flight_cond.wait(min(remaining, 1))
+    return True
+
+
+def _next_article():
+    """
+    Próximo artigo da fila: FIFO, ou com TOKEN_BUDGET_ENABLED o de maior
+    prioridade que caiba no orçamento de tokens das chaves. Retorna
+    (artigo, segundos para esperar antes de tentar de novo).
+    """
+    if not TOKEN_BUDGET_ENABLED:
+        return article_queue.pop(), 0
+    try:
+        keys = [f"****{slot.key[-4:]}" for slot in ai_processor._ai_client.pool.slots]
+        index, reason = get_budget(keys).choose(article_queue.items())
+    except Exception as e:
+        logger.error(f"TOKEN BUDGET: falha na admissão, usando a fila na ordem: {e}", exc_info=True)
+        return article_queue.pop(), 0
+    if index is not None:
+        return article_queue.pop_at(index), 0
+    if reason == 'minute':
+        logger.info(f"TOKEN BUDGET: cota por minuto no limite; {len(article_queue)} artigos aguardam")
+        return None, 60
+    if reason == 'daily':
+        logger.warning(f"TOKEN BUDGET: cota diária esgotada; {len(article_queue)} artigos ficam na fila")
+        return None, 600
+    return None, 0
+
 
 def worker_loop():
     """Continuously process articles from the queue in batches.
@@ -584,12 +688,9 @@ def worker_loop():
     - Max 10 AI requests per cycle (to avoid RPM violations)
     - 5-minute pause after hitting request limit
     """
-    link_map = {}
-    try:
-        with open('data/internal_links.json', 'r', encoding='utf-8') as f:
-            link_map = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        logger.warning("Could not load internal_links.json for worker.")
+    global _in_flight
+    # Link map + índice de relacionados: recarregados a quente quando os arquivos mudam
+    link_map_service = get_link_map_service()
 
     requests_in_cycle = 0
     MAX_REQUESTS_PER_CYCLE = 10
@@ -603,14 +704,26 @@ def worker_loop():
         start_wait = time.time()
         
         # Wait up to QUEUE_TIMEOUT_S for an article to appear in queue
+        budget_wait = 0
         while time.time() - start_wait < QUEUE_TIMEOUT_S:
-            if article := article_queue.pop():
+            with _in_flight_cond:
+                article, budget_wait = _next_article()
+                if article:
+                    _in_flight += 1
+            if article:
                 articles.append(article)
                 break
+            elif budget_wait:
+                break
             else:
                 # Esperar um pouco antes de tentar novamente
                 time.sleep(1)
 
+        if budget_wait:
+            # Sem orçamento: os artigos continuam QUEUED na fila, sem chamar a IA
+            time.sleep(budget_wait)
+            continue
+
         if not articles:
             # Still no articles after timeout, reset cycle counter and continue
             logger.debug("[WORKER] Nenhum artigo na fila após timeout de 30s")
@@ -632,6 +745,7 @@ def worker_loop():
             )
             # Retornar o artigo à fila para processar depois da pausa
             article_queue.push(articles[0])
+            _release_in_flight(len(articles))
             last_pause_time = time.time()
             time.sleep(PAUSE_ON_LIMIT_S)
             requests_in_cycle = 0
@@ -639,7 +753,11 @@ def worker_loop():
             continue
 
         # Process batch and count requests
-        process_batch(articles, link_map)
+        try:
+            snapshot = link_map_service.current()
+            process_batch(articles, snapshot.link_map, snapshot.related_index)
+        finally:
+            _release_in_flight(len(articles))
         requests_in_cycle += len(articles)
         last_pause_time = time.time()  # Atualizar timestamp de última atividade
         
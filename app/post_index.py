@@ -0,0 +1,390 @@
+"""
+Índice local dos posts publicados no WordPress (SQLite).
+
+`WordPressClient.get_published_posts` percorre o arquivo inteiro, 100 posts por
+vez e em sequência, a cada uso — o custo cresce com o acervo. Este índice
+guarda (id, link, title, tags, categories, modified) em `data/post_index.db` e:
+
+- atualiza de forma incremental com `modified_after` (só o que mudou desde a
+  última sincronização). O WordPress compara `modified_after` com
+  `post_modified`, na hora local do site, então o cursor é o `modified`
+  local, não o `modified_gmt`;
+- quando é preciso reconstruir tudo, busca a página 1, lê `X-WP-TotalPages` e
+  baixa as demais páginas em paralelo;
+- exporta o mapa de links internos (`data/internal_links.json`) sem nenhuma
+  chamada extra à API.
+
+Uso:
+    python -m app.post_index            # atualização incremental + export
+    python -m app.post_index --full     # reconstrução completa + export
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+POST_INDEX_DB_PATH = os.getenv('POST_INDEX_DB_PATH', 'data/post_index.db')
+POST_INDEX_MAX_WORKERS = int(os.getenv('POST_INDEX_MAX_WORKERS', 4))
+# Posts despublicados/excluídos não aparecem no modified_after; uma reconstrução
+# periódica remove essas entradas do índice.
+POST_INDEX_FULL_REBUILD_HOURS = int(os.getenv('POST_INDEX_FULL_REBUILD_HOURS', 24))
+POST_INDEX_REFRESH_MINUTES = int(os.getenv('POST_INDEX_REFRESH_MINUTES', 60))
+INTERNAL_LINKS_PATH = 'data/internal_links.json'
+
+INDEX_FIELDS = ['id', 'link', 'title', 'excerpt', 'tags', 'categories', 'modified', 'modified_gmt']
+
+
+def _rendered(value: Any) -> str:
+    """Campos como title/excerpt vêm como {'rendered': ...} na API REST."""
+    if isinstance(value, dict):
+        return value.get('rendered', '') or ''
+    return value or ''
+
+
+class PostIndex:
+    """Índice SQLite dos posts publicados, com atualização incremental."""
+
+    def __init__(self, db_path: str = POST_INDEX_DB_PATH):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._initialize()
+
+    def _initialize(self):
+        with self.conn:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS posts (
+                    id INTEGER PRIMARY KEY,
+                    link TEXT NOT NULL,
+                    title TEXT NOT NULL DEFAULT '',
+                    excerpt TEXT NOT NULL DEFAULT '',
+                    tags TEXT NOT NULL DEFAULT '[]',
+                    categories TEXT NOT NULL DEFAULT '[]',
+                    modified TEXT NOT NULL DEFAULT '',
+                    modified_gmt TEXT NOT NULL DEFAULT ''
+                );
+                CREATE INDEX IF NOT EXISTS idx_posts_link ON posts(link);
+                CREATE INDEX IF NOT EXISTS idx_posts_modified ON posts(modified_gmt);
+                CREATE TABLE IF NOT EXISTS tags (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS index_state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                );
+            """)
+            columns = {row['name'] for row in self.conn.execute("PRAGMA table_info(posts)")}
+            if 'modified' not in columns:
+                # Índices antigos: sem cursor local até a próxima reconstrução completa
+                self.conn.execute("ALTER TABLE posts ADD COLUMN modified TEXT NOT NULL DEFAULT ''")
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    # --- Estado ---
+
+    def _get_state(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM index_state WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row else None
+
+    def _set_state(self, key: str, value: str):
+        self.conn.execute(
+            "INSERT INTO index_state (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value),
+        )
+
+    def last_modified(self) -> Optional[str]:
+        """Maior `modified` (hora local do site) indexado: cursor da atualização incremental."""
+        row = self.conn.execute("SELECT MAX(modified) AS m FROM posts").fetchone()
+        return row['m'] if row and row['m'] else None
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+
+    def needs_full_rebuild(self) -> bool:
+        last_full = self._get_state('last_full_rebuild')
+        if not last_full or not self.count() or not self.last_modified():
+            return True
+        try:
+            last_dt = datetime.fromisoformat(last_full)
+        except ValueError:
+            return True
+        return datetime.now(timezone.utc) - last_dt > timedelta(hours=POST_INDEX_FULL_REBUILD_HOURS)
+
+    # --- Escrita ---
+
+    def upsert_posts(self, posts: List[Dict[str, Any]]):
+        with self._lock, self.conn:
+            self._upsert(posts)
+
+    def _upsert(self, posts: List[Dict[str, Any]]):
+        rows = []
+        for p in posts:
+            if not p.get('id') or not p.get('link'):
+                continue
+            rows.append((
+                int(p['id']),
+                p['link'],
+                _rendered(p.get('title')),
+                _rendered(p.get('excerpt')),
+                json.dumps(p.get('tags') or []),
+                json.dumps(p.get('categories') or []),
+                p.get('modified') or '',
+                p.get('modified_gmt') or '',
+            ))
+        if not rows:
+            return
+        self.conn.executemany("""
+            INSERT INTO posts (id, link, title, excerpt, tags, categories, modified, modified_gmt)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                link = excluded.link, title = excluded.title, excerpt = excluded.excerpt,
+                tags = excluded.tags, categories = excluded.categories,
+                modified = excluded.modified, modified_gmt = excluded.modified_gmt
+        """, rows)
+
+    def _resolve_tag_names(self, client):
+        """Busca (em lotes de 100) apenas os nomes de tags que ainda não estão no índice."""
+        known = {r[0] for r in self.conn.execute("SELECT id FROM tags")}
+        missing = set()
+        for (tags_json,) in self.conn.execute("SELECT tags FROM posts"):
+            missing.update(t for t in json.loads(tags_json) if t not in known)
+        if not missing:
+            return
+        tag_map = client.get_tags_map_by_ids(list(missing))
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO tags (id, name) VALUES (?, ?)",
+                list(tag_map.items()),
+            )
+
+    # --- Sincronização ---
+
+    def refresh(
+        self,
+        client,
+        client_factory: Optional[Callable[[], Any]] = None,
+        full: Optional[bool] = None,
+    ) -> int:
+        """
+        Sincroniza o índice com o WordPress.
+
+        Args:
+            client: WordPressClient usado na página 1 / atualização incremental.
+            client_factory: Cria um cliente por thread para as páginas paralelas
+                da reconstrução completa (requests.Session não é thread-safe).
+                Sem ele, as páginas são buscadas em sequência.
+            full: Força (True) ou impede (False) a reconstrução completa.
+                None decide por `needs_full_rebuild()`.
+
+        Returns:
+            Número de posts recebidos da API.
+        """
+        if full is None:
+            full = self.needs_full_rebuild()
+        if full:
+            fetched = self._full_rebuild(client, client_factory)
+        else:
+            fetched = self._incremental(client)
+        self._resolve_tag_names(client)
+        return fetched
+
+    def _incremental(self, client) -> int:
+        cursor = self.last_modified()
+        extra = {'orderby': 'modified', 'order': 'asc'}
+        if cursor:
+            extra['modified_after'] = cursor
+        fetched = 0
+        page = 1
+        while True:
+            try:
+                posts, total_pages = client.get_posts_page(page, INDEX_FIELDS, extra_params=extra)
+            except requests.RequestException as e:
+                logger.error(f"POST INDEX: erro na atualização incremental (página {page}): {e}")
+                break
+            # upsert é idempotente: o post no limite do cursor pode voltar sem problema
+            self.upsert_posts(posts)
+            fetched += len(posts)
+            if page >= total_pages:
+                break
+            page += 1
+        logger.info(f"POST INDEX: atualização incremental com {fetched} posts (desde {cursor or 'o início'})")
+        return fetched
+
+    def _full_rebuild(self, client, client_factory=None) -> int:
+        try:
+            first, total_pages = client.get_posts_page(1, INDEX_FIELDS)
+        except requests.RequestException as e:
+            logger.error(f"POST INDEX: falha ao buscar a primeira página: {e}")
+            return 0
+
+        pages: Dict[int, List[Dict[str, Any]]] = {1: first}
+        remaining = list(range(2, total_pages + 1))
+        if remaining:
+            if client_factory:
+                local = threading.local()
+                created = []
+
+                def _fetch(page: int):
+                    c = getattr(local, 'client', None)
+                    if c is None:
+                        c = local.client = client_factory()
+                        created.append(c)
+                    return page, c.get_posts_page(page, INDEX_FIELDS)[0]
+
+                with ThreadPoolExecutor(max_workers=max(1, POST_INDEX_MAX_WORKERS)) as pool:
+                    futures = [pool.submit(_fetch, p) for p in remaining]
+                    for fut in futures:
+                        try:
+                            page, posts = fut.result()
+                            pages[page] = posts
+                        except requests.RequestException as e:
+                            logger.error(f"POST INDEX: erro ao buscar página: {e}")
+                for c in created:
+                    c.close()
+            else:
+                for page in remaining:
+                    try:
+                        pages[page] = client.get_posts_page(page, INDEX_FIELDS)[0]
+                    except requests.RequestException as e:
+                        logger.error(f"POST INDEX: erro ao buscar página {page}: {e}")
+
+        if len(pages) < total_pages:
+            # Reconstrução parcial não pode apagar posts que simplesmente falharam no download
+            logger.warning(f"POST INDEX: {total_pages - len(pages)} páginas falharam; mantendo entradas antigas")
+            for posts in pages.values():
+                self.upsert_posts(posts)
+            return sum(len(p) for p in pages.values())
+
+        all_posts = [p for page in sorted(pages) for p in pages[page]]
+        # Troca em uma única transação: leitores nunca veem o índice vazio
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM posts")
+            self._upsert(all_posts)
+            self._set_state('last_full_rebuild', datetime.now(timezone.utc).isoformat())
+        logger.info(f"POST INDEX: reconstrução completa com {len(all_posts)} posts em {total_pages} páginas")
+        return len(all_posts)
+
+    # --- Leitura ---
+
+    def _row_to_post(self, row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            'id': row['id'],
+            'link': row['link'],
+            'title': row['title'],
+            'excerpt': row['excerpt'],
+            'tags': json.loads(row['tags']),
+            'categories': json.loads(row['categories']),
+            'modified': row['modified'],
+            'modified_gmt': row['modified_gmt'],
+        }
+
+    def all_posts(self) -> List[Dict[str, Any]]:
+        rows = self.conn.execute("SELECT * FROM posts ORDER BY modified_gmt DESC").fetchall()
+        return [self._row_to_post(r) for r in rows]
+
+    def get_by_link(self, link: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute("SELECT * FROM posts WHERE link = ?", (link,)).fetchone()
+        return self._row_to_post(row) if row else None
+
+    def search(self, term: str, limit: int = 3) -> List[Dict[str, str]]:
+        """Equivalente local de `WordPressClient.find_related_posts` (busca no título)."""
+        if not term:
+            return []
+        rows = self.conn.execute(
+            "SELECT title, link FROM posts WHERE title LIKE ? ORDER BY modified_gmt DESC LIMIT ?",
+            (f"%{term}%", limit),
+        ).fetchall()
+        return [{"title": r['title'], "url": r['link']} for r in rows]
+
+    def tag_names(self) -> Dict[int, str]:
+        return {r['id']: r['name'] for r in self.conn.execute("SELECT id, name FROM tags")}
+
+    def build_link_map(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Monta o mapa no formato esperado por `add_internal_links` (título + tags como keywords)."""
+        tag_names = self.tag_names()
+        posts = []
+        for post in self.all_posts():
+            keywords = [post['title']] if post['title'] else []
+            keywords += [tag_names[t] for t in post['tags'] if t in tag_names]
+            keywords = list(dict.fromkeys(k.strip() for k in keywords if k and len(k.strip()) >= 3))
+            posts.append({
+                'id': post['id'],
+                'link': post['link'],
+                'title': post['title'],
+                'keywords': keywords,
+                'categories': post['categories'],
+            })
+        return {'posts': posts}
+
+    def export_link_map(self, path: str = INTERNAL_LINKS_PATH) -> int:
+        """Grava o mapa de links de forma atômica (tmp + os.replace)."""
+        link_map = self.build_link_map()
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_suffix(target.suffix + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(link_map, f, ensure_ascii=False)
+        os.replace(tmp, target)
+        logger.info(f"POST INDEX: {len(link_map['posts'])} posts exportados para {path}")
+        return len(link_map['posts'])
+
+
+def _sync_related_index(index: 'PostIndex'):
+    """Atualiza incrementalmente o índice TF-IDF de posts relacionados."""
+    from .related_index import RelatedIndex, RELATED_INDEX_PATH
+
+    related = RelatedIndex.load_or_empty(RELATED_INDEX_PATH)
+    if related.sync_with_post_index(index):
+        related.save(RELATED_INDEX_PATH)
+
+
+def refresh_post_index(full: Optional[bool] = None, export: bool = True) -> int:
+    """Atualiza o índice usando a configuração do WordPress e exporta o mapa de links."""
+    from .config import WORDPRESS_CONFIG, WORDPRESS_CATEGORIES
+    from .wordpress import WordPressClient
+
+    def factory():
+        return WordPressClient(config=WORDPRESS_CONFIG, categories_map=WORDPRESS_CATEGORIES)
+
+    index = PostIndex()
+    client = factory()
+    try:
+        fetched = index.refresh(client, client_factory=factory, full=full)
+        if export:
+            index.export_link_map()
+            _sync_related_index(index)
+        return fetched
+    finally:
+        client.close()
+        index.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Atualiza o índice local de posts publicados.")
+    parser.add_argument('--full', action='store_true', help="Força a reconstrução completa.")
+    parser.add_argument('--no-export', action='store_true', help="Não regrava data/internal_links.json nem o índice de relacionados.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    refresh_post_index(full=True if args.full else None, export=not args.no_export)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,278 @@
+"""
+Registro central das expressões regulares do caminho quente, pré-compiladas.
+
+As etapas de texto (limpeza do HTML da IA, validação/otimização de títulos,
+reparo do JSON da IA, sanitização antes do WordPress) chamavam `re.sub`/
+`re.search` com a string do padrão a cada artigo, espalhadas pelos módulos.
+Aqui cada padrão é compilado uma vez, com um nome (`modulo.proposito`), e os
+módulos usam as constantes abaixo.
+
+Com `REGEX_PROFILE=true` (lido na importação) as constantes viram
+`ProfiledPattern`: cada chamada (`search`, `sub`, `findall`...) soma contagem e
+tempo no nome do padrão, e `log_profile()` — chamado ao fim de cada lote do
+pipeline — registra os piores. Desligado, as constantes são os `re.Pattern`
+puros, sem custo extra.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+REGEX_PROFILE = os.getenv('REGEX_PROFILE', 'false').lower() == 'true'
+REGEX_PROFILE_TOP = int(os.getenv('REGEX_PROFILE_TOP', 15))
+
+# nome -> padrão compilado (sempre o re.Pattern, mesmo com o profiler ligado)
+REGISTRY: Dict[str, 're.Pattern[str]'] = {}
+
+_stats: Dict[str, List[float]] = {}
+_stats_lock = threading.Lock()
+
+
+def _record(name: str, elapsed: float):
+    with _stats_lock:
+        entry = _stats.get(name)
+        if entry is None:
+            _stats[name] = [1, elapsed]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+
+
+class ProfiledPattern:
+    """`re.Pattern` que mede cada chamada; atributos (`pattern`, `flags`...) vêm do original."""
+
+    __slots__ = ('name', '_pattern')
+
+    def __init__(self, name: str, pattern: 're.Pattern[str]'):
+        self.name = name
+        self._pattern = pattern
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._pattern, attr)
+
+    def __repr__(self) -> str:
+        return f"ProfiledPattern({self.name!r}, {self._pattern!r})"
+
+    def _call(self, method: str, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return getattr(self._pattern, method)(*args, **kwargs)
+        finally:
+            _record(self.name, time.perf_counter() - start)
+
+    def search(self, *args, **kwargs):
+        return self._call('search', *args, **kwargs)
+
+    def match(self, *args, **kwargs):
+        return self._call('match', *args, **kwargs)
+
+    def fullmatch(self, *args, **kwargs):
+        return self._call('fullmatch', *args, **kwargs)
+
+    def sub(self, *args, **kwargs):
+        return self._call('sub', *args, **kwargs)
+
+    def subn(self, *args, **kwargs):
+        return self._call('subn', *args, **kwargs)
+
+    def split(self, *args, **kwargs):
+        return self._call('split', *args, **kwargs)
+
+    def findall(self, *args, **kwargs):
+        return self._call('findall', *args, **kwargs)
+
+    def finditer(self, *args, **kwargs):
+        # Consome o iterador para o tempo incluir a varredura
+        start = time.perf_counter()
+        matches = list(self._pattern.finditer(*args, **kwargs))
+        _record(self.name, time.perf_counter() - start)
+        return iter(matches)
+
+
+def compile(name: str, pattern: str, flags: int = 0):
+    """Compila e registra `pattern` com o nome dado (único)."""
+    if name in REGISTRY:
+        raise ValueError(f"Regex '{name}' já registrada")
+    compiled = re.compile(pattern, flags)
+    REGISTRY[name] = compiled
+    return ProfiledPattern(name, compiled) if REGEX_PROFILE else compiled
+
+
+def profile_stats() -> List[Tuple[str, int, float]]:
+    """(nome, chamadas, segundos) por padrão, do mais caro para o mais barato."""
+    with _stats_lock:
+        rows = [(name, int(calls), total) for name, (calls, total) in _stats.items()]
+    return sorted(rows, key=lambda row: row[2], reverse=True)
+
+
+def reset_profile():
+    with _stats_lock:
+        _stats.clear()
+
+
+def log_profile(top: int = REGEX_PROFILE_TOP, reset: bool = True):
+    """Registra os `top` padrões mais caros desde o último reset."""
+    rows = profile_stats()
+    if not rows:
+        return
+    total = sum(row[2] for row in rows)
+    lines = [f"REGEX PROFILE: {sum(row[1] for row in rows)} chamadas, {total * 1000:.1f}ms em {len(rows)} padrões"]
+    for name, calls, seconds in rows[:top]:
+        lines.append(f"  {name:<40} {calls:>7} chamadas {seconds * 1000:>9.2f}ms {seconds / calls * 1e6:>8.1f}µs/chamada")
+    logger.info("\n".join(lines))
+    if reset:
+        reset_profile()
+
+
+# --- html_utils -----------------------------------------------------------
+
+IMG_EXTENSION_SUFFIX = compile('html_utils.img_extension_suffix', r'\.(jpg|jpeg|png|gif|webp)$', re.IGNORECASE)
+FILENAME_SEPARATORS = compile('html_utils.filename_separators', r'[-_]')
+EMBEDDED_URL = compile('html_utils.embedded_url', r'https?://[^\s"\'<>]+')
+MALFORMED_IMG_SRC = compile('html_utils.malformed_img_src', r'src="[^"]*<[^"]*https?://[^\s"\'<>]*[^"]*"')
+IMAGE_PLACEHOLDER_LINE = compile(
+    'html_utils.image_placeholder_line', r'^\s*(\[?Imagem[^\n<]*\]?)\s*$', re.IGNORECASE | re.MULTILINE
+)
+NAKED_INTERNAL_LINK_PARAGRAPH = compile(
+    'html_utils.naked_internal_link_paragraph',
+    r'<p>\s*https?://[^<>\s]+/(?:tag|categoria)/[a-z0-9\-_/]+/?\s*</p>',
+    re.IGNORECASE,
+)
+# Cobre type="..." e type = '...' (antes eram duas passadas)
+JSON_LD_SCRIPT = compile(
+    'html_utils.json_ld_script',
+    r'<script[^>]*type\s*=\s*["\']application/ld\+json["\'][^>]*>.*?</script>',
+    re.DOTALL | re.IGNORECASE,
+)
+
+# --- pipeline -------------------------------------------------------------
+
+EMPTY_BLOCK_TAG = compile('pipeline.empty_block_tag', r'<(p|div|span|article)[^>]*>\s*</\1>', re.IGNORECASE)
+EMPTY_BR_PARAGRAPH = compile('pipeline.empty_br_paragraph', r'<p[^>]*>\s*<br[^>]*>\s*</p>', re.IGNORECASE)
+TITLE_SEPARATORS = compile('pipeline.title_separators', r'[:\-–—]\s*')
+
+# --- seo_title_optimizer --------------------------------------------------
+
+HTML_NUMERIC_ENTITY = compile('seo_title.html_numeric_entity', r'&#\d+;')
+HTML_NAMED_ENTITY = compile('seo_title.html_named_entity', r'&[a-z]+;')
+CLICKBAIT_PREFIXES = tuple(
+    compile(f'seo_title.clickbait_prefix_{i}', pattern, re.IGNORECASE)
+    for i, pattern in enumerate((
+        r'^Você não vai acreditar',
+        r'^Você precisa ver',
+        r'^Isto é incrível',
+        r'^Não sabíamos sobre',
+        r'^Ninguém esperava',
+        r'^O que aconteceu foi',
+        r'^Prepare-se para',
+    ))
+)
+NON_WORD_CHARS = compile('seo_title.non_word_chars', r'[^\w]')
+CLICKBAIT_HINT = compile('seo_title.clickbait_hint', r'Você (não|precisa|não vai acreditar)', re.IGNORECASE)
+NUMBER_OR_YEAR = compile('seo_title.number_or_year', r'\d{4}|2025|2024|\d+%|US\$')
+TRAILING_PUNCTUATION = compile('seo_title.trailing_punctuation', r'[,;:.]$')
+
+# --- title_validator ------------------------------------------------------
+
+INFINITIVE_VERBS = compile(
+    'title_validator.infinitive_verbs',
+    r'\b(?:falar|dizer|contar|revelar|demonstrar|mostrar|deixar|fazer)\b',
+    re.IGNORECASE,
+)
+OS_SERIE = compile('title_validator.os_serie', r'\bos serie\b', re.IGNORECASE)
+GRATIS = compile('title_validator.gratis', r'\bgratis\b', re.IGNORECASE)
+FICOU_DE_LADO = compile('title_validator.ficou_de_lado', r'\bficou de lado\b', re.IGNORECASE)
+SENSATIONALISM = compile(
+    'title_validator.sensationalism',
+    r'\b(?:surpreendente|impressionante|explode|bomba|nerfado|morto|mata|matou)\b',
+    re.IGNORECASE,
+)
+SUCESSO_SURPREENDENTE_PLURAL = compile(
+    'title_validator.sucesso_surpreendente_plural', r'\bsucesso\s+surpreendentes?\b', re.IGNORECASE
+)
+WEAK_PHRASES = compile('title_validator.weak_phrases', r'\b(?:veja|entenda|descubra|saiba)\b', re.IGNORECASE)
+PLATFORM_FIRST = compile(
+    'title_validator.platform_first',
+    r'(?:Netflix|Disney|HBO|Prime|Paramount|Max)\s+(?:revela|anuncia|apresenta|libera)',
+    re.IGNORECASE,
+)
+SUCESSO_SURPREENDENTE = compile('title_validator.sucesso_surpreendente', r'\bsucesso surpreendente\b', re.IGNORECASE)
+NERF_SLANG = compile('title_validator.nerf_slang', r'\b(?:nerfado|nerf)\b', re.IGNORECASE)
+VARIOS_VAGUE = compile('title_validator.varios_vague', r'\bvários\s+(?:filmes|séries|games|títulos)\b', re.IGNORECASE)
+VARIOS = compile('title_validator.varios', r'\bvários\b', re.IGNORECASE)
+EXPLODE_NAS_REDES = compile('title_validator.explode_nas_redes', r'\bexplode nas redes\b', re.IGNORECASE)
+WHITESPACE_RUN = compile('title_validator.whitespace_run', r'\s+')
+
+# --- ai_processor (reparo do JSON da IA) ----------------------------------
+
+JSON_CODE_FENCE = compile('ai_processor.json_code_fence', r"```(?:json)?\s*([\s\S]*?)\s*```", re.IGNORECASE)
+JSON_ESCAPED_NEWLINE_INDENT = compile('ai_processor.json_escaped_newline_indent', r'\\n\s+("[\w_]+"\s*:)')
+JSON_ADJACENT_OBJECTS = compile('ai_processor.json_adjacent_objects', r'\}\s*\{')
+JSON_TRAILING_COMMA = compile('ai_processor.json_trailing_comma', r',\s*([\]\}])')
+JSON_FENCE_EDGES = compile('ai_processor.json_fence_edges', r"^```(?:json)?|```$", re.IGNORECASE)
+CONTROL_CHARS = compile('ai_processor.control_chars', r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]')
+
+# --- wordpress ------------------------------------------------------------
+
+SLUG_INVALID_CHARS = compile('wordpress.slug_invalid_chars', r'[^\w\s-]', re.UNICODE)
+SLUG_SEPARATORS = compile('wordpress.slug_separators', r'[\s_-]+', re.UNICODE)
+HTML_TAG = compile('wordpress.html_tag', r'<[^>]+>')
+MULTIPLE_SPACES = compile('wordpress.multiple_spaces', r' {2,}')
+CTA_THANK_YOU_SUBSCRIBE = compile(
+    'wordpress.cta_thank_you_subscribe', r"(?is)thank\s+you\s+for\s+reading[^<]{0,200}?subscribe[^<]{0,200}?"
+)
+CTA_THANKS_SUBSCRIBE = compile(
+    'wordpress.cta_thanks_subscribe', r"(?is)thanks\s+for\s+reading[^<]{0,200}?subscribe[^<]{0,200}?"
+)
+
+# --- image_candidates -----------------------------------------------------
+
+# aceita query ?width=1200&height=630 e sufixos -1200x630.jpg
+IMAGE_DIM_SUFFIX = compile(
+    'image_candidates.dim_suffix', r'-(\d{2,5})x(\d{2,5})(?=\.[a-z]{3,4})(?:\?.*)?$', re.IGNORECASE
+)
+UPLOAD_BAD_KEYWORD = compile('image_candidates.upload_bad_keyword', 'author|avatar')
+UPLOAD_QUERY_DIMENSION = compile('image_candidates.upload_query_dimension', r'[?&](?:w|width|h|height)=(\d+)')
+
+# --- clean_engine ---------------------------------------------------------
+
+SIMPLE_SELECTOR = compile(
+    'clean_engine.simple_selector', r'^(?P<tag>[a-zA-Z][\w-]*)?(?P<rest>(?:\.[\w-]+|#[\w-]+|\[[^\]]+\])*)$'
+)
+SELECTOR_PART = compile(
+    'clean_engine.selector_part',
+    r'\.(?P<cls>[\w-]+)'
+    r'|#(?P<id>[\w-]+)'
+    r'|\[\s*(?P<attr>[\w-]+)\s*(?:(?P<op>[*^$~]?=)\s*(?P<q>[\'"]?)(?P<val>.*?)(?P=q))?\s*\]',
+)
+
+# --- extractor ------------------------------------------------------------
+
+# Blocos a ignorar (relacionados/sidebars/galerias etc.)
+BAD_SECTION = compile(
+    'extractor.bad_section',
+    r"(related|trending|more|sidebar|aside|recommend|recommended|"
+    r"gallery|carousel|slideshow|video|playlist|social|share|"
+    r"footer|header|nav|subscribe|newsletter|ad|advert|sponsor|"
+    r"cta|banner|paid|outbrain|taboola|"
+    r"screen-hub|screenhub|hub|most-popular|popular)",
+    re.I,
+)
+RELATED_HEADING = compile(
+    'extractor.related_heading',
+    r"(leia também|veja também|relacionad[oa]s|recomendad[oa]s|tópicos relacionados)",
+    re.I,
+)
+
+# --- gutenberg ------------------------------------------------------------
+
+YOUTUBE_URL = compile(
+    'gutenberg.youtube_url',
+    r'^https?://(?:www\.|m\.)?(?:youtube\.com/(?:watch\?v=|shorts/)|youtu\.be/)[\w-]{6,}[^\s<>"]*$',
+)
+WP_IMAGE_ID_CLASS = compile('gutenberg.wp_image_id_class', r'\bwp-image-(\d+)\b')
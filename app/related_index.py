@@ -0,0 +1,291 @@
+"""
+Índice de posts relacionados (TF-IDF) sobre o acervo publicado.
+
+`add_internal_links` só casa keywords literais e `find_related_posts` faz uma
+busca `/search` ao vivo por termo. Este índice guarda vetores TF-IDF dos posts
+publicados (título, tags e resumo vindos do `PostIndex`) em uma matriz esparsa
+term-major (CSR) com NumPy:
+
+    indptr[t]:indptr[t+1]  -> posições dos posts que contêm o termo t
+    doc_idx / tf           -> post e peso (1 + log tf) nessas posições
+
+A consulta soma, com um único `np.bincount`, as contribuições dos termos do
+texto novo; o custo é proporcional às postings dos termos consultados, não ao
+acervo inteiro. Novos posts entram por `add_posts` (merge vetorizado das
+postings, sem re-tokenizar o acervo) e o índice é salvo em `.npz`.
+"""
+
+import logging
+import os
+import re
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RELATED_INDEX_PATH = os.getenv('RELATED_INDEX_PATH', 'data/related_index.npz')
+RELATED_LINKS_ENABLED = os.getenv('RELATED_LINKS_ENABLED', 'true').lower() == 'true'
+RELATED_LINKS_TOP_K = int(os.getenv('RELATED_LINKS_TOP_K', 5))
+READ_ALSO_ENABLED = os.getenv('READ_ALSO_ENABLED', 'false').lower() == 'true'
+READ_ALSO_COUNT = int(os.getenv('READ_ALSO_COUNT', 3))
+# Score mínimo (cosseno) para considerar um post relacionado
+RELATED_MIN_SCORE = float(os.getenv('RELATED_MIN_SCORE', 0.12))
+
+_TOKEN_RE = re.compile(r'[a-z0-9]{3,}')
+_TAG_RE = re.compile(r'<[^>]+>')
+
+_STOPWORDS = frozenset("""
+a o as os um uma uns umas de da do das dos em no na nos nas por para com sem sob
+que se ao aos e ou mas como mais menos muito muita seu sua seus suas ele ela eles
+elas isso isto esse essa este esta aquele aquela ser sao foi era tem ter teve vai
+vao pode podem ja nao sim tambem sobre entre ate apos desde quando onde porque
+the and for with from that this these those are was were has have had will would
+can could its his her their they them you your our not but all any into over more
+about after before than then there what which who how why new
+""".split())
+
+
+def _strip_accents(text: str) -> str:
+    return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+
+
+def tokenize(text: str) -> List[str]:
+    """Minúsculas, sem acentos/HTML, tokens de 3+ caracteres fora da stoplist."""
+    if not text:
+        return []
+    text = _strip_accents(_TAG_RE.sub(' ', text).lower())
+    return [t for t in _TOKEN_RE.findall(text) if t not in _STOPWORDS]
+
+
+def document_text(post: Dict[str, Any], tag_names: Optional[Dict[int, str]] = None) -> str:
+    """Texto indexado de um post do PostIndex: título (peso 2), tags e resumo."""
+    title = post.get('title') or ''
+    tags = ' '.join((tag_names or {}).get(t, '') for t in post.get('tags') or [])
+    return f"{title} {title} {tags} {post.get('excerpt') or ''}"
+
+
+class RelatedIndex:
+    """Matriz TF-IDF term-major dos posts publicados."""
+
+    def __init__(self):
+        self.vocab: Dict[str, int] = {}
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.doc_idx = np.zeros(0, dtype=np.int32)
+        self.tf = np.zeros(0, dtype=np.float32)
+        self.idf = np.zeros(0, dtype=np.float32)
+        self.doc_norms = np.zeros(0, dtype=np.float32)
+        self.post_ids = np.zeros(0, dtype=np.int64)
+        self.links: List[str] = []
+        self.titles: List[str] = []
+        self.modified: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.links)
+
+    # --- Construção ---
+
+    def _term_ids(self, terms: Iterable[str]) -> List[int]:
+        ids = []
+        for term in terms:
+            tid = self.vocab.get(term)
+            if tid is None:
+                tid = self.vocab[term] = len(self.vocab)
+            ids.append(tid)
+        return ids
+
+    def add_posts(
+        self,
+        posts: List[Dict[str, Any]],
+        tag_names: Optional[Dict[int, str]] = None,
+        remove_ids: Iterable[int] = (),
+    ) -> int:
+        """
+        Adiciona (ou substitui, pelo id) posts no índice e remove `remove_ids`.
+
+        As postings existentes são convertidas em triplas (termo, doc, tf),
+        concatenadas às novas e reordenadas por termo; df, idf e normas são
+        recalculados de forma vetorizada.
+        """
+        posts = [p for p in posts if p.get('id') and p.get('link')]
+        replaced = {int(p['id']) for p in posts} | {int(i) for i in remove_ids}
+        if not replaced:
+            return 0
+
+        keep = ~np.isin(self.post_ids, list(replaced))
+
+        # Postings antigas em formato COO (só dos docs mantidos), com docs renumerados
+        old_terms = np.repeat(np.arange(len(self.indptr) - 1, dtype=np.int32), np.diff(self.indptr))
+        old_mask = keep[self.doc_idx] if len(self.doc_idx) else np.zeros(0, dtype=bool)
+        remap = np.cumsum(keep) - 1
+        terms = [old_terms[old_mask]]
+        docs = [remap[self.doc_idx[old_mask]].astype(np.int32)]
+        tfs = [self.tf[old_mask]]
+
+        keep_idx = np.flatnonzero(keep)
+        post_ids = list(self.post_ids[keep_idx])
+        links = [self.links[i] for i in keep_idx]
+        titles = [self.titles[i] for i in keep_idx]
+        modified = [self.modified[i] for i in keep_idx]
+
+        for post in posts:
+            counts = Counter(tokenize(document_text(post, tag_names)))
+            doc = len(links)
+            if counts:
+                terms.append(np.asarray(self._term_ids(counts.keys()), dtype=np.int32))
+                docs.append(np.full(len(counts), doc, dtype=np.int32))
+                tfs.append(1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts))))
+            post_ids.append(int(post['id']))
+            links.append(post['link'])
+            titles.append(post.get('title') or '')
+            modified.append(post.get('modified_gmt') or '')
+
+        all_terms = np.concatenate(terms)
+        all_docs = np.concatenate(docs)
+        all_tf = np.concatenate(tfs).astype(np.float32)
+        order = np.argsort(all_terms, kind='stable')
+        all_terms, all_docs, all_tf = all_terms[order], all_docs[order], all_tf[order]
+
+        n_terms = len(self.vocab)
+        n_docs = len(links)
+        df = np.bincount(all_terms, minlength=n_terms)
+        self.indptr = np.concatenate(([0], np.cumsum(df))).astype(np.int64)
+        self.doc_idx = all_docs
+        self.tf = all_tf
+        self.idf = (np.log((1 + n_docs) / (1 + df)) + 1.0).astype(np.float32)
+        weights = all_tf * self.idf[all_terms]
+        self.doc_norms = np.sqrt(np.bincount(all_docs, weights=weights * weights, minlength=n_docs)).astype(np.float32)
+        self.post_ids = np.asarray(post_ids, dtype=np.int64)
+        self.links, self.titles, self.modified = links, titles, modified
+        return len(posts)
+
+    def sync_with_post_index(self, post_index) -> int:
+        """Adiciona apenas os posts novos ou modificados desde o último sync."""
+        known = {int(pid): mod for pid, mod in zip(self.post_ids, self.modified)}
+        current = post_index.all_posts()
+        changed = [p for p in current if known.get(int(p['id'])) != p.get('modified_gmt')]
+        # Posts que saíram do índice (despublicados) saem também daqui
+        removed = set(known) - {int(p['id']) for p in current}
+        if not changed and not removed:
+            return 0
+        self.add_posts(changed, post_index.tag_names(), remove_ids=removed)
+        logger.info(
+            f"RELATED INDEX: {len(changed)} posts adicionados/atualizados, "
+            f"{len(removed)} removidos ({len(self)} no total)"
+        )
+        return len(changed) + len(removed)
+
+    # --- Consulta ---
+
+    def related(
+        self,
+        text: str,
+        k: int = RELATED_LINKS_TOP_K,
+        exclude_links: Iterable[str] = (),
+        min_score: float = RELATED_MIN_SCORE,
+    ) -> List[Dict[str, Any]]:
+        """Top-k posts mais parecidos com `text` (cosseno TF-IDF)."""
+        if not len(self) or not text:
+            return []
+        counts = Counter(t for t in tokenize(text) if t in self.vocab)
+        if not counts:
+            return []
+
+        tids = np.fromiter((self.vocab[t] for t in counts), dtype=np.int64, count=len(counts))
+        q = (1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))) * self.idf[tids]
+        q_norm = float(np.sqrt(np.dot(q, q))) or 1.0
+
+        starts, ends = self.indptr[tids], self.indptr[tids + 1]
+        lengths = ends - starts
+        if not lengths.sum():
+            return []
+        # Índices de todas as postings dos termos consultados, sem loop em Python
+        offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        positions = np.arange(lengths.sum()) + offsets
+        contrib = self.tf[positions] * np.repeat(self.idf[tids] * q, lengths)
+        scores = np.bincount(self.doc_idx[positions], weights=contrib, minlength=len(self))
+        scores /= np.maximum(self.doc_norms, 1e-9) * q_norm
+
+        excluded = set(exclude_links)
+        n = min(len(scores), k + len(excluded))
+        top = np.argpartition(-scores, n - 1)[:n] if n < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind='stable')]
+
+        results = []
+        for i in top:
+            if scores[i] < min_score or len(results) >= k:
+                break
+            if self.links[i] in excluded:
+                continue
+            results.append({
+                'id': int(self.post_ids[i]),
+                'link': self.links[i],
+                'title': self.titles[i],
+                'score': round(float(scores[i]), 4),
+            })
+        return results
+
+    # --- Persistência ---
+
+    def save(self, path: str = RELATED_INDEX_PATH):
+        """Grava o índice em .npz de forma atômica (tmp + os.replace)."""
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        terms = sorted(self.vocab, key=self.vocab.get)
+        tmp = target.with_name(target.name + '.tmp')
+        with open(tmp, 'wb') as f:
+            np.savez_compressed(
+                f,
+                vocab=np.asarray(terms, dtype=str),
+                indptr=self.indptr,
+                doc_idx=self.doc_idx,
+                tf=self.tf,
+                idf=self.idf,
+                doc_norms=self.doc_norms,
+                post_ids=self.post_ids,
+                links=np.asarray(self.links, dtype=str),
+                titles=np.asarray(self.titles, dtype=str),
+                modified=np.asarray(self.modified, dtype=str),
+            )
+        os.replace(tmp, target)
+
+    @classmethod
+    def load(cls, path: str = RELATED_INDEX_PATH) -> 'RelatedIndex':
+        index = cls()
+        with np.load(path, allow_pickle=False) as data:
+            index.vocab = {t: i for i, t in enumerate(data['vocab'].tolist())}
+            index.indptr = data['indptr']
+            index.doc_idx = data['doc_idx']
+            index.tf = data['tf']
+            index.idf = data['idf']
+            index.doc_norms = data['doc_norms']
+            index.post_ids = data['post_ids']
+            index.links = data['links'].tolist()
+            index.titles = data['titles'].tolist()
+            index.modified = data['modified'].tolist()
+        return index
+
+    @classmethod
+    def load_or_empty(cls, path: str = RELATED_INDEX_PATH) -> 'RelatedIndex':
+        try:
+            return cls.load(path)
+        except FileNotFoundError:
+            return cls()
+        except Exception as e:
+            logger.warning(f"RELATED INDEX: falha ao carregar {path} ({e}); recriando do zero")
+            return cls()
+
+
+def build_read_also_block(related: List[Dict[str, Any]], count: int = READ_ALSO_COUNT) -> str:
+    """Bloco "Leia também" com os posts mais relacionados."""
+    items = related[:count]
+    if not items:
+        return ''
+    links = ''.join(
+        f'<p><strong>Leia também:</strong> <a href="{r["link"]}">{r["title"]}</a></p>'
+        for r in items
+    )
+    return f"\n{links}"
@@ -0,0 +1,324 @@
+"""
+Revalidação das fontes de posts já publicados e atualização incremental.
+
+Depois de PUBLISHED, nunca percebíamos quando a matéria de origem era
+atualizada, e reprocessar à mão custava uma reescrita completa. Aqui:
+
+- na publicação, o pipeline grava em `source_revisions` (data/app.db) os
+  parágrafos do texto extraído da fonte (hash + texto) e o id do post;
+- o job `revalidate_published_sources` refaz o GET das fontes publicadas nas
+  últimas `REVALIDATION_WINDOW_HOURS` horas com `If-None-Match` /
+  `If-Modified-Since` — 304 encerra a verificação sem baixar nem extrair;
+- quando a página mudou, o texto extraído é comparado parágrafo a parágrafo
+  com o fingerprint: parágrafos novos cujo texto é quase igual a um que sumiu
+  (correção de digitação, `REVALIDATION_COSMETIC_RATIO`) são ignorados;
+- só os parágrafos realmente novos vão para a IA (`rewrite_update`); o
+  bloco "Atualização" resultante passa pela mesma limpeza de CTAs e tags
+  vazias da publicação (`clean_update_html`) — se ainda houver CTA, é
+  descartado — e é anexado ao post com `update_post_content`, seguido de
+  `sanitize_published_post`.
+
+Mudanças pequenas demais (`REVALIDATION_MIN_CHANGED_CHARS`) não gastam IA e
+ficam acumulando contra o fingerprint antigo; grandes demais
+(`REVALIDATION_MAX_CHANGED_RATIO` dos parágrafos — outra matéria na mesma URL)
+também não, e viram o novo fingerprint.
+
+Desligado por padrão (`REVALIDATION_ENABLED=true` para ligar): o bloco vai
+direto para um post já publicado.
+"""
+
+import difflib
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+REVALIDATION_ENABLED = os.getenv('REVALIDATION_ENABLED', 'false').lower() == 'true'
+REVALIDATION_INTERVAL_MINUTES = int(os.getenv('REVALIDATION_INTERVAL_MINUTES', 60))
+REVALIDATION_WINDOW_HOURS = float(os.getenv('REVALIDATION_WINDOW_HOURS', 48))
+REVALIDATION_MAX_PER_RUN = int(os.getenv('REVALIDATION_MAX_PER_RUN', 10))
+REVALIDATION_MIN_CHANGED_CHARS = int(os.getenv('REVALIDATION_MIN_CHANGED_CHARS', 200))
+REVALIDATION_MAX_CHANGED_RATIO = float(os.getenv('REVALIDATION_MAX_CHANGED_RATIO', 0.6))
+REVALIDATION_COSMETIC_RATIO = float(os.getenv('REVALIDATION_COSMETIC_RATIO', 0.9))
+
+PARAGRAPH_TAGS = ('p', 'h2', 'h3', 'h4', 'li', 'blockquote')
+
+SOURCE_REVISIONS_SQL = """
+    CREATE TABLE IF NOT EXISTS source_revisions (
+        seen_article_id INTEGER PRIMARY KEY,
+        wp_post_id INTEGER NOT NULL,
+        url TEXT NOT NULL,
+        title TEXT,
+        paragraphs TEXT NOT NULL,
+        etag TEXT,
+        last_modified TEXT,
+        published_at DATETIME NOT NULL,
+        checked_at DATETIME,
+        updates INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_source_revisions_published ON source_revisions(published_at);
+"""
+
+
+def paragraph_hash(text: str) -> str:
+    return hashlib.sha1(text.lower().encode('utf-8')).hexdigest()[:16]
+
+
+def clean_update_html(update_html: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Limpeza do bloco de atualização com as camadas da publicação (motor de
+    CTAs ou camadas legadas, tags vazias). Retorna (html, None) ou
+    (None, motivo) quando o CTA persiste ou não sobra texto.
+    """
+    from . import regexes as rx
+    from .cta_engine import CTA_ENGINE_ENABLED, legacy_pipeline_layers
+    from .document import Document
+    from .html_utils import scan_forbidden_cta, strip_forbidden_cta_sentences
+
+    if CTA_ENGINE_ENABLED:
+        content_html = scan_forbidden_cta(Document(update_html), paragraphs=True).html
+    else:
+        content_html, _ = strip_forbidden_cta_sentences(Document(update_html))
+        content_html, _ = legacy_pipeline_layers(content_html)
+    content_html = rx.EMPTY_BLOCK_TAG.sub('', content_html or '')
+    content_html = rx.EMPTY_BR_PARAGRAPH.sub('', content_html)
+
+    label = scan_forbidden_cta(content_html, paragraphs=True).label
+    if label or 'thank you for reading' in content_html.lower():
+        return None, f"CTA persistiu após limpeza: {label or 'thank you for reading'}"
+    if not BeautifulSoup(content_html, 'lxml').get_text(strip=True):
+        return None, "nada restou após a limpeza"
+    return content_html, None
+
+
+def extract_paragraphs(content_html: str) -> List[Tuple[str, str]]:
+    """(hash, texto) dos blocos de texto do conteúdo, em ordem (sem aninhados)."""
+    soup = BeautifulSoup(content_html or '', 'lxml')
+    paragraphs = []
+    for el in soup.find_all(PARAGRAPH_TAGS):
+        if el.find_parent(PARAGRAPH_TAGS):
+            continue
+        text = ' '.join(el.get_text(' ').split())
+        if text:
+            paragraphs.append((paragraph_hash(text), text))
+    return paragraphs
+
+
+def diff_paragraphs(
+    old: List[Tuple[str, str]],
+    new: List[Tuple[str, str]],
+    cosmetic_ratio: float = REVALIDATION_COSMETIC_RATIO,
+) -> Dict[str, Any]:
+    """
+    Parágrafos novos/alterados de `new` em relação a `old`. Um parágrafo novo
+    quase igual a um que sumiu (ratio >= cosmetic_ratio) conta como cosmético.
+    """
+    old_hashes = {h for h, _ in old}
+    new_hashes = {h for h, _ in new}
+    removed = [t for h, t in old if h not in new_hashes]
+    changed, cosmetic = [], 0
+    for h, text in new:
+        if h in old_hashes:
+            continue
+        matcher = difflib.SequenceMatcher(None, b=text)
+        is_cosmetic = False
+        for previous in removed:
+            matcher.set_seq1(previous)
+            if matcher.real_quick_ratio() >= cosmetic_ratio and matcher.quick_ratio() >= cosmetic_ratio \
+                    and matcher.ratio() >= cosmetic_ratio:
+                is_cosmetic = True
+                break
+        if is_cosmetic:
+            cosmetic += 1
+        else:
+            changed.append(text)
+    return {'changed': changed, 'cosmetic': cosmetic, 'removed': len(removed), 'total': len(new)}
+
+
+class SourceRevalidator:
+    """Fingerprints das fontes publicadas e o passo de revalidação."""
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        extractor=None,
+        ai_processor=None,
+        wp_client=None,
+        window_hours: float = REVALIDATION_WINDOW_HOURS,
+    ):
+        self.conn = conn
+        self.conn.executescript(SOURCE_REVISIONS_SQL)
+        self.extractor = extractor
+        self.ai_processor = ai_processor
+        self.wp_client = wp_client
+        self.window = timedelta(hours=window_hours)
+
+    def record(self, seen_article_id: int, wp_post_id: int, url: str, title: str, content_html: str):
+        """Chamado na publicação: guarda o fingerprint do texto extraído da fonte."""
+        paragraphs = extract_paragraphs(content_html)
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO source_revisions "
+                "(seen_article_id, wp_post_id, url, title, paragraphs, published_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (seen_article_id, wp_post_id, url, title, json.dumps(paragraphs, ensure_ascii=False), datetime.utcnow()),
+            )
+
+    def due(self, limit: int = REVALIDATION_MAX_PER_RUN, min_interval: timedelta = timedelta(minutes=REVALIDATION_INTERVAL_MINUTES)) -> List[sqlite3.Row]:
+        """Fontes na janela, das verificadas há mais tempo (ou nunca) para as mais recentes."""
+        now = datetime.utcnow()
+        cursor = self.conn.execute(
+            "SELECT * FROM source_revisions WHERE published_at >= ? AND (checked_at IS NULL OR checked_at < ?) "
+            "ORDER BY checked_at IS NOT NULL, checked_at LIMIT ?",
+            (now - self.window, now - min_interval + timedelta(seconds=30), limit),
+        )
+        cursor.row_factory = sqlite3.Row
+        return cursor.fetchall()
+
+    def _save(self, row, paragraphs=None, etag=None, last_modified=None, updated=False):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE source_revisions SET checked_at = ?, etag = COALESCE(?, etag), "
+                "last_modified = COALESCE(?, last_modified), paragraphs = COALESCE(?, paragraphs), "
+                "updates = updates + ? WHERE seen_article_id = ?",
+                (
+                    datetime.utcnow(), etag, last_modified,
+                    json.dumps(paragraphs, ensure_ascii=False) if paragraphs is not None else None,
+                    1 if updated else 0, row['seen_article_id'],
+                ),
+            )
+
+    def revalidate(self, row) -> str:
+        """
+        Verifica uma fonte. Retorna 'not_modified', 'unchanged', 'cosmetic',
+        'too_small', 'too_many_changes', 'updated' ou 'failed'.
+        """
+        from .extraction_pool import extract_html
+
+        url = row['url']
+        headers = {}
+        if row['etag']:
+            headers['If-None-Match'] = row['etag']
+        if row['last_modified']:
+            headers['If-Modified-Since'] = row['last_modified']
+        try:
+            resp = self.extractor.session.get(url, headers=headers, timeout=20.0, allow_redirects=True)
+            if resp.status_code == 304:
+                self._save(row)
+                return 'not_modified'
+            resp.raise_for_status()
+            extracted = extract_html(self.extractor, resp.text, url)
+        except (requests.RequestException, ValueError) as e:
+            logger.warning(f"REVALIDATION: falha ao buscar {url}: {e}")
+            self._save(row)
+            return 'failed'
+
+        etag, last_modified = resp.headers.get('ETag'), resp.headers.get('Last-Modified')
+        if not extracted or not extracted.get('content'):
+            self._save(row)
+            return 'failed'
+
+        new_paragraphs = extract_paragraphs(extracted['content'])
+        old_paragraphs = [tuple(p) for p in json.loads(row['paragraphs'])]
+        diff = diff_paragraphs(old_paragraphs, new_paragraphs)
+        changed = diff['changed']
+        if not changed:
+            self._save(row, new_paragraphs, etag, last_modified)
+            return 'cosmetic' if diff['cosmetic'] else 'unchanged'
+        if sum(len(t) for t in changed) < REVALIDATION_MIN_CHANGED_CHARS:
+            # Mantém o fingerprint antigo: mudanças pequenas se acumulam até valer a chamada
+            self._save(row)
+            return 'too_small'
+        if len(changed) > REVALIDATION_MAX_CHANGED_RATIO * max(diff['total'], 1):
+            logger.warning(f"REVALIDATION: {url} mudou demais ({len(changed)}/{diff['total']} parágrafos); sem atualização automática.")
+            self._save(row, new_paragraphs, etag, last_modified)
+            return 'too_many_changes'
+
+        update_html, reason = self.ai_processor.rewrite_update(row['title'] or '', changed, url)
+        if not update_html:
+            # Não grava o fingerprint novo: a próxima rodada tenta de novo
+            logger.warning(f"REVALIDATION: IA não gerou atualização para {url}: {reason}")
+            self._save(row)
+            return 'failed'
+        update_html, reason = clean_update_html(update_html)
+        if not update_html:
+            # A fonte trouxe o CTA: o fingerprint novo evita gastar IA de novo com ele
+            logger.warning(f"REVALIDATION: atualização de {url} descartada: {reason}")
+            self._save(row, new_paragraphs, etag, last_modified)
+            return 'rejected'
+        if not self._apply_update(row['wp_post_id'], update_html):
+            self._save(row)
+            return 'failed'
+        self._save(row, new_paragraphs, etag, last_modified, updated=True)
+        logger.info(f"REVALIDATION: post {row['wp_post_id']} atualizado com {len(changed)} parágrafos novos de {url}")
+        return 'updated'
+
+    def _apply_update(self, post_id: int, update_html: str) -> bool:
+        from .html_utils import html_to_gutenberg_blocks
+
+        content = self.wp_client.get_post_content(post_id)
+        if content is None:
+            return False
+        stamp = datetime.now().strftime('%d/%m/%Y %H:%M')
+        block = html_to_gutenberg_blocks(f"<h2>Atualização ({stamp})</h2>{update_html}")
+        if not self.wp_client.update_post_content(post_id, f"{content.rstrip()}\n\n{block}"):
+            return False
+        # Mesma verificação final da publicação, sobre o post inteiro
+        if not self.wp_client.sanitize_published_post(post_id):
+            logger.warning(f"REVALIDATION: sanitize_published_post falhou para o post {post_id}")
+        return True
+
+    def run(self, limit: int = REVALIDATION_MAX_PER_RUN) -> Dict[str, int]:
+        outcomes: Dict[str, int] = {}
+        for row in self.due(limit):
+            outcome = self.revalidate(row)
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        return outcomes
+
+    def purge(self) -> int:
+        with self.conn:
+            return self.conn.execute(
+                "DELETE FROM source_revisions WHERE published_at < ?", (datetime.utcnow() - self.window,)
+            ).rowcount
+
+
+def record_published_source(conn: sqlite3.Connection, seen_article_id: int, wp_post_id: int, url: str, title: str, content_html: str):
+    """Passo do pipeline após a publicação (falhas só geram aviso)."""
+    try:
+        SourceRevalidator(conn).record(seen_article_id, wp_post_id, url, title, content_html)
+    except Exception as e:
+        logger.warning(f"REVALIDATION: falha ao gravar fingerprint de {url}: {e}")
+
+
+def revalidate_published_sources() -> Dict[str, int]:
+    """Job do agendador: revalida as fontes publicadas recentemente."""
+    from .ai_processor import AIProcessor
+    from .config import WORDPRESS_CATEGORIES, WORDPRESS_CONFIG
+    from .extractor import ContentExtractor
+    from .store import Database
+    from .wordpress import WordPressClient
+
+    db = Database()
+    wp_client = WordPressClient(config=WORDPRESS_CONFIG, categories_map=WORDPRESS_CATEGORIES)
+    try:
+        revalidator = SourceRevalidator(
+            db.conn,
+            extractor=ContentExtractor(),
+            ai_processor=AIProcessor(),
+            wp_client=wp_client,
+        )
+        outcomes = revalidator.run()
+        revalidator.purge()
+    finally:
+        wp_client.close()
+        db.close()
+    if outcomes:
+        logger.info(f"REVALIDATION: {outcomes}")
+    return outcomes
@@ -13,8 +13,8 @@ Regras implementadas:
 - Com números, datas ou contexto temporal quando possível
 """
 
-import re
 import logging
+from . import regexes as rx
 from typing import Optional, Tuple
 
 logger = logging.getLogger(__name__)
@@ -61,27 +61,17 @@ def clean_html_characters(title: str) -> str:
         cleaned = cleaned.replace(html_char, replacement)
     
     # Remove any remaining HTML entities
-    cleaned = re.sub(r'&#\d+;', '', cleaned)
-    cleaned = re.sub(r'&[a-z]+;', '', cleaned)
+    cleaned = rx.HTML_NUMERIC_ENTITY.sub('', cleaned)
+    cleaned = rx.HTML_NAMED_ENTITY.sub('', cleaned)
     
     return cleaned
 
 
 def remove_clickbait(title: str) -> str:
     """Remove common clickbait patterns."""
-    clickbait_patterns = [
-        r'^Você não vai acreditar',
-        r'^Você precisa ver',
-        r'^Isto é incrível',
-        r'^Não sabíamos sobre',
-        r'^Ninguém esperava',
-        r'^O que aconteceu foi',
-        r'^Prepare-se para',
-    ]
-    
     result = title
-    for pattern in clickbait_patterns:
-        result = re.sub(pattern, '', result, flags=re.IGNORECASE)
+    for pattern in rx.CLICKBAIT_PREFIXES:
+        result = pattern.sub('', result)
     
     return result.strip()
 
@@ -102,7 +92,7 @@ def extract_keyword(title: str, content: Optional[str] = None) -> Optional[str]:
     
     for word in words:
         # Remove punctuation
-        clean_word = re.sub(r'[^\w]', '', word)
+        clean_word = rx.NON_WORD_CHARS.sub('', word)
         
         # Skip if too short or is stop word
         if len(clean_word) < 3 or clean_word in stop_words:
@@ -183,7 +173,7 @@ def analyze_title_quality(title: str) -> Tuple[float, list]:
         score -= 10
     
     # Check for clickbait
-    if re.search(r'Você (não|precisa|não vai acreditar)', title, re.IGNORECASE):
+    if rx.CLICKBAIT_HINT.search(title):
         issues.append("Contém padrão de clickbait")
         score -= 15
     
@@ -193,7 +183,7 @@ def analyze_title_quality(title: str) -> Tuple[float, list]:
         score -= 5
     
     # Bonus for numbers/dates
-    if re.search(r'\d{4}|2025|2024|\d+%|US\$', title):
+    if rx.NUMBER_OR_YEAR.search(title):
         score += 5
     
     # Bonus for proper structure
@@ -326,7 +316,7 @@ def _truncate_title(title: str, max_length: int) -> str:
         truncated = truncated[:last_space]
     
     # Remove trailing punctuation
-    truncated = re.sub(r'[,;:.]$', '', truncated)
+    truncated = rx.TRAILING_PUNCTUATION.sub('', truncated)
     
     return truncated.strip()
 
@@ -0,0 +1,185 @@
+"""
+Regras de extração declarativas por domínio.
+
+Cada fonte é descrita em `extraction_rules.json` (ou YAML, se o PyYAML
+estiver instalado): onde está o contêiner do artigo, o que remover do corpo
+(tags, seletores, padrões de classe/id, atributos `data-*`), se roda a
+limpeza de figuras/CTAs/legendas em inglês e de quais atributos vêm as
+imagens. As regras são compiladas uma vez (`SiteCleanRule`/`SelectorUnion`
+do `clean_engine`) e indexadas por host, então o custo por artigo não cresce
+com o número de domínios: a busca é feita pelos sufixos do host
+(`m.screenrant.com` → `screenrant.com`), um dict lookup por rótulo.
+
+Campos por site (em `sites`, herdando de `profiles` via `profile`):
+
+    label              nome usado nos logs
+    container          seletores tentados em ordem (select_one na página)
+    body               seletores tentados dentro do contêiner (senão, o próprio)
+    remove_tags        tags removidas do corpo
+    remove_selectors   seletores CSS removidos do corpo
+    class_patterns     regex (sem caixa) aplicadas à classe e ao id
+    flag_attrs         atributos que, com valor não vazio, removem o elemento
+    attr_prefixes      prefixos de atributo que removem o elemento (ex. data-stnl-)
+    figures            remove figuras vazias/decorativas/thumbnails/órfãs
+    ctas               remove blocos com frases de CTA
+    english_captions   limpa legendas em inglês
+    image_attrs        atributos lidos das <img> do corpo
+    related_selectors  blocos de relacionados removidos no extrator genérico
+    handler            limpador em código para sites fora do formato (ex. lance)
+    stream_until       seletores simples; o download para quando o primeiro
+                       elemento que casa é fechado (streaming_fetch)
+
+Adicionar uma fonte nova é acrescentar uma entrada no arquivo.
+"""
+
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from bs4 import BeautifulSoup, Tag
+
+from .clean_engine import SelectorUnion, SiteCleanRule
+from .streaming_fetch import StopMatcher
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_RULES_PATH = os.getenv(
+    'EXTRACTION_RULES_PATH', os.path.join(os.path.dirname(__file__), 'extraction_rules.json')
+)
+
+_RULE_FIELDS = {
+    'label', 'profile', 'container', 'body', 'remove_tags', 'remove_selectors',
+    'class_patterns', 'flag_attrs', 'attr_prefixes', 'figures', 'ctas',
+    'english_captions', 'image_attrs', 'related_selectors', 'handler', 'stream_until',
+}
+_DEFAULT_IMAGE_ATTRS = ('src', 'data-src')
+
+
+class SiteRule:
+    """Regras compiladas de um domínio."""
+
+    def __init__(self, host: str, spec: Dict[str, Any]):
+        unknown = set(spec) - _RULE_FIELDS
+        if unknown:
+            raise ValueError(f"Regra de extração de {host}: campos desconhecidos {sorted(unknown)}")
+        self.host = host
+        self.label = spec.get('label') or host
+        self.handler: Optional[str] = spec.get('handler')
+        self.container = tuple(spec.get('container') or ())
+        self.body = tuple(spec.get('body') or ())
+        self.english_captions = bool(spec.get('english_captions', False))
+        self.image_attrs = tuple(spec.get('image_attrs') or _DEFAULT_IMAGE_ATTRS)
+        related = spec.get('related_selectors') or ()
+        self.related = SelectorUnion(related) if related else None
+        stream_until = spec.get('stream_until') or ()
+        self.stream_stop = StopMatcher(stream_until) if stream_until else None
+        self.clean = SiteCleanRule(
+            self.label,
+            class_patterns=spec.get('class_patterns') or (),
+            remove_tags=spec.get('remove_tags', ('script', 'style')),
+            flag_attrs=spec.get('flag_attrs') or (),
+            attr_prefixes=spec.get('attr_prefixes') or (),
+            remove_selectors=spec.get('remove_selectors') or (),
+            figures=bool(spec.get('figures', False)),
+            ctas=bool(spec.get('ctas', False)),
+        )
+
+    @property
+    def cleans_body(self) -> bool:
+        """False para regras que só afetam o extrator genérico (ex. related_selectors)."""
+        return bool(self.handler or self.container)
+
+    def find_body(self, soup: BeautifulSoup) -> Optional[Tag]:
+        """Contêiner do artigo (primeiro seletor que casa) e, dentro dele, o corpo."""
+        container = None
+        for selector in self.container:
+            container = soup.select_one(selector)
+            if container:
+                break
+        if not container:
+            logger.error(f"ERRO CRÍTICO ({self.label}): Nenhum contêiner de artigo encontrado.")
+            return None
+        for selector in self.body:
+            body = container.select_one(selector)
+            if body:
+                return body
+        if self.body:
+            logger.warning(f"AVISO ({self.label}): Corpo {list(self.body)} não encontrado, usando o contêiner inteiro.")
+        return container
+
+    def image_urls(self, root: Tag) -> List[str]:
+        """Valor do primeiro atributo de imagem preenchido de cada <img>, em ordem."""
+        urls = []
+        for img in root.find_all('img'):
+            for attr in self.image_attrs:
+                value = img.get(attr)
+                if value:
+                    urls.append(value)
+                    break
+        return urls
+
+
+class SiteRuleTable:
+    """Regras indexadas por host; a busca percorre só os sufixos do host."""
+
+    def __init__(self, rules: Dict[str, SiteRule]):
+        self.rules = rules
+
+    def __len__(self):
+        return len(self.rules)
+
+    def for_host(self, host: str) -> Optional[SiteRule]:
+        host = (host or '').lower().split(':', 1)[0]
+        if host.startswith('www.'):
+            host = host[4:]
+        labels = host.split('.')
+        for i in range(len(labels) - 1):
+            rule = self.rules.get('.'.join(labels[i:]))
+            if rule is not None:
+                return rule
+        return None
+
+
+def compile_rules(raw: Dict[str, Any]) -> SiteRuleTable:
+    """Compila o conteúdo do arquivo de regras (perfis + sites)."""
+    profiles = raw.get('profiles') or {}
+    rules = {}
+    for host, spec in (raw.get('sites') or {}).items():
+        spec = dict(spec)
+        profile = spec.pop('profile', None)
+        if profile:
+            if profile not in profiles:
+                raise ValueError(f"Regra de extração de {host}: perfil '{profile}' não existe")
+            spec = {**profiles[profile], **spec}
+        rules[host.lower()] = SiteRule(host.lower(), spec)
+    return SiteRuleTable(rules)
+
+
+def load_site_rules(path: str = EXTRACTION_RULES_PATH) -> SiteRuleTable:
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith(('.yml', '.yaml')):
+            if yaml is None:
+                raise RuntimeError(f"PyYAML não instalado; não é possível ler {path}")
+            raw = yaml.safe_load(f)
+        else:
+            raw = json.load(f)
+    table = compile_rules(raw or {})
+    logger.info(f"Regras de extração carregadas: {len(table)} domínios ({path})")
+    return table
+
+
+_table: Optional[SiteRuleTable] = None
+
+
+def get_site_rules() -> SiteRuleTable:
+    """Tabela do processo, compilada na primeira chamada."""
+    global _table
+    if _table is None:
+        _table = load_site_rules()
+    return _table
@@ -12,6 +12,7 @@ from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
 
 from .config import PIPELINE_ORDER
+from .metrics import ARTICLE_STATUS
 
 logger = logging.getLogger(__name__)
 
@@ -120,7 +121,7 @@ class Database:
                     url TEXT,
                     published_at DATETIME,
                     inserted_at DATETIME DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
-                    status TEXT DEFAULT 'NEW', -- NEW, PROCESSING, REWRITTEN, PUBLISHED, FAILED, DEFERRED
+                    status TEXT DEFAULT 'NEW', -- NEW, PROCESSING, REWRITTEN, PUBLISHED, FAILED, DEFERRED, DUPLICATE
                     retry_at DATETIME,
                     fail_reason TEXT,
                     UNIQUE(source_id, external_id)
@@ -255,6 +256,7 @@ class Database:
                 (article_db_id, wp_post_id)
             )
             self.conn.commit()
+            ARTICLE_STATUS.labels(status='PUBLISHED').inc()
             logger.info(f"Successfully recorded published post for article DB ID {article_db_id} (WP Post ID: {wp_post_id}).")
         except sqlite3.IntegrityError:
             logger.warning(f"Post record for article DB ID {article_db_id} already exists.")
@@ -334,6 +336,7 @@ class Database:
                 else:
                     cursor.execute("UPDATE seen_articles SET status = ? WHERE id = ?", (status, article_id))
             self.conn.commit()
+            ARTICLE_STATUS.labels(status=status).inc()
         except sqlite3.Error as e:
             logger.error(f"Failed to update article status for id {article_id}: {e}")
 
@@ -357,7 +360,7 @@ class Database:
     def cleanup_old_entries(self, cutoff_time: datetime) -> int:
         """
         Deletes records from seen_articles and posts older than the cutoff time.
-        Only deletes articles with status 'PUBLISHED' or 'FAILED'.
+        Only deletes articles with status 'PUBLISHED', 'FAILED' or 'DUPLICATE'.
 
         Args:
             cutoff_time: The datetime threshold. Records older than this will be deleted.
@@ -370,7 +373,7 @@ class Database:
 
             # Find IDs of old articles to delete
             cursor.execute(
-                "SELECT id FROM seen_articles WHERE inserted_at < ? AND status IN ('PUBLISHED', 'FAILED')",
+                "SELECT id FROM seen_articles WHERE inserted_at < ? AND status IN ('PUBLISHED', 'FAILED', 'DUPLICATE')",
                 (cutoff_time,)
             )
             article_ids_to_delete = [row['id'] for row in cursor.fetchall()]
@@ -0,0 +1,137 @@
+"""
+Download de páginas de origem com parada antecipada.
+
+Páginas do ScreenRant/GameRant trazem, depois do corpo do artigo, blocos
+enormes de script/JSON inline, e o `_fetch_html` baixava tudo antes de
+começar a parsear. Aqui a resposta é lida em pedaços (`stream=True`) e cada
+pedaço alimenta um `lxml.etree.HTMLPullParser`:
+
+- o `<head>` (metadados og:*, JSON-LD, canonical) chega antes do corpo e é
+  preservado;
+- quando o elemento indicado por `stream_until` na regra do domínio
+  (`extraction_rules.json`) é fechado, a leitura para e a conexão é
+  encerrada — só o primeiro elemento que casa conta, então um <article>
+  aninhado (card de relacionados) não interrompe a leitura;
+- em qualquer domínio, a leitura para em `FETCH_MAX_BYTES`.
+
+O HTML devolvido é o prefixo lido; o BeautifulSoup fecha as tags abertas ao
+parsear. Conteúdo depois do corpo (comentários, vídeos no rodapé, JSON-LD no
+fim da página) deixa de ser visto nos domínios com `stream_until`.
+"""
+
+import logging
+import os
+import re
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import requests
+from lxml import etree
+
+from .clean_engine import _condition_matches, _parse_simple_selector
+
+logger = logging.getLogger(__name__)
+
+FETCH_STREAMING = os.getenv('FETCH_STREAMING', 'true').lower() == 'true'
+FETCH_MAX_BYTES = int(os.getenv('FETCH_MAX_BYTES', 4 * 1024 * 1024))
+FETCH_CHUNK_BYTES = int(os.getenv('FETCH_CHUNK_BYTES', 32 * 1024))
+
+_HEADER_CHARSET_RE = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.I)
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?([\w.:-]+)', re.I)
+
+
+class StopMatcher:
+    """Seletores simples (`tag`, `.classe`, `#id`, `tag[attr*=v]`) testados em elementos lxml."""
+
+    def __init__(self, selectors: Iterable[str]):
+        self.compiled = []
+        for group in selectors:
+            for selector in group.split(','):
+                parsed = _parse_simple_selector(selector)
+                if parsed is None:
+                    raise ValueError(f"stream_until só aceita seletores simples: {selector!r}")
+                self.compiled.append(parsed)
+
+    def matches(self, element) -> bool:
+        tag = element.tag
+        if not isinstance(tag, str):
+            return False
+        tag = tag.lower()
+        attrs = element.attrib
+        for name, conditions in self.compiled:
+            if name and name != tag:
+                continue
+            if all(_condition_matches(attrs, c) for c in conditions):
+                return True
+        return False
+
+
+def _response_encoding(resp: requests.Response, head: bytes) -> str:
+    # requests assume ISO-8859-1 para text/* sem charset; preferimos o <meta charset>
+    m = _HEADER_CHARSET_RE.search(resp.headers.get('Content-Type', ''))
+    if m:
+        return m.group(1)
+    m = _META_CHARSET_RE.search(head[:4096])
+    if m:
+        return m.group(1).decode('ascii', 'ignore')
+    return 'utf-8'
+
+
+def fetch_streaming(
+    session: requests.Session,
+    url: str,
+    stop: Optional[StopMatcher] = None,
+    max_bytes: int = FETCH_MAX_BYTES,
+    timeout: float = 20.0,
+    chunk_bytes: int = FETCH_CHUNK_BYTES,
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Baixa `url` em pedaços, parando no fim do elemento `stop` ou em `max_bytes`.
+    Retorna (html, stats) — stats: bytes, content_length, stopped ('body' |
+    'max_bytes' | None), first_chunk_s, elapsed_s. Levanta requests.RequestException.
+    """
+    started = time.monotonic()
+    chunks = []
+    read = 0
+    stopped = None
+    first_chunk_s = None
+    with session.get(url, timeout=timeout, allow_redirects=True, stream=True) as resp:
+        resp.raise_for_status()
+        parser = None
+        target = None
+        for chunk in resp.iter_content(chunk_size=chunk_bytes):
+            if not chunk:
+                continue
+            if first_chunk_s is None:
+                first_chunk_s = time.monotonic() - started
+            chunks.append(chunk)
+            read += len(chunk)
+
+            if stop is not None:
+                if parser is None:
+                    encoding = _response_encoding(resp, chunk)
+                    parser = etree.HTMLPullParser(events=('start', 'end'), encoding=encoding)
+                parser.feed(chunk)
+                for event, element in parser.read_events():
+                    if target is None:
+                        if event == 'start' and stop.matches(element):
+                            target = element
+                    elif event == 'end' and element is target:
+                        stopped = 'body'
+                        break
+                if stopped:
+                    break
+            if read >= max_bytes:
+                stopped = 'max_bytes'
+                break
+        encoding = _response_encoding(resp, chunks[0] if chunks else b'')
+        content_length = resp.headers.get('Content-Length')
+
+    html = b''.join(chunks).decode(encoding, errors='replace')
+    return html, {
+        'bytes': read,
+        'content_length': int(content_length) if content_length and content_length.isdigit() else None,
+        'stopped': stopped,
+        'first_chunk_s': first_chunk_s,
+        'elapsed_s': time.monotonic() - started,
+    }
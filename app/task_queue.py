@@ -10,5 +10,11 @@ class ArticleQueue:
         self.q.extend(items)
     def pop(self):
         return self.q.popleft() if self.q else None
+    def items(self):
+        return list(self.q)
+    def pop_at(self, index):
+        item = self.q[index]
+        del self.q[index]
+        return item
     def __len__(self):
         return len(self.q)
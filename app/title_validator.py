@@ -3,8 +3,8 @@
 Validador de Títulos e SEO Titles conforme regras editoriais.
 Garante: caracteres, concordância, acentuação, regência, tom, verbos no presente.
 """
-import re
 import logging
+from . import regexes as rx
 from typing import Dict, List, Tuple, Optional
 
 logger = logging.getLogger(__name__)
@@ -104,20 +104,20 @@ class TitleValidator:
             )
         
         # 2. Verificar presente para notícias quentes
-        infinitive_verbs = re.findall(r'\b(?:falar|dizer|contar|revelar|demonstrar|mostrar|deixar|fazer)\b', title, re.IGNORECASE)
+        infinitive_verbs = rx.INFINITIVE_VERBS.findall(title)
         if infinitive_verbs:
             self.warnings.append(f"⚠️ Verbo no infinitivo detectado: {', '.join(set(infinitive_verbs))}. Use presente: 'revela', 'mostra', 'conta'.")
         
         # 3. Verificar concordância
-        if re.search(r'\bos serie\b', title, re.IGNORECASE):
+        if rx.OS_SERIE.search(title):
             self.errors.append("❌ Erro de concordância: 'os serie' → 'as séries'")
         
         # 4. Verificar acentuação
-        if re.search(r'\bgratis\b', title, re.IGNORECASE):
+        if rx.GRATIS.search(title):
             self.errors.append("❌ Acentuação: 'grátis' ou 'de graça' (preferir 'de graça' em tom neutro).")
         
         # 5. Verificar regência
-        if re.search(r'\bficou de lado\b', title, re.IGNORECASE):
+        if rx.FICOU_DE_LADO.search(title):
             self.warnings.append("⚠️ Regência: prefira 'ficou de fora' ou 'saiu do GOTY'.")
         
         # 6. Verificar caixa-alta excessiva
@@ -126,12 +126,12 @@ class TitleValidator:
             self.warnings.append(f"⚠️ Caixa-alta excessiva ({uppercase_count} letras maiúsculas). Reservar para nomes próprios.")
         
         # 7. Verificar sensacionalismo (expandido)
-        sensationalism = re.findall(r'\b(?:surpreendente|impressionante|explode|bomba|nerfado|morto|mata|matou)\b', title, re.IGNORECASE)
+        sensationalism = rx.SENSATIONALISM.findall(title)
         if sensationalism:
             self.errors.append(f"❌ Sensacionalismo detectado: {', '.join(set(sensationalism))}. Use termos factuais.")
         
         # 7.5 Verificar "sucesso surpreendente" (aviso - termo vazio comum)
-        if re.search(r'\bsucesso\s+surpreendentes?\b', title, re.IGNORECASE):
+        if rx.SUCESSO_SURPREENDENTE_PLURAL.search(title):
             self.warnings.append("⚠️ Termo vazio: 'sucesso surpreendente'. Use apenas 'sucesso' ou adicione contexto (bilheteria, audiência).")
         
         # 8. Verificar pergunta (evitar em títulos)
@@ -143,25 +143,25 @@ class TitleValidator:
             self.errors.append("❌ Duplos dois-pontos detectados. Use: 'Termo: —'.")
         
         # 10. Verificar frases fracas
-        weak_phrases = re.findall(r'\b(?:veja|entenda|descubra|saiba)\b', title, re.IGNORECASE)
+        weak_phrases = rx.WEAK_PHRASES.findall(title)
         if weak_phrases:
             self.errors.append(f"❌ Frases fracas: {', '.join(set(weak_phrases))}. Use afirmação direta.")
         
         # 11. Verificar plataforma no final (aviso leve)
-        if re.search(r'(?:Netflix|Disney|HBO|Prime|Paramount|Max)\s+(?:revela|anuncia|apresenta|libera)', title, re.IGNORECASE):
+        if rx.PLATFORM_FIRST.search(title):
             self.warnings.append("⚠️ Plataforma no início. Prefira colocar no final: '...na Netflix'.")
         
         # 12. Verificar termos vazios (mais permissivo - avisar)
-        if re.search(r'\bsucesso surpreendente\b', title, re.IGNORECASE):
+        if rx.SUCESSO_SURPREENDENTE.search(title):
             self.warnings.append("⚠️ Termo vazio: 'sucesso surpreendente'. Use apenas 'sucesso'.")
         
         # 13. Verificar gíria agressiva (avisar, não bloquear)
-        gíria = re.findall(r'\b(?:nerfado|nerf)\b', title, re.IGNORECASE)
+        gíria = rx.NERF_SLANG.findall(title)
         if gíria:
             self.warnings.append("⚠️ Gíria agressiva detectada: 'nerfado'. Use 'ajustado' ou 'modificado'.")
         
         # 13.5 Verificar "ficou de lado" (regência - avisar)
-        if re.search(r'\bficou de lado\b', title, re.IGNORECASE):
+        if rx.FICOU_DE_LADO.search(title):
             self.warnings.append("⚠️ Regência: 'ficou de lado' é pouco claro. Use 'ficou de fora', 'saiu', 'foi removido'.")
         
         # 14. Verificar múltiplas interrogações ou exclamações (bloquear)
@@ -169,7 +169,7 @@ class TitleValidator:
             self.errors.append("❌ Múltiplas interrogações/exclamações. Máximo 1.")
         
         # 15. Verificar "vários" (avisar - vago)
-        if re.search(r'\bvários\s+(?:filmes|séries|games|títulos)\b', title, re.IGNORECASE):
+        if rx.VARIOS_VAGUE.search(title):
             self.warnings.append("⚠️ 'Vários' é vago. Prefira: 'múltiplos', 'três', 'cinco', 'novo'.")
         
         # Compilar resultado
@@ -187,16 +187,16 @@ class TitleValidator:
         corrected = title
         
         # Correções básicas
-        corrected = re.sub(r'\bgratis\b', 'de graça', corrected, flags=re.IGNORECASE)
-        corrected = re.sub(r'\bvários\b', 'múltiplos', corrected, flags=re.IGNORECASE)
-        corrected = re.sub(r'\bsucesso surpreendente\b', 'sucesso', corrected, flags=re.IGNORECASE)
-        corrected = re.sub(r'\bexplode nas redes\b', 'viralizando', corrected, flags=re.IGNORECASE)
+        corrected = rx.GRATIS.sub('de graça', corrected)
+        corrected = rx.VARIOS.sub('múltiplos', corrected)
+        corrected = rx.SUCESSO_SURPREENDENTE.sub('sucesso', corrected)
+        corrected = rx.EXPLODE_NAS_REDES.sub('viralizando', corrected)
         
         # Remover sensacionalismo
-        corrected = re.sub(r'\b(?:nerfado|nerf)\b', 'ajustado', corrected, flags=re.IGNORECASE)
+        corrected = rx.NERF_SLANG.sub('ajustado', corrected)
         
         # Limpar espaços extras
-        corrected = re.sub(r'\s+', ' ', corrected).strip()
+        corrected = rx.WHITESPACE_RUN.sub(' ', corrected).strip()
         
         return corrected
     
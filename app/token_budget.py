@@ -0,0 +1,427 @@
+"""
+Orçamento de tokens: estimativa antes da chamada e admissão por prioridade.
+
+O `AIProcessor` só registra os tokens depois da chamada; quando as chaves
+esgotavam a cota, os artigos ficavam girando entre QUEUED e FAILED. Aqui:
+
+- `TokenEstimator` é ajustado com o histórico do ledger de tokens
+  (`token_ledger`): regressão linear `prompt_tokens ≈ overhead + chars /
+  chars_por_token` sobre o tamanho do conteúdo enviado (`content_chars` no
+  metadata de cada chamada), mediana de caracteres por domínio de origem
+  (antes da extração o tamanho do artigo ainda não é conhecido) e razão
+  saída/entrada;
+- `TokenBudget` conhece o que resta por chave no dia (tokens e requisições,
+  dos agregados `token_keys`) e no último minuto, e `choose()` escolhe, entre
+  os artigos da fila, o de maior prioridade — peso da fonte (ordem em
+  `PIPELINE_ORDER`, ou `TOKEN_BUDGET_SOURCE_WEIGHTS`) × frescor (meia-vida de
+  `TOKEN_BUDGET_HALF_LIFE_H` horas) — cuja estimativa cabe no que sobrou. Sem
+  orçamento, os artigos simplesmente continuam na fila;
+- `simulate()` reexecuta o histórico do ledger com outros limites e mostra o
+  que teria sido admitido, adiado e o erro da estimativa:
+
+    python -m app.token_budget --days 14 --keys 2 --daily-requests 20
+
+Limites por chave (0 = sem limite): `TOKEN_BUDGET_KEY_DAILY_TOKENS`,
+`TOKEN_BUDGET_KEY_DAILY_REQUESTS`, `TOKEN_BUDGET_KEY_MINUTE_TOKENS`.
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import statistics
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+from .config import PIPELINE_ORDER, RSS_FEEDS
+from .token_ledger import TOKEN_LOG_DIR, TokenLedger, get_ledger
+
+logger = logging.getLogger(__name__)
+
+TOKEN_BUDGET_ENABLED = os.getenv('TOKEN_BUDGET_ENABLED', 'true').lower() == 'true'
+TOKEN_BUDGET_KEY_DAILY_TOKENS = int(os.getenv('TOKEN_BUDGET_KEY_DAILY_TOKENS', 0))
+TOKEN_BUDGET_KEY_DAILY_REQUESTS = int(os.getenv('TOKEN_BUDGET_KEY_DAILY_REQUESTS', 1000))
+TOKEN_BUDGET_KEY_MINUTE_TOKENS = int(os.getenv('TOKEN_BUDGET_KEY_MINUTE_TOKENS', 250000))
+TOKEN_BUDGET_SAFETY = float(os.getenv('TOKEN_BUDGET_SAFETY', 1.2))
+TOKEN_BUDGET_HALF_LIFE_H = float(os.getenv('TOKEN_BUDGET_HALF_LIFE_H', 6))
+TOKEN_BUDGET_HISTORY_DAYS = int(os.getenv('TOKEN_BUDGET_HISTORY_DAYS', 30))
+TOKEN_BUDGET_REFIT_S = float(os.getenv('TOKEN_BUDGET_REFIT_S', 3600))
+TOKEN_BUDGET_SOURCE_WEIGHTS = json.loads(os.getenv('TOKEN_BUDGET_SOURCE_WEIGHTS', '{}') or '{}')
+
+# Sem histórico: ~4 caracteres por token, artigo típico de 20 mil caracteres
+DEFAULT_CHARS_PER_TOKEN = 4.0
+DEFAULT_CONTENT_CHARS = 20000
+DEFAULT_COMPLETION_RATIO = 0.5
+MIN_FIT_SAMPLES = 5
+
+
+def _domain(url: Optional[str]) -> str:
+    try:
+        return urlparse(url or '').netloc.lower().removeprefix('www.')
+    except ValueError:
+        return ''
+
+
+def _parse_published(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        dt = value
+    elif isinstance(value, str) and value:
+        try:
+            dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            try:
+                dt = parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                return None
+    else:
+        return None
+    # Tudo em hora local ingênua, como os timestamps do ledger
+    return dt.astimezone().replace(tzinfo=None) if dt.tzinfo else dt
+
+
+def default_source_weights() -> Dict[str, float]:
+    """Peso por domínio: as fontes no início de PIPELINE_ORDER valem mais (1.0 até 0.5)."""
+    weights: Dict[str, float] = {}
+    count = max(1, len(PIPELINE_ORDER) - 1)
+    for position, source_id in enumerate(PIPELINE_ORDER):
+        weight = float(TOKEN_BUDGET_SOURCE_WEIGHTS.get(source_id, 1.0 - 0.5 * position / count))
+        for url in RSS_FEEDS.get(source_id, {}).get('urls', []):
+            weights.setdefault(_domain(url), weight)
+    for name, weight in TOKEN_BUDGET_SOURCE_WEIGHTS.items():
+        if '.' in name:
+            weights[_domain(f'https://{name}')] = float(weight)
+    return weights
+
+
+def priority(weights: Dict[str, float], url: Optional[str], published: Any, now: datetime) -> float:
+    """Peso da fonte × frescor (1.0 recém-publicado, metade a cada meia-vida)."""
+    weight = weights.get(_domain(url), 0.5)
+    published = _parse_published(published)
+    age_h = max(0.0, (now - published).total_seconds() / 3600) if published else TOKEN_BUDGET_HALF_LIFE_H
+    return weight * 0.5 ** (age_h / TOKEN_BUDGET_HALF_LIFE_H)
+
+
+class TokenEstimator:
+    """Estimativa de tokens de uma reescrita a partir do tamanho do conteúdo."""
+
+    def __init__(
+        self,
+        overhead_tokens: float = 0.0,
+        chars_per_token: float = DEFAULT_CHARS_PER_TOKEN,
+        completion_ratio: float = DEFAULT_COMPLETION_RATIO,
+        domain_chars: Optional[Dict[str, float]] = None,
+        default_chars: float = DEFAULT_CONTENT_CHARS,
+        samples: int = 0,
+    ):
+        self.overhead_tokens = overhead_tokens
+        self.chars_per_token = chars_per_token
+        self.completion_ratio = completion_ratio
+        self.domain_chars = domain_chars or {}
+        self.default_chars = default_chars
+        self.samples = samples
+
+    @classmethod
+    def fit(cls, events: Iterable[Dict[str, Any]]) -> 'TokenEstimator':
+        """Ajusta com registros do ledger (só reescritas bem-sucedidas que trazem `content_chars`)."""
+        points: List[Tuple[float, float]] = []
+        ratios: List[float] = []
+        by_domain: Dict[str, List[float]] = {}
+        for event in events:
+            chars = (event.get('metadata') or {}).get('content_chars')
+            prompt = event.get('prompt_tokens') or 0
+            if event.get('api_type') != 'gemini' or not event.get('success') or not chars or prompt <= 0:
+                continue
+            points.append((float(chars), float(prompt)))
+            ratios.append((event.get('completion_tokens') or 0) / prompt)
+            by_domain.setdefault(_domain(event.get('source_url')), []).append(float(chars))
+
+        if len(points) < MIN_FIT_SAMPLES:
+            return cls(samples=len(points))
+
+        mean_x = statistics.fmean(x for x, _ in points)
+        mean_y = statistics.fmean(y for _, y in points)
+        var_x = sum((x - mean_x) ** 2 for x, _ in points)
+        slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x if var_x else 0.0
+        if slope > 0:
+            overhead = max(0.0, mean_y - slope * mean_x)
+            chars_per_token = 1 / slope
+        else:
+            # Conteúdos todos do mesmo tamanho (ou ruído): só a razão média
+            overhead = 0.0
+            chars_per_token = mean_x / mean_y
+        return cls(
+            overhead_tokens=overhead,
+            chars_per_token=chars_per_token,
+            completion_ratio=statistics.median(ratios),
+            domain_chars={domain: statistics.median(values) for domain, values in by_domain.items() if domain},
+            default_chars=statistics.median(x for x, _ in points),
+            samples=len(points),
+        )
+
+    def content_chars(self, item: Dict[str, Any]) -> float:
+        """Tamanho do conteúdo: o do item, se conhecido, senão a mediana do domínio de origem."""
+        chars = item.get('content_chars')
+        if chars:
+            return float(chars)
+        return self.domain_chars.get(_domain(item.get('url') or item.get('source_url')), self.default_chars)
+
+    def prompt_tokens(self, content_chars: float) -> int:
+        return int(math.ceil(self.overhead_tokens + content_chars / self.chars_per_token))
+
+    def estimate(self, item: Dict[str, Any]) -> Tuple[int, int]:
+        """(tokens de entrada, total com a saída esperada) para um artigo."""
+        prompt = self.prompt_tokens(self.content_chars(item))
+        return prompt, int(math.ceil(prompt * (1 + self.completion_ratio)))
+
+    def describe(self) -> str:
+        return (
+            f"{self.samples} amostras, overhead {self.overhead_tokens:.0f} tokens, "
+            f"{self.chars_per_token:.2f} chars/token, saída/entrada {self.completion_ratio:.2f}"
+        )
+
+
+class TokenBudget:
+    """Orçamento restante das chaves e escolha do próximo artigo da fila."""
+
+    def __init__(
+        self,
+        ledger: TokenLedger,
+        keys: Sequence[str],
+        daily_tokens: int = TOKEN_BUDGET_KEY_DAILY_TOKENS,
+        daily_requests: int = TOKEN_BUDGET_KEY_DAILY_REQUESTS,
+        minute_tokens: int = TOKEN_BUDGET_KEY_MINUTE_TOKENS,
+        source_weights: Optional[Dict[str, float]] = None,
+    ):
+        self.ledger = ledger
+        self.keys = list(keys)
+        self.daily_tokens = daily_tokens
+        self.daily_requests = daily_requests
+        self.minute_tokens = minute_tokens
+        self.source_weights = default_source_weights() if source_weights is None else source_weights
+        self.estimator = TokenEstimator()
+        self._fitted_at: Optional[datetime] = None
+
+    def refit(self, now: Optional[datetime] = None):
+        now = now or datetime.now()
+        since = (now - timedelta(days=TOKEN_BUDGET_HISTORY_DAYS)).strftime('%Y-%m-%d')
+        self.estimator = TokenEstimator.fit(self.ledger.events(since_day=since))
+        self._fitted_at = now
+        logger.info(f"TOKEN BUDGET: estimador ajustado ({self.estimator.describe()})")
+
+    def remaining(self, now: Optional[datetime] = None) -> Dict[str, float]:
+        """
+        O que sobra para o pool: `daily_tokens`/`daily_requests` somados entre
+        as chaves, `minute_tokens` da chave mais folgada (o KeyPool escolhe a
+        chave, então basta que alguma comporte a chamada). `math.inf` = sem limite.
+        Só as chamadas de IA (`api_type` 'gemini') contam: os registros de
+        publicação ('publishing', 0 tokens) e de garantia não são requisições.
+        """
+        now = now or datetime.now()
+        today = self.ledger.key_totals(since_day=now.strftime('%Y-%m-%d'), api_type='gemini')
+        last_minute = self.ledger.usage_since((now - timedelta(seconds=60)).isoformat(), api_type='gemini')
+        # Uso sem chave identificada (registros antigos, falhas) desconta do pool inteiro
+        unattributed = {
+            'total_tokens': sum(v['total_tokens'] for k, v in today.items() if k not in self.keys),
+            'requests': sum(v['requests'] for k, v in today.items() if k not in self.keys),
+        }
+
+        def pool_left(limit: int, field: str) -> float:
+            if not limit:
+                return math.inf
+            used = sum(today.get(key, {}).get(field, 0) for key in self.keys) + unattributed[field]
+            return max(0, limit * len(self.keys) - used)
+
+        if self.minute_tokens:
+            minute = max(
+                (self.minute_tokens - last_minute.get(key, {}).get('total_tokens', 0) for key in self.keys),
+                default=0,
+            )
+        else:
+            minute = math.inf
+        return {
+            'daily_tokens': pool_left(self.daily_tokens, 'total_tokens'),
+            'daily_requests': pool_left(self.daily_requests, 'requests'),
+            'minute_tokens': max(0, minute),
+        }
+
+    def priority(self, item: Dict[str, Any], now: Optional[datetime] = None) -> float:
+        return priority(self.source_weights, item.get('url') or item.get('source_url'), item.get('published'),
+                        now or datetime.now())
+
+    def choose(self, items: Sequence[Dict[str, Any]], now: Optional[datetime] = None) -> Tuple[Optional[int], str]:
+        """
+        Índice do artigo a processar agora e o motivo: 'ok', 'minute' (espere a
+        janela de um minuto), 'daily' (cota do dia esgotada) ou 'empty'.
+        """
+        if not items:
+            return None, 'empty'
+        now = now or datetime.now()
+        if self._fitted_at is None or (now - self._fitted_at).total_seconds() >= TOKEN_BUDGET_REFIT_S:
+            self.refit(now)
+        left = self.remaining(now)
+        if left['daily_requests'] < 1:
+            return None, 'daily'
+
+        reason = 'daily'
+        ranked = sorted(range(len(items)), key=lambda i: self.priority(items[i], now), reverse=True)
+        for index in ranked:
+            _, total = self.estimator.estimate(items[index])
+            needed = total * TOKEN_BUDGET_SAFETY
+            if needed > left['daily_tokens']:
+                continue
+            if needed > left['minute_tokens']:
+                reason = 'minute'
+                continue
+            return index, 'ok'
+        return None, reason
+
+
+_budget: Optional[TokenBudget] = None
+
+
+def get_budget(keys: Sequence[str]) -> TokenBudget:
+    """
+    Orçamento do processo para as chaves dadas (sufixos no formato `****abcd`).
+    A ordem não importa: o KeyPool gira `slots` a cada penalidade, e um
+    orçamento novo reajustaria o estimador com todo o histórico.
+    """
+    global _budget
+    if _budget is None or sorted(_budget.keys) != sorted(keys):
+        _budget = TokenBudget(get_ledger(TOKEN_LOG_DIR), keys)
+    return _budget
+
+
+# --- simulação ------------------------------------------------------------
+
+def simulate(
+    events: Iterable[Dict[str, Any]],
+    keys: int = 1,
+    daily_tokens: int = TOKEN_BUDGET_KEY_DAILY_TOKENS,
+    daily_requests: int = TOKEN_BUDGET_KEY_DAILY_REQUESTS,
+    minute_tokens: int = TOKEN_BUDGET_KEY_MINUTE_TOKENS,
+    source_weights: Optional[Dict[str, float]] = None,
+) -> Dict[str, Any]:
+    """
+    Reexecuta as reescritas do histórico com os limites dados.
+
+    Cada chamada registrada conta como a chegada de um artigo (publicado
+    naquele instante) e como uma oportunidade de processar; nela o artigo
+    pendente de maior prioridade que caiba no orçamento é admitido e
+    consome os tokens reais daquela chamada. O estimador de cada dia é
+    ajustado só com os dias anteriores. Pendentes no fim do dia são adiados.
+    """
+    weights = default_source_weights() if source_weights is None else source_weights
+    rewrites = sorted(
+        (e for e in events if e.get('api_type') == 'gemini' and e.get('success') and e.get('prompt_tokens')),
+        key=lambda e: e['timestamp'],
+    )
+    by_day: Dict[str, List[Dict[str, Any]]] = {}
+    for event in rewrites:
+        by_day.setdefault(event['timestamp'][:10], []).append(event)
+
+    pool_daily_tokens = daily_tokens * keys if daily_tokens else math.inf
+    pool_daily_requests = daily_requests * keys if daily_requests else math.inf
+    pool_minute_tokens = minute_tokens * keys if minute_tokens else math.inf
+
+    report: Dict[str, Any] = {'days': [], 'admitted': 0, 'deferred': 0, 'tokens': 0, 'by_source': {}}
+    errors: List[float] = []
+    history: List[Dict[str, Any]] = []
+    for day, day_events in sorted(by_day.items()):
+        estimator = TokenEstimator.fit(history)
+        used_tokens = used_requests = 0
+        window: List[Tuple[datetime, int]] = []
+        pending: List[Tuple[datetime, Dict[str, Any]]] = []
+        admitted = blocked = 0
+        for event in day_events:
+            now = datetime.fromisoformat(event['timestamp'])
+            pending.append((now, event))
+            window = [(t, n) for t, n in window if (now - t).total_seconds() < 60]
+            minute_left = pool_minute_tokens - sum(n for _, n in window)
+            if used_requests >= pool_daily_requests:
+                blocked += 1
+                continue
+
+            chosen = None
+            ranked = sorted(pending, key=lambda entry: priority(weights, entry[1].get('source_url'), entry[0], now),
+                            reverse=True)
+            for entry in ranked:
+                _, total = estimator.estimate({'source_url': entry[1].get('source_url'),
+                                               'content_chars': (entry[1].get('metadata') or {}).get('content_chars')})
+                needed = total * TOKEN_BUDGET_SAFETY
+                if needed <= pool_daily_tokens - used_tokens and needed <= minute_left:
+                    chosen = entry
+                    break
+            if chosen is None:
+                blocked += 1
+                continue
+
+            pending.remove(chosen)
+            picked = chosen[1]
+            actual = picked['total_tokens']
+            used_tokens += actual
+            used_requests += 1
+            window.append((now, actual))
+            admitted += 1
+            domain = _domain(picked.get('source_url')) or 'desconhecido'
+            report['by_source'][domain] = report['by_source'].get(domain, 0) + 1
+            if estimator.samples >= MIN_FIT_SAMPLES:
+                content_chars = (picked.get('metadata') or {}).get('content_chars')
+                estimated = estimator.prompt_tokens(content_chars) if content_chars else estimator.estimate(
+                    {'source_url': picked.get('source_url')})[0]
+                errors.append(abs(estimated - picked['prompt_tokens']) / picked['prompt_tokens'])
+
+        report['days'].append({
+            'day': day, 'calls': len(day_events), 'admitted': admitted, 'deferred': len(pending),
+            'blocked': blocked, 'tokens': used_tokens,
+        })
+        report['admitted'] += admitted
+        report['deferred'] += len(pending)
+        report['tokens'] += used_tokens
+        history.extend(day_events)
+
+    report['estimate_mape'] = statistics.fmean(errors) if errors else None
+    report['estimator'] = TokenEstimator.fit(history).describe()
+    return report
+
+
+def format_simulation(report: Dict[str, Any]) -> str:
+    lines = [f"{'dia':<12} {'chamadas':>9} {'admitidos':>10} {'adiados':>8} {'sem cota':>9} {'tokens':>12}"]
+    for row in report['days']:
+        lines.append(
+            f"{row['day']:<12} {row['calls']:>9} {row['admitted']:>10} {row['deferred']:>8} "
+            f"{row['blocked']:>9} {row['tokens']:>12,}"
+        )
+    lines.append(f"Total: {report['admitted']} admitidos, {report['deferred']} adiados, {report['tokens']:,} tokens")
+    if report['estimate_mape'] is not None:
+        lines.append(f"Erro médio da estimativa de entrada: {report['estimate_mape'] * 100:.1f}%")
+    lines.append(f"Estimador: {report['estimator']}")
+    for domain, count in sorted(report['by_source'].items(), key=lambda item: item[1], reverse=True):
+        lines.append(f"  {domain:<30} {count:>6}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Simula a admissão por orçamento de tokens sobre o histórico.")
+    parser.add_argument('--log-dir', default=str(TOKEN_LOG_DIR), help="Diretório do ledger de tokens.")
+    parser.add_argument('--days', type=int, default=TOKEN_BUDGET_HISTORY_DAYS)
+    parser.add_argument('--keys', type=int, default=1)
+    parser.add_argument('--daily-tokens', type=int, default=TOKEN_BUDGET_KEY_DAILY_TOKENS)
+    parser.add_argument('--daily-requests', type=int, default=TOKEN_BUDGET_KEY_DAILY_REQUESTS)
+    parser.add_argument('--minute-tokens', type=int, default=TOKEN_BUDGET_KEY_MINUTE_TOKENS)
+    args = parser.parse_args(argv)
+
+    since = (datetime.now() - timedelta(days=args.days)).strftime('%Y-%m-%d')
+    events = get_ledger(args.log_dir).events(since_day=since)
+    report = simulate(
+        events, keys=args.keys, daily_tokens=args.daily_tokens,
+        daily_requests=args.daily_requests, minute_tokens=args.minute_tokens,
+    )
+    print(format_simulation(report))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -14,6 +14,8 @@ from typing import Tuple, Optional, Dict
 import functools
 import traceback
 
+from .token_ledger import get_ledger
+
 logger = logging.getLogger(__name__)
 
 
@@ -37,7 +39,7 @@ class TokenGuarantee:
         """
         Registra tokens com 3 níveis de garantia:
         1. Log de garantia (arquivo de backup)
-        2. Arquivo diário JSONL
+        2. Ledger de tokens (token_ledger.py)
         3. Log de auditoria com timestamp
         
         Returns True se sucesso, False caso contrário
@@ -82,13 +84,18 @@ class TokenGuarantee:
             logger.error(f"❌ NÍVEL 1 FALHOU: {e}")
             success = False
         
-        # CAMADA 2: Arquivo JSONL diário
-        today_file = self.tokens_dir / f"tokens_{timestamp.strftime('%Y-%m-%d')}.jsonl"
+        # CAMADA 2: Ledger de tokens (mesmo histórico do TokenTracker)
         try:
-            with open(today_file, 'a', encoding='utf-8') as f:
-                f.write(json.dumps(log_entry, ensure_ascii=False) + '\n')
-                f.flush()
-            logger.debug(f"✅ Nível 2/3: JSONL diário OK")
+            get_ledger(self.tokens_dir).append({
+                "timestamp": iso_timestamp,
+                "api_type": "guarantee",
+                "model": operation,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": total_tokens,
+                "metadata": dict(metadata or {}, source=source),
+            })
+            logger.debug(f"✅ Nível 2/3: Ledger OK")
         except Exception as e:
             logger.error(f"❌ NÍVEL 2 FALHOU: {e}")
             success = False
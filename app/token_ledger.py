@@ -0,0 +1,487 @@
+"""
+Ledger único de tokens em SQLite (`logs/tokens/token_ledger.db`).
+
+Antes cada `log_tokens` abria o JSONL do dia para um append e reescrevia o
+`token_stats.json` inteiro; o dashboard, o visualizador e o validador
+re-liam todos os JSONL a cada consulta, e o `TokenGuarantee` mantinha outro
+JSONL em paralelo.
+
+Agora os registros entram num buffer em memória (`append` é O(1)) e são
+gravados em lote — a cada `TOKEN_LEDGER_FLUSH_EVERY` registros ou
+`TOKEN_LEDGER_FLUSH_SECONDS` segundos (na thread de `background_writer`), no
+fim de cada lote do pipeline e na saída do processo. Cada lote, numa
+transação:
+
+- insere as linhas em `token_events` (histórico completo, só append);
+- soma o lote nos agregados `token_daily` (dia/api/modelo), `token_models`
+  (api/modelo, o antigo `token_stats.json`) e `token_keys` (dia/api/chave) via
+  UPSERT, então as consultas do dashboard leem poucas linhas, não importa o
+  tamanho do histórico.
+
+Depois de cada lote o `token_stats.json` é regravado a partir de
+`token_models` (instantâneo para scripts antigos, não mais a cada chamada).
+JSONL antigos entram uma vez com `import_jsonl` (feito automaticamente pelo
+`TokenTracker` quando o ledger está vazio).
+"""
+
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from . import background_writer
+
+logger = logging.getLogger(__name__)
+
+TOKEN_LEDGER_FLUSH_EVERY = int(os.getenv('TOKEN_LEDGER_FLUSH_EVERY', 20))
+TOKEN_LEDGER_FLUSH_SECONDS = float(os.getenv('TOKEN_LEDGER_FLUSH_SECONDS', 5))
+# Diretório padrão do ledger, do TokenTracker e do orçamento (os testes apontam para um tmp)
+TOKEN_LOG_DIR = Path(os.getenv('TOKEN_LOG_DIR') or Path(__file__).parent.parent / 'logs' / 'tokens')
+LEDGER_FILENAME = 'token_ledger.db'
+STATS_SNAPSHOT_FILENAME = 'token_stats.json'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS token_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    day TEXT NOT NULL,
+    api_type TEXT NOT NULL,
+    model TEXT NOT NULL,
+    api_key_suffix TEXT,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    total_tokens INTEGER NOT NULL,
+    success INTEGER NOT NULL,
+    error_message TEXT,
+    metadata TEXT,
+    source_url TEXT,
+    wp_post_id INTEGER,
+    article_title TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_token_events_day ON token_events(day);
+
+CREATE TABLE IF NOT EXISTS token_daily (
+    day TEXT NOT NULL,
+    api_type TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    total_tokens INTEGER NOT NULL DEFAULT 0,
+    requests INTEGER NOT NULL DEFAULT 0,
+    failed_requests INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, api_type, model)
+);
+
+CREATE TABLE IF NOT EXISTS token_models (
+    api_type TEXT NOT NULL,
+    model TEXT NOT NULL,
+    total_prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    total_completion_tokens INTEGER NOT NULL DEFAULT 0,
+    total_tokens INTEGER NOT NULL DEFAULT 0,
+    total_requests INTEGER NOT NULL DEFAULT 0,
+    successful_requests INTEGER NOT NULL DEFAULT 0,
+    failed_requests INTEGER NOT NULL DEFAULT 0,
+    last_updated TEXT,
+    PRIMARY KEY (api_type, model)
+);
+
+CREATE TABLE IF NOT EXISTS token_keys (
+    day TEXT NOT NULL,
+    api_type TEXT NOT NULL,
+    api_key_suffix TEXT NOT NULL,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    total_tokens INTEGER NOT NULL DEFAULT 0,
+    requests INTEGER NOT NULL DEFAULT 0,
+    failed_requests INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, api_type, api_key_suffix)
+);
+"""
+
+_EVENT_COLUMNS = (
+    'timestamp', 'day', 'api_type', 'model', 'api_key_suffix', 'prompt_tokens', 'completion_tokens',
+    'total_tokens', 'success', 'error_message', 'metadata', 'source_url', 'wp_post_id', 'article_title',
+)
+
+_UPSERT_DAILY = """
+INSERT INTO token_daily (day, api_type, model, prompt_tokens, completion_tokens, total_tokens, requests, failed_requests)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (day, api_type, model) DO UPDATE SET
+    prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+    completion_tokens = completion_tokens + excluded.completion_tokens,
+    total_tokens = total_tokens + excluded.total_tokens,
+    requests = requests + excluded.requests,
+    failed_requests = failed_requests + excluded.failed_requests
+"""
+
+_UPSERT_MODELS = """
+INSERT INTO token_models (api_type, model, total_prompt_tokens, total_completion_tokens, total_tokens,
+                          total_requests, successful_requests, failed_requests, last_updated)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (api_type, model) DO UPDATE SET
+    total_prompt_tokens = total_prompt_tokens + excluded.total_prompt_tokens,
+    total_completion_tokens = total_completion_tokens + excluded.total_completion_tokens,
+    total_tokens = total_tokens + excluded.total_tokens,
+    total_requests = total_requests + excluded.total_requests,
+    successful_requests = successful_requests + excluded.successful_requests,
+    failed_requests = failed_requests + excluded.failed_requests,
+    last_updated = MAX(COALESCE(last_updated, ''), excluded.last_updated)
+"""
+
+_UPSERT_KEYS = """
+INSERT INTO token_keys (day, api_type, api_key_suffix, prompt_tokens, completion_tokens, total_tokens,
+                        requests, failed_requests)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (day, api_type, api_key_suffix) DO UPDATE SET
+    prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+    completion_tokens = completion_tokens + excluded.completion_tokens,
+    total_tokens = total_tokens + excluded.total_tokens,
+    requests = requests + excluded.requests,
+    failed_requests = failed_requests + excluded.failed_requests
+"""
+
+
+def _event_row(entry: Dict[str, Any]) -> tuple:
+    prompt = int(entry.get('prompt_tokens') or 0)
+    completion = int(entry.get('completion_tokens') or 0)
+    timestamp = entry.get('timestamp') or ''
+    metadata = entry.get('metadata')
+    return (
+        timestamp,
+        timestamp[:10],
+        entry.get('api_type') or 'unknown',
+        entry.get('model') or 'unknown',
+        entry.get('api_key_suffix') or 'unknown',
+        prompt,
+        completion,
+        int(entry.get('total_tokens') or prompt + completion),
+        1 if entry.get('success', True) else 0,
+        entry.get('error_message'),
+        json.dumps(metadata, ensure_ascii=False, default=str) if metadata else None,
+        entry.get('source_url'),
+        entry.get('wp_post_id'),
+        entry.get('article_title'),
+    )
+
+
+def _rollups(rows: Iterable[tuple]):
+    """Soma um lote de linhas de `token_events` nos três agregados."""
+    daily: Dict[tuple, List[int]] = {}
+    models: Dict[tuple, list] = {}
+    keys: Dict[tuple, List[int]] = {}
+    for timestamp, day, api_type, model, key, prompt, completion, total, success, *_ in rows:
+        failed = 0 if success else 1
+
+        entry = daily.setdefault((day, api_type, model), [0, 0, 0, 0, 0])
+        entry[0] += prompt
+        entry[1] += completion
+        entry[2] += total
+        entry[3] += 1
+        entry[4] += failed
+
+        entry = models.setdefault((api_type, model), [0, 0, 0, 0, 0, 0, ''])
+        entry[0] += prompt
+        entry[1] += completion
+        entry[2] += total
+        entry[3] += 1
+        entry[4] += success
+        entry[5] += failed
+        entry[6] = max(entry[6], timestamp)
+
+        entry = keys.setdefault((day, api_type, key), [0, 0, 0, 0, 0])
+        entry[0] += prompt
+        entry[1] += completion
+        entry[2] += total
+        entry[3] += 1
+        entry[4] += failed
+    return (
+        [k + tuple(v) for k, v in daily.items()],
+        [k + tuple(v) for k, v in models.items()],
+        [k + tuple(v) for k, v in keys.items()],
+    )
+
+
+class TokenLedger:
+    """Histórico de tokens + agregados, gravados em lote."""
+
+    def __init__(self, db_path: str, stats_snapshot: Optional[str] = None):
+        self.db_path = str(db_path)
+        self.stats_snapshot = Path(stats_snapshot) if stats_snapshot else None
+        if self.db_path != ':memory:':
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10)
+        if self.db_path != ':memory:':
+            # Leitores (dashboard) não bloqueiam o pipeline gravando
+            self.conn.execute('PRAGMA journal_mode=WAL')
+        self._migrate_token_keys()
+        self.conn.executescript(_SCHEMA)
+        # _lock só protege o buffer (append nunca espera I/O); _db_lock serializa
+        # a conexão: gravações, instantâneo e consultas. Ordem: _db_lock → _lock.
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._buffer: List[tuple] = []
+        self._last_flush = time.monotonic()
+        self._flush_scheduled = False
+
+    def _migrate_token_keys(self):
+        """Ledgers antigos agregavam `token_keys` só por dia/chave: refaz a partir de `token_events`."""
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(token_keys)")]
+        if not columns or 'api_type' in columns:
+            return
+        with self.conn:
+            self.conn.execute("DROP TABLE token_keys")
+            self.conn.executescript(_SCHEMA)
+            self.conn.execute(
+                "INSERT INTO token_keys (day, api_type, api_key_suffix, prompt_tokens, completion_tokens, "
+                "total_tokens, requests, failed_requests) "
+                "SELECT day, api_type, api_key_suffix, SUM(prompt_tokens), SUM(completion_tokens), "
+                "SUM(total_tokens), COUNT(*), SUM(1 - success) FROM token_events "
+                "GROUP BY day, api_type, api_key_suffix"
+            )
+
+    def append(self, entry: Dict[str, Any]):
+        """Enfileira um registro (mesmo formato das linhas do antigo JSONL)."""
+        row = _event_row(entry)
+        with self._lock:
+            self._buffer.append(row)
+            if self._flush_scheduled or (
+                len(self._buffer) < TOKEN_LEDGER_FLUSH_EVERY
+                and time.monotonic() - self._last_flush < TOKEN_LEDGER_FLUSH_SECONDS
+            ):
+                return
+            self._flush_scheduled = True
+        # Grava na thread de I/O; com a fila cheia, grava aqui mesmo
+        if not background_writer.submit(self.flush):
+            self.flush()
+
+    def flush(self):
+        # _db_lock antes da troca do buffer: os lotes entram no banco na ordem em que foram trocados
+        with self._db_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+                self._last_flush = time.monotonic()
+                self._flush_scheduled = False
+            if rows:
+                self._write(rows)
+
+    def _write(self, rows: List[tuple]):
+        daily, models, keys = _rollups(rows)
+        try:
+            with self.conn:
+                self.conn.executemany(
+                    f"INSERT INTO token_events ({', '.join(_EVENT_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(_EVENT_COLUMNS))})",
+                    rows,
+                )
+                self.conn.executemany(_UPSERT_DAILY, daily)
+                self.conn.executemany(_UPSERT_MODELS, models)
+                self.conn.executemany(_UPSERT_KEYS, keys)
+        except sqlite3.Error as e:
+            logger.error(f"TOKEN LEDGER: falha ao gravar {len(rows)} registros: {e}")
+            return
+        if self.stats_snapshot is not None:
+            self._write_snapshot()
+
+    def _write_snapshot(self):
+        try:
+            tmp = self.stats_snapshot.with_suffix('.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self._model_totals(), f, indent=2, ensure_ascii=False)
+            os.replace(tmp, self.stats_snapshot)
+        except OSError as e:
+            logger.warning(f"TOKEN LEDGER: falha ao gravar {self.stats_snapshot}: {e}")
+
+    def _query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        self.flush()
+        with self._db_lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def is_empty(self) -> bool:
+        return not self._query("SELECT 1 FROM token_events LIMIT 1")
+
+    def _model_totals(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        stats: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for api_type, model, prompt, completion, total, requests, ok, failed, last in self.conn.execute(
+            "SELECT api_type, model, total_prompt_tokens, total_completion_tokens, total_tokens, "
+            "total_requests, successful_requests, failed_requests, last_updated FROM token_models "
+            "ORDER BY api_type, model"
+        ):
+            stats.setdefault(api_type, {})[model] = {
+                'total_prompt_tokens': prompt,
+                'total_completion_tokens': completion,
+                'total_tokens': total,
+                'total_requests': requests,
+                'successful_requests': ok,
+                'failed_requests': failed,
+                'last_updated': last,
+            }
+        return stats
+
+    def model_totals(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """{api_type: {model: {...}}}, no formato do antigo `token_stats.json`."""
+        self.flush()
+        with self._db_lock:
+            return self._model_totals()
+
+    def daily_totals(self, since_day: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+        """{'AAAA-MM-DD': {prompt_tokens, completion_tokens, total_tokens, requests, failed_requests}}"""
+        rows = self._query(
+            "SELECT day, SUM(prompt_tokens), SUM(completion_tokens), SUM(total_tokens), SUM(requests), "
+            "SUM(failed_requests) FROM token_daily WHERE day >= ? GROUP BY day ORDER BY day",
+            (since_day or '',),
+        )
+        return {
+            day: {
+                'prompt_tokens': prompt,
+                'completion_tokens': completion,
+                'total_tokens': total,
+                'requests': requests,
+                'failed_requests': failed,
+            }
+            for day, prompt, completion, total, requests, failed in rows
+        }
+
+    def key_totals(self, since_day: Optional[str] = None, api_type: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+        """
+        {sufixo da chave: {prompt_tokens, completion_tokens, total_tokens, requests, failed_requests}},
+        opcionalmente só de um `api_type` (as chamadas de IA são 'gemini').
+        """
+        rows = self._query(
+            "SELECT api_key_suffix, SUM(prompt_tokens), SUM(completion_tokens), SUM(total_tokens), SUM(requests), "
+            "SUM(failed_requests) FROM token_keys WHERE day >= ? AND api_type = COALESCE(?, api_type) "
+            "GROUP BY api_key_suffix ORDER BY api_key_suffix",
+            (since_day or '', api_type),
+        )
+        return {
+            key: {
+                'prompt_tokens': prompt,
+                'completion_tokens': completion,
+                'total_tokens': total,
+                'requests': requests,
+                'failed_requests': failed,
+            }
+            for key, prompt, completion, total, requests, failed in rows
+        }
+
+    def event_totals(self) -> Dict[str, Dict[str, int]]:
+        """
+        Somas diretas de `token_events` por dia, para conferir os agregados
+        (`token_validator.py`): as mesmas chaves de `daily_totals` mais
+        `negative` (registros com tokens negativos).
+        """
+        rows = self._query(
+            "SELECT day, SUM(prompt_tokens), SUM(completion_tokens), SUM(total_tokens), COUNT(*), "
+            "SUM(1 - success), SUM(prompt_tokens < 0 OR completion_tokens < 0) "
+            "FROM token_events GROUP BY day ORDER BY day"
+        )
+        return {
+            day: {
+                'prompt_tokens': prompt,
+                'completion_tokens': completion,
+                'total_tokens': total,
+                'requests': requests,
+                'failed_requests': failed,
+                'negative': negative,
+            }
+            for day, prompt, completion, total, requests, failed, negative in rows
+        }
+
+    def usage_since(self, since: str, api_type: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+        """{sufixo da chave: {total_tokens, requests}} para registros com timestamp >= `since` (ISO)."""
+        rows = self._query(
+            "SELECT api_key_suffix, SUM(total_tokens), COUNT(*) FROM token_events "
+            "WHERE day >= ? AND timestamp >= ? AND api_type = COALESCE(?, api_type) GROUP BY api_key_suffix",
+            (since[:10], since, api_type),
+        )
+        return {key: {'total_tokens': total, 'requests': requests} for key, total, requests in rows}
+
+    def events(
+        self, since_day: Optional[str] = None, until_day: Optional[str] = None, limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Registros do histórico, do mais recente para o mais antigo."""
+        sql = f"SELECT {', '.join(_EVENT_COLUMNS)} FROM token_events WHERE day >= ?"
+        params: list = [since_day or '']
+        if until_day:
+            sql += " AND day <= ?"
+            params.append(until_day)
+        sql += " ORDER BY id DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        entries = []
+        for row in self._query(sql, tuple(params)):
+            entry = dict(zip(_EVENT_COLUMNS, row))
+            entry.pop('day')
+            entry['success'] = bool(entry['success'])
+            entry['metadata'] = json.loads(entry['metadata']) if entry['metadata'] else {}
+            entries.append(entry)
+        return entries
+
+    def recent(self, limit: int = 15) -> List[Dict[str, Any]]:
+        return self.events(limit=limit)
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+
+_ledgers: Dict[str, TokenLedger] = {}
+_ledgers_pid: Optional[int] = None
+_ledgers_lock = threading.Lock()
+
+
+def get_ledger(log_dir) -> TokenLedger:
+    """Ledger de `log_dir` (um por diretório e por processo)."""
+    global _ledgers, _ledgers_pid
+    key = str(Path(log_dir).resolve())
+    with _ledgers_lock:
+        if _ledgers_pid != os.getpid():
+            # Processo filho: conexões herdadas não são reaproveitadas
+            _ledgers = {}
+            _ledgers_pid = os.getpid()
+        ledger = _ledgers.get(key)
+        if ledger is None:
+            ledger = TokenLedger(Path(key) / LEDGER_FILENAME, Path(key) / STATS_SNAPSHOT_FILENAME)
+            _ledgers[key] = ledger
+    return ledger
+
+
+def flush_all():
+    """Grava os buffers de todos os ledgers deste processo."""
+    if _ledgers_pid != os.getpid():
+        return
+    for ledger in list(_ledgers.values()):
+        ledger.flush()
+
+
+atexit.register(flush_all)
+
+
+def import_jsonl(ledger: TokenLedger, log_dir) -> int:
+    """Importa os `tokens_*.jsonl` de `log_dir` para o ledger; retorna quantos registros entraram."""
+    count = 0
+    for path in sorted(Path(log_dir).glob('tokens_*.jsonl')):
+        rows = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if 'operation' in entry and 'api_type' not in entry:
+                    # Linhas do TokenGuarantee
+                    entry = dict(entry, api_type='guarantee', model=entry['operation'],
+                                 metadata=dict(entry.get('metadata') or {}, source=entry.get('source')))
+                rows.append(_event_row(entry))
+        if rows:
+            with ledger._db_lock:
+                ledger._write(rows)
+            count += len(rows)
+    if count:
+        logger.info(f"TOKEN LEDGER: {count} registros importados de {log_dir}")
+    return count
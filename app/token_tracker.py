@@ -2,15 +2,19 @@
 """
 Sistema de rastreamento de tokens para APIs (Gemini, etc)
 Registra entrada (prompt_tokens), saída (completion_tokens) e total
+no ledger SQLite de tokens (ver token_ledger.py)
 """
 
 import os
-import json
 import logging
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Optional, Tuple
 
+from .background_writer import async_handler
+from .metrics import observe_tokens
+from .token_ledger import TOKEN_LOG_DIR, get_ledger, import_jsonl
+
 class TokenTracker:
     """Rastreia uso de tokens em chamadas de API"""
     
@@ -19,28 +23,23 @@ class TokenTracker:
         Inicializa o rastreador de tokens
         
         Args:
-            log_dir: Diretório para armazenar logs. Se None, usa 'logs/tokens'
+            log_dir: Diretório para armazenar logs. Se None, usa 'logs/tokens' (ou TOKEN_LOG_DIR)
         """
         if log_dir is None:
-            log_dir = Path(__file__).parent.parent / 'logs' / 'tokens'
+            log_dir = TOKEN_LOG_DIR
         else:
             log_dir = Path(log_dir)
         
         self.log_dir = log_dir
         self.log_dir.mkdir(parents=True, exist_ok=True)
         
-        # Arquivo de log diário
-        self.log_file = self.log_dir / f"tokens_{datetime.now().strftime('%Y-%m-%d')}.jsonl"
-        
-        # Arquivo de estatísticas
+        # Ledger SQLite (histórico + agregados); token_stats.json vira instantâneo dele
+        self.ledger = get_ledger(self.log_dir)
         self.stats_file = self.log_dir / 'token_stats.json'
         
         # Arquivo de erro/debug
         self.debug_file = self.log_dir / 'token_debug.log'
         
-        # Estatísticas em memória
-        self.stats = self._load_stats()
-        
         self.logger = logging.getLogger('TokenTracker')
         self.logger.setLevel(logging.DEBUG)
         
@@ -50,7 +49,10 @@ class TokenTracker:
             fh.setLevel(logging.DEBUG)
             formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
             fh.setFormatter(formatter)
-            self.logger.addHandler(fh)
+            self.logger.addHandler(async_handler(fh))
+        
+        # Estatísticas em memória
+        self.stats = self._load_stats()
     
     def log_tokens(
         self, 
@@ -105,12 +107,12 @@ class TokenTracker:
                 "article_title": article_title
             }
             
-            # Escrever no arquivo JSONL
-            with open(self.log_file, 'a', encoding='utf-8') as f:
-                f.write(json.dumps(log_entry, ensure_ascii=False) + '\n')
+            # Enfileirar no ledger (gravação em lote)
+            self.ledger.append(log_entry)
             
             # Atualizar estatísticas
             self._update_stats(log_entry)
+            observe_tokens(prompt_tokens, completion_tokens)
             
             self.logger.info(
                 f"[{api_type.upper()}] Entrada: {prompt_tokens} | "
@@ -124,7 +126,7 @@ class TokenTracker:
             return False
     
     def _update_stats(self, log_entry: Dict) -> None:
-        """Atualiza arquivo de estatísticas"""
+        """Atualiza as estatísticas em memória (os agregados persistidos ficam no ledger)"""
         try:
             api_type = log_entry['api_type']
             model = log_entry['model']
@@ -156,20 +158,16 @@ class TokenTracker:
                 stats_entry['failed_requests'] += 1
             
             stats_entry['last_updated'] = log_entry['timestamp']
-            
-            # Salvar estatísticas
-            with open(self.stats_file, 'w', encoding='utf-8') as f:
-                json.dump(self.stats, f, indent=2, ensure_ascii=False)
         
         except Exception as e:
             self.logger.error(f"Erro ao atualizar estatísticas: {e}", exc_info=True)
     
     def _load_stats(self) -> Dict:
-        """Carrega estatísticas existentes"""
+        """Carrega estatísticas do ledger (importando os JSONL antigos na primeira vez)"""
         try:
-            if self.stats_file.exists():
-                with open(self.stats_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+            if self.ledger.is_empty():
+                import_jsonl(self.ledger, self.log_dir)
+            return self.ledger.model_totals()
         except Exception as e:
             self.logger.warning(f"Não foi possível carregar estatísticas: {e}")
         
@@ -0,0 +1,288 @@
+"""
+Spans por artigo: quanto tempo cada etapa do pipeline levou.
+
+Até aqui só havia linhas soltas de log. Este módulo mede as etapas com spans
+leves (context manager `span`, decorador `traced`) e grava um registro por
+span em `data/traces.db` (SQLite):
+
+- `process_batch`: fetch, espera/tempo da extração, IA, pós-processamento;
+- `AIClient.generate_text`: espera por chave fora do cooldown
+  (`ai.key_wait`), rate limiter (`ai.rate_limit`) e latência do modelo
+  (`ai.model`), por tentativa;
+- `WordPressClient`: upload de mídia, create_post, Yoast e sanitização;
+- `ContentExtractor._fetch_html`.
+
+O artigo corrente fica num `ContextVar` (`set_article`), então spans internos
+(IA, WordPress) saem ligados ao artigo sem passar o id adiante; spans
+aninhados guardam o nome do pai. Os registros vão para um buffer e são
+gravados em lote (`flush` ao fim de cada lote do pipeline).
+
+`python main.py --profile` imprime p50/p95 por etapa (`format_report`).
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'true').lower() == 'true'
+TRACE_DB_PATH = os.getenv('TRACE_DB_PATH', 'data/traces.db')
+TRACE_RETENTION_DAYS = float(os.getenv('TRACE_RETENTION_DAYS', 14))
+TRACE_FLUSH_EVERY = 50
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS spans (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    article_id INTEGER,
+    name TEXT NOT NULL,
+    parent TEXT,
+    started_at REAL NOT NULL,
+    duration_ms REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'ok',
+    attrs TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_spans_started ON spans(started_at);
+CREATE INDEX IF NOT EXISTS idx_spans_article ON spans(article_id);
+"""
+
+_current_article: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar('trace_article', default=None)
+_current_span: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('trace_span', default=None)
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+class Tracer:
+    """Grava spans em SQLite, em lotes."""
+
+    def __init__(self, db_path: str = TRACE_DB_PATH):
+        self.db_path = db_path
+        if db_path != ':memory:':
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+        self.conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._buffer: List[tuple] = []
+
+    def record(
+        self,
+        name: str,
+        duration_s: float,
+        started_at: Optional[float] = None,
+        status: str = 'ok',
+        attrs: Optional[Dict[str, Any]] = None,
+        article_id: Optional[int] = None,
+        parent: Optional[str] = None,
+    ):
+        row = (
+            article_id if article_id is not None else _current_article.get(),
+            name,
+            parent,
+            started_at if started_at is not None else time.time() - duration_s,
+            duration_s * 1000,
+            status,
+            json.dumps(attrs, ensure_ascii=False, default=str) if attrs else None,
+        )
+        with self._lock:
+            self._buffer.append(row)
+            if len(self._buffer) < TRACE_FLUSH_EVERY:
+                return
+            rows, self._buffer = self._buffer, []
+        self._write(rows)
+
+    def flush(self):
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        self._write(rows)
+
+    def _write(self, rows: List[tuple]):
+        if not rows:
+            return
+        try:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT INTO spans (article_id, name, parent, started_at, duration_ms, status, attrs) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"TRACING: falha ao gravar {len(rows)} spans: {e}")
+
+    def stage_stats(self, since: Optional[float] = None) -> Dict[str, Dict[str, float]]:
+        """{etapa: {count, p50, p95, max, total}} em ms, para spans a partir de `since` (epoch)."""
+        self.flush()
+        rows = self.conn.execute(
+            "SELECT name, duration_ms FROM spans WHERE started_at >= ? ORDER BY name, duration_ms",
+            (since or 0,),
+        ).fetchall()
+        grouped: Dict[str, List[float]] = {}
+        for name, duration in rows:
+            grouped.setdefault(name, []).append(duration)
+        return {
+            name: {
+                'count': len(values),
+                'p50': _percentile(values, 50),
+                'p95': _percentile(values, 95),
+                'max': values[-1],
+                'total': sum(values),
+            }
+            for name, values in grouped.items()
+        }
+
+    def article_spans(self, article_id: int) -> List[Dict[str, Any]]:
+        self.flush()
+        cur = self.conn.execute(
+            "SELECT name, parent, started_at, duration_ms, status, attrs FROM spans "
+            "WHERE article_id = ? ORDER BY started_at",
+            (article_id,),
+        )
+        return [
+            {'name': n, 'parent': p, 'started_at': s, 'duration_ms': d, 'status': st, 'attrs': json.loads(a) if a else {}}
+            for n, p, s, d, st, a in cur.fetchall()
+        ]
+
+    def purge(self, days: float = TRACE_RETENTION_DAYS) -> int:
+        with self.conn:
+            cur = self.conn.execute("DELETE FROM spans WHERE started_at < ?", (time.time() - days * 86400,))
+        return cur.rowcount
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+
+_tracer: Optional[Tracer] = None
+_tracer_pid: Optional[int] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Optional[Tracer]:
+    """Tracer do processo (None com TRACING_ENABLED=false ou se o banco não abrir)."""
+    global _tracer, _tracer_pid
+    if not TRACING_ENABLED:
+        return None
+    if _tracer_pid != os.getpid():
+        with _tracer_lock:
+            if _tracer_pid != os.getpid():
+                try:
+                    _tracer = Tracer()
+                    _tracer.purge()
+                except sqlite3.Error as e:
+                    logger.warning(f"TRACING: desativado, banco {TRACE_DB_PATH} indisponível: {e}")
+                    _tracer = None
+                _tracer_pid = os.getpid()
+    return _tracer
+
+
+def set_article(article_id: Optional[int]):
+    """Define o artigo a que os próximos spans deste contexto pertencem."""
+    _current_article.set(article_id)
+
+
+class Span:
+    """Um span aberto; use como context manager ou chame `end()`."""
+
+    __slots__ = ('name', 'attrs', 'status', '_start', '_wall', '_token', '_done')
+
+    def __init__(self, name: str, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self.status = 'ok'
+        self._token = None
+        self._done = False
+        self._wall = time.time()
+        self._start = time.perf_counter()
+
+    def __enter__(self) -> 'Span':
+        self._token = _current_span.set(self.name)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.status = 'error'
+            self.attrs.setdefault('error', exc_type.__name__)
+        self.end()
+        return False
+
+    @property
+    def ended(self) -> bool:
+        return self._done
+
+    def end(self):
+        if self._done:
+            return
+        self._done = True
+        elapsed = time.perf_counter() - self._start
+        if self._token is not None:
+            _current_span.reset(self._token)
+        parent = _current_span.get()
+        STAGE_SECONDS.labels(stage=self.name).observe(elapsed)
+        tracer = get_tracer()
+        if tracer is not None:
+            tracer.record(self.name, elapsed, self._wall, self.status, self.attrs or None, parent=parent)
+
+
+def span(name: str, **attrs) -> Span:
+    """`with span('wp.create_post'): ...` mede o bloco e grava ao sair."""
+    return Span(name, **attrs)
+
+
+def start_span(name: str, **attrs) -> Span:
+    """
+    Span aberto sem bloco `with`; feche com `.end()` (se nunca fechar, não é
+    gravado). Não vira pai dos spans seguintes: um `continue` no meio do
+    caminho não deixa o contexto preso nele.
+    """
+    return Span(name, **attrs)
+
+
+def record(name: str, duration_s: float, **attrs):
+    """Grava um span já medido em outro lugar (ex.: tempo da extração no processo filho)."""
+    STAGE_SECONDS.labels(stage=name).observe(duration_s)
+    tracer = get_tracer()
+    if tracer is not None:
+        tracer.record(name, duration_s, attrs=attrs or None, parent=_current_span.get())
+
+
+def traced(name: str):
+    """Decorador: cada chamada vira um span `name`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with Span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def flush():
+    tracer = _tracer if _tracer_pid == os.getpid() else None
+    if tracer is not None:
+        tracer.flush()
+
+
+def format_report(stats: Dict[str, Dict[str, float]]) -> str:
+    """Tabela de latência por etapa (ms), da etapa com maior tempo total para a menor."""
+    if not stats:
+        return "Nenhum span registrado."
+    lines = [f"{'etapa':<24} {'n':>6} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10} {'total s':>9}"]
+    for name, row in sorted(stats.items(), key=lambda item: item[1]['total'], reverse=True):
+        lines.append(
+            f"{name:<24} {row['count']:>6} {row['p50']:>10.1f} {row['p95']:>10.1f} "
+            f"{row['max']:>10.1f} {row['total'] / 1000:>9.1f}"
+        )
+    return "\n".join(lines)
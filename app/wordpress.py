@@ -2,10 +2,14 @@ import logging
 import requests
 import time
 import json
-import re 
 import html as _html
-from .html_utils import detect_forbidden_cta, strip_forbidden_cta_sentences
-from typing import Dict, Any, Optional, List
+from .html_utils import scan_forbidden_cta
+from . import regexes as rx
+from .background_writer import write_artifact
+from .metrics import count_wordpress_response
+from .tracing import traced
+from .wp_payload import PostPayload, encode_body, split_pages
+from typing import Dict, Any, Optional, List, Tuple
 from urllib.parse import urlparse
 
 logger = logging.getLogger(__name__)
@@ -14,9 +18,9 @@ def _slugify(name: str) -> str:
     """Creates a simple, WordPress-compatible slug from a string."""
     s = name.strip().lower()
     # Remove characters that are not alphanumeric, whitespace, or hyphen
-    s = re.sub(r'[^\w\s-]', '', s, flags=re.UNICODE)
+    s = rx.SLUG_INVALID_CHARS.sub('', s)
     # Replace whitespace and underscores with a hyphen
-    s = re.sub(r'[\s_-]+', '-', s, flags=re.UNICODE)
+    s = rx.SLUG_SEPARATORS.sub('-', s)
     # Strip leading/trailing hyphens and limit length
     return s.strip('-')[:190] or 'tag'
 
@@ -34,6 +38,7 @@ class WordPressClient:
         if self.user and self.password:
             self.session.auth = (self.user, self.password)
         self.session.headers.update({'User-Agent': 'VocMoney-Pipeline/1.0'})
+        self.session.hooks['response'].append(count_wordpress_response)
 
     def get_domain(self) -> str:
         """Extracts the domain from the WordPress URL."""
@@ -228,20 +233,28 @@ class WordPressClient:
         logger.info(f"Resolved category names {cleaned_names} to IDs: {cat_ids}")
         return cat_ids
 
-    def upload_media_from_url(self, image_url: str, alt_text: str = "", max_attempts: int = 3) -> Optional[Dict[str, Any]]:
+    @traced('wp.upload_media')
+    def upload_media_from_url(
+        self,
+        image_url: str,
+        alt_text: str = "",
+        max_attempts: int = 3,
+        download_timeout: float = 25,
+        upload_timeout: float = 40,
+    ) -> Optional[Dict[str, Any]]:
         """
         Downloads an image and uploads it to WordPress with a retry mechanism.
         """
         last_err = None
+        # Sanitize filename
+        filename = (urlparse(image_url).path.split('/')[-1] or "image.jpg").split("?")[0]
         for attempt in range(1, max_attempts + 1):
             try:
                 # 1. Download the image with a reasonable timeout
-                img_response = requests.get(image_url, timeout=25)
+                img_response = requests.get(image_url, timeout=download_timeout)
                 img_response.raise_for_status()
                 content_type = img_response.headers.get('Content-Type', 'image/jpeg')
                 img_size = len(img_response.content)
-                # Sanitize filename
-                filename = (urlparse(image_url).path.split('/')[-1] or "image.jpg").split("?")[0]
 
                 # 2. Upload to WordPress
                 media_endpoint = f"{self.api_url}/media"
@@ -249,7 +262,7 @@ class WordPressClient:
                     'Content-Disposition': f'attachment; filename="{filename}"',
                     'Content-Type': content_type,
                 }
-                wp_response = self.session.post(media_endpoint, headers=headers, data=img_response.content, timeout=40)
+                wp_response = self.session.post(media_endpoint, headers=headers, data=img_response.content, timeout=upload_timeout)
                 wp_response.raise_for_status()
                 media_id = wp_response.json().get('id')
                 logger.info(f"MEDIA OK: ID {media_id} | {filename} ({img_size} bytes)")
@@ -308,38 +321,12 @@ class WordPressClient:
             logger.error(f"Error searching for related posts with term '{term}': {e}")
             return []
 
+    @traced('wp.create_post')
     def create_post(self, payload: Dict[str, Any]) -> Optional[int]:
         """Creates a new post in WordPress."""
         try:
-            # Validar tamanho do payload ANTES de enviar
-            payload_size = len(json.dumps(payload))
             post_title = payload.get('title', 'SEM TITULO')[:60]
-            
-            # Se exceder 30KB, tentar reduzir conteúdo
-            if payload_size > 30000:  # 30KB limit (mais realista que 15KB)
-                logger.warning(f"POST GRANDE: {payload_size} bytes (limite: 30KB). Tentando reduzir conteúdo...")
-                
-                # Estratégia 1: Remover parágrafos repetitivos ou muito curtos
-                if 'content' in payload and payload['content']:
-                    content = payload['content']
-                    # Remove múltiplos parágrafos vazios
-                    content = re.sub(r'<!-- /wp:paragraph -->\s*<!-- wp:paragraph -->', '', content)
-                    # Remove parágrafos com menos de 30 chars
-                    content = re.sub(r'<!-- wp:paragraph -->\s*<p>\s*.{0,25}\s*<\/p>\s*<!-- /wp:paragraph -->', '', content, flags=re.IGNORECASE)
-                    payload['content'] = content
-                    
-                    # Recalcular tamanho após redução
-                    new_payload_size = len(json.dumps(payload))
-                    logger.info(f"Conteúdo reduzido: {payload_size} → {new_payload_size} bytes")
-                    payload_size = new_payload_size
-            
-            if payload_size > 30000:  # Ainda muito grande
-                logger.error(f"POST GRANDE DEMAIS: {payload_size} bytes (limite: 30KB)")
-                logger.error(f"  Titulo: {post_title}")
-                logger.error(f"  Content: {len(payload.get('content', ''))} chars")
-                logger.error(f"  Featured media: {payload.get('featured_media')}")
-                return None
-            
+
             # Resolve tag names to integer IDs before sending
             if 'tags' in payload and payload['tags']:
                 payload['tags'] = self._ensure_tag_ids(payload['tags'])
@@ -365,7 +352,7 @@ class WordPressClient:
             if 'title' in clean_payload and clean_payload['title']:
                 title = clean_payload['title']
                 # Remove any HTML tags that might have leaked into the title
-                title = re.sub(r'<[^>]+>', '', title).strip()
+                title = rx.HTML_TAG.sub('', title).strip()
                 clean_payload['title'] = title
             
             # Sanitize content to prevent malformed HTML
@@ -379,7 +366,7 @@ class WordPressClient:
                 # Remove only truly problematic control characters (not whitespace)
                 content = ''.join(char for char in content if ord(char) >= 32 or char in '\n\r\t' or ord(char) in [0x0B])
                 # Clean up multiple consecutive spaces (but keep single spaces)
-                content = re.sub(r' {2,}', ' ', content)
+                content = rx.MULTIPLE_SPACES.sub(' ', content)
                 clean_payload['content'] = content
             
             # Sanitize excerpt
@@ -460,20 +447,31 @@ class WordPressClient:
                 except Exception as cat_err:
                     logger.warning(f"Erro ao validar categorias: {cat_err}, enviando assim mesmo")
             
-            # Log ANTES da requisição - informação resumida
-            post_title = clean_payload.get('title', 'SEM TITULO')[:80]
-            logger.info(f"POST CRIAR: '{post_title}'")
-            logger.info(f"  WP payload: title_len={len(clean_payload.get('title', ''))} content_len={len(clean_payload.get('content', ''))} cat={clean_payload.get('categories', [])} tags={clean_payload.get('tags', [])}")
-            
-            # Validação extra: tentar serializar para JSON e validar
+            # Paginar listas muito longas em vez de recusar o post
+            clean_payload['content'], pages = split_pages(clean_payload['content'])
+            if pages > 1:
+                logger.info(f"POST LONGO: conteúdo paginado em {pages} páginas (<!--nextpage-->)")
+
+            # Serializa uma vez só: o mesmo corpo vai para o log, o envio e a nova tentativa
             try:
-                test_json = json.dumps(clean_payload, ensure_ascii=False)
-                logger.debug(f"JSON válido: {len(test_json)} bytes")
-            except Exception as json_err:
+                wp_payload = PostPayload()
+                for key, value in clean_payload.items():
+                    wp_payload.add(key, value)
+                body, headers = encode_body(wp_payload)
+            except (TypeError, ValueError) as json_err:
                 logger.error(f"ERRO: Payload não é JSON válido: {str(json_err)[:200]}")
                 logger.error(f"  Título: {clean_payload.get('title')[:100]}")
                 logger.error(f"  Conteúdo (primeiros 100): {clean_payload.get('content', '')[:100]}")
                 return None
+
+            # Log ANTES da requisição - informação resumida
+            post_title = clean_payload.get('title', 'SEM TITULO')[:80]
+            logger.info(f"POST CRIAR: '{post_title}'")
+            logger.info(f"  WP payload: title_len={len(clean_payload.get('title', ''))} content_len={len(clean_payload.get('content', ''))} cat={clean_payload.get('categories', [])} tags={clean_payload.get('tags', [])}")
+            logger.debug(
+                f"JSON válido: {wp_payload.size} bytes"
+                + (f" ({len(body)} com gzip)" if 'Content-Encoding' in headers else "")
+            )
             logger.debug(f"  - Tamanho conteudo: {len(clean_payload.get('content', ''))} chars")
             logger.debug(f"  - Featured image: {clean_payload.get('featured_media', 'nenhuma')}")
             logger.debug(f"  - Categorias: {clean_payload.get('categories', [])}")
@@ -481,13 +479,9 @@ class WordPressClient:
             
             # Log do payload completo APENAS em DEBUG mode
             if logger.isEnabledFor(logging.DEBUG):
-                try:
-                    log_payload = json.dumps(clean_payload, indent=2, ensure_ascii=False)[:2000]
-                    logger.debug(f"PAYLOAD JSON:\n{log_payload}")
-                except Exception as log_e:
-                    logger.warning(f"Nao conseguiu serializar payload: {log_e}")
+                logger.debug(f"PAYLOAD JSON:\n{wp_payload.preview(2000)}")
 
-            response = self.session.post(posts_endpoint, json=clean_payload, timeout=60)
+            response = self.session.post(posts_endpoint, data=body, headers=headers, timeout=60)
             
             # Log DEPOIS da resposta
             post_id = response.json().get('id') if response.ok else None
@@ -507,15 +501,11 @@ class WordPressClient:
                 logger.error(f"  Método: POST")
                 logger.error(f"  Auth: {'Sim (Basic Auth)' if self.user else 'Não'}")
                 logger.error(f"  Headers: {dict(self.session.headers)}")
-                logger.error(f"  Tamanho do payload: {len(json.dumps(clean_payload))} bytes")
+                logger.error(f"  Tamanho do payload: {wp_payload.size} bytes")
                 
                 # 2. Conteúdo enviado (payload completo)
                 logger.error(f"\nPAYLOAD ENVIADO (JSON COMPLETO):")
-                try:
-                    payload_json = json.dumps(clean_payload, indent=2, ensure_ascii=False)
-                    logger.error(payload_json)
-                except Exception as e:
-                    logger.error(f"Erro ao serializar payload: {e}")
+                logger.error(wp_payload.text())
                 
                 # 3. Resposta do WordPress (TUDO)
                 logger.error(f"\nRESPOSTA DO WORDPRESS:")
@@ -537,19 +527,14 @@ class WordPressClient:
                     logger.error(f"  Não é JSON válido: {json_err}")
                     logger.error(f"  Tipo MIME: {response.headers.get('content-type')}")
                 
-                # 6. Salvar em arquivo de debug
-                debug_file = f"debug/wordpress_error_500_{int(time.time())}.txt"
-                try:
-                    import os
-                    os.makedirs('debug', exist_ok=True)
-                    with open(debug_file, 'w', encoding='utf-8') as f:
-                        f.write(f"ERRO 500 - {post_title}\n")
-                        f.write("=" * 100 + "\n\n")
-                        f.write(f"PAYLOAD ENVIADO:\n{json.dumps(clean_payload, indent=2, ensure_ascii=False)}\n\n")
-                        f.write(f"RESPOSTA WORDPRESS:\n{response.text}\n")
-                    logger.error(f"  ✅ Debug salvo em: {debug_file}")
-                except Exception as file_err:
-                    logger.error(f"  ❌ Erro ao salvar debug: {file_err}")
+                # 6. Salvar em arquivo de debug (gzip, na thread de I/O)
+                debug_file = write_artifact(
+                    f"wordpress_error_500_{int(time.time())}.txt",
+                    f"ERRO 500 - {post_title}\n" + "=" * 100 + "\n\n"
+                    f"PAYLOAD ENVIADO:\n{wp_payload.text()}\n\n"
+                    f"RESPOSTA WORDPRESS:\n{response.text}\n",
+                )
+                logger.error(f"  ✅ Debug salvo em: {debug_file}")
                 
                 logger.error("=" * 100)
                 logger.error("❌ TENTANDO NOVAMENTE...")
@@ -559,7 +544,7 @@ class WordPressClient:
                 logger.info(f"  Tentativa 2: Reenviando artigo completo (sem remoção de conteúdo)")
                 
                 try:
-                    response2 = self.session.post(posts_endpoint, json=clean_payload, timeout=60)
+                    response2 = self.session.post(posts_endpoint, data=body, headers=headers, timeout=60)
                     post_id2 = response2.json().get('id') if response2.ok else None
                     
                     if response2.ok and post_id2 and post_id2 > 0:
@@ -652,6 +637,7 @@ class WordPressClient:
                 logger.error(f"Response body: {e.response.text}")
             return False
 
+    @traced('wp.yoast')
     def update_post_yoast_seo(self, post_id: int, featured_media_id: int, seo_data: Dict[str, Any]) -> bool:
         """
         Updates Yoast SEO metadata for a post including OG images, meta descriptions, etc.
@@ -790,6 +776,7 @@ class WordPressClient:
             logger.warning(f"⚠️  Aviso ao adicionar Google News meta: {type(e).__name__}")
             return True  # Não bloqueia se falhar
 
+    @traced('wp.sanitize')
     def sanitize_published_post(self, post_id: int, max_attempts: int = 2, backoff_s: int = 2) -> bool:
         """
         Fetches the published post's content and excerpt, detects forbidden CTAs,
@@ -819,8 +806,11 @@ class WordPressClient:
         content_raw = _html.unescape(content_raw)
         excerpt_raw = _html.unescape(excerpt_raw)
 
-        content_cta = detect_forbidden_cta(content_raw)
-        excerpt_cta = detect_forbidden_cta(excerpt_raw)
+        # Detection and removal in one pass per field
+        content_scan = scan_forbidden_cta(content_raw)
+        excerpt_scan = scan_forbidden_cta(excerpt_raw)
+        content_cta = content_scan.label
+        excerpt_cta = excerpt_scan.label
 
         if not content_cta and not excerpt_cta:
             logger.debug(f"No CTA detected for post {post_id} (content/excerpt).")
@@ -828,9 +818,8 @@ class WordPressClient:
 
         logger.warning(f"CTA detected in published post {post_id}: content_cta={content_cta} excerpt_cta={excerpt_cta}")
 
-        # Attempt sanitization
-        new_content, content_removed = strip_forbidden_cta_sentences(content_raw)
-        new_excerpt, excerpt_removed = strip_forbidden_cta_sentences(excerpt_raw)
+        new_content, content_removed = content_scan.html, bool(content_scan.removed)
+        new_excerpt, excerpt_removed = excerpt_scan.html, bool(excerpt_scan.removed)
 
         # Fallback: aggressive simple string replacements for common variants
         def aggressive_fallback(s: str) -> str:
@@ -842,8 +831,8 @@ class WordPressClient:
             s = s.replace("Thank you for reading this post, don't forget to subscribe!", "")
             s = s.replace("Thank you for reading this post, dont forget to subscribe!", "")
             # remove common English CTA fragments
-            s = re.sub(r"(?is)thank\s+you\s+for\s+reading[^<]{0,200}?subscribe[^<]{0,200}?", "", s)
-            s = re.sub(r"(?is)thanks\s+for\s+reading[^<]{0,200}?subscribe[^<]{0,200}?", "", s)
+            s = rx.CTA_THANK_YOU_SUBSCRIBE.sub("", s)
+            s = rx.CTA_THANKS_SUBSCRIBE.sub("", s)
             return s
 
         if not content_removed:
@@ -948,6 +937,39 @@ class WordPressClient:
         logger.info(f"Successfully fetched a total of {len(all_posts)} posts.")
         return all_posts
 
+    def get_posts_page(
+        self,
+        page: int,
+        fields: List[str],
+        per_page: int = 100,
+        extra_params: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Fetches a single page of published posts.
+
+        Returns:
+            (posts, total_pages) — total_pages comes from the X-WP-TotalPages header
+            so callers can fetch the remaining pages concurrently.
+        """
+        params = {
+            "status": "publish",
+            "per_page": per_page,
+            "page": page,
+            "_fields": ','.join(fields),
+        }
+        if extra_params:
+            params.update(extra_params)
+        r = self.session.get(f"{self.api_url}/posts", params=params, timeout=30)
+        # WordPress answers 400 (rest_post_invalid_page_number) past the last page
+        if r.status_code == 400 and page > 1:
+            return [], page - 1
+        r.raise_for_status()
+        try:
+            total_pages = int(r.headers.get('X-WP-TotalPages', 1))
+        except (TypeError, ValueError):
+            total_pages = 1
+        return r.json(), total_pages
+
     def get_tags_map_by_ids(self, tag_ids: List[int]) -> Dict[int, str]:
         """ 
         Fetches tag details from a list of IDs and returns a map of {id: name}.
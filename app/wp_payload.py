@@ -0,0 +1,155 @@
+"""
+Corpo da requisição de criação de post no WordPress, serializado uma vez só.
+
+`WordPressClient.create_post` rodava `json.dumps(payload)` até cinco vezes
+por post (medir o tamanho, medir de novo depois de cortar, `test_json`,
+`log_payload` no DEBUG, os dumps do erro 500) e recusava qualquer post acima
+de 30KB — justamente as listas grandes do ScreenRant/Collider. Aqui:
+
+- `PostPayload.add` codifica cada campo uma vez e soma o tamanho em bytes
+  conforme os campos entram; `body()` só concatena os pedaços já
+  codificados (orjson quando instalado, senão `json`);
+- o mesmo corpo serve para o envio, o log, a nova tentativa e o arquivo de
+  debug do erro 500;
+- `split_pages` insere blocos `core/nextpage` entre os blocos de topo de
+  conteúdos longos (de preferência antes de um título), para o post sair
+  paginado em vez de recusado;
+- `encode_body` comprime com gzip (`Content-Encoding: gzip`) corpos acima
+  de `WP_GZIP_MIN_BYTES` — só ligue se o servidor aceitar corpo comprimido.
+"""
+
+import gzip
+import json
+import os
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 0 desliga: gzip só para corpos acima deste tamanho (bytes)
+WP_GZIP_MIN_BYTES = int(os.getenv('WP_GZIP_MIN_BYTES', 0))
+# 0 desliga: conteúdo acima deste tamanho (bytes) é paginado com <!--nextpage-->
+WP_NEXTPAGE_BYTES = int(os.getenv('WP_NEXTPAGE_BYTES', 0))
+
+JSON_CONTENT_TYPE = 'application/json; charset=utf-8'
+NEXTPAGE_BLOCK = '<!-- wp:nextpage -->\n<!--nextpage-->\n<!-- /wp:nextpage -->'
+
+_BLOCK_DELIMITER_RE = re.compile(r'<!--\s+(/)?wp:([a-z][a-z0-9_-]*(?:/[a-z][a-z0-9_-]*)?)\b.*?(/)?-->', re.DOTALL)
+
+
+def dumps(value: Any) -> bytes:
+    """JSON compacto em UTF-8 (sem escapar acentos)."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class PostPayload:
+    """Campos do post codificados um a um; `size` é o tamanho exato do corpo final."""
+
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self._encoded: Dict[str, bytes] = {}
+        self._size = 2  # {}
+        self._body: Optional[bytes] = None
+
+    def add(self, key: str, value: Any) -> 'PostPayload':
+        """Adiciona (ou substitui) um campo; levanta TypeError/ValueError se não for serializável."""
+        fragment = dumps(key) + b':' + dumps(value)
+        previous = self._encoded.get(key)
+        if previous is not None:
+            self._size -= len(previous) + 1
+        self._encoded[key] = fragment
+        self.fields[key] = value
+        self._size += len(fragment) + 1
+        self._body = None
+        return self
+
+    @property
+    def size(self) -> int:
+        # uma vírgula a menos que o número de campos
+        return self._size - 1 if self._encoded else 2
+
+    def body(self) -> bytes:
+        if self._body is None:
+            self._body = b'{' + b','.join(self._encoded.values()) + b'}'
+        return self._body
+
+    def text(self) -> str:
+        return self.body().decode('utf-8')
+
+    def preview(self, limit: int = 2000) -> str:
+        """Início do corpo para log, sem nova serialização."""
+        return self.body()[:limit].decode('utf-8', errors='ignore')
+
+
+def encode_body(payload: PostPayload, gzip_min_bytes: int = WP_GZIP_MIN_BYTES) -> Tuple[bytes, Dict[str, str]]:
+    """Corpo pronto para `requests` (`data=`) e os headers correspondentes."""
+    body = payload.body()
+    headers = {'Content-Type': JSON_CONTENT_TYPE}
+    if gzip_min_bytes and len(body) > gzip_min_bytes:
+        body = gzip.compress(body, compresslevel=6)
+        headers['Content-Encoding'] = 'gzip'
+    return body, headers
+
+
+def iter_top_level_blocks(content: str) -> Iterator[str]:
+    """Blocos de topo de um conteúdo Gutenberg (HTML solto entre blocos sai como está)."""
+    depth = 0
+    start = 0
+    for match in _BLOCK_DELIMITER_RE.finditer(content):
+        closing, _, self_closing = match.groups()
+        if self_closing:
+            if depth == 0:
+                if content[start:match.start()].strip():
+                    yield content[start:match.start()].strip()
+                yield match.group(0)
+                start = match.end()
+        elif closing:
+            depth -= 1
+            if depth == 0:
+                yield content[start:match.end()].strip()
+                start = match.end()
+        else:
+            if depth == 0:
+                if content[start:match.start()].strip():
+                    yield content[start:match.start()].strip()
+                start = match.start()
+            depth += 1
+    if content[start:].strip():
+        yield content[start:].strip()
+
+
+def split_pages(content: str, max_page_bytes: int = WP_NEXTPAGE_BYTES) -> Tuple[str, int]:
+    """
+    Pagina conteúdos longos com `core/nextpage` entre blocos de topo.
+
+    Uma página fecha quando passa de `max_page_bytes`; a quebra vai antes do
+    último título da página, se houver (os itens das listas começam num
+    título). Retorna (conteúdo, número de páginas).
+    """
+    if not max_page_bytes or not content or len(content.encode('utf-8')) <= max_page_bytes:
+        return content, 1
+    pages: List[List[str]] = [[]]
+    page_bytes = 0
+    for item in iter_top_level_blocks(content):
+        item_bytes = len(item.encode('utf-8')) + 2
+        current = pages[-1]
+        if current and page_bytes + item_bytes > max_page_bytes:
+            heading_at = max(
+                (i for i, b in enumerate(current) if b.startswith('<!-- wp:heading')), default=0
+            )
+            if heading_at > 0:
+                pages[-1], carried = current[:heading_at], current[heading_at:]
+            else:
+                carried = []
+            pages.append(carried)
+            page_bytes = sum(len(b.encode('utf-8')) + 2 for b in carried)
+        pages[-1].append(item)
+        page_bytes += item_bytes
+    pages = [page for page in pages if page]
+    separator = f'\n\n{NEXTPAGE_BLOCK}\n\n'
+    return separator.join('\n\n'.join(page) for page in pages), len(pages)
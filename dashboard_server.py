@@ -15,6 +15,8 @@ from collections import defaultdict
 from flask import Flask, render_template, render_template_string, jsonify
 import os
 
+from app.token_ledger import get_ledger
+
 # =====================================================
 # PATHS
 # =====================================================
@@ -32,7 +34,6 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__, template_folder=str(PROJECT_ROOT / 'templates'))
 app.config['JSON_SORT_KEYS'] = False
 LOGS_DIR = PROJECT_ROOT / 'logs' / 'tokens'
-TOKEN_STATS_FILE = LOGS_DIR / 'token_stats.json'
 DB_PATH = PROJECT_ROOT / 'data' / 'app.db'
 
 # Carrega feeds do config
@@ -48,63 +49,30 @@ except Exception as e:
 # =====================================================
 
 def load_stats():
-    """Carrega estatísticas de tokens"""
+    """Carrega estatísticas de tokens (agregado por modelo do ledger)"""
     try:
-        if TOKEN_STATS_FILE.exists():
-            with open(TOKEN_STATS_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
+        stats = get_ledger(LOGS_DIR).model_totals()
+        if stats:
+            return stats
     except Exception as e:
         logger.error(f"Erro ao carregar stats: {e}")
     return {"gemini": {}, "publishing": {}}
 
 def load_recent_tokens(limit=15):
     """Carrega tokens recentes"""
-    recent = []
     try:
-        if LOGS_DIR.exists():
-            for jsonl_file in sorted(LOGS_DIR.glob("tokens_*.jsonl"), reverse=True):
-                with open(jsonl_file, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        try:
-                            entry = json.loads(line)
-                            recent.append(entry)
-                            if len(recent) >= limit:
-                                break
-                        except json.JSONDecodeError:
-                            continue
-                if len(recent) >= limit:
-                    break
+        return get_ledger(LOGS_DIR).recent(limit)
     except Exception as e:
         logger.error(f"Erro ao carregar tokens: {e}")
-    recent.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-    return recent[:limit]
+    return []
 
 def load_daily_stats():
-    """Carrega stats por dia"""
-    daily_stats = {}
+    """Carrega stats por dia (agregado diário do ledger)"""
     try:
-        if LOGS_DIR.exists():
-            for jsonl_file in sorted(LOGS_DIR.glob("tokens_*.jsonl")):
-                date_str = jsonl_file.stem.replace("tokens_", "")
-                daily_stats[date_str] = {
-                    "prompt_tokens": 0,
-                    "completion_tokens": 0,
-                    "total_tokens": 0,
-                    "requests": 0,
-                }
-                with open(jsonl_file, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        try:
-                            entry = json.loads(line)
-                            daily_stats[date_str]["prompt_tokens"] += entry.get("prompt_tokens", 0)
-                            daily_stats[date_str]["completion_tokens"] += entry.get("completion_tokens", 0)
-                            daily_stats[date_str]["total_tokens"] += entry.get("total_tokens", 0)
-                            daily_stats[date_str]["requests"] += 1
-                        except json.JSONDecodeError:
-                            pass
+        return get_ledger(LOGS_DIR).daily_totals()
     except Exception as e:
         logger.error(f"Erro ao carregar stats diários: {e}")
-    return daily_stats
+    return {}
 
 def load_feeds_data():
     """Carrega dados dos feeds"""
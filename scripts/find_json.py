@@ -8,6 +8,7 @@ Use:
 """
 
 import sys
+import gzip
 import json
 from pathlib import Path
 
@@ -19,7 +20,12 @@ def find_json(search_term):
         print("❌ debug/ directory not found!")
         return
     
-    json_files = sorted(debug_dir.glob("ai_response_batch_*.json"), reverse=True)
+    # .json.gz: gravados comprimidos pelo background_writer
+    json_files = sorted(
+        [*debug_dir.glob("ai_response_batch_*.json"), *debug_dir.glob("ai_response_batch_*.json.gz")],
+        key=lambda path: path.stat().st_mtime,
+        reverse=True,
+    )
     
     if not json_files:
         print("❌ No JSON files found!")
@@ -30,7 +36,8 @@ def find_json(search_term):
     
     for json_file in json_files:
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
+            opener = gzip.open if json_file.suffix == '.gz' else open
+            with opener(json_file, 'rt', encoding='utf-8') as f:
                 data = json.load(f)
             
             # Handle both single objects and arrays
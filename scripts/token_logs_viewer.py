@@ -10,6 +10,10 @@ from datetime import datetime, timedelta
 from typing import Dict, List
 from collections import defaultdict
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.token_ledger import get_ledger
+
 class TokenLogsViewer:
     """Visualiza e analisa logs de tokens"""
     
@@ -19,43 +23,26 @@ class TokenLogsViewer:
             print(f"❌ Diretório de logs não encontrado: {self.log_dir}")
             sys.exit(1)
         
-        self.stats_file = self.log_dir / 'token_stats.json'
+        self.ledger = get_ledger(self.log_dir)
     
     def load_stats(self) -> Dict:
-        """Carrega as estatísticas salvas"""
-        if not self.stats_file.exists():
-            return {}
-        
+        """Carrega as estatísticas agregadas por modelo (ledger)"""
         try:
-            with open(self.stats_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return self.ledger.model_totals()
         except Exception as e:
             print(f"❌ Erro ao ler estatísticas: {e}")
             return {}
     
-    def load_logs(self, days: int = 1) -> List[Dict]:
+    def load_logs(self, days: int = 1, limit: int = None) -> List[Dict]:
         """
-        Carrega logs dos últimos N dias
+        Carrega logs dos últimos N dias, do mais antigo para o mais recente
         
         Args:
             days: Número de dias para carregar (padrão: 1)
+            limit: Apenas os N registros mais recentes
         """
-        logs = []
-        
-        for i in range(days):
-            date = (datetime.now() - timedelta(days=i)).strftime('%Y-%m-%d')
-            log_file = self.log_dir / f"tokens_{date}.jsonl"
-            
-            if log_file.exists():
-                try:
-                    with open(log_file, 'r', encoding='utf-8') as f:
-                        for line in f:
-                            if line.strip():
-                                logs.append(json.loads(line))
-                except Exception as e:
-                    print(f"⚠️  Erro ao ler {log_file}: {e}")
-        
-        return logs
+        since = (datetime.now() - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+        return list(reversed(self.ledger.events(since_day=since, limit=limit)))
     
     def print_header(self, title: str) -> None:
         """Imprime um cabeçalho formatado"""
@@ -172,7 +159,7 @@ class TokenLogsViewer:
     
     def view_recent_logs(self, limit: int = 20, days: int = 1) -> None:
         """Exibe logs recentes"""
-        logs = self.load_logs(days)
+        logs = self.load_logs(days, limit)
         
         if not logs:
             print(f"\n⚠️  Nenhum log encontrado nos últimos {days} dia(s).")
@@ -206,24 +193,8 @@ class TokenLogsViewer:
         """Exibe comparação diária"""
         self.print_header(f"📈 COMPARAÇÃO DIÁRIA (últimos {days} dias)")
         
-        daily_stats = defaultdict(lambda: {
-            'prompt_tokens': 0,
-            'completion_tokens': 0,
-            'requests': 0,
-            'success': 0
-        })
-        
-        for i in range(days):
-            date = (datetime.now() - timedelta(days=i)).strftime('%Y-%m-%d')
-            logs = self.load_logs(1)  # Carrega logs do dia específico
-            
-            for log in logs:
-                if log['timestamp'].startswith(date):
-                    daily_stats[date]['prompt_tokens'] += log['prompt_tokens']
-                    daily_stats[date]['completion_tokens'] += log['completion_tokens']
-                    daily_stats[date]['requests'] += 1
-                    if log['success']:
-                        daily_stats[date]['success'] += 1
+        since = (datetime.now() - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+        daily_stats = self.ledger.daily_totals(since_day=since)
         
         if not daily_stats:
             print("\n⚠️  Nenhum dado diário disponível.")
@@ -240,7 +211,7 @@ class TokenLogsViewer:
             completion = stats['completion_tokens']
             total = prompt + completion
             requests = stats['requests']
-            success = stats['success']
+            success = requests - stats['failed_requests']
             
             self.print_table_row(
                 [date, f"{prompt:,}", f"{completion:,}", f"{total:,}", f"{requests:,}", f"{success:,}"],
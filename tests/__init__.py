@@ -1,3 +1,12 @@
 """
 Test package for RSS to WordPress Automation System
 """
+
+import os
+import tempfile
+
+# Os spans do tracing não vão para data/traces.db durante os testes
+os.environ.setdefault('TRACING_ENABLED', 'false')
+
+# Ledger e logs de tokens dos testes fora de logs/tokens do repositório
+os.environ.setdefault('TOKEN_LOG_DIR', tempfile.mkdtemp(prefix='tokens-tests-'))
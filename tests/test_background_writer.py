@@ -0,0 +1,103 @@
+"""
+Unit tests for the background writer (I/O thread, debug artifacts, async log handler)
+"""
+
+import gzip
+import logging
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from app import background_writer
+from app.background_writer import BackgroundWriter, async_handler, prune_artifacts, write_artifact
+
+
+class TestBackgroundWriter(unittest.TestCase):
+    """Test cases for the bounded job queue"""
+
+    def test_jobs_run_in_order_off_the_caller_thread(self):
+        writer = BackgroundWriter(maxsize=10)
+        self.addCleanup(writer.stop)
+        seen = []
+        for i in range(3):
+            self.assertTrue(writer.submit(seen.append, i))
+        writer.drain()
+        self.assertEqual(seen, [0, 1, 2])
+
+    def test_full_queue_and_stopped_writer_refuse_jobs(self):
+        writer = BackgroundWriter(maxsize=1)
+        with patch.object(writer, '_ensure_started', return_value=True):
+            self.assertTrue(writer.submit(print))
+            self.assertFalse(writer.submit(print))
+        self.assertEqual(writer.dropped, 1)
+
+        writer = BackgroundWriter(maxsize=1)
+        writer.stop()
+        self.assertFalse(writer.submit(print))
+
+
+class TestArtifacts(unittest.TestCase):
+    """Test cases for compressed debug artifacts and retention"""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+
+    def test_artifact_is_written_gzipped(self):
+        path = write_artifact('failed_ai_20260101-000000.json.txt', 'conteúdo', directory=str(self.tmp))
+        background_writer.drain()
+        self.assertEqual(path.name, 'failed_ai_20260101-000000.json.txt.gz')
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            self.assertEqual(f.read(), 'conteúdo')
+
+    def test_prune_keeps_newest_and_ignores_other_files(self):
+        now = time.time()
+        for i in range(5):
+            path = self.tmp / f'ai_response_batch_slug_{i}.json.gz'
+            path.write_bytes(b'x')
+            os.utime(path, (now - i, now - i))
+        old = self.tmp / 'failed_ai_old.json.txt'
+        old.write_bytes(b'x')
+        os.utime(old, (now - 30 * 86400, now - 30 * 86400))
+        (self.tmp / 'notes.txt').write_bytes(b'x')
+        (self.tmp / 'pages').mkdir()
+
+        removed = prune_artifacts(str(self.tmp), max_files=3, max_age_days=7)
+
+        self.assertEqual(removed, 3)
+        self.assertEqual(
+            sorted(p.name for p in self.tmp.iterdir()),
+            ['ai_response_batch_slug_0.json.gz', 'ai_response_batch_slug_1.json.gz',
+             'ai_response_batch_slug_2.json.gz', 'notes.txt', 'pages'],
+        )
+
+
+class TestAsyncHandler(unittest.TestCase):
+    """Test cases for the QueueHandler/QueueListener log path"""
+
+    def test_records_reach_the_file_handler(self):
+        tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        file_handler = logging.FileHandler(tmp / 'debug.log', encoding='utf-8')
+        file_handler.setFormatter(logging.Formatter('%(levelname)s %(message)s'))
+        handler = async_handler(file_handler)
+
+        log = logging.getLogger('tests.background_writer')
+        log.propagate = False
+        log.addHandler(handler)
+        self.addCleanup(log.removeHandler, handler)
+        log.warning('tokens: %d', 42)
+
+        listener = background_writer._listeners.pop()
+        listener.stop()
+        listener.sync()
+        file_handler.close()
+        self.assertEqual((tmp / 'debug.log').read_text(encoding='utf-8'), 'WARNING tokens: 42\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+"""
+Unit tests for the body_images module
+"""
+
+import threading
+import unittest
+from unittest.mock import Mock
+
+from app.body_images import (
+    collect_body_image_urls,
+    upload_body_images,
+    schedule_body_image_patch,
+    threadlocal_uploader,
+)
+
+
+def _fake_upload(url):
+    name = url.rsplit('/', 1)[-1]
+    return {'id': 1, 'source_url': f'https://wp.example.com/uploads/{name}'}
+
+
+class TestBodyImages(unittest.TestCase):
+    """Test cases for concurrent body-image uploads"""
+
+    def test_collect_body_image_urls_dedup_and_limit(self):
+        html = (
+            '<p>a</p><img src="https://cdn.x.com/a.jpg">'
+            '<figure><img src="https://cdn.x.com/A.jpg/"></figure>'
+            '<img src="https://cdn.x.com/b.jpg"><img src="https://cdn.x.com/c.jpg">'
+        )
+        self.assertEqual(
+            collect_body_image_urls(html, limit=2),
+            ['https://cdn.x.com/a.jpg', 'https://cdn.x.com/b.jpg'],
+        )
+        self.assertEqual(collect_body_image_urls('<p>sem imagens</p>'), [])
+
+    def test_upload_reuses_known_and_maps_results(self):
+        upload = Mock(side_effect=_fake_upload)
+        result = upload_body_images(
+            upload,
+            ['https://cdn.x.com/featured.jpg', 'https://cdn.x.com/b.jpg'],
+            known={'https://cdn.x.com/featured.jpg': 'https://wp.example.com/uploads/f.jpg'},
+        )
+        upload.assert_called_once_with('https://cdn.x.com/b.jpg')
+        self.assertEqual(result.uploaded, {
+            'https://cdn.x.com/featured.jpg': 'https://wp.example.com/uploads/f.jpg',
+            'https://cdn.x.com/b.jpg': 'https://wp.example.com/uploads/b.jpg',
+        })
+        self.assertEqual(result.pending, {})
+
+    def test_failed_upload_is_skipped(self):
+        def flaky(url):
+            if 'bad' in url:
+                raise RuntimeError('boom')
+            return _fake_upload(url)
+
+        result = upload_body_images(flaky, ['https://cdn.x.com/bad.jpg', 'https://cdn.x.com/ok.jpg'])
+        self.assertEqual(list(result.uploaded), ['https://cdn.x.com/ok.jpg'])
+
+    def test_slow_upload_is_patched_after_publish(self):
+        release = threading.Event()
+
+        def slow(url):
+            release.wait(5)
+            return _fake_upload(url)
+
+        result = upload_body_images(slow, ['https://cdn.x.com/slow.jpg'], deadline_s=0.05)
+        self.assertEqual(result.uploaded, {})
+        self.assertIn('https://cdn.x.com/slow.jpg', result.pending)
+
+        client = Mock()
+        client.get_post_content.return_value = '<img src="https://cdn.x.com/slow.jpg">'
+        thread = schedule_body_image_patch(result, 42, lambda: client, timeout_s=5)
+        release.set()
+        thread.join(5)
+
+        client.update_post_content.assert_called_once()
+        post_id, content = client.update_post_content.call_args[0]
+        self.assertEqual(post_id, 42)
+        self.assertIn('https://wp.example.com/uploads/slow.jpg', content)
+        client.close.assert_called_once()
+
+    def test_threadlocal_uploader_single_attempt(self):
+        client = Mock()
+        client.upload_media_from_url.return_value = {'source_url': 'x'}
+        upload = threadlocal_uploader(lambda: client, 'alt', timeout_s=7)
+        upload('https://cdn.x.com/a.jpg')
+        client.upload_media_from_url.assert_called_once_with(
+            'https://cdn.x.com/a.jpg', 'alt', max_attempts=1,
+            download_timeout=7, upload_timeout=7,
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+Unit tests for the compiled cleaning engine (equivalence with the BeautifulSoup cleaners)
+"""
+
+import unittest
+
+from bs4 import BeautifulSoup
+
+from app.bench import synthetic_page, SYNTHETIC_URLS
+from app.clean_engine import SelectorUnion, remove_cta_blocks
+from app.extractor import ContentExtractor, PRE_CLEAN_SELECTORS
+
+
+TRICKY_BODY = """
+<html><body><article><div class="article-body">
+<p>Intro com texto suficiente.</p>
+<div data-is-tag-interaction="">flag vazia fica</div>
+<div data-stnl-slot="1"><p>stnl</p></div>
+<div id="Sidebar-Main"><p>id em maiúsculas</p></div>
+<ul><li><b>read mo</b><i>re</i></li><li><span>Sign up</span> today</li></ul>
+<div><div><p>Keep up to date with news</p></div><p>normal</p></div>
+<figure><img src="https://x.com/a.svg"></figure>
+<figure><img src="https://x.com/b.jpg?w=1200" alt="ok"><figcaption>Cena</figcaption></figure>
+<figure><p>sem imagem</p></figure>
+<p>Final do artigo.</p>
+</div></article></body></html>
+"""
+
+PRE_CLEAN_PAGE = """
+<html><body>
+<header>h</header><nav>n</nav>
+<div class="post share-buttons">share-buttons não é token .share</div>
+<div class="share">x</div>
+<div class="Related-box">maiúscula não casa [class*=related]</div>
+<div class="box related-x">y</div>
+<section aria-label="Leia também">z</section>
+<section aria-label="leia">minúscula não casa</section>
+<div class="widget">w</div><span class="widget">span.widget fica</span>
+<div data-ad="">ad</div>
+<div id="comments">c</div><div id="comments-2">c2</div>
+<div id="x-popular-y">p</div>
+<p>conteúdo</p>
+</body></html>
+"""
+
+
+class TestCleanEngine(unittest.TestCase):
+    """The compiled path must produce the same tree as the legacy cleaners"""
+
+    def setUp(self):
+        self.legacy = ContentExtractor(compiled_cleaners=False)
+        self.compiled = ContentExtractor(compiled_cleaners=True)
+
+    def _both(self, method, html):
+        out = []
+        for extractor in (self.legacy, self.compiled):
+            body = getattr(extractor, method)(BeautifulSoup(html, 'lxml'))
+            out.append(str(body))
+        return out
+
+    def test_site_cleaners_match_legacy(self):
+        for site in ('screenrant', 'gamerant', 'collider', 'comicbook'):
+            method = f'_clean_html_for_{site}'
+            for html in (synthetic_page(paragraphs=30), TRICKY_BODY):
+                with self.subTest(site=site):
+                    legacy, compiled = self._both(method, html)
+                    self.assertEqual(compiled, legacy)
+
+    def test_tricky_cases(self):
+        _, out = self._both('_clean_html_for_screenrant', TRICKY_BODY)
+        self.assertIn('flag vazia fica', out)
+        self.assertNotIn('stnl', out)
+        self.assertNotIn('id em maiúsculas', out)
+        self.assertIn('<b>read mo</b>', out)
+        self.assertNotIn('Sign up', out)
+        self.assertNotIn('Keep up to date', out)
+        self.assertIn('b.jpg', out)
+        self.assertNotIn('a.svg', out)
+        self.assertNotIn('sem imagem', out)
+
+    def test_extract_matches_legacy(self):
+        html = synthetic_page(paragraphs=30)
+        for site, url in SYNTHETIC_URLS.items():
+            with self.subTest(site=site):
+                legacy = self.legacy.extract(html, url)
+                compiled = self.compiled.extract(html, url)
+                self.assertEqual(compiled, legacy)
+
+    def test_pre_clean_union_matches_select(self):
+        expected = BeautifulSoup(PRE_CLEAN_PAGE, 'lxml')
+        for sel in PRE_CLEAN_SELECTORS:
+            for el in expected.select(sel):
+                el.decompose()
+        soup = BeautifulSoup(PRE_CLEAN_PAGE, 'lxml')
+        union = SelectorUnion(PRE_CLEAN_SELECTORS)
+        self.assertEqual(union.fallback, [])
+        union.remove_from(soup)
+        self.assertEqual(str(soup), str(expected))
+        self.assertIn('span.widget fica', str(soup))
+        self.assertIn('minúscula não casa', str(soup))
+
+    def test_unsupported_selectors_fall_back_to_select(self):
+        union = SelectorUnion(['div > p.x', '.keep-me-not'])
+        self.assertEqual(union.fallback, ['div > p.x'])
+        soup = BeautifulSoup('<div><p class="x">a</p></div><p class="x">b</p><i class="keep-me-not">c</i>', 'lxml')
+        self.assertEqual(union.remove_from(soup), 2)
+        self.assertEqual(soup.get_text(), 'b')
+
+    def test_cta_removes_outermost_candidate(self):
+        soup = BeautifulSoup('<div><section><p>Follow us</p></section></div><ul><li>follow us</li></ul>', 'lxml')
+        self.assertEqual(remove_cta_blocks(soup.body, 'Test'), 1)
+        self.assertEqual(str(soup.body), '<body><ul><li>follow us</li></ul></body>')
+
+
+if __name__ == '__main__':
+    unittest.main()
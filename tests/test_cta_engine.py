@@ -0,0 +1,163 @@
+"""
+Unit tests for the cta_engine module (single-pass CTA detection and removal)
+"""
+
+import html
+import random
+import re
+import unicodedata
+import unittest
+
+from bs4 import BeautifulSoup
+
+from app import html_utils
+from app.cta_engine import CtaMatcher, TextIndex, legacy_pipeline_layers, normalize_cta_text
+from app.document import Document
+from app.html_utils import detect_forbidden_cta, scan_forbidden_cta, strip_forbidden_cta_sentences
+
+_FRAGMENTS = [
+    "thank you for reading", "thanks for reading", "subscribe", "Inscreva-se", "obrigado por ler",
+    "don’t forget to subscribe", "stay tuned", "follow us", "se inscreva", "Não esqueça de se inscrever",
+    "this post", "lorem ipsum", "filme", "é ótimo", "&amp;", "read more", "cadastre-se",
+]
+_TAGS = ["p", "div", "span", "section", "li", "strong", "em", "h2", "a", "blockquote", "footer"]
+
+
+def random_fragment(rnd: random.Random, depth: int = 0) -> str:
+    out = []
+    for _ in range(rnd.randint(1, 4)):
+        if depth < 4 and rnd.random() < 0.5:
+            tag = rnd.choice(_TAGS)
+            out.append(f"<{tag}>{random_fragment(rnd, depth + 1)}</{tag}>")
+        else:
+            out.append(" ".join(rnd.choice(_FRAGMENTS) for _ in range(rnd.randint(1, 3))))
+    return "".join(out)
+
+
+class TestCtaMatcher(unittest.TestCase):
+    """Test cases for the trie matcher and the text index"""
+
+    def test_overlapping_and_nested_fragments(self):
+        matcher = CtaMatcher(["se inscreva", "inscreva se", "thank you for reading", "thank you for reading this post"])
+        found = {(s, e, matcher.fragments[f]) for s, e, f in matcher.occurrences("se inscreva se e thank you for reading this post")}
+        self.assertEqual(found, {
+            (0, 11, "se inscreva"),
+            (3, 14, "inscreva se"),
+            (17, 38, "thank you for reading"),
+            (17, 48, "thank you for reading this post"),
+        })
+
+    def test_normalization_matches_previous_helper(self):
+        self.assertEqual(normalize_cta_text("Não esqueça — de SE inscrever!"), "nao esqueca de se inscrever")
+        self.assertEqual(normalize_cta_text("Don’t &amp; `forget`"), "don t forget")
+        self.assertEqual(normalize_cta_text(""), "")
+
+    def test_translate_table_matches_nfkd_filter(self):
+        def reference(text):
+            text = html.unescape(text).replace("’", "'").replace("`", "'")
+            text = unicodedata.normalize("NFKD", text)
+            text = "".join(ch for ch in text if not unicodedata.category(ch).startswith("M")).lower()
+            return re.sub(r"[^a-z0-9]+", " ", text).strip()
+
+        rnd = random.Random(0)
+        pools = [range(0x20, 0x250), range(0x300, 0x370), range(0x1E00, 0x1F00), range(0x2000, 0x2200),
+                 range(0xFB00, 0xFB10), range(0xFF00, 0xFF60), [0x130, 0x3A3, 0x2122, 0xBD]]
+        for _ in range(2000):
+            text = "".join(chr(rnd.choice(rnd.choice(pools))) for _ in range(rnd.randint(0, 30)))
+            self.assertEqual(normalize_cta_text(text), reference(text), repr(text))
+
+    def test_tag_spans_are_slices_of_document_text(self):
+        rnd = random.Random(3)
+        checked = 0
+        for _ in range(20):
+            soup = BeautifulSoup(random_fragment(rnd), "lxml")
+            index = TextIndex(soup, _TAGS)
+            for tag, name, a, b, _ in index.entries:
+                self.assertEqual(name, tag.name)
+                self.assertEqual(index.text[a:b], normalize_cta_text(tag.get_text(" ", strip=True)))
+                checked += 1
+        self.assertGreater(checked, 20)
+
+
+class TestCtaEngineEquivalence(unittest.TestCase):
+    """The block tier must remove exactly what the bottom-up per-node check removes"""
+
+    def test_random_documents_match_per_node_check(self):
+        rnd = random.Random(1)
+        for _ in range(400):
+            html = random_fragment(rnd)
+            per_node, engine = BeautifulSoup(html, "lxml"), BeautifulSoup(html, "lxml")
+            html_utils._strip_forbidden_cta_soup_per_node(per_node)
+            label, _ = html_utils._CTA_ENGINE.strip_soup(engine, tiers=1)
+            self.assertEqual(str(per_node), str(engine), html)
+            self.assertEqual(label, detect_forbidden_cta(html), html)
+
+    def test_removed_child_clears_parent(self):
+        html = "<div><p>Obrigado por ler!</p><p>O filme estreia em março.</p></div>"
+        cleaned, removed = strip_forbidden_cta_sentences(html)
+        self.assertTrue(removed)
+        self.assertEqual(cleaned, "<div><p>O filme estreia em março.</p></div>")
+
+    def test_smallest_matching_block_is_removed(self):
+        html = "<div><section><p>Artigo.</p><ul><li>Follow us on X</li></ul><p>Mais.</p></section></div>"
+        cleaned, removed = strip_forbidden_cta_sentences(html)
+        self.assertTrue(removed)
+        self.assertEqual(cleaned, "<div><section><p>Artigo.</p><ul></ul><p>Mais.</p></section></div>")
+
+    def test_inline_tags_inside_blocks_remove_the_block(self):
+        cleaned, _ = strip_forbidden_cta_sentences("<p>Great movie, <em>stay tuned</em> for more.</p><p>ok</p>")
+        self.assertEqual(cleaned, "<p>ok</p>")
+        cleaned, _ = strip_forbidden_cta_sentences("<h2>Título <strong>stay tuned</strong></h2><p>ok</p>")
+        self.assertEqual(cleaned, "<h2>Título </h2><p>ok</p>")
+
+    def test_sequence_split_across_children_removes_parent(self):
+        html = "<div><p>subscribe</p><p>thanks for visiting</p></div><p>fica</p>"
+        cleaned, removed = strip_forbidden_cta_sentences(html)
+        self.assertTrue(removed)
+        self.assertEqual(cleaned, "<p>fica</p>")
+
+
+class TestScanForbiddenCta(unittest.TestCase):
+    """Test cases for detection + removal in one pass"""
+
+    def test_scan_reports_label_and_removals(self):
+        scan = scan_forbidden_cta(
+            "<p>Texto.</p><p>Thank you for reading this post, don't forget to subscribe!</p>"
+        )
+        self.assertEqual(scan.label, "thank you for reading + subscribe")
+        self.assertEqual(scan.html, "<p>Texto.</p>")
+        self.assertEqual(len(scan.removed), 1)
+
+        clean = scan_forbidden_cta("<p>Nada a remover.</p>")
+        self.assertIsNone(clean.label)
+        self.assertEqual(clean.removed, [])
+
+    def test_paragraph_tier_matches_old_layers_on_single_cta(self):
+        for phrase in ("Stay tuned for more!", "Click here to see the trailer.", "Leia mais no site.", "Cadastre-se já."):
+            # CTA no primeiro parágrafo: o único caso em que as regexes antigas não levam texto junto
+            html = f"<p>{phrase}</p><p>Resto do texto.</p>"
+            legacy, _ = legacy_pipeline_layers(html)
+            scan = scan_forbidden_cta(Document(html), paragraphs=True)
+            self.assertEqual(scan.html, legacy, phrase)
+            # Sem `paragraphs`, só as regras de bloco valem
+            if phrase.startswith(("Click", "Leia")):
+                self.assertEqual(scan_forbidden_cta(html).html, html)
+
+    def test_paragraph_tier_keeps_earlier_paragraphs(self):
+        # As regexes `<p>.*?frase.*?</p>` antigas casavam a partir do primeiro <p> do documento
+        html = "<p>Primeiro.</p><p>Segundo.</p><p>Quer saber mais? Leia mais no site.</p><p>Fim.</p>"
+        self.assertEqual(legacy_pipeline_layers(html)[0], "<p>Fim.</p>")
+        self.assertEqual(
+            scan_forbidden_cta(html, paragraphs=True).html,
+            "<p>Primeiro.</p><p>Segundo.</p><p>Fim.</p>",
+        )
+
+    def test_fallback_regex_for_bare_text(self):
+        scan = scan_forbidden_cta("Thank you for reading, subscribe<p>fica</p>")
+        self.assertEqual(scan.label, "thank you for reading + subscribe")
+        self.assertTrue(any(item.startswith("FALLBACK") for item in scan.removed))
+        self.assertNotIn("Thank you", scan.html)
+
+
+if __name__ == '__main__':
+    unittest.main()
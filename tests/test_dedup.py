@@ -0,0 +1,116 @@
+"""
+Unit tests for the dedup module (MinHash + LSH near-duplicate stories)
+"""
+
+import os
+import random
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from app.dedup import StoryDeduplicator, band_buckets, minhash, shingle_hashes, similarity
+from app.store import Database
+
+_WORDS = (
+    "marvel studios confirmou nova data estreia filme vingadores diretor elenco "
+    "produção trailer bilheteria sequência personagem universo cinematográfico "
+    "anúncio painel convenção roteiro filmagens gravações série plataforma "
+    "streaming temporada episódio crítica público fãs lançamento cinema"
+).split()
+
+
+def story(seed: int, words: int = 220) -> str:
+    rnd = random.Random(seed)
+    return ' '.join(rnd.choice(_WORDS) + str(rnd.randint(0, 40)) for _ in range(words))
+
+
+def rewrite(text: str, fraction: float, seed: int = 1) -> str:
+    """Troca `fraction` das palavras (mesma história, redação um pouco diferente)."""
+    rnd = random.Random(seed)
+    tokens = text.split()
+    for i in rnd.sample(range(len(tokens)), int(len(tokens) * fraction)):
+        tokens[i] = f"outra{i}"
+    return ' '.join(tokens)
+
+
+class TestStoryDeduplicator(unittest.TestCase):
+    """Test cases for near-duplicate detection before the AI step"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.tmp.name, 'app.db'))
+        self.db.initialize()
+        self.dedup = StoryDeduplicator(self.db.conn, threshold=0.6)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def _article(self, source_id: str, external_id: str, status: str = 'PROCESSING') -> dict:
+        item = {'id': external_id, 'url': f'https://{source_id}.com/{external_id}', 'title': external_id}
+        [new] = self.db.filter_new_articles(source_id, [item])
+        self.db.update_article_status(new['db_id'], status)
+        return {'db_id': new['db_id'], 'source_id': source_id, 'url': item['url'], 'title': external_id}
+
+    def test_signature_estimates_jaccard(self):
+        base = story(1)
+        a = minhash(shingle_hashes(base))
+        self.assertEqual(similarity(a, minhash(shingle_hashes(base))), 1.0)
+        self.assertGreater(similarity(a, minhash(shingle_hashes(rewrite(base, 0.03)))), 0.6)
+        self.assertLess(similarity(a, minhash(shingle_hashes(story(2)))), 0.1)
+        self.assertEqual(len(set(band_buckets(a))), 32)
+
+    def test_near_duplicate_across_sources(self):
+        base = story(1)
+        first = self._article('screenrant_movie_news', 'a1')
+        self.assertIsNone(self.dedup.check_and_add(first, base))
+        self.db.update_article_status(first['db_id'], 'PUBLISHED')
+
+        dup = self._article('collider_news', 'b1')
+        match = self.dedup.check_and_add(dup, rewrite(base, 0.03))
+        self.assertEqual(match['seen_article_id'], first['db_id'])
+        self.assertGreaterEqual(match['similarity'], 0.6)
+
+        other = self._article('collider_news', 'b2')
+        self.assertIsNone(self.dedup.check_and_add(other, story(3)))
+
+    def test_retry_and_failed_articles_do_not_match(self):
+        base = story(5)
+        first = self._article('screenrant_movie_news', 'a1')
+        self.assertIsNone(self.dedup.check_and_add(first, base))
+        # A mesma linha voltando da fila (QUEUED) não é duplicata de si mesma
+        self.assertIsNone(self.dedup.check_and_add(first, base))
+
+        self.db.update_article_status(first['db_id'], 'FAILED')
+        second = self._article('gamerant_news', 'c1')
+        self.assertIsNone(self.dedup.check_and_add(second, base))
+
+    def test_in_flight_articles_do_not_match(self):
+        base = story(6)
+        first = self._article('screenrant_movie_news', 'a1')
+        self.assertIsNone(self.dedup.check_and_add(first, base))
+        # Ainda na fila ou em processamento: se falhar depois, a história não pode sumir
+        for status in ('PROCESSING', 'QUEUED'):
+            self.db.update_article_status(first['db_id'], status)
+            second = self._article('gamerant_news', f'c-{status}')
+            self.assertIsNone(self.dedup.check_and_add(second, rewrite(base, 0.03)))
+
+    def test_short_text_and_window(self):
+        art = self._article('screenrant_movie_news', 'curta')
+        self.assertIsNone(self.dedup.signature('Nota curta sobre o filme.'))
+        self.assertIsNone(self.dedup.check_and_add(art, 'Nota curta sobre o filme.'))
+
+        base = story(7)
+        first = self._article('screenrant_movie_news', 'a1', status='PUBLISHED')
+        self.dedup.add(first['db_id'], self.dedup.signature(base))
+        self.assertIsNotNone(self.dedup.find_duplicate(self.dedup.signature(base)))
+        old = datetime.utcnow() - timedelta(hours=100)
+        self.db.conn.execute("UPDATE story_signatures SET created_at = ?", (old,))
+        self.db.conn.commit()
+        self.assertIsNone(self.dedup.find_duplicate(self.dedup.signature(base)))
+        self.assertEqual(self.dedup.purge(), 1)
+        self.assertEqual(self.db.conn.execute("SELECT COUNT(*) FROM story_lsh").fetchone()[0], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
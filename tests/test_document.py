@@ -0,0 +1,96 @@
+"""
+Unit tests for the parse-once Document and the in-place html_utils transforms
+"""
+
+import unittest
+
+from app.document import Document, transform
+from app.html_utils import (
+    validate_and_fix_figures,
+    validate_and_fix_figures_soup,
+    merge_images_into_content,
+    merge_images_into_content_soup,
+    rewrite_img_srcs_with_wp,
+    rewrite_img_srcs_soup,
+    strip_credits_and_normalize_youtube,
+    strip_credits_and_normalize_youtube_soup,
+    detect_forbidden_cta,
+    strip_forbidden_cta_sentences,
+    html_to_gutenberg_blocks,
+)
+from app.internal_linking import add_internal_links, add_internal_links_soup
+
+
+AI_OUTPUT = """
+<p>O novo filme do Batman estreia em junho.</p>
+<img src="https://cdn.x.com/batman.jpg" alt="Batman">
+<p>Crédito: Warner Bros.</p>
+<figure><iframe src="https://www.youtube.com/embed/abc123XYZ"></iframe></figure>
+<h2>Elenco</h2>
+<p>Robert Pattinson volta ao papel.</p>
+<ul><li>Item um</li><li>Item dois</li></ul>
+"""
+IMAGES = ["https://cdn.x.com/extra.jpg"]
+UPLOADED = {"https://cdn.x.com/batman.jpg": "https://wp.example.com/batman.jpg"}
+LINK_MAP = {'posts': [{'link': 'https://s.com/pattinson', 'keywords': ['Robert Pattinson']}]}
+
+
+class TestDocument(unittest.TestCase):
+    """Test cases for Document and transform skipping"""
+
+    def test_apply_skips_transform_without_touched_nodes(self):
+        calls = []
+
+        @transform(touches=("img",))
+        def only_images(soup):
+            calls.append(1)
+
+        doc = Document("<p>sem imagens</p>")
+        doc.apply(only_images)
+        self.assertEqual(calls, [])
+        self.assertEqual(doc.skipped, ["only_images"])
+
+        Document('<p><img src="https://x/a.jpg"></p>').apply(only_images)
+        self.assertEqual(calls, [1])
+
+    def test_text_cache_is_invalidated(self):
+        doc = Document("<p>um</p>")
+        self.assertEqual(doc.text(), "um")
+        doc.append_html("<p>dois</p>")
+        self.assertEqual(doc.text(), "um dois")
+        self.assertEqual(doc.html(), "<p>um</p><p>dois</p>")
+
+    def test_append_to_empty_document(self):
+        doc = Document("")
+        doc.append_html("<p>x</p>")
+        self.assertEqual(doc.html(), "<p>x</p>")
+
+    def test_parse_once_chain_matches_string_chain(self):
+        html = validate_and_fix_figures(AI_OUTPUT)
+        html = merge_images_into_content(html, IMAGES)
+        html = rewrite_img_srcs_with_wp(html, UPLOADED)
+        html = strip_credits_and_normalize_youtube(html)
+        html = add_internal_links(html, LINK_MAP)
+        expected = html_to_gutenberg_blocks(html)
+
+        doc = Document(AI_OUTPUT)
+        doc.apply(validate_and_fix_figures_soup)
+        doc.apply(merge_images_into_content_soup, IMAGES)
+        doc.apply(rewrite_img_srcs_soup, UPLOADED)
+        doc.apply(strip_credits_and_normalize_youtube_soup)
+        doc.apply(add_internal_links_soup, LINK_MAP)
+        self.assertEqual(html_to_gutenberg_blocks(doc), expected)
+        self.assertIn("https://wp.example.com/batman.jpg", expected)
+        self.assertIn('<a href="https://s.com/pattinson">Robert Pattinson</a>', expected)
+
+    def test_cta_helpers_accept_document(self):
+        doc = Document("<p>Texto.</p><p>Thank you for reading this post, don't forget to subscribe!</p>")
+        self.assertIsNotNone(detect_forbidden_cta(doc))
+        cleaned, removed = strip_forbidden_cta_sentences(doc)
+        self.assertTrue(removed)
+        self.assertEqual(cleaned, "<p>Texto.</p>")
+        self.assertIsNone(detect_forbidden_cta(doc))
+
+
+if __name__ == '__main__':
+    unittest.main()
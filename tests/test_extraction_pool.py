@@ -0,0 +1,45 @@
+"""
+Unit tests for the extraction_pool module
+"""
+
+import glob
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app.bench import synthetic_page, SYNTHETIC_URLS
+from app.extraction_pool import ExtractionPool
+
+
+class TestExtractionPool(unittest.TestCase):
+    """Test cases for process-pool extraction and the HTML handoff"""
+
+    def setUp(self):
+        self.html = synthetic_page(paragraphs=20)
+        self.url = SYNTHETIC_URLS['screenrant']
+
+    def test_inline_mode(self):
+        pool = ExtractionPool(workers=0)
+        result = pool.submit(self.html, self.url).result()
+        self.assertEqual(result['title'], 'Artigo sintético')
+        self.assertIn('Parágrafo 19', result['content'])
+
+    def test_process_pool_matches_local_extraction(self):
+        expected = ExtractionPool(workers=0).extract_local(self.html, self.url)
+        with tempfile.TemporaryDirectory() as handoff_dir, \
+                patch('app.extraction_pool._HANDOFF_DIR', handoff_dir):
+            # Limite de 1 KB: a página grande vai por arquivo + mmap, a pequena por bytes
+            pool = ExtractionPool(workers=1, handoff_min_bytes=1024)
+            try:
+                big = pool.submit(self.html, self.url)
+                small = pool.submit('<html><body><article><p>curto</p></article></body></html>', self.url)
+                self.assertEqual(big.result(timeout=60), expected)
+                self.assertIn('curto', small.result(timeout=60)['content'])
+            finally:
+                pool.shutdown()
+            self.assertEqual(glob.glob(os.path.join(handoff_dir, 'extract-*')), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
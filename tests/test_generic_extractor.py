@@ -0,0 +1,74 @@
+"""
+Unit tests for the generic (trafilatura) extraction path
+"""
+
+import unittest
+
+from bs4 import BeautifulSoup
+
+from app.extraction_pool import extract_html
+from app.extractor import ContentExtractor, _find_article_body
+
+URL = 'https://exemplo.com.br/noticia/'
+
+
+def portal_page(paragraphs: int = 30, comments: int = 60) -> str:
+    """Portal sem <article>: menu grande, corpo em .post-content, comentários, barra lateral e rodapé."""
+    menu = ''.join(f'<li><a href="/sec{i}">Seção {i}</a></li>' for i in range(100))
+    body = ''.join(
+        f'<p>Parágrafo {i} do texto principal, com informação relevante sobre o assunto.</p>'
+        for i in range(paragraphs)
+    )
+    comment_html = ''.join(
+        f'<div class="comentario"><span>Leitor {i}</span><p>Comentário {i} de um leitor sobre a notícia.</p></div>'
+        for i in range(comments)
+    )
+    return (
+        '<html><head><title>Notícia</title><meta property="og:title" content="Notícia genérica"></head><body>'
+        f'<div id="topo"><ul class="menu">{menu}</ul></div>'
+        f'<div class="conteudo"><h1>Notícia genérica</h1><div class="post-content">{body}</div>'
+        f'<div class="comentarios">{comment_html}</div></div>'
+        '<div id="rodape"><a href="/sobre">Sobre</a></div></body></html>'
+    )
+
+
+class TestGenericExtractor(unittest.TestCase):
+    """Test cases for trafilatura running on the _find_article_body candidate"""
+
+    def setUp(self):
+        self.extractor = ContentExtractor(page_cache=None)
+
+    def test_find_article_body_without_article_tag(self):
+        soup = BeautifulSoup(portal_page(), 'lxml')
+        root = _find_article_body(soup)
+        self.assertEqual(root.get('class'), ['post-content'])
+
+    def test_subtree_extraction_skips_comments(self):
+        result = extract_html(self.extractor, portal_page(), URL)
+        self.assertIsNotNone(result)
+        self.assertIn('Parágrafo 0 do texto principal', result['content'])
+        self.assertIn('Parágrafo 29 do texto principal', result['content'])
+        self.assertNotIn('Comentário', result['content'])
+        self.assertEqual(result['title'], 'Notícia genérica')
+
+    def test_small_candidate_falls_back_to_full_page(self):
+        html = (
+            '<html><body><div class="post-content"><p>curto</p></div>'
+            f'<div><p>{"texto longo " * 100}</p></div></body></html>'
+        )
+        soup = BeautifulSoup(html, 'lxml')
+        article_soup = self.extractor._extract_with_trafilatura(soup, URL)
+        self.assertIn('texto longo', article_soup.get_text())
+
+    def test_full_page_mode_matches_on_article_pages(self):
+        full = ContentExtractor(page_cache=None, trafilatura_subtree=False)
+        html = portal_page(comments=0).replace('<div class="post-content">', '<article>').replace(
+            '</div><div class="comentarios">', '</article><div class="comentarios">'
+        )
+        new = extract_html(self.extractor, html, URL)
+        old = extract_html(full, html, URL)
+        self.assertEqual(' '.join(new['content'].split()), ' '.join(old['content'].split()))
+
+
+if __name__ == '__main__':
+    unittest.main()
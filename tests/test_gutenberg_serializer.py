@@ -0,0 +1,108 @@
+"""
+Unit tests for the gutenberg module (single-pass block serializer)
+"""
+
+import io
+import json
+import re
+import unittest
+
+from app.document import Document
+from app.gutenberg import block_attrs
+from app.html_utils import html_to_gutenberg_blocks
+
+_ATTRS_RE = re.compile(r'<!-- wp:[\w/-]+ (\{.*?\}) -->')
+
+
+class TestBlockAttrs(unittest.TestCase):
+    """Test cases for the block comment attribute encoding"""
+
+    def test_empty_attrs(self):
+        self.assertEqual(block_attrs(None), '')
+        self.assertEqual(block_attrs({}), '')
+
+    def test_escapes_comment_breaking_characters(self):
+        encoded = block_attrs({'caption': 'a -- <b> & "c"'})
+        self.assertNotIn('--', encoded)
+        self.assertNotIn('<', encoded)
+        self.assertNotIn('&', encoded)
+        self.assertEqual(json.loads(encoded), {'caption': 'a -- <b> & "c"'})
+
+
+class TestGutenbergSerializer(unittest.TestCase):
+    """Test cases for html_to_gutenberg_blocks"""
+
+    def test_list_items_keep_inline_markup_and_nesting(self):
+        out = html_to_gutenberg_blocks(
+            '<ol start="3"><li><strong>Diretor:</strong> <a href="https://x.com/d">Nome</a></li>'
+            '<li>Elenco<ul><li>Ator A</li></ul></li></ol>'
+        )
+        self.assertIn('<!-- wp:list {"ordered":true,"start":3} -->\n<ol start="3"><!-- wp:list-item -->', out)
+        self.assertIn('<li><strong>Diretor:</strong> <a href="https://x.com/d">Nome</a></li>', out)
+        self.assertEqual(out.count('<!-- wp:list-item -->'), 3)
+        self.assertIn('<li>Elenco<!-- wp:list -->\n<ul><!-- wp:list-item -->\n<li>Ator A</li>', out)
+
+    def test_heading_and_quote_keep_inline_markup(self):
+        out = html_to_gutenberg_blocks(
+            '<h3>1. <a href="https://x.com/f">Filme</a></h3>'
+            '<blockquote><p>Frase <em>marcante</em>.</p><cite>Autor</cite></blockquote>'
+        )
+        self.assertIn('<!-- wp:heading {"level":3} -->\n<h3>1. <a href="https://x.com/f">Filme</a></h3>', out)
+        self.assertIn('<!-- wp:paragraph -->\n<p>Frase <em>marcante</em>.</p>', out)
+        self.assertIn('<cite>Autor</cite></blockquote>', out)
+
+    def test_containers_are_walked_and_loose_inline_grouped(self):
+        out = html_to_gutenberg_blocks(
+            '<div><section>Texto <a href="https://x.com">solto</a><p>Parágrafo.</p></section>'
+            '<table><tr><td>1</td></tr></table><hr></div>'
+        )
+        self.assertIn('<p>Texto <a href="https://x.com">solto</a></p>', out)
+        self.assertIn('<p>Parágrafo.</p>', out)
+        self.assertIn('<!-- wp:table -->', out)
+        self.assertIn('<!-- wp:separator -->', out)
+
+    def test_table_rows_are_wrapped_in_thead_and_tbody(self):
+        out = html_to_gutenberg_blocks(
+            '<table class="x"><tr><th>Nome</th><th>Nota</th></tr>'
+            '<tr><td style="color:red">Filme</td><td colspan="2">9</td></tr></table>'
+        )
+        self.assertIn(
+            '<figure class="wp-block-table"><table>'
+            '<thead><tr><th>Nome</th><th>Nota</th></tr></thead>'
+            '<tbody><tr><td>Filme</td><td colspan="2">9</td></tr></tbody>'
+            '</table></figure>',
+            out,
+        )
+
+        out = html_to_gutenberg_blocks('<table><tbody><tr><td>1</td></tr></tbody><tfoot><tr><td>2</td></tr></tfoot></table>')
+        self.assertIn('<table><tbody><tr><td>1</td></tr></tbody><tfoot><tr><td>2</td></tr></tfoot></table>', out)
+        self.assertNotIn('<thead>', out)
+
+    def test_youtube_url_paragraph_becomes_embed(self):
+        out = html_to_gutenberg_blocks('<p>https://www.youtube.com/watch?v=abc123XYZ</p>')
+        self.assertTrue(out.startswith('<!-- wp:embed {'))
+        attrs = json.loads(_ATTRS_RE.search(out).group(1))
+        self.assertEqual(attrs['url'], 'https://www.youtube.com/watch?v=abc123XYZ')
+        self.assertEqual(attrs['providerNameSlug'], 'youtube')
+
+    def test_figure_caption_and_image_id(self):
+        out = html_to_gutenberg_blocks(
+            '<figure><img src="https://x.com/a.jpg" alt="Cena &quot;1&quot;" class="wp-image-42">'
+            '<figcaption>Imagem via <a href="https://x.com">Studio</a></figcaption></figure>'
+        )
+        attrs = json.loads(_ATTRS_RE.search(out).group(1))
+        self.assertEqual(attrs, {'id': 42, 'caption': 'Imagem via Studio'})
+        self.assertIn('alt="Cena &quot;1&quot;"', out)
+        self.assertIn('<figcaption class="wp-element-caption">Imagem via <a href="https://x.com">Studio</a>', out)
+
+    def test_writes_into_buffer_and_accepts_document(self):
+        html = '<p>Um.</p><ul><li>Dois</li></ul>'
+        buffer = io.StringIO()
+        self.assertIsNone(html_to_gutenberg_blocks(html, out=buffer))
+        self.assertEqual(buffer.getvalue(), html_to_gutenberg_blocks(html))
+        self.assertEqual(html_to_gutenberg_blocks(Document(html)), buffer.getvalue())
+        self.assertEqual(html_to_gutenberg_blocks(''), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+Unit tests for the image_candidates module
+"""
+
+import unittest
+
+from bs4 import BeautifulSoup
+
+from app.extractor import collect_images_from_article, is_valid_article_image
+from app.image_candidates import (
+    BAD_KEYWORD,
+    BLOCKED_HOST,
+    TOO_SMALL,
+    best_srcset_url,
+    image_candidate,
+)
+
+
+class TestImageCandidate(unittest.TestCase):
+    """Test cases for the parsed, memoized image candidate record"""
+
+    def test_record_fields_and_flags(self):
+        c = image_candidate('https://static1.srcdn.com/wp/cena.JPG?w=1200&h=630')
+        self.assertEqual((c.host, c.ext, c.width, c.height), ('static1.srcdn.com', 'jpg', 1200, 630))
+        self.assertTrue(c.valid_for_article)
+        self.assertTrue(c.valid_for_upload)
+
+        avatar = image_candidate('https://x.com/autor.jpg?w=150&h=150')
+        self.assertTrue(avatar.flags & BAD_KEYWORD)
+        self.assertTrue(avatar.flags & TOO_SMALL)
+        self.assertFalse(avatar.valid_for_article)
+
+        tracker = image_candidate('https://sb.scorecardresearch.com/p.gif')
+        self.assertTrue(tracker.flags & BLOCKED_HOST)
+        self.assertFalse(tracker.valid_for_upload)
+
+    def test_upload_rules(self):
+        self.assertFalse(image_candidate('https://x.com/foto').valid_for_upload)
+        self.assertFalse(image_candidate('https://x.com/foto.jpg?w=90').valid_for_upload)
+        self.assertFalse(image_candidate('ftp://x.com/foto.jpg').valid_for_upload)
+        self.assertFalse(image_candidate('https://[::1/foto.jpg').valid_for_upload)
+        self.assertTrue(image_candidate('https://x.com/foto.webp?w=1200').valid_for_upload)
+
+    def test_memoized_across_passes(self):
+        url = 'https://cdn.example.com/memo-1600x900.jpg'
+        image_candidate(url)
+        hits = image_candidate.cache_info().hits
+        self.assertTrue(is_valid_article_image(url))
+        self.assertEqual(image_candidate.cache_info().hits, hits + 1)
+
+    def test_best_srcset_skips_rejected_candidates(self):
+        srcset = '/a-800x450.jpg 800w, /logo-2000x1000.png 2000w, /a-1600x900.jpg 1600w, /a-300x170.jpg 300w'
+        self.assertEqual(best_srcset_url(srcset, 'https://x.com/post/'), 'https://x.com/a-1600x900.jpg')
+        self.assertIsNone(best_srcset_url('/icon.svg 100w', 'https://x.com/'))
+        self.assertIsNone(best_srcset_url('', 'https://x.com/'))
+
+    def test_collect_images_uses_best_valid_srcset(self):
+        soup = BeautifulSoup(
+            '<article>'
+            '<img srcset="https://x.com/f-800x450.jpg 800w, https://x.com/logo-2400x1200.jpg 2400w">'
+            '<picture><source srcset="https://x.com/p-640x360.jpg 640w, https://x.com/p-1280x720.jpg 1280w"></picture>'
+            '</article>',
+            'lxml',
+        )
+        self.assertEqual(
+            collect_images_from_article(soup, 'https://x.com/'),
+            ['https://x.com/f-800x450.jpg', 'https://x.com/p-1280x720.jpg'],
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Unit tests for the internal_linking module
+"""
+
+import unittest
+from unittest.mock import patch
+
+from app.internal_linking import add_internal_links, CompiledLinkMap, get_compiled_link_map
+
+
+def _map(*posts):
+    return {'posts': [
+        {'link': link, 'keywords': keywords, 'categories': categories}
+        for link, keywords, categories in posts
+    ]}
+
+
+class TestInternalLinking(unittest.TestCase):
+    """Test cases for keyword-based internal link insertion"""
+
+    def test_longest_keyword_wins_and_case_is_preserved(self):
+        link_map = _map(('https://s.com/rm', ['Real Madrid', 'Real Madrid Club de Fútbol'], []))
+        html = '<p>O real madrid club de fútbol venceu.</p>'
+        out = add_internal_links(html, link_map)
+        self.assertIn('<a href="https://s.com/rm">real madrid club de fútbol</a>', out)
+
+    def test_word_boundaries(self):
+        link_map = _map(('https://s.com/thor', ['Thor'], []))
+        self.assertNotIn('<a', add_internal_links('<p>Thorough review.</p>', link_map))
+        self.assertIn('<a href="https://s.com/thor">Thor</a>,', add_internal_links('<p>Thor, o deus.</p>', link_map))
+
+    def test_excluded_tags_are_skipped(self):
+        link_map = _map(('https://s.com/x', ['Batman'], []))
+        html = '<h2>Batman</h2><figure><figcaption>Batman</figcaption></figure><p>Batman voltou</p>'
+        out = add_internal_links(html, link_map)
+        self.assertIn('<h2>Batman</h2>', out)
+        self.assertIn('<figcaption>Batman</figcaption>', out)
+        self.assertIn('<p><a href="https://s.com/x">Batman</a> voltou</p>', out)
+
+    def test_category_priority_and_one_link_per_url(self):
+        link_map = _map(
+            ('https://s.com/other', ['Superman'], [1]),
+            ('https://s.com/cat', ['Superman'], [7]),
+        )
+        html = '<p>Superman aqui.</p><p>Superman de novo.</p><p>Superman outra vez.</p>'
+        out = add_internal_links(html, link_map, current_post_categories=[7])
+        self.assertLess(out.index('https://s.com/cat'), out.index('https://s.com/other'))
+        self.assertEqual(out.count('<a '), 2)
+
+    def test_pilar_priority(self):
+        link_map = _map(
+            ('https://s.com/normal', ['Marvel'], [7]),
+            ('https://s.com/pilar', ['Marvel Studios'], []),
+        )
+        with patch('app.internal_linking.PILAR_POSTS', ['https://s.com/pilar']):
+            out = add_internal_links('<p>A Marvel Studios anunciou.</p>', CompiledLinkMap(link_map), [7])
+        self.assertIn('<a href="https://s.com/pilar">Marvel Studios</a>', out)
+
+    def test_related_posts_outrank_category(self):
+        link_map = _map(
+            ('https://s.com/cat', ['Flash'], [7]),
+            ('https://s.com/related', ['Flash'], []),
+        )
+        out = add_internal_links('<p>Flash corre.</p>', link_map, [7], related_links={'https://s.com/related'})
+        self.assertIn('https://s.com/related', out)
+        self.assertNotIn('https://s.com/cat', out)
+
+    def test_max_links_and_text_is_not_reparsed(self):
+        link_map = _map(*[(f'https://s.com/{i}', [f'termo{i}'], []) for i in range(10)])
+        html = ''.join(f'<p>a &lt;b&gt; termo{i}</p>' for i in range(10))
+        out = add_internal_links(html, link_map, max_links=3)
+        self.assertEqual(out.count('<a '), 3)
+        self.assertIn('a &lt;b&gt; <a href="https://s.com/0">termo0</a>', out)
+
+    def test_compiled_map_is_cached_and_input_not_mutated(self):
+        link_map = _map(('https://s.com/x', ['ab', 'abc def'], []))
+        self.assertIs(get_compiled_link_map(link_map), get_compiled_link_map(link_map))
+        add_internal_links('<p>abc def</p>', link_map)
+        self.assertEqual(link_map['posts'][0]['keywords'], ['ab', 'abc def'])
+
+
+if __name__ == '__main__':
+    unittest.main()
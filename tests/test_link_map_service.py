@@ -0,0 +1,65 @@
+"""
+Unit tests for the link_map_service module
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from app.link_map_service import LinkMapService
+
+
+def _write_map(path, links):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'posts': [{'link': l, 'keywords': [l.rsplit('/', 1)[-1]]} for l in links]}, f)
+    os.replace(tmp, path)
+
+
+class TestLinkMapService(unittest.TestCase):
+    """Test cases for the hot-reloadable link map"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'internal_links.json')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_reloads_in_background_after_file_changes(self):
+        _write_map(self.path, ['https://s.com/batman'])
+        service = LinkMapService(self.path, related_path=None, check_interval_s=0)
+        first = service.load()
+        self.assertEqual(len(first.link_map), 1)
+        self.assertIs(service.current(), first)
+
+        _write_map(self.path, ['https://s.com/batman', 'https://s.com/superman'])
+        os.utime(self.path, ns=(first.link_map_version[0] + 10**9,) * 2)
+        service.current()
+        service.wait_for_reload(5)
+
+        second = service.current()
+        self.assertIsNot(second, first)
+        self.assertEqual(len(second.link_map), 2)
+        # Quem segurava o snapshot antigo continua com ele intacto
+        self.assertEqual(len(first.link_map), 1)
+
+    def test_broken_file_keeps_previous_snapshot(self):
+        _write_map(self.path, ['https://s.com/batman'])
+        service = LinkMapService(self.path, related_path=None, check_interval_s=0)
+        first = service.load()
+
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('{"posts": [')
+        service.current()
+        service.wait_for_reload(5)
+        self.assertIs(service.current().link_map, first.link_map)
+
+    def test_missing_file(self):
+        service = LinkMapService(self.path, related_path=None)
+        self.assertIsNone(service.load().link_map)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+"""
+Unit tests for the metrics module (in-process registry and /metrics endpoint)
+"""
+
+import threading
+import unittest
+import urllib.request
+from http.server import ThreadingHTTPServer
+from unittest.mock import Mock
+
+from app import metrics
+from app.limiter import KeyPool
+from app.metrics import Counter, Gauge, Histogram, Metric, Registry, RollingSum
+
+
+class TestRegistry(unittest.TestCase):
+    """Test cases for the Prometheus text rendering"""
+
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter_gauge_histogram_text(self):
+        requests = Counter('demo_requests_total', 'Requests.', ['code'], registry=self.registry)
+        requests.labels(code='200').inc()
+        requests.labels(code='500').inc(2)
+        depth = Gauge('demo_depth', 'Depth.', registry=self.registry)
+        depth.set_function(lambda: 3)
+        latency = Histogram('demo_seconds', 'Latency.', buckets=(0.1, 1), registry=self.registry)
+        for value in (0.05, 0.5, 5):
+            latency.observe(value)
+
+        text = self.registry.render()
+        self.assertIn('# TYPE demo_requests_total counter', text)
+        self.assertIn('demo_requests_total{code="500"} 2', text)
+        self.assertIn('demo_depth 3', text)
+        self.assertIn('demo_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('demo_seconds_bucket{le="1"} 2', text)
+        self.assertIn('demo_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn('demo_seconds_count 3', text)
+        self.assertIn('demo_seconds_sum 5.55', text)
+
+    def test_label_values_are_escaped_and_names_unique(self):
+        gauge = Gauge('demo_labels', 'Labels.', ['name'], registry=self.registry)
+        gauge.labels(name='a"b\\c').set(1)
+        self.assertIn('demo_labels{name="a\\"b\\\\c"} 1', self.registry.render())
+        with self.assertRaises(ValueError):
+            Gauge('demo_labels', 'Again.', registry=self.registry)
+
+    def test_metric_base_is_abstract(self):
+        with self.assertRaises(TypeError):
+            Metric('demo_base', 'Base.', registry=None)
+
+    def test_rolling_sum_window(self):
+        window = RollingSum(60)
+        window.add(100, now=0)
+        window.add(50, now=30)
+        self.assertEqual(window.value(now=45), 150)
+        self.assertEqual(window.value(now=61), 50)
+
+
+class TestPipelineMetrics(unittest.TestCase):
+    """Live-state gauges and hooks used by the pipeline"""
+
+    def test_key_cooldowns_are_read_at_scrape_time(self):
+        pool = KeyPool(['AIzaKEY-cool'])
+        pool.penalize(pool.slots[0], retry_after=30)
+        samples = dict(metrics._key_cooldowns())
+        self.assertGreater(samples[('****cool',)], 25)
+
+    def test_wordpress_endpoint_labels(self):
+        self.assertEqual(metrics.wordpress_endpoint('https://x.com/wp-json/wp/v2/posts/123?context=edit'), 'posts/:id')
+        self.assertEqual(metrics.wordpress_endpoint('https://x.com/wp-json/wp/v2/media'), 'media')
+        before = metrics.WORDPRESS_RESPONSES.labels(endpoint='tags', code='500').value
+        metrics.count_wordpress_response(Mock(url='https://x.com/wp-json/wp/v2/tags?search=a', status_code=500))
+        self.assertEqual(metrics.WORDPRESS_RESPONSES.labels(endpoint='tags', code='500').value, before + 1)
+
+    def test_http_endpoint_serves_registry(self):
+        self.assertIsNone(metrics.start_metrics_server(port=0))  # porta 0 = desligado
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), metrics._MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f'http://127.0.0.1:{server.server_address[1]}/metrics'
+        with urllib.request.urlopen(url, timeout=5) as resp:
+            self.assertEqual(resp.headers['Content-Type'], metrics.CONTENT_TYPE)
+            body = resp.read().decode('utf-8')
+        self.assertIn('# TYPE pipeline_stage_seconds histogram', body)
+        self.assertIn('# TYPE ai_key_cooldown_seconds gauge', body)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+"""
+Unit tests for the page_cache module and the extract replay
+"""
+
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from app.bench import compare_with_baseline, replay_extract, synthetic_page, SYNTHETIC_URLS
+from app.extractor import ContentExtractor
+from app.page_cache import PageCache
+
+
+class TestPageCache(unittest.TestCase):
+    """Test cases for the compressed, content-addressed page cache"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = PageCache(os.path.join(self.tmp.name, 'pages.db'), ttl_s=60, retention_s=3600)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def test_roundtrip_and_ttl(self):
+        self.cache.put('https://s.com/a', '<p>olá</p>')
+        self.assertEqual(self.cache.get('https://s.com/a'), '<p>olá</p>')
+        self.cache.put('https://s.com/old', '<p>velha</p>', fetched_at=time.time() - 120)
+        self.assertIsNone(self.cache.get('https://s.com/old'))
+        self.assertEqual(self.cache.get('https://s.com/old', max_age_s=3600), '<p>velha</p>')
+        self.assertIsNone(self.cache.get('https://s.com/missing'))
+
+    def test_content_addressed_and_compressed(self):
+        html = '<p>mesmo conteúdo</p>' * 500
+        self.cache.put('https://s.com/a', html)
+        self.cache.put('https://s.com/a?utm=x', html)
+        stats = self.cache.stats()
+        self.assertEqual(stats['pages'], 2)
+        self.assertEqual(stats['blobs'], 1)
+        self.assertLess(stats['stored_bytes'], stats['raw_bytes'] / 10)
+
+    def test_purge_removes_orphan_blobs(self):
+        self.cache.put('https://s.com/old', '<p>velha</p>', fetched_at=time.time() - 7200)
+        self.cache.put('https://s.com/new', '<p>nova</p>')
+        self.assertEqual(self.cache.purge(), 1)
+        self.assertEqual(self.cache.stats()['blobs'], 1)
+        self.assertEqual([u for u, _, _, _ in self.cache.iter_pages()], ['https://s.com/new'])
+
+    def test_truncated_pages_are_marked(self):
+        self.cache.put('https://s.com/full', '<p>inteira</p>')
+        self.cache.put('https://s.com/cut', '<p>prefixo', stopped='body')
+        self.assertEqual(self.cache.get('https://s.com/cut'), '<p>prefixo')
+        self.assertIsNone(self.cache.get('https://s.com/cut', complete_only=True))
+        self.assertEqual(self.cache.get('https://s.com/full', complete_only=True), '<p>inteira</p>')
+        self.assertEqual(
+            {u: stopped for u, _, _, stopped in self.cache.iter_pages()},
+            {'https://s.com/full': None, 'https://s.com/cut': 'body'},
+        )
+
+        # Baixada de novo inteira, a entrada deixa de ser marcada como cortada
+        self.cache.put('https://s.com/cut', '<p>prefixo e resto</p>')
+        self.assertEqual(self.cache.get('https://s.com/cut', complete_only=True), '<p>prefixo e resto</p>')
+
+    def test_non_streaming_fetch_skips_truncated_entry(self):
+        self.cache.put('https://s.com/x', '<p>prefixo', stopped='max_bytes')
+        extractor = ContentExtractor(page_cache=self.cache, streaming=False)
+        extractor.session = MagicMock()
+        extractor.session.get.return_value = MagicMock(text='<p>rede</p>')
+
+        self.assertEqual(extractor._fetch_html('https://s.com/x'), '<p>rede</p>')
+        self.assertEqual(self.cache.get('https://s.com/x', complete_only=True), '<p>rede</p>')
+
+    def test_fetch_uses_cache_first(self):
+        extractor = ContentExtractor(page_cache=self.cache, streaming=False)
+        extractor.session = MagicMock()
+        response = MagicMock(text='<p>rede</p>')
+        extractor.session.get.return_value = response
+
+        self.assertEqual(extractor._fetch_html('https://s.com/x'), '<p>rede</p>')
+        self.assertEqual(extractor._fetch_html('https://s.com/x'), '<p>rede</p>')
+        self.assertEqual(extractor.session.get.call_count, 1)
+
+        extractor._fetch_html('https://s.com/x', use_cache=False)
+        self.assertEqual(extractor.session.get.call_count, 2)
+
+    def test_replay_flags_changed_output(self):
+        for site in ('screenrant', 'gamerant'):
+            self.cache.put(SYNTHETIC_URLS[site], synthetic_page(paragraphs=10))
+        outputs, per_domain = replay_extract(self.cache)
+        self.assertEqual(set(per_domain), {'screenrant.com', 'gamerant.com'})
+        self.assertEqual(sum(d['failed'] for d in per_domain.values()), 0)
+        self.assertEqual(sum(d['truncated'] for d in per_domain.values()), 0)
+        self.assertEqual(compare_with_baseline(outputs, outputs)['changed'], [])
+
+        baseline = dict(outputs)
+        url = SYNTHETIC_URLS['screenrant']
+        baseline[url] = dict(baseline[url], fingerprint='antes')
+        diff = compare_with_baseline(outputs, baseline)
+        self.assertEqual(diff['changed'], [url])
+
+
+if __name__ == '__main__':
+    unittest.main()
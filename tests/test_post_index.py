@@ -0,0 +1,116 @@
+"""
+Unit tests for the post_index module
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock
+
+from app.post_index import PostIndex
+
+
+def _post(pid, modified, tags=None, categories=None, local=None):
+    return {
+        'id': pid,
+        'link': f'https://example.com/post-{pid}',
+        'title': {'rendered': f'Post numero {pid}'},
+        'excerpt': {'rendered': ''},
+        'tags': tags or [],
+        'categories': categories or [],
+        'modified': local or modified,
+        'modified_gmt': modified,
+    }
+
+
+class FakeClient:
+    """Serves fixed pages and records the params of each call."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = []
+        self.get_tags_map_by_ids = Mock(return_value={10: 'Marvel', 11: 'DC'})
+        self.closed = False
+
+    def get_posts_page(self, page, fields, per_page=100, extra_params=None):
+        self.calls.append((page, extra_params))
+        return self.pages[page - 1], len(self.pages)
+
+    def close(self):
+        self.closed = True
+
+
+class TestPostIndex(unittest.TestCase):
+    """Test cases for the local published-post index"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.index = PostIndex(os.path.join(self.tmp.name, 'idx.db'))
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp.cleanup()
+
+    def test_full_rebuild_fetches_pages_concurrently(self):
+        pages = [
+            [_post(1, '2025-01-01T10:00:00', tags=[10])],
+            [_post(2, '2025-01-02T10:00:00', tags=[11])],
+            [_post(3, '2025-01-03T10:00:00')],
+        ]
+        main = FakeClient(pages)
+        workers = []
+
+        def factory():
+            c = FakeClient(pages)
+            workers.append(c)
+            return c
+
+        fetched = self.index.refresh(main, client_factory=factory)
+        self.assertEqual(fetched, 3)
+        self.assertEqual(self.index.count(), 3)
+        self.assertEqual(main.calls, [(1, None)])
+        self.assertEqual(sorted(p for w in workers for p, _ in w.calls), [2, 3])
+        self.assertTrue(all(w.closed for w in workers))
+        self.assertFalse(self.index.needs_full_rebuild())
+
+    def test_incremental_uses_modified_after_cursor(self):
+        self.index.refresh(FakeClient([[_post(1, '2025-01-01T10:00:00')]]), full=True)
+        client = FakeClient([[_post(1, '2025-01-05T10:00:00'), _post(4, '2025-01-05T11:00:00')]])
+        self.index.refresh(client)
+
+        self.assertEqual(client.calls[0][1]['modified_after'], '2025-01-01T10:00:00')
+        self.assertEqual(self.index.count(), 2)
+        self.assertEqual(self.index.last_modified(), '2025-01-05T11:00:00')
+
+    def test_incremental_cursor_is_site_local_time(self):
+        # Site em UTC-3: modified_after é comparado com post_modified (hora local)
+        self.index.refresh(FakeClient([[_post(1, '2025-01-01T13:00:00', local='2025-01-01T10:00:00')]]), full=True)
+        client = FakeClient([[_post(2, '2025-01-01T14:00:00', local='2025-01-01T11:00:00')]])
+        self.index.refresh(client)
+
+        self.assertEqual(client.calls[0][1]['modified_after'], '2025-01-01T10:00:00')
+        self.assertEqual(self.index.last_modified(), '2025-01-01T11:00:00')
+
+    def test_index_without_local_cursor_is_rebuilt(self):
+        self.index.refresh(FakeClient([[_post(1, '2025-01-01T13:00:00')]]), full=True)
+        with self.index.conn:
+            self.index.conn.execute("UPDATE posts SET modified = ''")
+        self.assertIsNone(self.index.last_modified())
+        self.assertTrue(self.index.needs_full_rebuild())
+
+    def test_export_link_map(self):
+        self.index.refresh(FakeClient([[_post(1, '2025-01-01T10:00:00', tags=[10], categories=[8])]]), full=True)
+        path = os.path.join(self.tmp.name, 'internal_links.json')
+        self.assertEqual(self.index.export_link_map(path), 1)
+
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        self.assertEqual(data['posts'][0]['link'], 'https://example.com/post-1')
+        self.assertEqual(data['posts'][0]['keywords'], ['Post numero 1', 'Marvel'])
+        self.assertEqual(data['posts'][0]['categories'], [8])
+        self.assertEqual(self.index.search('numero'), [{'title': 'Post numero 1', 'url': 'https://example.com/post-1'}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+"""
+Unit tests for the regexes module (pattern registry and profiler)
+"""
+
+import re
+import unittest
+
+from app import regexes
+from app.html_utils import remove_source_domain_schemas
+
+
+class TestRegistry(unittest.TestCase):
+    """Test cases for the named pattern registry"""
+
+    def test_names_are_unique(self):
+        with self.assertRaises(ValueError):
+            regexes.compile('title_validator.gratis', r'x')
+
+    def test_registry_holds_compiled_patterns(self):
+        self.assertIs(type(regexes.REGISTRY['wordpress.html_tag']), re.Pattern)
+        self.assertIn('seo_title.clickbait_prefix_0', regexes.REGISTRY)
+
+    def test_json_ld_pattern_covers_both_quote_styles(self):
+        html = (
+            '<script type="application/ld+json">{"a": 1}</script><p>x</p>'
+            "<script type = 'application/ld+json'>\n{}\n</script><script>ga()</script>"
+        )
+        self.assertEqual(remove_source_domain_schemas(html), '<p>x</p><script>ga()</script>')
+
+
+class TestProfiledPattern(unittest.TestCase):
+    """Test cases for the per-pattern call counter"""
+
+    def setUp(self):
+        regexes.reset_profile()
+        self.pattern = regexes.ProfiledPattern('test.digits', re.compile(r'\d+'))
+
+    def tearDown(self):
+        regexes.reset_profile()
+
+    def test_calls_are_counted_and_results_unchanged(self):
+        self.assertEqual(self.pattern.sub('#', 'a1b22'), 'a#b#')
+        self.assertEqual(self.pattern.findall('a1b22'), ['1', '22'])
+        self.assertEqual([m.group() for m in self.pattern.finditer('3 4')], ['3', '4'])
+        self.assertEqual(self.pattern.pattern, r'\d+')
+
+        [(name, calls, seconds)] = regexes.profile_stats()
+        self.assertEqual((name, calls), ('test.digits', 3))
+        self.assertGreaterEqual(seconds, 0)
+
+    def test_log_profile_resets(self):
+        self.pattern.search('1')
+        with self.assertLogs('app.regexes', level='INFO') as logs:
+            regexes.log_profile(top=1)
+        self.assertIn('test.digits', logs.output[0])
+        self.assertEqual(regexes.profile_stats(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
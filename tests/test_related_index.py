@@ -0,0 +1,77 @@
+"""
+Unit tests for the related_index module
+"""
+
+import os
+import tempfile
+import unittest
+
+from app.related_index import RelatedIndex, build_read_also_block, tokenize
+
+
+POSTS = [
+    {'id': 1, 'link': 'https://s.com/batman', 'title': 'Batman ganha novo trailer', 'tags': [10],
+     'excerpt': 'O Cavaleiro das Trevas volta a Gotham', 'modified_gmt': '2025-01-01T00:00:00'},
+    {'id': 2, 'link': 'https://s.com/zelda', 'title': 'Zelda recebe atualização', 'tags': [11],
+     'excerpt': 'Nintendo lança patch para Tears of the Kingdom', 'modified_gmt': '2025-01-02T00:00:00'},
+    {'id': 3, 'link': 'https://s.com/superman', 'title': 'Superman e Batman no mesmo filme', 'tags': [12],
+     'excerpt': 'DC Studios confirma encontro', 'modified_gmt': '2025-01-03T00:00:00'},
+]
+TAGS = {10: 'DC Comics', 11: 'Nintendo', 12: 'DC Studios'}
+
+
+class FakePostIndex:
+    def __init__(self, posts):
+        self.posts = posts
+
+    def all_posts(self):
+        return self.posts
+
+    def tag_names(self):
+        return TAGS
+
+
+class TestRelatedIndex(unittest.TestCase):
+    """Test cases for the TF-IDF related-post index"""
+
+    def test_tokenize_strips_html_accents_and_stopwords(self):
+        self.assertEqual(tokenize('<p>A atualização de Zelda</p>'), ['atualizacao', 'zelda'])
+
+    def test_related_ranks_by_similarity(self):
+        index = RelatedIndex()
+        index.add_posts(POSTS, TAGS)
+        result = index.related('<p>Novo filme do Batman em Gotham</p>', k=2, min_score=0.0)
+        self.assertEqual(result[0]['link'], 'https://s.com/batman')
+        self.assertEqual(result[1]['link'], 'https://s.com/superman')
+        self.assertEqual(index.related('Nintendo Zelda', k=5, exclude_links={'https://s.com/zelda'}), [])
+
+    def test_incremental_sync_replaces_and_removes(self):
+        index = RelatedIndex()
+        index.sync_with_post_index(FakePostIndex(POSTS))
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.sync_with_post_index(FakePostIndex(POSTS)), 0)
+
+        updated = dict(POSTS[1], title='Pokémon anunciado', excerpt='Game Freak', modified_gmt='2025-02-01T00:00:00')
+        index.sync_with_post_index(FakePostIndex([POSTS[0], updated]))
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.related('Pokémon', min_score=0.0)[0]['id'], 2)
+        self.assertEqual(index.related('Zelda', min_score=0.0), [])
+
+    def test_save_and_load_roundtrip(self):
+        index = RelatedIndex()
+        index.add_posts(POSTS, TAGS)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'related.npz')
+            index.save(path)
+            loaded = RelatedIndex.load(path)
+        self.assertEqual(loaded.related('Batman Gotham', min_score=0.0), index.related('Batman Gotham', min_score=0.0))
+        self.assertEqual(len(RelatedIndex.load_or_empty(path)), 0)
+
+    def test_read_also_block(self):
+        block = build_read_also_block([{'link': 'https://s.com/a', 'title': 'A'}], count=1)
+        self.assertIn('<strong>Leia também:</strong> <a href="https://s.com/a">A</a>', block)
+        self.assertEqual(build_read_also_block([]), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+"""
+Unit tests for the revalidation module (source change detection + incremental update)
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from app.bench import synthetic_page
+from app.extractor import ContentExtractor
+from app.page_cache import PageCache
+from app.revalidation import SourceRevalidator, diff_paragraphs, extract_paragraphs
+from app.store import Database
+
+URL = 'https://screenrant.com/filme-noticia/'
+NEW_PARAGRAPH = (
+    'Atualização: o estúdio confirmou que as filmagens começam em março e que o elenco original '
+    'retorna para a sequência, com o mesmo diretor e roteiristas do primeiro filme da franquia. '
+    'A estreia segue marcada para o segundo semestre do ano que vem.'
+)
+
+
+def _response(status: int = 200, text: str = '', headers=None) -> MagicMock:
+    resp = MagicMock(status_code=status, text=text, headers=headers or {})
+    resp.raise_for_status.return_value = None
+    return resp
+
+
+class TestParagraphDiff(unittest.TestCase):
+    """Test cases for paragraph fingerprints and the cosmetic filter"""
+
+    def test_extract_skips_nested_blocks(self):
+        paragraphs = extract_paragraphs('<ul><li><p>item  um</p></li></ul><p>texto</p><h2>Título</h2>')
+        self.assertEqual([t for _, t in paragraphs], ['item um', 'texto', 'Título'])
+
+    def test_typo_fix_is_cosmetic(self):
+        old = extract_paragraphs('<p>O filme estreia em março nos cinemas do Brasil.</p><p>Elenco confirmado.</p>')
+        new = extract_paragraphs('<p>O filme estréia em março nos cinemas do Brasil.</p><p>Elenco confirmado.</p>')
+        diff = diff_paragraphs(old, new)
+        self.assertEqual(diff['changed'], [])
+        self.assertEqual(diff['cosmetic'], 1)
+
+        new = extract_paragraphs(f'<p>Elenco confirmado.</p><p>{NEW_PARAGRAPH}</p>')
+        self.assertEqual(diff_paragraphs(old, new)['changed'], [NEW_PARAGRAPH])
+
+
+class TestSourceRevalidator(unittest.TestCase):
+    """Test cases for the conditional re-fetch and incremental rewrite"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.tmp.name, 'app.db'))
+        self.db.initialize()
+        self.cache = PageCache(os.path.join(self.tmp.name, 'pages.db'))
+        self.extractor = ContentExtractor(page_cache=self.cache, streaming=False)
+        self.extractor.session = MagicMock()
+        self.ai = MagicMock()
+        self.ai.rewrite_update.return_value = ('<p>O estúdio confirmou o início das filmagens.</p>', None)
+        self.wp = MagicMock()
+        self.wp.get_post_content.return_value = '<!-- wp:paragraph --><p>post</p><!-- /wp:paragraph -->'
+        self.wp.update_post_content.return_value = True
+        self.revalidator = SourceRevalidator(self.db.conn, self.extractor, self.ai, self.wp)
+
+        page = synthetic_page(paragraphs=12)
+        original = self.extractor.extract(page, url=URL)
+        self.revalidator.record(1, 501, URL, 'Filme confirmado', original['content'])
+        self.page = page
+
+    def tearDown(self):
+        self.cache.close()
+        self.db.close()
+        self.tmp.cleanup()
+
+    def _row(self):
+        [row] = self.revalidator.due()
+        return row
+
+    def test_not_modified_skips_extraction(self):
+        self.db.conn.execute("UPDATE source_revisions SET etag = '\"v1\"'")
+        self.extractor.session.get.return_value = _response(304)
+        self.assertEqual(self.revalidator.revalidate(self._row()), 'not_modified')
+        headers = self.extractor.session.get.call_args.kwargs['headers']
+        self.assertEqual(headers['If-None-Match'], '"v1"')
+        self.ai.rewrite_update.assert_not_called()
+        # Verificada agora: sai da fila até o próximo intervalo
+        self.assertEqual(self.revalidator.due(), [])
+
+    def test_unchanged_page(self):
+        self.extractor.session.get.return_value = _response(200, self.page, {'ETag': '"v2"'})
+        self.assertEqual(self.revalidator.revalidate(self._row()), 'unchanged')
+        self.ai.rewrite_update.assert_not_called()
+        etag = self.db.conn.execute("SELECT etag FROM source_revisions").fetchone()[0]
+        self.assertEqual(etag, '"v2"')
+
+    def test_new_paragraph_is_rewritten_and_appended(self):
+        changed = self.page.replace('<p>Parágrafo 11 ', f'<p>{NEW_PARAGRAPH}</p><p>Parágrafo 11 ', 1)
+        self.extractor.session.get.return_value = _response(200, changed)
+
+        self.assertEqual(self.revalidator.revalidate(self._row()), 'updated')
+        _, sent, _ = self.ai.rewrite_update.call_args.args
+        self.assertEqual(sent, [NEW_PARAGRAPH])
+        post_id, content = self.wp.update_post_content.call_args.args
+        self.assertEqual(post_id, 501)
+        self.assertTrue(content.startswith('<!-- wp:paragraph --><p>post</p>'))
+        self.assertIn('Atualização', content)
+        self.assertIn('início das filmagens', content)
+        self.wp.sanitize_published_post.assert_called_once_with(501)
+
+        updates, paragraphs = self.db.conn.execute("SELECT updates, paragraphs FROM source_revisions").fetchone()
+        self.assertEqual(updates, 1)
+        self.assertIn(NEW_PARAGRAPH, [t for _, t in json.loads(paragraphs)])
+
+    def test_failed_rewrite_keeps_fingerprint(self):
+        changed = self.page.replace('<p>Parágrafo 11 ', f'<p>{NEW_PARAGRAPH}</p><p>Parágrafo 11 ', 1)
+        self.extractor.session.get.return_value = _response(200, changed, {'ETag': '"v3"'})
+        self.ai.rewrite_update.return_value = (None, 'quota')
+
+        self.assertEqual(self.revalidator.revalidate(self._row()), 'failed')
+        self.wp.update_post_content.assert_not_called()
+        etag, paragraphs = self.db.conn.execute("SELECT etag, paragraphs FROM source_revisions").fetchone()
+        self.assertIsNone(etag)
+        self.assertNotIn(NEW_PARAGRAPH, paragraphs)
+
+    def test_update_goes_through_cta_cleanup(self):
+        changed = self.page.replace('<p>Parágrafo 11 ', f'<p>{NEW_PARAGRAPH}</p><p>Parágrafo 11 ', 1)
+        self.extractor.session.get.return_value = _response(200, changed)
+        self.ai.rewrite_update.return_value = (
+            "<p>O estúdio confirmou o início das filmagens.</p>"
+            "<p>Thank you for reading this post, don't forget to subscribe!</p>",
+            None,
+        )
+
+        self.assertEqual(self.revalidator.revalidate(self._row()), 'updated')
+        _, content = self.wp.update_post_content.call_args.args
+        self.assertIn('início das filmagens', content)
+        self.assertNotIn('subscribe', content.lower())
+
+    def test_update_with_only_cta_is_dropped(self):
+        changed = self.page.replace('<p>Parágrafo 11 ', f'<p>{NEW_PARAGRAPH}</p><p>Parágrafo 11 ', 1)
+        self.extractor.session.get.return_value = _response(200, changed)
+        self.ai.rewrite_update.return_value = ("<p>Thank you for reading this post, don't forget to subscribe!</p>", None)
+
+        self.assertEqual(self.revalidator.revalidate(self._row()), 'rejected')
+        self.wp.update_post_content.assert_not_called()
+        paragraphs = self.db.conn.execute("SELECT paragraphs FROM source_revisions").fetchone()[0]
+        self.assertIn(NEW_PARAGRAPH, paragraphs)
+
+
+if __name__ == '__main__':
+    unittest.main()
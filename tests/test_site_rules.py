@@ -0,0 +1,80 @@
+"""
+Unit tests for the declarative per-domain extraction rules
+"""
+
+import unittest
+
+from bs4 import BeautifulSoup
+
+from app.extractor import ContentExtractor
+from app.site_rules import compile_rules, get_site_rules
+
+
+GE_PAGE = """
+<html><body><div class="materia-conteudo">
+<p>Texto da matéria.</p>
+<div class="video-player">vídeo</div>
+<div class="related-materia"><a href="/x">relacionada</a></div>
+<div id="gm-widget-mais-escalados-root">cartola</div>
+<script>x()</script>
+<p>Fim.</p>
+</div></body></html>
+"""
+
+
+class TestSiteRules(unittest.TestCase):
+    """Test cases for rule compilation and host dispatch"""
+
+    def test_host_lookup_by_suffix(self):
+        rules = get_site_rules()
+        self.assertEqual(rules.for_host('www.screenrant.com').label, 'ScreenRant')
+        self.assertEqual(rules.for_host('m.gamerant.com').label, 'GameRant')
+        self.assertEqual(rules.for_host('ge.globo.com').label, 'GE')
+        self.assertIsNone(rules.for_host('globo.com'))
+        self.assertIsNone(rules.for_host('example.com'))
+
+    def test_profile_is_merged_and_overridden(self):
+        table = compile_rules({
+            'profiles': {'base': {'figures': True, 'remove_tags': ['script']}},
+            'sites': {'novo.com': {'profile': 'base', 'container': ['main'], 'remove_tags': ['style']}},
+        })
+        rule = table.for_host('novo.com')
+        self.assertTrue(rule.clean.figures)
+        self.assertEqual(rule.clean.remove_tags, frozenset(['style']))
+
+    def test_invalid_rules_fail_at_compile_time(self):
+        with self.assertRaises(ValueError):
+            compile_rules({'sites': {'x.com': {'containers': ['main']}}})
+        with self.assertRaises(ValueError):
+            compile_rules({'sites': {'x.com': {'profile': 'nope'}}})
+
+    def test_new_source_needs_only_config(self):
+        table = compile_rules({'sites': {'novo.com': {
+            'label': 'Novo',
+            'container': ['main'],
+            'body': ['.conteudo'],
+            'class_patterns': ['newsletter'],
+            'image_attrs': ['data-lazy-src', 'src'],
+        }}})
+        rule = table.for_host('novo.com')
+        soup = BeautifulSoup(
+            '<main><div class="conteudo"><p>ok</p><div class="box-Newsletter">x</div>'
+            '<img data-lazy-src="/a.jpg" src="data:,"><img src="/b.jpg"></div></main>', 'lxml'
+        )
+        body = ContentExtractor()._clean_with_rule(soup, rule)
+        self.assertNotIn('box-Newsletter', str(body))
+        self.assertEqual(rule.image_urls(body), ['/a.jpg', '/b.jpg'])
+
+    def test_ge_rule(self):
+        body = ContentExtractor(compiled_cleaners=True)._clean_html_for_ge(BeautifulSoup(GE_PAGE, 'lxml'))
+        text = body.get_text(" ", strip=True)
+        self.assertEqual(text, 'Texto da matéria. Fim.')
+
+    def test_related_selectors_used_by_pre_clean(self):
+        soup = BeautifulSoup('<div class="see-also">a</div><p>texto</p>', 'lxml')
+        ContentExtractor()._pre_clean_html(soup, 'https://www.estadao.com.br/x')
+        self.assertNotIn('see-also', str(soup))
+
+
+if __name__ == '__main__':
+    unittest.main()
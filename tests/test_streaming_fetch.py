@@ -0,0 +1,112 @@
+"""
+Unit tests for the streaming_fetch module (download with early stop)
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from app.extractor import ContentExtractor
+from app.page_cache import PageCache
+from app.streaming_fetch import StopMatcher, fetch_streaming
+
+HEAD = (
+    '<html><head><meta charset="utf-8"><title>Título</title>'
+    '<meta property="og:image" content="https://img.example.com/capa.jpg">'
+    '<script type="application/ld+json">{"@type": "NewsArticle", "headline": "Manchete"}</script>'
+    '</head><body><header>menu</header>'
+)
+ARTICLE = (
+    '<article class="article"><div class="article-body">'
+    '<p>Primeiro parágrafo do artigo.</p>'
+    '<article class="display-card"><a href="/x">Card relacionado</a></article>'
+    '<p>Último parágrafo, depois do card.</p>'
+    '</div></article>'
+)
+TAIL = '<script>window.__DATA__ = "' + 'x' * 400_000 + '";</script><footer>rodapé</footer></body></html>'
+PAGE = (HEAD + ARTICLE + TAIL).encode('utf-8')
+
+
+def _session(page: bytes, content_type: str = 'text/html; charset=utf-8'):
+    response = MagicMock()
+    response.headers = {'Content-Type': content_type, 'Content-Length': str(len(page))}
+    response.__enter__.return_value = response
+    response.read_chunks = 0
+
+    def iter_content(chunk_size):
+        for i in range(0, len(page), chunk_size):
+            response.read_chunks += 1
+            yield page[i:i + chunk_size]
+
+    response.iter_content.side_effect = iter_content
+    session = MagicMock()
+    session.get.return_value = response
+    return session, response
+
+
+class TestStreamingFetch(unittest.TestCase):
+    """Test cases for the early-stop streaming fetch"""
+
+    def test_stops_after_outer_article(self):
+        session, response = _session(PAGE)
+        html, stats = fetch_streaming(session, 'https://screenrant.com/a', stop=StopMatcher(['article']), chunk_bytes=1024)
+
+        self.assertEqual(stats['stopped'], 'body')
+        self.assertLess(stats['bytes'], 8 * 1024)
+        self.assertEqual(stats['content_length'], len(PAGE))
+        self.assertLess(response.read_chunks, len(PAGE) // 1024)
+        self.assertIn('"headline": "Manchete"', html)
+        self.assertIn('og:image', html)
+        # O <article> aninhado do card não interrompe a leitura
+        self.assertIn('Último parágrafo, depois do card.', html)
+        self.assertNotIn('rodapé', html)
+        self.assertTrue(session.get.call_args.kwargs['stream'])
+
+    def test_class_selector_and_byte_cap(self):
+        session, _ = _session(PAGE)
+        html, stats = fetch_streaming(session, 'https://collider.com/a', stop=StopMatcher(['#article-body, .article-body']), chunk_bytes=512)
+        self.assertEqual(stats['stopped'], 'body')
+        self.assertIn('Último parágrafo', html)
+
+        session, _ = _session(PAGE)
+        html, stats = fetch_streaming(session, 'https://example.com/a', max_bytes=64 * 1024, chunk_bytes=16 * 1024)
+        self.assertEqual(stats['stopped'], 'max_bytes')
+        self.assertEqual(stats['bytes'], 64 * 1024)
+
+        session, _ = _session(PAGE)
+        html, stats = fetch_streaming(session, 'https://example.com/a', chunk_bytes=64 * 1024)
+        self.assertIsNone(stats['stopped'])
+        self.assertEqual(html, PAGE.decode('utf-8'))
+
+    def test_meta_charset_when_header_has_none(self):
+        page = '<html><head><meta charset="iso-8859-1"></head><body><p>ação</p></body></html>'.encode('iso-8859-1')
+        session, _ = _session(page, content_type='text/html')
+        html, _ = fetch_streaming(session, 'https://example.com/a')
+        self.assertIn('ação', html)
+
+    def test_rejects_complex_selectors(self):
+        with self.assertRaises(ValueError):
+            StopMatcher(['div > article'])
+
+    def test_extractor_uses_site_rule(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = PageCache(os.path.join(tmp, 'pages.db'))
+            extractor = ContentExtractor(page_cache=cache)
+            extractor.session, _ = _session(PAGE)
+
+            html = extractor._fetch_html('https://screenrant.com/movies/artigo/')
+            self.assertIn('Último parágrafo', html)
+            self.assertNotIn('rodapé', html)
+            self.assertEqual(cache.get('https://screenrant.com/movies/artigo/'), html)
+            # O prefixo fica marcado: quem precisa da página inteira não o recebe
+            self.assertIsNone(cache.get('https://screenrant.com/movies/artigo/', complete_only=True))
+
+            # Domínio sem stream_until: página inteira (dentro do limite de bytes)
+            extractor.session, _ = _session(PAGE)
+            self.assertIn('rodapé', extractor._fetch_html('https://example.com/artigo/'))
+            cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
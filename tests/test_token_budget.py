@@ -0,0 +1,144 @@
+"""
+Unit tests for the token budget (estimator, admission control and simulation)
+"""
+
+import unittest
+from collections import deque
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from app import token_budget
+from app.token_budget import TokenBudget, TokenEstimator, get_budget, simulate
+from app.token_ledger import TokenLedger
+
+WEIGHTS = {'screenrant.com': 1.0, 'gamerant.com': 0.5}
+
+
+def _rewrite(timestamp, content_chars, url='https://screenrant.com/a', key='****ab12', completion=None):
+    prompt = 1000 + content_chars // 4
+    return {
+        'timestamp': timestamp.isoformat(), 'api_type': 'gemini', 'model': 'gemini-2.5-flash-lite',
+        'api_key_suffix': key, 'prompt_tokens': prompt,
+        'completion_tokens': completion if completion is not None else prompt // 2,
+        'total_tokens': prompt + (completion if completion is not None else prompt // 2),
+        'success': True, 'source_url': url, 'metadata': {'content_chars': content_chars},
+    }
+
+
+class TestTokenEstimator(unittest.TestCase):
+    """Test cases for the chars-per-token fit"""
+
+    def test_fit_recovers_overhead_and_ratio(self):
+        now = datetime(2026, 1, 1, 12)
+        events = [_rewrite(now, chars) for chars in (4000, 8000, 12000, 16000, 20000, 24000)]
+        events.append(dict(_rewrite(now, 8000), api_type='publishing'))  # ignorado
+        estimator = TokenEstimator.fit(events)
+        self.assertEqual(estimator.samples, 6)
+        self.assertAlmostEqual(estimator.chars_per_token, 4.0, delta=0.01)
+        self.assertAlmostEqual(estimator.overhead_tokens, 1000, delta=5)
+        self.assertAlmostEqual(estimator.completion_ratio, 0.5, delta=0.01)
+        self.assertEqual(estimator.estimate({'content_chars': 40000}), (11000, 16500))
+        # Sem tamanho conhecido: mediana do domínio
+        self.assertEqual(estimator.content_chars({'url': 'https://www.screenrant.com/b'}), 14000)
+
+    def test_too_few_samples_uses_defaults(self):
+        estimator = TokenEstimator.fit([_rewrite(datetime(2026, 1, 1), 4000)])
+        self.assertEqual(estimator.samples, 1)
+        self.assertEqual(estimator.estimate({'content_chars': 4000}), (1000, 1500))
+
+
+class TestTokenBudget(unittest.TestCase):
+    """Test cases for admission against the remaining key budget"""
+
+    def setUp(self):
+        self.ledger = TokenLedger(':memory:')
+        self.addCleanup(self.ledger.close)
+        self.now = datetime.now().replace(microsecond=0)
+
+    def _budget(self, **limits):
+        budget = TokenBudget(self.ledger, ['****ab12', '****cd34'], source_weights=WEIGHTS, **limits)
+        budget.refit(self.now)
+        return budget
+
+    def test_remaining_counts_today_and_last_minute(self):
+        self.ledger.append(_rewrite(self.now - timedelta(seconds=10), 4000, key='****ab12', completion=0))  # 2000
+        self.ledger.append(_rewrite(self.now - timedelta(minutes=5), 4000, key='****cd34', completion=0))   # 2000
+        self.ledger.append(_rewrite(self.now - timedelta(minutes=5), 0, key='unknown', completion=0))       # 1000
+        left = self._budget(daily_tokens=10000, daily_requests=5, minute_tokens=3000).remaining(self.now)
+        self.assertEqual(left['daily_tokens'], 2 * 10000 - 5000)
+        self.assertEqual(left['daily_requests'], 2 * 5 - 3)
+        self.assertEqual(left['minute_tokens'], 3000)  # ****cd34 está livre no último minuto
+
+    def test_publishing_rows_do_not_count(self):
+        for _ in range(5):
+            self.ledger.append(_rewrite(self.now - timedelta(minutes=5), 4000, completion=0))  # 2000
+            self.ledger.append({
+                'timestamp': (self.now - timedelta(minutes=4)).isoformat(), 'api_type': 'publishing',
+                'model': 'wordpress', 'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0,
+            })
+        self.ledger.append(dict(_rewrite(self.now - timedelta(seconds=5), 4000), api_type='guarantee'))
+        budget = self._budget(daily_tokens=0, daily_requests=5, minute_tokens=3000)
+        left = budget.remaining(self.now)
+        self.assertEqual(left['daily_requests'], 2 * 5 - 5)
+        self.assertEqual(left['minute_tokens'], 3000)
+        self.assertEqual(budget.choose([{'url': 'https://screenrant.com/y', 'content_chars': 4000}], self.now),
+                         (0, 'ok'))
+
+    def test_choose_prefers_priority_within_budget(self):
+        queue = [
+            {'url': 'https://gamerant.com/x', 'published': (self.now - timedelta(hours=1)).isoformat()},
+            {'url': 'https://screenrant.com/y', 'published': (self.now - timedelta(hours=1)).isoformat()},
+            {'url': 'https://screenrant.com/z', 'published': (self.now - timedelta(days=2)).isoformat()},
+        ]
+        budget = self._budget(daily_tokens=0, daily_requests=0, minute_tokens=0)
+        self.assertEqual(budget.choose(queue, self.now), (1, 'ok'))
+
+        # Estimativa padrão: 20000 chars / 4 = 5000 + 50% de saída, × 1.2 de margem = 9000
+        budget = self._budget(daily_tokens=4000, daily_requests=0, minute_tokens=0)
+        self.assertEqual(budget.choose(queue, self.now), (None, 'daily'))
+        budget = self._budget(daily_tokens=0, daily_requests=0, minute_tokens=8000)
+        self.assertEqual(budget.choose(queue, self.now), (None, 'minute'))
+        self.assertEqual(budget.choose([dict(queue[0], content_chars=4000)], self.now), (0, 'ok'))
+
+    def test_request_quota_exhausted(self):
+        for _ in range(2):
+            self.ledger.append(_rewrite(self.now - timedelta(minutes=5), 4000))
+        budget = self._budget(daily_tokens=0, daily_requests=1, minute_tokens=0)
+        self.assertEqual(budget.choose([{'url': 'https://screenrant.com/y'}], self.now), (None, 'daily'))
+
+
+class TestGetBudget(unittest.TestCase):
+    """The process-wide budget survives key rotation"""
+
+    def test_rotated_keys_reuse_budget(self):
+        with patch.object(token_budget, '_budget', None):
+            slots = deque(['****ab12', '****cd34', '****ef56'])
+            budget = get_budget(slots)
+            slots.rotate(-1)  # KeyPool.penalize
+            self.assertIs(get_budget(slots), budget)
+            self.assertIsNot(get_budget(['****ab12', '****cd34']), budget)
+
+
+class TestSimulation(unittest.TestCase):
+    """Test cases for replaying the ledger history"""
+
+    def test_replay_defers_what_does_not_fit(self):
+        day1 = datetime(2026, 1, 1, 8)
+        day2 = datetime(2026, 1, 2, 8)
+        events = [_rewrite(day1 + timedelta(minutes=10 * i), 4000 * (i + 1)) for i in range(6)]
+        events += [
+            _rewrite(day2, 8000, url='https://gamerant.com/a'),
+            _rewrite(day2 + timedelta(minutes=1), 8000, url='https://screenrant.com/b'),
+            _rewrite(day2 + timedelta(minutes=2), 8000, url='https://screenrant.com/c'),
+        ]
+        report = simulate(events, keys=1, daily_tokens=0, daily_requests=2, minute_tokens=0, source_weights=WEIGHTS)
+
+        self.assertEqual([row['admitted'] for row in report['days']], [2, 2])
+        self.assertEqual(report['deferred'], 4 + 1)
+        self.assertEqual(report['by_source'], {'screenrant.com': 3, 'gamerant.com': 1})
+        # Dia 2 usa o estimador ajustado com o dia 1 (mesma relação chars/tokens)
+        self.assertLess(report['estimate_mape'], 0.01)
+
+
+if __name__ == '__main__':
+    unittest.main()
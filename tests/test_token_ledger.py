@@ -0,0 +1,182 @@
+"""
+Unit tests for the token ledger (SQLite history + incremental rollups)
+"""
+
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from app import background_writer, token_ledger
+from app.token_ledger import TokenLedger, import_jsonl
+from app.token_tracker import TokenTracker
+
+
+def _entry(timestamp, prompt, completion, model='gemini-2.5-flash', key='ab12', success=True, **extra):
+    return dict(
+        timestamp=timestamp, api_type='gemini', model=model, api_key_suffix=key,
+        prompt_tokens=prompt, completion_tokens=completion, total_tokens=prompt + completion,
+        success=success, **extra,
+    )
+
+
+class TestTokenLedger(unittest.TestCase):
+    """Test cases for buffered writes and rollups"""
+
+    def setUp(self):
+        self.ledger = TokenLedger(':memory:')
+        self.addCleanup(self.ledger.close)
+
+    def test_appends_are_buffered_until_flush(self):
+        self.ledger.append(_entry('2026-01-01T10:00:00', 10, 5))
+        count = self.ledger.conn.execute("SELECT COUNT(*) FROM token_events").fetchone()[0]
+        self.assertEqual(count, 0)
+        self.ledger.flush()
+        count = self.ledger.conn.execute("SELECT COUNT(*) FROM token_events").fetchone()[0]
+        self.assertEqual(count, 1)
+
+    def test_buffer_flushes_at_batch_size(self):
+        with patch.object(token_ledger, 'TOKEN_LEDGER_FLUSH_EVERY', 2):
+            self.ledger.append(_entry('2026-01-01T10:00:00', 1, 1))
+            self.ledger.append(_entry('2026-01-01T10:00:01', 1, 1))
+        background_writer.drain()  # o lote é gravado na thread de I/O
+        count = self.ledger.conn.execute("SELECT COUNT(*) FROM token_events").fetchone()[0]
+        self.assertEqual(count, 2)
+
+    def test_append_does_not_wait_for_flush_io(self):
+        writing, release = threading.Event(), threading.Event()
+        original = self.ledger._write
+
+        def slow_write(rows):
+            writing.set()
+            release.wait(5)
+            original(rows)
+
+        self.ledger.append(_entry('2026-01-01T10:00:00', 1, 1))
+        with patch.object(self.ledger, '_write', slow_write):
+            flusher = threading.Thread(target=self.ledger.flush)
+            flusher.start()
+            self.assertTrue(writing.wait(5))
+            appender = threading.Thread(target=self.ledger.append, args=(_entry('2026-01-01T10:00:01', 1, 1),))
+            appender.start()
+            appender.join(1)
+            self.assertFalse(appender.is_alive())  # o append não ficou preso atrás da gravação
+            release.set()
+            flusher.join(5)
+        self.ledger.flush()
+        count = self.ledger.conn.execute("SELECT COUNT(*) FROM token_events").fetchone()[0]
+        self.assertEqual(count, 2)
+
+    def test_rollups_accumulate_across_batches(self):
+        self.ledger.append(_entry('2026-01-01T10:00:00', 100, 50))
+        self.ledger.append(_entry('2026-01-01T11:00:00', 10, 0, success=False, key='cd34'))
+        self.ledger.flush()
+        self.ledger.append(_entry('2026-01-02T09:00:00', 200, 100, model='gemini-2.5-flash-lite'))
+        self.ledger.append(_entry('2026-01-02T09:30:00', 1, 1))
+
+        models = self.ledger.model_totals()['gemini']
+        self.assertEqual(models['gemini-2.5-flash']['total_tokens'], 162)
+        self.assertEqual(models['gemini-2.5-flash']['total_requests'], 3)
+        self.assertEqual(models['gemini-2.5-flash']['failed_requests'], 1)
+        self.assertEqual(models['gemini-2.5-flash']['last_updated'], '2026-01-02T09:30:00')
+        self.assertEqual(models['gemini-2.5-flash-lite']['total_prompt_tokens'], 200)
+
+        daily = self.ledger.daily_totals()
+        self.assertEqual(daily['2026-01-01']['total_tokens'], 160)
+        self.assertEqual(daily['2026-01-02']['requests'], 2)
+        self.assertEqual(list(self.ledger.daily_totals(since_day='2026-01-02')), ['2026-01-02'])
+
+        keys = self.ledger.key_totals()
+        self.assertEqual(keys['ab12']['requests'], 3)
+        self.assertEqual(keys['cd34']['failed_requests'], 1)
+
+        events = self.ledger.event_totals()
+        for day, totals in daily.items():
+            self.assertEqual({k: events[day][k] for k in totals}, totals)
+        self.assertEqual(events['2026-01-01']['negative'], 0)
+
+    def test_key_totals_by_api_type(self):
+        self.ledger.append(_entry('2026-01-01T10:00:00', 100, 50))
+        self.ledger.append(dict(_entry('2026-01-01T10:01:00', 0, 0), api_type='publishing'))
+        self.assertEqual(self.ledger.key_totals()['ab12']['requests'], 2)
+        self.assertEqual(self.ledger.key_totals(api_type='gemini')['ab12']['requests'], 1)
+        self.assertEqual(self.ledger.usage_since('2026-01-01T00:00:00', api_type='gemini')['ab12']['requests'], 1)
+
+    def test_old_key_rollup_is_rebuilt_with_api_type(self):
+        path = Path(tempfile.mkdtemp()) / 'old.db'
+        self.addCleanup(shutil.rmtree, path.parent, ignore_errors=True)
+        ledger = TokenLedger(path)
+        ledger.append(_entry('2026-01-01T10:00:00', 100, 50))
+        ledger.append(dict(_entry('2026-01-01T10:01:00', 0, 0, success=False), api_type='publishing'))
+        ledger.flush()
+        with ledger.conn:
+            ledger.conn.executescript(
+                "DROP TABLE token_keys; CREATE TABLE token_keys (day TEXT NOT NULL, api_key_suffix TEXT NOT NULL, "
+                "prompt_tokens INTEGER, completion_tokens INTEGER, total_tokens INTEGER, requests INTEGER, "
+                "failed_requests INTEGER, PRIMARY KEY (day, api_key_suffix));"
+            )
+        ledger.close()
+
+        ledger = TokenLedger(path)
+        self.addCleanup(ledger.close)
+        self.assertEqual(ledger.key_totals()['ab12'], {
+            'prompt_tokens': 100, 'completion_tokens': 50, 'total_tokens': 150, 'requests': 2, 'failed_requests': 1,
+        })
+        self.assertEqual(ledger.key_totals(api_type='gemini')['ab12']['requests'], 1)
+
+    def test_events_most_recent_first(self):
+        self.ledger.append(_entry('2026-01-01T10:00:00', 1, 1, metadata={'a': 1}, wp_post_id=7))
+        self.ledger.append(_entry('2026-01-02T10:00:00', 2, 2, success=False, error_message='429'))
+        recent = self.ledger.recent(1)
+        self.assertEqual(len(recent), 1)
+        self.assertEqual(recent[0]['timestamp'], '2026-01-02T10:00:00')
+        self.assertIs(recent[0]['success'], False)
+        older = self.ledger.events(until_day='2026-01-01')
+        self.assertEqual(older[0]['metadata'], {'a': 1})
+        self.assertEqual(older[0]['wp_post_id'], 7)
+
+
+class TestTokenTrackerLedger(unittest.TestCase):
+    """TokenTracker on top of the ledger, including the JSONL migration"""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+
+    def test_legacy_jsonl_is_imported_once(self):
+        lines = [
+            _entry('2026-01-01T10:00:00', 100, 20),
+            {'timestamp': '2026-01-01T10:05:00', 'prompt_tokens': 5, 'completion_tokens': 5,
+             'total_tokens': 10, 'operation': 'rewrite', 'source': 'x', 'metadata': {}},
+        ]
+        with open(self.tmp / 'tokens_2026-01-01.jsonl', 'w', encoding='utf-8') as f:
+            f.write('\n'.join(json.dumps(line) for line in lines) + '\n{corrompida\n')
+
+        ledger = TokenLedger(self.tmp / 'a.db')
+        self.addCleanup(ledger.close)
+        self.assertEqual(import_jsonl(ledger, self.tmp), 2)
+        stats = ledger.model_totals()
+        self.assertEqual(stats['gemini']['gemini-2.5-flash']['total_tokens'], 120)
+        self.assertEqual(stats['guarantee']['rewrite']['total_tokens'], 10)
+
+    def test_log_tokens_writes_ledger_and_snapshot(self):
+        tracker = TokenTracker(str(self.tmp))
+        self.addCleanup(tracker.ledger.close)
+        self.assertTrue(tracker.log_tokens(100, 50, model='gemini-2.5-flash', api_key_suffix='ab12'))
+        self.assertTrue(tracker.log_tokens(10, 0, model='gemini-2.5-flash', success=False))
+
+        self.assertEqual(tracker.get_summary()['total_tokens'], 160)
+        self.assertEqual(list(self.tmp.glob('tokens_*.jsonl')), [])
+
+        tracker.ledger.flush()
+        with open(self.tmp / 'token_stats.json', encoding='utf-8') as f:
+            snapshot = json.load(f)
+        self.assertEqual(snapshot['gemini']['gemini-2.5-flash']['total_requests'], 2)
+        self.assertEqual(snapshot, tracker.ledger.model_totals())
+
+
+if __name__ == '__main__':
+    unittest.main()
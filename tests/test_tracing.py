@@ -0,0 +1,111 @@
+"""
+Unit tests for the tracing module (per-article stage spans)
+"""
+
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app import tracing
+from app.tracing import Tracer
+
+
+class TracingTestCase(unittest.TestCase):
+    """Installs an in-memory tracer as the process tracer"""
+
+    def setUp(self):
+        self.tracer = Tracer(':memory:')
+        patches = [
+            patch.object(tracing, 'TRACING_ENABLED', True),
+            patch.object(tracing, '_tracer', self.tracer),
+            patch.object(tracing, '_tracer_pid', os.getpid()),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        tracing.set_article(None)
+
+    def tearDown(self):
+        tracing.set_article(None)
+        self.tracer.close()
+
+
+class TestSpans(TracingTestCase):
+    """Test cases for span nesting, article context and the report"""
+
+    def test_nested_spans_record_parent_and_article(self):
+        tracing.set_article(42)
+        with tracing.span('ai'):
+            with tracing.span('ai.model', attempt=1):
+                pass
+        with self.assertRaises(ValueError):
+            with tracing.span('wp.create_post'):
+                raise ValueError('boom')
+
+        spans = {s['name']: s for s in self.tracer.article_spans(42)}
+        self.assertEqual(spans['ai.model']['parent'], 'ai')
+        self.assertEqual(spans['ai.model']['attrs'], {'attempt': 1})
+        self.assertIsNone(spans['ai']['parent'])
+        self.assertEqual(spans['wp.create_post']['status'], 'error')
+        self.assertEqual(spans['wp.create_post']['attrs']['error'], 'ValueError')
+
+    def test_start_span_does_not_become_parent(self):
+        pending = tracing.start_span('postprocess')
+        with tracing.span('wp.upload_media'):
+            pass
+        self.assertFalse(pending.ended)
+        pending.end()
+        pending.end()
+        self.assertTrue(pending.ended)
+        tracing.flush()
+        rows = self.tracer.conn.execute("SELECT name, parent FROM spans ORDER BY id").fetchall()
+        self.assertEqual(rows, [('wp.upload_media', None), ('postprocess', None)])
+
+    def test_stage_stats_percentiles(self):
+        for ms in range(1, 101):
+            self.tracer.record('fetch', ms / 1000)
+        stats = self.tracer.stage_stats()['fetch']
+        self.assertEqual(stats['count'], 100)
+        self.assertAlmostEqual(stats['p50'], 51, delta=1)
+        self.assertAlmostEqual(stats['p95'], 95, delta=1)
+        self.assertAlmostEqual(stats['max'], 100)
+        self.assertIn('fetch', tracing.format_report(self.tracer.stage_stats()))
+
+    def test_disabled_tracing_records_nothing(self):
+        with patch.object(tracing, 'TRACING_ENABLED', False):
+            with tracing.span('fetch'):
+                pass
+            tracing.record('extract', 0.1)
+        self.assertEqual(self.tracer.stage_stats(), {})
+
+
+class TestInstrumentation(TracingTestCase):
+    """The AI client and WordPress client emit their stage spans"""
+
+    def test_generate_text_splits_waits_from_model_latency(self):
+        from app.ai_client_gemini import AIClient
+
+        client = AIClient(['AIzaKEY1'], min_interval_s=0)
+        response = MagicMock(text='ok', usage_metadata=None)
+        with patch('app.ai_client_gemini.genai') as genai:
+            genai.GenerativeModel.return_value.generate_content.return_value = response
+            tracing.set_article(7)
+            self.assertEqual(client.generate_text('prompt')[0], 'ok')
+
+        spans = {s['name']: s for s in self.tracer.article_spans(7)}
+        self.assertEqual(set(spans), {'ai.generate', 'ai.key_wait', 'ai.rate_limit', 'ai.model'})
+        self.assertEqual(spans['ai.model']['parent'], 'ai.generate')
+
+    def test_wordpress_calls_are_traced(self):
+        from app.wordpress import WordPressClient
+
+        client = WordPressClient({'url': 'https://example.com/wp-json/wp/v2'}, {})
+        with patch.object(client.session, 'post', side_effect=RuntimeError('offline')):
+            with self.assertRaises(RuntimeError):
+                client.create_post({'title': 'Título do post', 'content': '<p>' + 'texto ' * 40 + '</p>'})
+        [span] = self.tracer.stage_stats()
+        self.assertEqual(span, 'wp.create_post')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,7 @@
 Unit tests for the wordpress module
 """
 
+import json
 import unittest
 from unittest.mock import Mock, patch
 from app.wordpress import WordPressClient
@@ -113,11 +114,16 @@ class TestWordPressClient(unittest.TestCase):
         mock_response = Mock()
         mock_response.status_code = 201
         mock_response.json.return_value = {'id': 789}
+        mock_response.elapsed.total_seconds.return_value = 0.5
         mock_post.return_value = mock_response
 
+        content = (
+            '<p>Content long enough to pass the minimum length check applied by create_post '
+            'before anything is sent to the WordPress REST API.</p>'
+        )
         post_payload = {
             'title': 'Test Title',
-            'content': '<p>Content</p>',
+            'content': content,
             'tags': ['tag1', 'tag2']
         }
 
@@ -126,8 +132,12 @@ class TestWordPressClient(unittest.TestCase):
         self.assertEqual(post_id, 789)
         mock_ensure_tags.assert_called_once_with(['tag1', 'tag2'])
         # Check that the final payload sent to WP has the integer tag IDs
-        final_payload = mock_post.call_args.kwargs['json']
+        final_payload = json.loads(mock_post.call_args.kwargs['data'])
         self.assertEqual(final_payload['tags'], [101, 102])
+        self.assertEqual(final_payload['content'], content)
+        headers = mock_post.call_args.kwargs['headers']
+        self.assertTrue(headers['Content-Type'].startswith('application/json'))
+        self.assertNotIn('Content-Encoding', headers)
 
     def test_close_session(self):
         """Test that the session is closed."""
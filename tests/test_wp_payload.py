@@ -0,0 +1,93 @@
+"""
+Unit tests for the wp_payload module (single serialization, gzip and pagination)
+"""
+
+import gzip
+import json
+import unittest
+from unittest.mock import Mock, patch
+
+from app.gutenberg import block
+from app.wordpress import WordPressClient
+from app.wp_payload import NEXTPAGE_BLOCK, PostPayload, encode_body, iter_top_level_blocks, split_pages
+
+
+def _list_article(entries: int) -> str:
+    blocks = []
+    for i in range(entries):
+        blocks.append(block('heading', f'<h2>{i}. Filme {i}</h2>', {'level': 2}))
+        blocks.append(block('paragraph', f'<p>{"Descrição do filme. " * 20}</p>'))
+        items = '\n\n'.join(block('list-item', f'<li>Item {j}</li>') for j in range(3))
+        blocks.append(block('list', f'<ul>{items}</ul>'))
+    return '\n\n'.join(blocks)
+
+
+class TestPostPayload(unittest.TestCase):
+    """Test cases for the incremental payload builder"""
+
+    def test_size_tracks_body_and_replacements(self):
+        payload = PostPayload()
+        self.assertEqual(payload.size, len(payload.body()))
+        payload.add('title', 'Título "com" aspas').add('categories', [1, 2]).add('content', '<p>ç</p>')
+        self.assertEqual(payload.size, len(payload.body()))
+        payload.add('title', 'Outro')
+        self.assertEqual(payload.size, len(payload.body()))
+        self.assertEqual(json.loads(payload.body()), {'title': 'Outro', 'categories': [1, 2], 'content': '<p>ç</p>'})
+
+    def test_unserializable_value_raises(self):
+        with self.assertRaises(TypeError):
+            PostPayload().add('content', object())
+
+    def test_gzip_above_threshold(self):
+        payload = PostPayload().add('content', 'x' * 5000)
+        body, headers = encode_body(payload, gzip_min_bytes=0)
+        self.assertNotIn('Content-Encoding', headers)
+        body, headers = encode_body(payload, gzip_min_bytes=1000)
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(body), payload.body())
+
+
+class TestSplitPages(unittest.TestCase):
+    """Test cases for nextpage pagination of long list articles"""
+
+    def test_top_level_blocks_keep_nested_items(self):
+        content = _list_article(2)
+        self.assertEqual(len(list(iter_top_level_blocks(content))), 6)
+
+    def test_pages_break_before_headings(self):
+        content = _list_article(10)
+        paged, pages = split_pages(content, max_page_bytes=3000)
+        self.assertGreater(pages, 1)
+        self.assertEqual(paged.count(NEXTPAGE_BLOCK), pages - 1)
+        for page in paged.split(NEXTPAGE_BLOCK)[1:]:
+            self.assertTrue(page.strip().startswith('<!-- wp:heading'))
+        self.assertEqual(paged.replace(f'\n\n{NEXTPAGE_BLOCK}', ''), content)
+
+    def test_short_content_is_untouched(self):
+        self.assertEqual(split_pages('<p>curto</p>', max_page_bytes=3000), ('<p>curto</p>', 1))
+        self.assertEqual(split_pages(_list_article(10), max_page_bytes=0)[1], 1)
+
+
+class TestCreatePostBody(unittest.TestCase):
+    """create_post sends the pre-encoded body instead of re-encoding it"""
+
+    @patch('requests.Session.post')
+    def test_large_post_is_sent_once_encoded(self, mock_post):
+        client = WordPressClient({'url': 'https://example.com/wp-json/wp/v2'}, {})
+        mock_post.return_value = Mock(ok=True, status_code=201, json=Mock(return_value={'id': 7}))
+        mock_post.return_value.elapsed.total_seconds.return_value = 0.5
+        content = _list_article(60)
+        self.assertGreater(len(content), 30000)
+
+        with patch('app.wordpress.json.dumps') as mock_dumps:
+            post_id = client.create_post({'title': 'Lista grande', 'content': content})
+
+        self.assertEqual(post_id, 7)
+        mock_dumps.assert_not_called()
+        kwargs = mock_post.call_args.kwargs
+        self.assertEqual(kwargs['headers']['Content-Type'], 'application/json; charset=utf-8')
+        self.assertEqual(json.loads(kwargs['data'])['content'], content)
+
+
+if __name__ == '__main__':
+    unittest.main()
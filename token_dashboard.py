@@ -3,6 +3,7 @@
 """
 DASHBOARD DE TOKENS EM TEMPO REAL
 Monitora tokens, mostra logs em tempo real e força captura obrigatória
+Lê o ledger de tokens (logs/tokens/token_ledger.db)
 """
 
 import json
@@ -13,6 +14,8 @@ from collections import defaultdict
 import time
 import sys
 
+from app.token_ledger import get_ledger
+
 class TokenDashboard:
     """Dashboard em tempo real do sistema de rastreamento de tokens"""
     
@@ -30,32 +33,18 @@ class TokenDashboard:
         self.last_check = 0
         self.last_log_pos = {}  # rastrear posição em cada arquivo
         self.stats_cache = {}
+        self.ledger = get_ledger(self.tokens_dir)
     
     def read_latest_entries(self, lines: int = 20) -> list:
-        """Lê entradas mais recentes do JSONL de hoje"""
+        """Lê entradas mais recentes de hoje no ledger (em ordem cronológica)"""
         today = datetime.now().strftime('%Y-%m-%d')
-        jsonl_file = self.tokens_dir / f"tokens_{today}.jsonl"
-        
-        entries = []
-        if jsonl_file.exists():
-            try:
-                with open(jsonl_file, 'r', encoding='utf-8') as f:
-                    all_lines = f.readlines()
-                    for line in all_lines[-lines:]:
-                        if line.strip():
-                            try:
-                                entries.append(json.loads(line))
-                            except:
-                                pass
-            except:
-                pass
-        
-        return entries
+        try:
+            return list(reversed(self.ledger.events(since_day=today, limit=lines)))
+        except Exception:
+            return []
     
     def get_current_stats(self) -> dict:
-        """Obtém estatísticas atuais"""
-        stats_file = self.tokens_dir / "token_stats.json"
-        
+        """Obtém estatísticas atuais (agregados por API/modelo do ledger)"""
         stats = {
             "total_prompt": 0,
             "total_completion": 0,
@@ -64,35 +53,33 @@ class TokenDashboard:
             "by_api": {}
         }
         
-        if stats_file.exists():
-            try:
-                with open(stats_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+        try:
+            data = self.ledger.model_totals()
+            
+            for api_type, models in data.items():
+                stats["by_api"][api_type] = {
+                    "prompt": 0,
+                    "completion": 0,
+                    "total": 0,
+                    "requests": 0
+                }
                 
-                for api_type, models in data.items():
-                    stats["by_api"][api_type] = {
-                        "prompt": 0,
-                        "completion": 0,
-                        "total": 0,
-                        "requests": 0
-                    }
+                for model, model_data in models.items():
+                    p = model_data.get("total_prompt_tokens", 0)
+                    c = model_data.get("total_completion_tokens", 0)
                     
-                    for model, model_data in models.items():
-                        p = model_data.get("total_prompt_tokens", 0)
-                        c = model_data.get("total_completion_tokens", 0)
-                        
-                        stats["by_api"][api_type]["prompt"] += p
-                        stats["by_api"][api_type]["completion"] += c
-                        stats["by_api"][api_type]["total"] += p + c
-                        stats["by_api"][api_type]["requests"] += model_data.get("total_requests", 0)
-                        
-                        stats["total_prompt"] += p
-                        stats["total_completion"] += c
-                        stats["total_requests"] += model_data.get("total_requests", 0)
-                
-                stats["total_tokens"] = stats["total_prompt"] + stats["total_completion"]
-            except:
-                pass
+                    stats["by_api"][api_type]["prompt"] += p
+                    stats["by_api"][api_type]["completion"] += c
+                    stats["by_api"][api_type]["total"] += p + c
+                    stats["by_api"][api_type]["requests"] += model_data.get("total_requests", 0)
+                    
+                    stats["total_prompt"] += p
+                    stats["total_completion"] += c
+                    stats["total_requests"] += model_data.get("total_requests", 0)
+            
+            stats["total_tokens"] = stats["total_prompt"] + stats["total_completion"]
+        except:
+            pass
         
         return stats
     
@@ -157,7 +144,7 @@ class TokenDashboard:
             prompt = entry.get('prompt_tokens', 0)
             completion = entry.get('completion_tokens', 0)
             total = prompt + completion
-            title = entry.get('article_title', 'N/A')[:30]
+            title = (entry.get('article_title') or 'N/A')[:30]
             
             print(f"│")
             print(f"│  ⏰ {timestamp} | {api:<6} | {prompt:>6} + {completion:>6} = {total:>8}")
@@ -222,6 +209,7 @@ class TokenGuarantee:
         
         self.workspace = workspace_path
         self.tokens_dir = workspace_path / "logs" / "tokens"
+        self.tokens_dir.mkdir(parents=True, exist_ok=True)
         self.guarantee_log = self.tokens_dir / "token_guarantee.log"
     
     def log_guarantee(self, prompt_tokens: int, completion_tokens: int, 
@@ -245,13 +233,20 @@ class TokenGuarantee:
             print(f"[GARANTIA] Erro ao escrever garantia: {e}")
             return False
         
-        # GARANTIA 2: Registrar em arquivo diário JSONL
-        today_file = self.tokens_dir / f"tokens_{datetime.now().strftime('%Y-%m-%d')}.jsonl"
+        # GARANTIA 2: Registrar no ledger de tokens (mesmo formato do app.token_guarantee)
         try:
-            with open(today_file, 'a', encoding='utf-8') as f:
-                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            ledger = get_ledger(self.tokens_dir)
+            ledger.append({
+                "timestamp": timestamp,
+                "api_type": "guarantee",
+                "model": source,
+                "prompt_tokens": entry["prompt_tokens"],
+                "completion_tokens": entry["completion_tokens"],
+                "metadata": dict(entry["metadata"], source=source),
+            })
+            ledger.flush()
         except Exception as e:
-            print(f"[GARANTIA] Erro ao escrever JSONL: {e}")
+            print(f"[GARANTIA] Erro ao escrever no ledger: {e}")
             return False
         
         # GARANTIA 3: Log de sucesso
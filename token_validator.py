@@ -3,16 +3,19 @@
 """
 VERIFICADOR OBRIGATÓRIO DE TOKENS
 Garante que 100% dos tokens foram contabilizados corretamente
-Valida logs, stats e persistência
+Valida o ledger (logs/tokens/token_ledger.db), stats e persistência
 """
 
 import json
 import logging
+import sqlite3
 from pathlib import Path
 from datetime import datetime, timedelta
 import sys
 from tabulate import tabulate  # pip install tabulate
 
+from app.token_ledger import LEDGER_FILENAME, TokenLedger
+
 # Configurar logging
 logging.basicConfig(
     level=logging.DEBUG,
@@ -35,6 +38,7 @@ class TokenValidator:
         self.app_log = self.logs_dir / "app.log"
         self.token_debug_log = self.tokens_dir / "token_debug.log"
         self.token_stats = self.tokens_dir / "token_stats.json"
+        self.ledger_path = self.tokens_dir / LEDGER_FILENAME
         
         self.issues = []
         self.warnings = []
@@ -57,94 +61,76 @@ class TokenValidator:
         
         return all_exist
     
-    def validate_token_files(self) -> dict:
-        """Valida arquivos de tokens"""
-        logger.info("🔍 Validando arquivos de logs de tokens...")
+    def validate_ledger(self) -> dict:
+        """Valida o ledger SQLite de tokens (histórico e agregados por dia)"""
+        logger.info("🔍 Validando ledger de tokens...")
         
         results = {
-            "jsonl_files": [],
+            "days": [],
             "total_entries": 0,
+            "total_tokens": 0,
             "date_range": None,
-            "missing_fields": []
+            "model_totals": None
         }
         
         if not self.tokens_dir.exists():
             self.issues.append("Diretório tokens não existe")
             return results
         
-        jsonl_files = list(self.tokens_dir.glob("tokens_*.jsonl"))
+        if not self.ledger_path.exists():
+            if list(self.tokens_dir.glob("tokens_*.jsonl")):
+                self.warnings.append(
+                    "Ledger ainda não criado; os tokens_*.jsonl antigos são importados "
+                    "na primeira execução do TokenTracker"
+                )
+            else:
+                self.warnings.append(f"Ledger {LEDGER_FILENAME} não encontrado")
+            return results
         
-        if not jsonl_files:
-            self.warnings.append("Nenhum arquivo JSONL encontrado")
+        try:
+            ledger = TokenLedger(self.ledger_path)
+            try:
+                events = ledger.event_totals()
+                daily = ledger.daily_totals()
+                results["model_totals"] = ledger.model_totals()
+            finally:
+                ledger.close()
+        except sqlite3.Error as e:
+            self.issues.append(f"Erro ao ler {LEDGER_FILENAME}: {e}")
             return results
         
-        total_tokens = 0
-        dates = set()
+        if not events:
+            self.warnings.append("Ledger sem registros")
         
-        for jsonl_file in sorted(jsonl_files):
-            file_info = {
-                "file": jsonl_file.name,
-                "size": jsonl_file.stat().st_size,
-                "entries": 0,
-                "total_tokens": 0,
+        for day, totals in events.items():
+            day_info = {
+                "day": day,
+                "entries": totals["requests"],
+                "total_tokens": totals["prompt_tokens"] + totals["completion_tokens"],
                 "valid": True
             }
             
-            try:
-                with open(jsonl_file, 'r', encoding='utf-8') as f:
-                    for line_no, line in enumerate(f, 1):
-                        if not line.strip():
-                            continue
-                        
-                        try:
-                            entry = json.loads(line)
-                            file_info["entries"] += 1
-                            
-                            # Validar campos obrigatórios
-                            required = ["timestamp", "prompt_tokens", "completion_tokens"]
-                            for field in required:
-                                if field not in entry:
-                                    self.issues.append(
-                                        f"{jsonl_file.name}:{line_no} - Campo {field} faltando"
-                                    )
-                                    file_info["valid"] = False
-                            
-                            # Somar tokens
-                            prompt = entry.get("prompt_tokens", 0)
-                            completion = entry.get("completion_tokens", 0)
-                            total = prompt + completion
-                            
-                            # Validar valores
-                            if prompt < 0 or completion < 0:
-                                self.issues.append(
-                                    f"{jsonl_file.name}:{line_no} - Tokens negativos"
-                                )
-                                file_info["valid"] = False
-                            
-                            file_info["total_tokens"] += total
-                            total_tokens += total
-                            
-                            # Extrair data
-                            if "timestamp" in entry:
-                                dates.add(entry["timestamp"][:10])
-                        
-                        except json.JSONDecodeError as e:
-                            self.issues.append(f"{jsonl_file.name}:{line_no} - JSON inválido: {e}")
-                            file_info["valid"] = False
-                
-                if file_info["entries"] > 0:
-                    logger.info(f"✅ {jsonl_file.name}: {file_info['entries']} entradas, {file_info['total_tokens']} tokens")
-                else:
-                    self.warnings.append(f"{jsonl_file.name} está vazio")
-                
-                results["jsonl_files"].append(file_info)
+            # Validar valores
+            if totals["negative"]:
+                self.issues.append(f"{day} - {totals['negative']} registros com tokens negativos")
+                day_info["valid"] = False
+            
+            # Agregado do dia precisa bater com o histórico
+            rollup = daily.get(day)
+            fields = ("prompt_tokens", "completion_tokens", "requests")
+            if rollup is None or any(rollup[f] != totals[f] for f in fields):
+                self.issues.append(f"{day} - agregado token_daily diverge de token_events")
+                day_info["valid"] = False
             
-            except Exception as e:
-                self.issues.append(f"Erro ao ler {jsonl_file.name}: {e}")
+            logger.info(f"✅ {day}: {day_info['entries']} entradas, {day_info['total_tokens']} tokens")
+            results["days"].append(day_info)
         
-        results["total_entries"] = sum(f["entries"] for f in results["jsonl_files"])
-        results["total_tokens"] = total_tokens
-        results["date_range"] = f"{min(dates)} a {max(dates)}" if dates else "N/A"
+        for day in set(daily) - set(events):
+            self.issues.append(f"{day} - agregado token_daily sem registros em token_events")
+        
+        results["total_entries"] = sum(d["entries"] for d in results["days"])
+        results["total_tokens"] = sum(d["total_tokens"] for d in results["days"])
+        results["date_range"] = f"{min(events)} a {max(events)}" if events else "N/A"
         
         return results
     
@@ -192,38 +178,52 @@ class TokenValidator:
             results["valid"] = False
             return results
     
-    def reconcile_tokens(self, jsonl_results: dict, stats_results: dict) -> dict:
-        """Reconcilia totais entre JSONL e stats agregadas"""
-        logger.info("🔍 Reconciliando tokens entre JSONL e Stats...")
+    def reconcile_tokens(self, ledger_results: dict, stats_results: dict) -> dict:
+        """Reconcilia o histórico do ledger com os agregados por modelo e o token_stats.json"""
+        logger.info("🔍 Reconciliando tokens entre ledger e Stats...")
         
         reconciliation = {
-            "jsonl_total": jsonl_results.get("total_tokens", 0),
+            "ledger_total": ledger_results.get("total_tokens", 0),
             "stats_total": 0,
             "match": False,
             "discrepancy": 0,
             "details": []
         }
         
-        if stats_results["stats"]:
-            for api_type, models in stats_results["stats"].items():
-                for model, data in models.items():
-                    total = data.get("total_prompt_tokens", 0) + data.get("total_completion_tokens", 0)
-                    reconciliation["stats_total"] += total
+        def _total(stats: dict) -> int:
+            return sum(
+                data.get("total_prompt_tokens", 0) + data.get("total_completion_tokens", 0)
+                for models in stats.values()
+                for data in models.values()
+            )
+        
+        if ledger_results.get("model_totals") is not None:
+            reconciliation["stats_total"] = _total(ledger_results["model_totals"])
         
         reconciliation["discrepancy"] = abs(
-            reconciliation["jsonl_total"] - reconciliation["stats_total"]
+            reconciliation["ledger_total"] - reconciliation["stats_total"]
         )
         reconciliation["match"] = reconciliation["discrepancy"] == 0
         
         if reconciliation["match"]:
-            logger.info(f"✅ PERFEITO: JSONL e Stats sincronizados ({reconciliation['jsonl_total']} tokens)")
+            logger.info(f"✅ PERFEITO: ledger e Stats sincronizados ({reconciliation['ledger_total']} tokens)")
         else:
             self.issues.append(
-                f"Discrepância de tokens: JSONL={reconciliation['jsonl_total']}, "
+                f"Discrepância de tokens: ledger={reconciliation['ledger_total']}, "
                 f"Stats={reconciliation['stats_total']} (diferença: {reconciliation['discrepancy']})"
             )
             logger.error(f"❌ Discrepância detectada: {reconciliation['discrepancy']} tokens")
         
+        # token_stats.json é só um instantâneo, regravado depois de cada lote
+        if stats_results["stats"] is not None and ledger_results.get("model_totals") is not None:
+            snapshot_total = _total(stats_results["stats"])
+            if snapshot_total != reconciliation["stats_total"]:
+                self.warnings.append(
+                    f"token_stats.json desatualizado: {snapshot_total} tokens "
+                    f"(ledger: {reconciliation['stats_total']}); é regravado no próximo lote"
+                )
+            reconciliation["details"].append(f"Instantâneo: {snapshot_total} tokens")
+        
         return reconciliation
     
     def generate_report(self) -> str:
@@ -234,9 +234,9 @@ class TokenValidator:
         
         # Executar validações
         dir_valid = self.validate_directories()
-        jsonl_results = self.validate_token_files()
+        ledger_results = self.validate_ledger()
         stats_results = self.validate_stats_file()
-        reconciliation = self.reconcile_tokens(jsonl_results, stats_results)
+        reconciliation = self.reconcile_tokens(ledger_results, stats_results)
         
         # Construir relatório
         report = []
@@ -249,7 +249,7 @@ class TokenValidator:
         report.append("📊 STATUS GERAL:")
         report.append("-" * 80)
         report.append(f"Diretórios: {'✅ OK' if dir_valid else '❌ FALTANDO'}")
-        report.append(f"JSONL Válidos: {'✅ OK' if jsonl_results['jsonl_files'] else '❌ NENHUM'}")
+        report.append(f"Ledger Válido: {'✅ OK' if ledger_results['days'] else '❌ VAZIO'}")
         report.append(f"Stats Válidas: {'✅ OK' if stats_results['valid'] else '❌ INVÁLIDO'}")
         report.append(f"Reconciliação: {'✅ OK' if reconciliation['match'] else '❌ DISCREPÂNCIA'}")
         report.append("")
@@ -257,37 +257,38 @@ class TokenValidator:
         # Seção: Detalhes de Tokens
         report.append("💰 DETALHES DE TOKENS:")
         report.append("-" * 80)
-        report.append(f"Total em JSONL: {jsonl_results['total_tokens']:,} tokens")
+        report.append(f"Total no Ledger: {ledger_results['total_tokens']:,} tokens")
         report.append(f"Total em Stats: {reconciliation['stats_total']:,} tokens")
         report.append(f"Discrepância: {reconciliation['discrepancy']:,} tokens")
-        report.append(f"Período: {jsonl_results['date_range']}")
+        report.append(f"Período: {ledger_results['date_range']}")
         report.append("")
         
-        # Seção: Arquivos JSONL
-        if jsonl_results['jsonl_files']:
-            report.append("📋 ARQUIVOS JSONL:")
+        # Seção: Dias no ledger
+        if ledger_results['days']:
+            report.append("📋 DIAS NO LEDGER:")
             report.append("-" * 80)
             table_data = []
-            for f in jsonl_results['jsonl_files']:
+            for d in ledger_results['days']:
                 table_data.append([
-                    f['file'],
-                    f['entries'],
-                    f"{f['total_tokens']:,}",
-                    '✅ OK' if f['valid'] else '❌ ERRO'
+                    d['day'],
+                    d['entries'],
+                    f"{d['total_tokens']:,}",
+                    '✅ OK' if d['valid'] else '❌ ERRO'
                 ])
             report.append(tabulate(
                 table_data,
-                headers=['Arquivo', 'Entradas', 'Tokens', 'Status'],
+                headers=['Dia', 'Entradas', 'Tokens', 'Status'],
                 tablefmt='grid'
             ))
             report.append("")
         
         # Seção: APIs e Modelos
-        if stats_results["stats"]:
+        model_stats = ledger_results.get("model_totals") or stats_results["stats"]
+        if model_stats:
             report.append("🔧 APIS E MODELOS:")
             report.append("-" * 80)
             table_data = []
-            for api_type, models in stats_results["stats"].items():
+            for api_type, models in model_stats.items():
                 for model, data in models.items():
                     prompt = data.get("total_prompt_tokens", 0)
                     completion = data.get("total_completion_tokens", 0)